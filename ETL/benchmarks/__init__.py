@@ -0,0 +1,6 @@
+"""Performance benchmarks for ETL pipeline components
+
+Standalone scripts (bench_*.py) that measure throughput and latency of ETL
+building blocks on synthetic data. They are not collected by pytest; run them
+directly, e.g. `python -m ETL.benchmarks.bench_vector_search`.
+"""
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: throughput (MB/s) of chunking cleaned SEC filing text.
+
+Writes synthetic 10-K text (paragraphs of sentences with blank lines, like
+the cleaned text in chunk files) and chunks it with the chunk_size /
+chunk_overlap of VectorEmbeddingConfig:
+
+    legacy _chunk_document  the string-slicing chunker of
+                            SemanticEmbeddingGenerator before offsets
+    offsets                 chunker.chunk_spans over the str, offsets only
+    offsets + text          the same, then every chunk materialized
+    offsets over mmap       chunker.chunk_file_spans over an mmap of the file
+
+Peak MB is the tracemalloc peak of a separate run of each pass (the text
+itself is allocated before). When langchain is installed the
+RecursiveCharacterTextSplitter that ETL/rcts.py used is measured as well.
+
+Usage:
+    python -m ETL.benchmarks.bench_chunker
+    python -m ETL.benchmarks.bench_chunker --size-mb 200 --chunk-size 1024
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.sec_filing_processor.chunker import chunk_file_spans, chunk_spans, chunk_texts
+
+SENTENCES = [
+    "Net sales increased 2% or $7.8 billion during 2024 compared to 2023.",
+    "The increase was driven by higher sales of Services, partially offset by iPhone.",
+    "Gross margin percentage was 46.2%, up from 44.1% a year earlier.",
+    "The Company believes its existing balances will be sufficient for its requirements ",
+]
+
+
+def write_text(path, size_mb):
+    paragraph = " ".join(SENTENCES) + "\n\n"
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range((size_mb << 20) // len(paragraph)):
+            f.write(f"Item {n}\n" if n % 10 == 0 else paragraph)
+
+
+def legacy_chunk(content, chunk_size, chunk_overlap):
+    """SemanticEmbeddingGenerator._chunk_document before offset chunking."""
+    chunks = []
+    start = 0
+
+    while start < len(content):
+        end = start + chunk_size
+        chunk_text = content[start:end]
+
+        # Try to break at sentence boundaries
+        if end < len(content):
+            last_period = chunk_text.rfind(".")
+            last_newline = chunk_text.rfind("\n")
+            break_point = max(last_period, last_newline)
+
+            if break_point > start + chunk_size // 2:  # At least half the chunk size
+                end = start + break_point + 1
+                chunk_text = content[start:end]
+
+        chunks.append({"content": chunk_text.strip(), "start": start, "end": end})
+
+        start = end - chunk_overlap
+
+    return chunks
+
+
+def measure(func, repeat):
+    """Best of ``repeat`` timed runs, then one run under tracemalloc for the peak."""
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = func()
+        seconds = min(seconds, time.perf_counter() - start)
+    del chunks
+    tracemalloc.start()
+    chunks = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return chunks, seconds, peak
+
+
+def run(size_mb, chunk_size, chunk_overlap, repeat, workdir):
+    fd, path = tempfile.mkstemp(prefix="bench_chunker_", suffix=".txt", dir=workdir)
+    os.close(fd)
+    try:
+        write_text(path, size_mb)
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        text_mb = len(content) / 2**20
+        print(f"text={text_mb:.0f} MB, chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+
+        passes = [
+            ("legacy _chunk_document", lambda: legacy_chunk(content, chunk_size, chunk_overlap)),
+            ("offsets", lambda: chunk_spans(content, chunk_size, chunk_overlap)),
+            (
+                "offsets + text",
+                lambda: list(chunk_texts(content, chunk_spans(content, chunk_size, chunk_overlap))),
+            ),
+            ("offsets over mmap", lambda: chunk_file_spans(path, chunk_size, chunk_overlap)),
+        ]
+        try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                separators=["\n\n", "\n", ".", " ", ""],
+            )
+            passes.append(("langchain rcts", lambda: splitter.split_text(content)))
+        except ImportError:
+            print("langchain not installed: skipping RecursiveCharacterTextSplitter")
+
+        print(f"{'pass':>22} | {'chunks':>8} | {'seconds':>7} | {'MB/s':>7} | {'peak MB':>7}")
+        for label, func in passes:
+            chunks, seconds, peak = measure(func, repeat)
+            print(
+                f"{label:>22} | {len(chunks):>8} | {seconds:7.3f} | {text_mb / seconds:7.0f} | "
+                f"{peak / 2**20:7.1f}"
+            )
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per pass; the best is shown")
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary text file")
+    args = parser.parse_args()
+    run(args.size_mb, args.chunk_size, args.chunk_overlap, args.repeat, args.workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: posting-list pre-filtered search vs unfiltered search.
+
+Builds a corpus where each ticker owns an equal share of rows, then times a
+single-query unfiltered top-k against a top-k restricted to one ticker's rows
+via PostingLists.select + search_subset.
+
+Usage:
+    python -m ETL.benchmarks.bench_filtered_search
+    python -m ETL.benchmarks.bench_filtered_search --rows 1000000 --tickers 3500
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.benchmarks.bench_vector_search import random_unit_vectors, time_call
+from ETL.embedding_store import PostingLists
+from ETL.vector_index import NumpyVectorIndex
+
+
+def run(rows: int, tickers: int, dim: int, k: int):
+    data = random_unit_vectors(rows, dim, seed=0)
+    query = random_unit_vectors(1, dim, seed=1)
+    ticker_of_row = np.random.default_rng(2).integers(0, tickers, rows)
+    postings = PostingLists.from_columns({"ticker": [f"T{t}" for t in ticker_of_row]})
+    index = NumpyVectorIndex.from_matrix(data)
+
+    candidates, _ = postings.select({"ticker": "T0"})
+    unfiltered = time_call(lambda: index.search(query, k))
+    filtered = time_call(
+        lambda: index.search_subset(query, k, postings.select({"ticker": "T0"})[0])
+    )
+
+    print(f"rows={rows} tickers={tickers} dim={dim} k={k} matching rows={len(candidates)}")
+    print(f"unfiltered search: {unfiltered * 1e3:9.3f} ms")
+    print(f"filtered search:   {filtered * 1e3:9.3f} ms  ({unfiltered / filtered:.0f}x faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    run(args.rows, args.tickers, args.dim, args.k)
+
+
+if __name__ == "__main__":
+    main()
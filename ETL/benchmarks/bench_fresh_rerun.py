@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: no-op yfinance spider rerun over a v3k-sized data partition.
+
+Every ticker already has a fresh file for every period, so a rerun only runs
+MetadataManager.check_file_exists_recent and skips. The first rerun trusts the
+stored (size, mtime_ns, inode) fingerprints; the second one runs after every
+file was touched, which forces the streaming re-hash fallback (the cost of
+every rerun before fingerprints, with a warm page cache, so a lower bound).
+
+Usage:
+    python -m ETL.benchmarks.bench_fresh_rerun
+    python -m ETL.benchmarks.bench_fresh_rerun --tickers 500 --file-kb 1024
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from common.build.metadata_manager import MetadataManager
+from ETL.yfinance_spider import fetch_ticker_periods
+
+PERIOD_ITEMS = [
+    ("D1", "3mo", "1d"),
+    ("W7", "5y", "1wk"),
+    ("M30", "max", "1mo"),
+]
+
+
+def no_fetch(ticker):
+    raise AssertionError(f"no-op rerun tried to fetch {ticker}")
+
+
+def populate(manager, base_dir, tickers, file_kb):
+    """Write one file per ticker and period, recorded as the spider's save_data does."""
+    payload = os.urandom(file_kb * 1024)
+    for ticker in tickers:
+        ticker_dir = Path(base_dir) / "yfinance" / "20251016" / ticker
+        ticker_dir.mkdir(parents=True, exist_ok=True)
+        for oid, period, interval in PERIOD_ITEMS:
+            path = ticker_dir / f"{ticker}_yfinance_{oid}_251016-000000.json"
+            path.write_bytes(payload)
+            config_info = {"period": period, "interval": interval, "oid": oid, "exe_id": "seed"}
+            manager.add_file_record("yfinance", ticker, str(path), oid, config_info)
+
+
+def rerun(manager, tickers):
+    logger = logging.getLogger("bench_fresh_rerun")
+    start = time.perf_counter()
+    skipped = 0
+    for ticker in tickers:
+        result = fetch_ticker_periods(
+            ticker, PERIOD_ITEMS, "yfinance", "rerun", logger, manager, ticker_factory=no_fetch
+        )
+        assert result["fetched"] == 0 and result["errors"] == 0
+        skipped += result["skipped"]
+    return time.perf_counter() - start, skipped
+
+
+def run(n_tickers, file_kb, workdir):
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    base_dir = tempfile.mkdtemp(prefix="bench_fresh_rerun_", dir=workdir)
+    try:
+        manager = MetadataManager(base_dir)
+        start = time.perf_counter()
+        populate(manager, base_dir, tickers, file_kb)
+        n_files = n_tickers * len(PERIOD_ITEMS)
+        total_mb = n_files * file_kb / 1024
+        print(f"tickers={n_tickers} files={n_files} data={total_mb:.0f} MB")
+        print(f"populate (write + hash + record): {time.perf_counter() - start:.1f} s")
+
+        seconds, skipped = rerun(manager, tickers)
+        print(f"no-op rerun, fingerprints trusted:  {seconds:7.2f} s ({skipped} skipped)")
+
+        for ticker in tickers:
+            for path in (Path(base_dir) / "yfinance" / "20251016" / ticker).iterdir():
+                os.utime(path)
+        seconds, skipped = rerun(manager, tickers)
+        print(
+            f"no-op rerun, all files re-hashed:   {seconds:7.2f} s ({skipped} skipped, "
+            f"{total_mb / seconds:.0f} MB/s)"
+        )
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=3485, help="v3k has 3485 tickers")
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary data")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    run(args.tickers, args.file_kb, args.workdir)
+
+
+if __name__ == "__main__":
+    main()
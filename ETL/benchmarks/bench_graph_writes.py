@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Neo4j write throughput of per-node vs batched UNWIND statements.
+
+Loads a synthetic graph shaped like GraphDataIntegrator output (Stock nodes,
+SECFiling nodes and HAS_FILING relationships) two ways:
+
+    per node   one MERGE round trip per stock and per filing, as
+               GraphDataIntegrator did before batching
+    batched    ETL.graph_batch_writer.GraphBatchWriter, UNWIND batches of
+               --batch-size rows in explicit transactions
+
+By default the database is a latency stand-in: every request (statement,
+BEGIN, COMMIT) sleeps one network round trip (--rtt-ms, 0.5 ms is typical
+of a local container over bolt) plus a server cost per row (--row-us). With
+--neo4j-url and neomodel installed it writes to a real Neo4j (for example a
+local neo4j:5 test container) under Bench* labels, which are removed after.
+
+Usage:
+    python -m ETL.benchmarks.bench_graph_writes
+    python -m ETL.benchmarks.bench_graph_writes --companies 100 --filings 200 --rtt-ms 2
+    python -m ETL.benchmarks.bench_graph_writes --neo4j-url bolt://localhost:7687
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.graph_batch_writer import GraphBatchWriter
+
+LABELS = {"Stock": "BenchStock", "SECFiling": "BenchSECFiling"}
+
+PER_NODE_STOCK = """
+MERGE (s:BenchStock {ticker: $ticker})
+SET s.node_id = $node_id, s.company_name = $company_name, s.cik = $cik
+"""
+
+PER_NODE_FILING = """
+MERGE (f:BenchSECFiling {accession_number: $accession_number})
+SET f.node_id = $node_id, f.filing_type = $filing_type, f.filing_date = $filing_date
+WITH f
+MATCH (s:BenchStock {ticker: $ticker})
+MERGE (s)-[:HAS_FILING]->(f)
+"""
+
+
+class LatencyStandIn:
+    """neomodel ``db`` stand-in: each request costs a round trip plus a cost per row."""
+
+    def __init__(self, rtt_seconds, row_seconds):
+        self.rtt_seconds = rtt_seconds
+        self.row_seconds = row_seconds
+        self.requests = 0
+
+    def _request(self, rows=0):
+        self.requests += 1
+        time.sleep(self.rtt_seconds + rows * self.row_seconds)
+
+    def cypher_query(self, query, params=None):
+        if params and "rows" in params:
+            self._request(len(params["rows"]))
+        else:
+            self._request(query.count("MERGE"))  # Nodes and relationships merged
+        return [], None
+
+    @property
+    def transaction(self):
+        return self
+
+    def __enter__(self):
+        self._request()  # BEGIN
+
+    def __exit__(self, *exc_info):
+        self._request()  # COMMIT
+        return False
+
+
+def connect_neo4j(url, username, password):
+    from neomodel import db
+
+    db.set_connection(url=url, username=username, password=password)
+    return db
+
+
+def dataset(companies, filings):
+    stocks = [
+        {
+            "ticker": f"T{c:04d}",
+            "node_id": f"stock_T{c:04d}",
+            "company_name": f"Company {c}",
+            "cik": f"{c:010d}",
+        }
+        for c in range(companies)
+    ]
+    sec_filings = [
+        {
+            "ticker": stock["ticker"],
+            "accession_number": f"{stock['cik']}-24-{f:06d}",
+            "node_id": f"sec_{stock['ticker']}_{f}",
+            "filing_type": ("10K", "10Q", "8K")[f % 3],
+            "filing_date": f"2024-{f % 12 + 1:02d}-01",
+        }
+        for stock in stocks
+        for f in range(filings)
+    ]
+    return stocks, sec_filings
+
+
+def load_per_node(db, stocks, filings):
+    for stock in stocks:
+        db.cypher_query(PER_NODE_STOCK, stock)
+    for filing in filings:
+        db.cypher_query(PER_NODE_FILING, filing)
+    return len(stocks) + len(filings)
+
+
+def load_batched(db, stocks, filings, batch_size):
+    writer = GraphBatchWriter(db, batch_size=batch_size)
+    for stock in stocks:
+        writer.merge_node(LABELS["Stock"], "ticker", stock)
+    for filing in filings:
+        properties = {key: value for key, value in filing.items() if key != "ticker"}
+        writer.merge_node(LABELS["SECFiling"], "accession_number", properties)
+        writer.merge_relationship(
+            "HAS_FILING",
+            (LABELS["Stock"], "ticker"),
+            filing["ticker"],
+            (LABELS["SECFiling"], "accession_number"),
+            filing["accession_number"],
+        )
+    writer.flush()
+    return writer.stats["statements"]
+
+
+def clean_up(db):
+    db.cypher_query("MATCH (n) WHERE n:BenchStock OR n:BenchSECFiling DETACH DELETE n")
+
+
+def run(companies, filings, batch_size, rtt_ms, row_us, neo4j_url, username, password):
+    stocks, sec_filings = dataset(companies, filings)
+    rows = len(stocks) + 2 * len(sec_filings)  # Nodes and relationships written
+    if neo4j_url:
+        db = connect_neo4j(neo4j_url, username, password)
+        print(f"Neo4j at {neo4j_url}")
+    else:
+        db = LatencyStandIn(rtt_ms / 1000, row_us / 1e6)
+        print(f"latency stand-in: rtt={rtt_ms} ms, {row_us} us per row")
+    print(
+        f"{len(stocks)} stocks, {len(sec_filings)} filings ({rows} nodes + relationships), "
+        f"batch_size={batch_size}"
+    )
+    print(f"{'pass':>9} | {'statements':>10} | {'seconds':>7} | {'stmts/s':>8} | {'rows/s':>8}")
+    passes = [
+        ("per node", lambda: load_per_node(db, stocks, sec_filings)),
+        ("batched", lambda: load_batched(db, stocks, sec_filings, batch_size)),
+    ]
+    for label, load in passes:
+        if neo4j_url:
+            clean_up(db)
+        start = time.perf_counter()
+        statements = load()
+        seconds = time.perf_counter() - start
+        print(
+            f"{label:>9} | {statements:>10} | {seconds:7.2f} | {statements / seconds:8.0f} | "
+            f"{rows / seconds:8.0f}"
+        )
+    if neo4j_url:
+        clean_up(db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--filings", type=int, default=100, help="Filings per company")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="Stand-in round trip time")
+    parser.add_argument("--row-us", type=float, default=20.0, help="Stand-in server cost per row")
+    parser.add_argument("--neo4j-url", default=None, help="Write to this Neo4j instead")
+    parser.add_argument("--username", default="neo4j")
+    parser.add_argument("--password", default="password")
+    args = parser.parse_args()
+    run(
+        args.companies,
+        args.filings,
+        args.batch_size,
+        args.rtt_ms,
+        args.row_us,
+        args.neo4j_url,
+        args.username,
+        args.password,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: IVFVectorIndex recall@k and latency vs exact NumpyVectorIndex search.
+
+Data is synthetic 384-d unit vectors drawn around random cluster centers
+(pure Gaussian noise has no neighbourhood structure for any ANN index to
+exploit). For each nprobe the table reports recall@k against exact search
+and single-query latency.
+
+Usage:
+    python -m ETL.benchmarks.bench_ivf_recall
+    python -m ETL.benchmarks.bench_ivf_recall --size 100000 --nprobe 1 4 16
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.benchmarks.bench_vector_search import time_call
+from ETL.vector_index import IVFVectorIndex, NumpyVectorIndex, normalize_rows
+
+
+def clustered_unit_vectors(
+    n: int, dim: int, n_clusters: int, noise: float, seed: int
+) -> np.ndarray:
+    centers = np.random.default_rng(0).standard_normal((n_clusters, dim), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    data = np.empty((n, dim), dtype=np.float32)
+    block = 100_000
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        data[start:end] = centers[rng.integers(0, n_clusters, end - start)]
+        data[start:end] += noise * rng.standard_normal((end - start, dim), dtype=np.float32)
+    return normalize_rows(data)
+
+
+def recall_at_k(approx: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)]))
+
+
+def run(size, dim, k, n_queries, nprobes, nlist, n_clusters, noise):
+    data = clustered_unit_vectors(size, dim, n_clusters, noise, seed=1)
+    queries = clustered_unit_vectors(n_queries, dim, n_clusters, noise, seed=2)
+
+    exact_index = NumpyVectorIndex.from_matrix(data)
+    _, exact = exact_index.search(queries, k)
+    exact_latency = time_call(lambda: exact_index.search(queries[:1], k))
+
+    start = time.perf_counter()
+    ivf = IVFVectorIndex.build(data, nlist=nlist)
+    build_seconds = time.perf_counter() - start
+
+    print(f"vectors={size} dim={dim} k={k} queries={n_queries} nlist={ivf.nlist}")
+    print(f"IVF build: {build_seconds:.1f} s, exact 1q latency: {exact_latency * 1e3:.2f} ms")
+    print(f"{'nprobe':>7} | {f'recall@{k}':>9} | {'1q latency (ms)':>15} | {'speedup':>8}")
+    for nprobe in nprobes:
+        ivf.nprobe = nprobe
+        _, approx = ivf.search(queries, k)
+        latency = time_call(lambda: ivf.search(queries[:1], k))
+        print(
+            f"{nprobe:>7} | {recall_at_k(approx, exact):9.3f} | {latency * 1e3:15.2f} | "
+            f"{exact_latency / latency:7.1f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nlist", type=int, default=0, help="0 picks about 2 * sqrt(size)")
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=1.5, help="Noise / center norm ratio")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+    run(
+        args.size,
+        args.dim,
+        args.k,
+        args.queries,
+        args.nprobe,
+        args.nlist,
+        args.clusters,
+        args.noise,
+    )
+
+
+if __name__ == "__main__":
+    main()
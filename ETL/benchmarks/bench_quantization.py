@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: memory, recall@k and latency of compressed (float16 / int8 / pq) search.
+
+Data is the same synthetic clustered 384-d unit vectors as bench_ivf_recall.
+For each compression the table reports bytes held in memory per vector, the
+reduction against the float32 matrix (and against the float64 arrays built
+from Python lists), recall@k of the quantized scores alone and after exact
+re-ranking of rerank * k candidates against the full-precision vectors, and
+single-query latency.
+
+Usage:
+    python -m ETL.benchmarks.bench_quantization
+    python -m ETL.benchmarks.bench_quantization --size 1000000 --rerank 4 10 20
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.benchmarks.bench_ivf_recall import clustered_unit_vectors, recall_at_k
+from ETL.benchmarks.bench_vector_search import time_call
+from ETL.vector_index import NumpyVectorIndex
+from ETL.vector_quantization import QuantizedVectorIndex
+
+
+def run(size, dim, k, n_queries, compressions, reranks, pq_subspaces, n_clusters, noise):
+    data = clustered_unit_vectors(size, dim, n_clusters, noise, seed=1)
+    queries = clustered_unit_vectors(n_queries, dim, n_clusters, noise, seed=2)
+
+    exact_index = NumpyVectorIndex.from_matrix(data)
+    _, exact = exact_index.search(queries, k)
+    exact_latency = time_call(lambda: exact_index.search(queries[:1], k))
+    float32_bytes = data.nbytes / size
+
+    print(f"vectors={size} dim={dim} k={k} queries={n_queries}")
+    print(f"float32: {float32_bytes:.0f} B/vector, exact 1q latency: {exact_latency * 1e3:.2f} ms")
+    print(
+        f"{'codec':>8} | {'B/vector':>8} | {'vs f32':>7} | {'vs f64':>7} | {'build s':>7} | "
+        f"{'rerank':>6} | {f'recall@{k}':>9} | {'1q latency (ms)':>15}"
+    )
+    for compression in compressions:
+        start = time.perf_counter()
+        index = QuantizedVectorIndex.build(data, compression, pq_subspaces=pq_subspaces)
+        build_seconds = time.perf_counter() - start
+        per_vector = index.nbytes / size
+        for rerank in [0] + list(reranks):
+            # rerank 0: quantized scores only, no full-precision vectors touched
+            index.vectors = data if rerank else None
+            index.rerank = max(rerank, 1)
+            _, approx = index.search(queries, k)
+            latency = time_call(lambda: index.search(queries[:1], k))
+            print(
+                f"{compression:>8} | {per_vector:8.1f} | {float32_bytes / per_vector:6.1f}x | "
+                f"{2 * float32_bytes / per_vector:6.1f}x | {build_seconds:7.1f} | {rerank:>6} | "
+                f"{recall_at_k(approx, exact):9.3f} | {latency * 1e3:15.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument(
+        "--compression", nargs="+", default=["float16", "int8", "pq"], help="Codecs to compare"
+    )
+    parser.add_argument("--rerank", type=int, nargs="+", default=[4, 10, 20])
+    parser.add_argument("--pq-subspaces", type=int, default=0, help="0 picks dim / 8")
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--noise", type=float, default=1.5, help="Noise / center norm ratio")
+    args = parser.parse_args()
+    run(
+        args.size,
+        args.dim,
+        args.k,
+        args.queries,
+        args.compression,
+        args.rerank,
+        args.pq_subspaces,
+        args.clusters,
+        args.noise,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: bytes transferred and written by daily SEC filing syncs.
+
+A local fake EDGAR server holds n100-sized filing histories. Day 1 is a cold
+sync. Day 2 is a rerun into a new date partition with nothing new filed: the
+listings are revalidated with 304 Not Modified and every filing is hard-linked
+from the manifest. Day 3 has one new 8-K for every tenth company. For
+comparison the day 2 rerun is repeated with incremental sync disabled, which
+is what every run did before (minus the old fixed sleeps).
+
+"written" counts the bytes of files (inodes) that did not exist before the
+run, so hard links count as zero and rewritten manifests count in full.
+
+Usage:
+    python -m ETL.benchmarks.bench_sec_incremental_sync
+    python -m ETL.benchmarks.bench_sec_incremental_sync --companies 500 --file-kb 512
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.sec_edgar_downloader import EdgarClient, EdgarDownloader
+
+# source_sec_edgar.yml filing_types: (type, priority, max_filings)
+FILING_TYPES = [("10K", 1, 5), ("10Q", 2, 8), ("8K", 3, 20)]
+FORMS = ["10-K"] * 5 + ["10-Q"] * 8 + ["8-K"] * 20 + ["4"] * 40
+
+
+class FakeEdgarHandler(BaseHTTPRequestHandler):
+    """Submissions JSON with ETags and filing text of a fixed size."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match = re.fullmatch(r"/submissions/CIK(\d{10})\.json", self.path)
+        if match:
+            forms = self.server.companies[match.group(1)]
+            n = len(forms)
+            document = {
+                "tickers": [f"T{int(match.group(1))}"],
+                "filings": {
+                    "recent": {
+                        "accessionNumber": [f"{match.group(1)}-24-{n - i:06d}" for i in range(n)],
+                        "filingDate": ["2024-01-01"] * n,
+                        "form": forms,
+                    }
+                },
+            }
+            body = json.dumps(document).encode()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", etag)
+            return self._send(200, body, etag)
+        self._send(200, self.server.payload)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def inode_sizes(root):
+    """{(device, inode, mtime): size} of every file under root; freed inodes get reused."""
+    sizes = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            stat = os.stat(os.path.join(dirpath, name))
+            sizes[(stat.st_dev, stat.st_ino, stat.st_mtime_ns)] = stat.st_size
+    return sizes
+
+
+def sync(server_url, data_root, day, ciks, workers, incremental):
+    client = EdgarClient("Benchmark (bench@example.com)", server_url, server_url)
+    manifest_dir = os.path.join(data_root, ".manifests") if incremental else None
+    downloader = EdgarDownloader(
+        client, os.path.join(data_root, day), max_workers=workers, manifest_dir=manifest_dir
+    )
+    before = inode_sizes(data_root)
+    start = time.perf_counter()
+    stats = downloader.run(ciks, FILING_TYPES)
+    seconds = time.perf_counter() - start
+    written = sum(size for key, size in inode_sizes(data_root).items() if key not in before)
+    return stats, client, written, seconds
+
+
+def report(label, stats, client, written, seconds):
+    print(
+        f"{label:<28} | {stats['downloaded']:>10} | {stats['linked']:>6} | {client.requests:>8} | "
+        f"{client.bytes_received / 2**20:12.3f} | {written / 2**20:12.3f} | {seconds:7.2f}"
+    )
+
+
+def run(n_companies, file_kb, workers, workdir):
+    ciks = [f"{i:010d}" for i in range(1, n_companies + 1)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEdgarHandler)
+    server.daemon_threads = True
+    server.companies = {cik: list(FORMS) for cik in ciks}
+    server.payload = os.urandom(file_kb * 1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    data_root = tempfile.mkdtemp(prefix="bench_sec_sync_", dir=workdir)
+    try:
+        filings = n_companies * sum(count for _, _, count in FILING_TYPES)
+        print(f"companies={n_companies} filings={filings} filing size={file_kb} KB")
+        print(
+            f"{'run':<28} | {'downloaded':>10} | {'linked':>6} | {'requests':>8} | "
+            f"{'received MB':>12} | {'written MB':>12} | {'seconds':>7}"
+        )
+        days = [
+            ("day 1: cold sync", "20251014", True),
+            ("day 2: nothing new", "20251015", True),
+            ("day 3: 1 new 8-K per 10 cos", "20251016", True),
+            ("day 3 rerun, not incremental", "20251017", False),
+        ]
+        for label, day, incremental in days:
+            if day == "20251016":
+                for cik in ciks[::10]:
+                    server.companies[cik].insert(0, "8-K")
+            report(label, *sync(url, data_root, day, ciks, workers, incremental))
+    finally:
+        server.shutdown()
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--companies", type=int, default=100, help="n100 has 100 companies")
+    parser.add_argument("--file-kb", type=int, default=128)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary data")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    run(args.companies, args.file_kb, args.workers, args.workdir)
+
+
+if __name__ == "__main__":
+    main()
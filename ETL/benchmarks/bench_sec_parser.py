@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: throughput and peak memory of parsing a large SEC filing.
+
+Writes a synthetic full submission text file (a 10-K in HTML, many small
+exhibits and one large uuencoded GRAPHIC document, like filings with
+exhibits) and compares a plain chunked read of the file (disk / page cache
+speed) with ETL.sec_parser.iter_sec_documents, headers only and with text
+extraction of every document. Peak memory is the tracemalloc peak of a
+separate run of each pass. When beautifulsoup4 is installed the previous
+regex + BeautifulSoup parser is measured as well.
+
+Usage:
+    python -m ETL.benchmarks.bench_sec_parser
+    python -m ETL.benchmarks.bench_sec_parser --size-mb 200 --largest-mb 80
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.sec_parser import CHUNK_SIZE, iter_sec_documents, preprocess_sec_content
+
+PARAGRAPH = (
+    "<p style='font-family:Times New Roman'>Net sales increased 2% or $7.8 billion during "
+    "2024 compared to 2023 &amp; were driven by higher sales of Services.</p>\n"
+)
+
+
+def document(doc_type, sequence, body):
+    return (
+        f"<DOCUMENT>\n<TYPE>{doc_type}\n<SEQUENCE>{sequence}\n<FILENAME>doc{sequence}.htm\n"
+        f"<DESCRIPTION>{doc_type}\n<TEXT>\n{body}</TEXT>\n</DOCUMENT>\n"
+    )
+
+
+def write_filing(path, size_mb, largest_mb):
+    """Main 10-K, one large GRAPHIC and 1 MB exhibits up to size_mb."""
+    main = PARAGRAPH * ((2 << 20) // len(PARAGRAPH))
+    graphic_line = "M" + "A" * 60 + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<SEC-DOCUMENT>0000320193-24-000123.txt : 20241101\n")
+        f.write(document("10-K", 1, f"<html><body>{main}</body></html>\n"))
+        graphic = graphic_line * ((largest_mb << 20) // len(graphic_line))
+        f.write(document("GRAPHIC", 2, f"begin 644 chart.jpg\n{graphic}end\n"))
+        sequence = 3
+        while f.tell() < size_mb << 20:
+            f.write(document(f"EX-{sequence}", sequence, PARAGRAPH * ((1 << 20) // len(PARAGRAPH))))
+            sequence += 1
+        f.write("</SEC-DOCUMENT>\n")
+
+
+def read_only(path):
+    with open(path, "rb") as f:
+        while f.read(CHUNK_SIZE):
+            pass
+    return 0
+
+
+def headers_only(path):
+    return sum(1 for _ in iter_sec_documents(path))
+
+
+def with_text(path):
+    return sum(len(doc.text) > 0 for doc in iter_sec_documents(path))
+
+
+def legacy_parse(path):
+    """The parse_sec_file implementation before streaming."""
+    from bs4 import BeautifulSoup
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        soup = BeautifulSoup(preprocess_sec_content(f.read()), "html.parser")
+    return sum(1 for doc in soup.find_all("document") if doc.find("text").get_text(strip=True))
+
+
+def measure(func, path):
+    """Timed pass, then a second pass under tracemalloc (which slows allocations) for the peak."""
+    start = time.perf_counter()
+    documents = func(path)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return documents, seconds, peak
+
+
+def run(size_mb, largest_mb, workdir):
+    fd, path = tempfile.mkstemp(prefix="bench_sec_parser_", suffix=".txt", dir=workdir)
+    os.close(fd)
+    try:
+        write_filing(path, size_mb, largest_mb)
+        file_mb = os.path.getsize(path) / 2**20
+        print(f"filing={file_mb:.0f} MB, largest document={largest_mb} MB")
+        print(f"{'pass':>16} | {'documents':>9} | {'seconds':>7} | {'MB/s':>7} | {'peak MB':>7}")
+        passes = [
+            ("read only", read_only),
+            ("headers", headers_only),
+            ("headers + text", with_text),
+        ]
+        try:
+            import bs4  # noqa: F401
+
+            passes.append(("bs4 (before)", legacy_parse))
+        except ImportError:
+            print("beautifulsoup4 not installed: skipping the previous parser")
+        for label, func in passes:
+            documents, seconds, peak = measure(func, path)
+            print(
+                f"{label:>16} | {documents:>9} | {seconds:7.2f} | {file_mb / seconds:7.0f} | "
+                f"{peak / 2**20:7.0f}"
+            )
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--largest-mb", type=int, default=40, help="Size of the GRAPHIC document")
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary filing")
+    args = parser.parse_args()
+    run(args.size_mb, args.largest_mb, args.workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: NumpyVectorIndex vs the pure-Python SimpleVectorIndex.
+
+Measures single-query latency and batched throughput of exact top-k search
+on random unit vectors. The pure-Python index is quadratic in Python
+bytecode, so it is only timed up to --legacy-max vectors (one query).
+
+Usage:
+    python -m ETL.benchmarks.bench_vector_search
+    python -m ETL.benchmarks.bench_vector_search --sizes 10000 100000 1000000 --dim 384
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.semantic_retrieval import SimpleVectorIndex
+from ETL.vector_index import NumpyVectorIndex, normalize_rows
+
+
+def random_unit_vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return normalize_rows(rng.standard_normal((n, dim), dtype=np.float32))
+
+
+def time_call(func, repeats: int = 3) -> float:
+    """Best-of-N wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, dim: int, k: int, batch: int, legacy_max: int):
+    print(f"dim={dim} k={k} batch={batch}")
+    print(
+        f"{'vectors':>10} | {'legacy 1q (s)':>13} | {'numpy 1q (ms)':>13} | "
+        f"{'numpy batch (ms)':>16} | {'queries/s':>10} | {'speedup':>8}"
+    )
+    for n in sizes:
+        data = random_unit_vectors(n, dim, seed=0)
+        queries = random_unit_vectors(batch, dim, seed=1)
+
+        index = NumpyVectorIndex(dim)
+        index.add(data)
+        single = time_call(lambda: index.search(queries[:1], k))
+        batched = time_call(lambda: index.search(queries, k))
+
+        legacy = None
+        if n <= legacy_max:
+            legacy_index = SimpleVectorIndex(dim)
+            legacy_index.add(data)
+            legacy = time_call(lambda: legacy_index.search(queries[:1], k), repeats=1)
+
+        legacy_col = f"{legacy:13.3f}" if legacy is not None else f"{'skipped':>13}"
+        speedup = f"{legacy / single:7.0f}x" if legacy is not None else f"{'-':>8}"
+        print(
+            f"{n:>10} | {legacy_col} | {single * 1e3:13.2f} | {batched * 1e3:16.2f} | "
+            f"{batch / batched:10.0f} | {speedup}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=64, help="Queries per batched search")
+    parser.add_argument(
+        "--legacy-max", type=int, default=100_000, help="Largest size timed for SimpleVectorIndex"
+    )
+    args = parser.parse_args()
+    run(args.sizes, args.dim, args.k, args.batch, args.legacy_max)
+
+
+if __name__ == "__main__":
+    main()
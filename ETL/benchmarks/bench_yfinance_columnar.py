@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: JSON vs columnar (Parquet) yfinance extracts, size and load time.
+
+Each ticker gets a synthetic max-period daily extract (about 40 years of bars)
+with quarterly balance sheet and cash flow statements, saved both as
+pretty-printed JSON (as save_data always did) and in the columnar format.
+Loads are timed for the whole extract, and for the history Date and Close
+columns only, which is what price readers need.
+
+Usage:
+    python -m ETL.benchmarks.bench_yfinance_columnar
+    python -m ETL.benchmarks.bench_yfinance_columnar --tickers 200 --years 20
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from ETL.yfinance_columnar import read_extract, read_table, write_extract
+
+LINE_ITEMS = 60
+
+
+def synthetic_extract(ticker, years, rng):
+    start = datetime(2025, 10, 16) - timedelta(days=365 * years)
+    days = [start + timedelta(days=i) for i in range(365 * years) if (start.weekday() + i) % 7 < 5]
+    closes = [100.0]
+    for _ in days[1:]:
+        closes.append(round(closes[-1] * (1 + rng.gauss(0, 0.02)), 4))
+    history = {
+        "Date": [f"{day.isoformat()}-05:00" for day in days],
+        "Open": closes,
+        "High": [round(c * 1.01, 4) for c in closes],
+        "Low": [round(c * 0.99, 4) for c in closes],
+        "Close": closes,
+        "Volume": [rng.randrange(10**6, 10**8) for _ in closes],
+        "Dividends": [0.0] * len(closes),
+        "Stock Splits": [0.0] * len(closes),
+    }
+    quarters = [datetime(2025, 9, 30) - timedelta(days=91 * q) for q in range(16)]
+    statement = {
+        quarter.isoformat(): {f"Line Item {i}": rng.uniform(1e6, 1e9) for i in range(LINE_ITEMS)}
+        for quarter in quarters
+    }
+    return {
+        "ticker": ticker,
+        "period": "max",
+        "interval": "1d",
+        "fetched_at": "2025-10-16T09:00:00",
+        "info": {"sector": "Technology", "longBusinessSummary": "x" * 2000},
+        "history": history,
+        "balance_sheet": statement,
+        "cashflow": statement,
+    }
+
+
+def size_mb(paths):
+    return sum(path.stat().st_size for path in paths) / 1024**2
+
+
+def timed(func, paths):
+    start = time.perf_counter()
+    for path in paths:
+        func(str(path))
+    return time.perf_counter() - start
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(n_tickers, years, workdir):
+    rng = random.Random(0)
+    base_dir = Path(tempfile.mkdtemp(prefix="bench_yfinance_columnar_", dir=workdir))
+    try:
+        json_paths, columnar_paths = [], []
+        for i in range(n_tickers):
+            data = synthetic_extract(f"T{i:04d}", years, rng)
+            json_path = base_dir / "json" / f"T{i:04d}.json"
+            json_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            json_paths.append(json_path)
+            columnar_path = base_dir / "columnar" / f"T{i:04d}.json"
+            columnar_path.parent.mkdir(parents=True, exist_ok=True)
+            write_extract(data, str(columnar_path))
+            columnar_paths.append(columnar_path)
+
+        bars = len(data["history"]["Date"])
+        print(f"tickers={n_tickers} bars/ticker={bars} statement items={LINE_ITEMS}")
+        json_mb = size_mb(json_paths)
+        columnar_mb = size_mb((base_dir / "columnar").iterdir())
+        print(
+            f"size   json: {json_mb:8.1f} MB   columnar: {columnar_mb:8.1f} MB "
+            f"({json_mb / columnar_mb:.1f}x smaller)"
+        )
+
+        full_json = timed(load_json, json_paths)
+        full_columnar = timed(read_extract, columnar_paths)
+        print(
+            f"load whole extract      json: {full_json:6.2f} s   columnar: {full_columnar:6.2f} s"
+        )
+
+        close = {"history": ["Close"]}
+        close_json = timed(
+            lambda path: read_extract(path, tables=["history"], columns=close), json_paths
+        )
+        close_columnar = timed(
+            lambda path: read_table(path, "history", columns=["Close"]), columnar_paths
+        )
+        print(
+            f"load Date+Close only    json: {close_json:6.2f} s   columnar: {close_columnar:6.2f} s "
+            f"({close_json / close_columnar:.1f}x faster)"
+        )
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--years", type=int, default=40)
+    parser.add_argument("--workdir", default=None, help="Directory for the temporary data")
+    args = parser.parse_args()
+    run(args.tickers, args.years, args.workdir)
+
+
+if __name__ == "__main__":
+    main()
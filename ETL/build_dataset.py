@@ -29,6 +29,7 @@ logger.info("Setting up imports...")
 import argparse
 import json
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 
@@ -44,7 +45,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 logger.info("Path setup completed")
 
 logger.info("About to import BuildTracker...")
+from common.build.build_cache import LINK_MODES, BuildCache
 from common.build.build_tracker import BuildTracker
+from common.build.stage_executor import StageExecutor
 
 logger.info("BuildTracker imported successfully")
 
@@ -72,6 +75,30 @@ from ETL.tests.test_config import DatasetTier
 
 logger.info("DatasetTier imported successfully")
 
+# Worker threads per executor pool: the two extraction sources, and the
+# per-ticker analysis and reporting tasks (overridden by --workers)
+EXTRACT_WORKERS = 2
+DEFAULT_ANALYSIS_WORKERS = 4
+
+# Tickers reported when the tier configuration lists no companies
+DEFAULT_REPORT_TICKERS = ["MSFT", "NVDA"]
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Code whose changes invalidate each cached task's outputs
+CACHE_SOURCES = {
+    "extract_yfinance": ["ETL/yfinance_spider.py", "ETL/yfinance_columnar.py"],
+    "extract_sec_edgar": ["ETL/sec_edgar_spider.py", "ETL/sec_edgar_downloader.py"],
+    "transform_sec_filings": ["ETL/sec_filing_processor", "ETL/sec_parser.py", "ETL/rcts.py"],
+    "build_price_store": ["ETL/price_store.py", "ETL/price_import.py", "ETL/yfinance_columnar.py"],
+}
+
+STAGE_ARTIFACTS = {
+    "stage_01_extract": ["yfinance_data.json", "sec_edgar_data.txt"],
+    "stage_02_transform": ["cleaned_data.json"],
+    "stage_03_load": ["graph_nodes.json", "dcf_results.json"],
+}
+
 
 def tier_to_config_name(tier: DatasetTier) -> str:
     """Convert DatasetTier to new ETL loader config name"""
@@ -84,13 +111,26 @@ def tier_to_config_name(tier: DatasetTier) -> str:
     return mapping.get(tier, "f2")
 
 
-def build_dataset(tier_name: str, config_path: str = None) -> bool:
+def build_dataset(
+    tier_name: str,
+    config_path: str = None,
+    skip_markdown_index: bool = False,
+    max_workers: int = None,
+    use_cache: bool = True,
+    cache_link: str = "copy",
+    resume_build_id: str = None,
+) -> bool:
     """
     Build dataset for specified tier using configuration.
 
     Args:
         tier_name: Dataset tier (test, m7, nasdaq100, vti)
         config_path: Optional path to specific config file
+        skip_markdown_index: Do not write per-ticker README.md indexes during extraction
+        max_workers: Concurrent per-ticker analysis and reporting tasks
+        use_cache: Restore unchanged extract and transform outputs from the build cache
+        cache_link: How cached outputs are restored, "copy" or "symlink"
+        resume_build_id: Continue this earlier build, skipping its checkpointed tasks
 
     Returns:
         bool: Success status
@@ -131,6 +171,7 @@ def build_dataset(tier_name: str, config_path: str = None) -> bool:
             # Convert to legacy format for compatibility - use API config directly
             config = {
                 "companies": runtime_config.stock_list.companies,
+                "output_formats": runtime_config.scenario.output_formats,
                 "data_sources": {
                     "yfinance": {
                         "enabled": "yfinance" in runtime_config.enabled_sources,
@@ -139,6 +180,11 @@ def build_dataset(tier_name: str, config_path: str = None) -> bool:
                             if "yfinance" in runtime_config.enabled_sources
                             else {}
                         ),
+                        "rate_limits": (
+                            runtime_config.data_sources.get("yfinance", {}).rate_limits
+                            if "yfinance" in runtime_config.enabled_sources
+                            else {}
+                        ),
                     },
                     "sec_edgar": {
                         "enabled": "sec_edgar" in runtime_config.enabled_sources,
@@ -147,9 +193,18 @@ def build_dataset(tier_name: str, config_path: str = None) -> bool:
                             if "sec_edgar" in runtime_config.enabled_sources
                             else {}
                         ),
+                        "rate_limits": (
+                            runtime_config.data_sources.get("sec_edgar", {}).rate_limits
+                            if "sec_edgar" in runtime_config.enabled_sources
+                            else {}
+                        ),
                     },
                 },
             }
+            if skip_markdown_index:
+                config["data_sources"]["yfinance"]["api_config"] = dict(
+                    config["data_sources"]["yfinance"]["api_config"], markdown_index=False
+                )
             config_description = runtime_config.combination
         except Exception as e:
             logger.error(f"ETL config loading error: {e}")
@@ -170,8 +225,15 @@ def build_dataset(tier_name: str, config_path: str = None) -> bool:
         logger.info("About to print build tracker init message...")
         print(f"⏱️ [{time.strftime('%H:%M:%S')}] Initializing build tracker...")
         logger.info("About to create BuildTracker instance...")
-        tracker = BuildTracker()
+        tracker = BuildTracker(build_id=resume_build_id)
         logger.info("BuildTracker instance created")
+        if resume_build_id:
+            resumed_tier = tracker.manifest["build_info"]["configuration"]
+            if resumed_tier != tier.value:
+                print(f"❌ Build {resume_build_id} is a {resumed_tier} build, not {tier.value}")
+                return False
+            resumed_units = sum(len(units) for units in tracker.checkpoints.values())
+            print(f"   Resuming build {resume_build_id}: {resumed_units} tasks already completed")
 
         logger.info("About to call tracker.start_build()...")
         build_id = tracker.start_build(tier.value, f"p3 build run {tier_name}")
@@ -190,142 +252,224 @@ def build_dataset(tier_name: str, config_path: str = None) -> bool:
         print(f"⏱️ [{time.strftime('%H:%M:%S')}] YAML config loaded: {list(yaml_config.keys())}")
         logger.info("YAML config loaded message printed")
 
-        # Start extract stage
-        logger.info("About to print extract stage message...")
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Starting stage_01_extract...")
-        logger.info("Extract stage message printed")
-        logger.info("About to call tracker.start_stage...")
-        tracker.start_stage("stage_01_extract")
-        logger.info("tracker.start_stage completed")
-
-        # Check if yfinance is enabled in data_sources
-        logger.info("About to check yfinance data sources...")
+        # Stages run as a task DAG: the extraction sources overlap, and each
+        # ticker's report follows its own analysis instead of every analysis
+        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Running build stages...")
+        date_partition = datetime.now().strftime("%Y%m%d")
         data_sources = yaml_config.get("data_sources", {})
-        logger.info(f"data_sources obtained: {data_sources}")
-        logger.info("About to check yfinance enabled status...")
-        yfinance_config = data_sources.get("yfinance", {})
-        logger.info(f"yfinance_config: {yfinance_config}")
-        yfinance_enabled = yfinance_config.get("enabled", False)
-        logger.info(f"yfinance_enabled: {yfinance_enabled}")
+        executor = StageExecutor(
+            tracker,
+            pools={
+                "extract": EXTRACT_WORKERS,
+                "analysis": max_workers or DEFAULT_ANALYSIS_WORKERS,
+            },
+        )
+        cache = (
+            BuildCache(str(directory_manager.get_cache_path() / "build"), link=cache_link)
+            if use_cache
+            else None
+        )
+        yfinance_dir = directory_manager.get_subdir_path(DataLayer.DAILY_DELTA, "yfinance")
+        sec_dir = directory_manager.get_subdir_path(DataLayer.DAILY_DELTA, "sec_edgar")
+        companies = list(config.get("companies", {}))
 
-        if yfinance_enabled:
-            logger.info("YFinance is enabled, building data...")
+        def extract_yfinance():
+            if not data_sources.get("yfinance", {}).get("enabled", False):
+                print(f"⏱️ [{time.strftime('%H:%M:%S')}] YFinance disabled, skipping...")
+                return False
             print(f"⏱️ [{time.strftime('%H:%M:%S')}] Building YFinance data...")
-            yf_start = time.time()
-            success = build_yfinance_data(tier, yaml_config, tracker)
-            print(
-                f"⏱️ [{time.strftime('%H:%M:%S')}] YFinance data completed in {time.time() - yf_start:.1f}s, success: {success}"
+            built = run_cached(
+                cache,
+                tracker,
+                "stage_01_extract",
+                "extract_yfinance",
+                lambda: build_yfinance_data(tier, yaml_config, tracker),
+                outputs=[yfinance_dir / date_partition],
+                config={
+                    "yfinance": data_sources["yfinance"],
+                    "companies": companies,
+                    "output_formats": config["output_formats"],
+                    "partition": date_partition,
+                },
             )
-            if not success:
-                tracker.fail_stage("stage_01_extract", "yfinance data collection failed")
-                return False
-        else:
-            logger.info("YFinance is disabled, skipping...")
-            print(f"⏱️ [{time.strftime('%H:%M:%S')}] YFinance disabled, skipping...")
+            if not built:
+                raise RuntimeError("yfinance data collection failed")
+            return True
 
-        # Check SEC Edgar data source configuration
-        logger.info("About to check SEC Edgar configuration...")
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Checking SEC Edgar configuration...")
-        logger.info("SEC Edgar configuration message printed")
-        data_sources = yaml_config.get("data_sources", {})
-        if data_sources.get("sec_edgar", {}).get("enabled", False):
+        def extract_sec_edgar():
+            if not data_sources.get("sec_edgar", {}).get("enabled", False):
+                print(f"⏱️ [{time.strftime('%H:%M:%S')}] SEC Edgar disabled or not configured")
+                return False
             print(f"⏱️ [{time.strftime('%H:%M:%S')}] Building SEC Edgar data...")
-            sec_start = time.time()
-            success = build_sec_edgar_data(tier, yaml_config, tracker)
-            print(
-                f"⏱️ [{time.strftime('%H:%M:%S')}] SEC Edgar data completed in {time.time() - sec_start:.1f}s, success: {success}"
+            built = run_cached(
+                cache,
+                tracker,
+                "stage_01_extract",
+                "extract_sec_edgar",
+                lambda: build_sec_edgar_data(tier, yaml_config, tracker),
+                outputs=[sec_dir / date_partition],
+                config={
+                    "sec_edgar": data_sources["sec_edgar"],
+                    "companies": config.get("companies", {}),
+                    "partition": date_partition,
+                },
             )
-            if not success:
+            if not built:
                 tracker.add_warning("stage_01_extract", "SEC Edgar data collection failed")
-        else:
-            print(f"⏱️ [{time.strftime('%H:%M:%S')}] SEC Edgar disabled or not configured")
+                return False
+            return True
 
-        # Complete extract stage
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Completing extract stage...")
-        date_partition = datetime.now().strftime("%Y%m%d")
-        tracker.complete_stage(
+        def transform_sec_filings():
+            from common.schemas.graph_rag_schema import DEFAULT_EMBEDDING_CONFIG
+            from ETL.sec_filing_processor import default_chunk_dir
+
+            built = run_cached(
+                cache,
+                tracker,
+                "stage_02_transform",
+                "transform_sec_filings",
+                lambda: build_sec_filing_chunks(tracker),
+                outputs=[default_chunk_dir()],
+                config={
+                    "chunk_size": DEFAULT_EMBEDDING_CONFIG.chunk_size,
+                    "chunk_overlap": DEFAULT_EMBEDDING_CONFIG.chunk_overlap,
+                },
+                inputs=[sec_dir],
+            )
+            if not built:
+                tracker.add_warning("stage_02_transform", "SEC filing processing failed")
+                return False
+            return True
+
+        def build_prices():
+            from ETL.price_store import default_store_path
+
+            built = run_cached(
+                cache,
+                tracker,
+                "stage_02_transform",
+                "build_price_store",
+                lambda: build_price_store(tracker),
+                outputs=[default_store_path()],
+                inputs=[yfinance_dir],
+            )
+            if not built:
+                tracker.add_warning("stage_02_transform", "Price store build failed")
+                return False
+            return True
+
+        def load():
+            # TODO: Add actual load logic
+            return True
+
+        # Checkpointed tasks are skipped when resuming a build that completed them
+        yfinance = executor.add(
+            "extract_yfinance",
+            extract_yfinance,
             "stage_01_extract",
-            partition=date_partition,
-            artifacts=["yfinance_data.json", "sec_edgar_data.txt"],
+            pool="extract",
+            required=True,
+            checkpoint=True,
         )
-
-        # Transform stage (placeholder for now)
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Starting stage_02_transform...")
-        transform_start = time.time()
-        tracker.start_stage("stage_02_transform")
-        # TODO: Add actual transformation logic
-        tracker.complete_stage(
-            "stage_02_transform", partition=date_partition, artifacts=["cleaned_data.json"]
+        sec_edgar = executor.add(
+            "extract_sec_edgar",
+            extract_sec_edgar,
+            "stage_01_extract",
+            pool="extract",
+            checkpoint=True,
         )
-        print(
-            f"⏱️ [{time.strftime('%H:%M:%S')}] Transform stage completed in {time.time() - transform_start:.1f}s"
+        transform = executor.add(
+            "transform_sec_filings",
+            transform_sec_filings,
+            "stage_02_transform",
+            deps=[sec_edgar],
+            checkpoint=True,
         )
-
-        # Load stage (placeholder for now)
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Starting stage_03_load...")
-        load_start = time.time()
-        tracker.start_stage("stage_03_load")
-        # TODO: Add actual load logic
-        tracker.complete_stage(
-            "stage_03_load",
-            partition=date_partition,
-            artifacts=["graph_nodes.json", "dcf_results.json"],
+        prices = executor.add(
+            "build_price_store",
+            build_prices,
+            "stage_02_transform",
+            deps=[yfinance],
+            checkpoint=True,
         )
-        print(
-            f"⏱️ [{time.strftime('%H:%M:%S')}] Load stage completed in {time.time() - load_start:.1f}s"
+        loaded = executor.add(
+            "load", load, "stage_03_load", deps=[prices, transform], checkpoint=True
+        )
+        preflight = executor.add(
+            "analysis_dependencies",
+            lambda: check_analysis_dependencies(tier, tracker),
+            "stage_04_analysis",
+            deps=[loaded],
         )
 
-        # Analysis stage - DCF calculations (SIMPLIFIED FOR TESTING)
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Starting stage_04_analysis (SIMPLIFIED)...")
-        analysis_start = time.time()
-        tracker.start_stage("stage_04_analysis")
-
-        try:
-            print(f"⏱️ [{time.strftime('%H:%M:%S')}] Running DCF analysis...")
-            companies_analyzed = run_dcf_analysis(tier, tracker)
-            print(
-                f"⏱️ [{time.strftime('%H:%M:%S')}] DCF analysis completed, analyzed {companies_analyzed} companies"
-            )
-            tracker.complete_stage(
+        for ticker in companies:
+            executor.add(
+                f"analysis:{ticker}",
+                lambda ticker=ticker: analyze_ticker(ticker, tracker),
                 "stage_04_analysis",
-                partition=date_partition,
-                companies_analyzed=companies_analyzed,
+                deps=[preflight],
+                pool="analysis",
+                checkpoint=True,
             )
-        except Exception as e:
-            print(f"⏱️ [{time.strftime('%H:%M:%S')}] DCF analysis failed: {e}")
-            tracker.add_warning("stage_04_analysis", f"DCF analysis failed: {e}")
-            tracker.complete_stage(
-                "stage_04_analysis", partition=date_partition, companies_analyzed=0
+        if not companies:
+            print(f"   ⚠️  No companies found in {tier.value} configuration, using M7 default")
+        for ticker in companies or DEFAULT_REPORT_TICKERS:
+            analysis = f"analysis:{ticker}"
+            executor.add(
+                f"report:{ticker}",
+                lambda ticker=ticker: generate_ticker_report(ticker, tracker),
+                "stage_05_reporting",
+                deps=[analysis if ticker in companies else preflight],
+                pool="analysis",
+                checkpoint=True,
             )
-        print(
-            f"⏱️ [{time.strftime('%H:%M:%S')}] Analysis stage completed in {time.time() - analysis_start:.1f}s"
-        )
 
-        # Reporting stage - Generate final reports (SIMPLIFIED FOR TESTING)
-        print(f"⏱️ [{time.strftime('%H:%M:%S')}] Starting stage_05_reporting (SIMPLIFIED)...")
-        reporting_start = time.time()
-        tracker.start_stage("stage_05_reporting")
+        def succeeded(results, prefix):
+            return sum(1 for r in results if r.name.startswith(prefix) and r.value)
 
-        try:
-            print(f"⏱️ [{time.strftime('%H:%M:%S')}] Running report generation...")
-            reports_generated = run_report_generation(tier, tracker)
-            print(
-                f"⏱️ [{time.strftime('%H:%M:%S')}] Report generation completed, generated {reports_generated} reports"
-            )
-            tracker.complete_stage(
-                "stage_05_reporting",
-                partition=date_partition,
-                reports_generated=reports_generated,
-            )
-        except Exception as e:
-            print(f"⏱️ [{time.strftime('%H:%M:%S')}] Report generation failed: {e}")
-            tracker.add_warning("stage_05_reporting", f"Report generation failed: {e}")
-            tracker.complete_stage(
-                "stage_05_reporting", partition=date_partition, reports_generated=0
+        for stage, artifacts in STAGE_ARTIFACTS.items():
+            executor.on_stage_complete(
+                stage,
+                lambda results, artifacts=artifacts: {
+                    "partition": date_partition,
+                    "artifacts": list(artifacts),
+                },
             )
+        executor.on_stage_complete(
+            "stage_04_analysis",
+            lambda results: {
+                "partition": date_partition,
+                "companies_analyzed": succeeded(results, "analysis:"),
+            },
+        )
+        executor.on_stage_complete(
+            "stage_05_reporting",
+            lambda results: {
+                "partition": date_partition,
+                "reports_generated": succeeded(results, "report:"),
+            },
+        )
+
+        stages_start = time.time()
+        results = executor.run()
+        task_seconds = sum(result.seconds for result in results.values())
+        path, critical_seconds = executor.critical_path()
+        print(
+            f"⏱️ [{time.strftime('%H:%M:%S')}] Stages completed in "
+            f"{time.time() - stages_start:.1f}s: {task_seconds:.1f}s of tasks, critical path "
+            f"{critical_seconds:.1f}s ({' -> '.join(path)})"
+        )
         print(
-            f"⏱️ [{time.strftime('%H:%M:%S')}] Reporting stage completed in {time.time() - reporting_start:.1f}s"
+            f"   Analyzed {succeeded(results.values(), 'analysis:')} companies, "
+            f"generated {succeeded(results.values(), 'report:')} DCF reports"
         )
+        resumed = sum(1 for result in results.values() if result.resumed)
+        if resumed:
+            print(f"   {resumed} tasks restored from checkpoints of build {build_id}")
+        if results[yfinance].status != "completed":
+            return False
+        if cache is not None:
+            cache.save()
 
         # Scan filesystem for actual outputs
         print(f"⏱️ [{time.strftime('%H:%M:%S')}] Scanning filesystem for outputs...")
@@ -349,6 +493,33 @@ def build_dataset(tier_name: str, config_path: str = None) -> bool:
         return False
 
 
+def run_cached(
+    cache: BuildCache,
+    tracker: BuildTracker,
+    stage: str,
+    task: str,
+    func,
+    outputs: list,
+    config: dict = None,
+    inputs: list = (),
+):
+    """Run a stage task through the build cache, recording the hit or miss on the tracker"""
+    if cache is None:
+        return func()
+    value, status, key = cache.run(
+        task,
+        func,
+        outputs=[str(path) for path in outputs],
+        config=config,
+        inputs=[str(path) for path in inputs if Path(path).exists()],
+        sources=[str(PROJECT_ROOT / path) for path in CACHE_SOURCES.get(task, [])],
+    )
+    tracker.record_cache(stage, task, status, key)
+    if status == "hit":
+        print(f"   ♻️  {task}: restored from build cache")
+    return value
+
+
 def build_yfinance_data(tier: DatasetTier, yaml_config: dict, tracker: BuildTracker) -> bool:
     """Build yfinance data using spider"""
     try:
@@ -386,6 +557,8 @@ def build_yfinance_data(tier: DatasetTier, yaml_config: dict, tracker: BuildTrac
         # Create config from centralized API configuration
         yf_config = yf_api_config.copy()
         yf_config["tickers"] = tickers
+        yf_config["rate_limits"] = yfinance_config.get("rate_limits", {})
+        yf_config["output_formats"] = yaml_config.get("output_formats", ["json"])
 
         # Ensure essential config fields are present with defaults
         if "user_agent" not in yf_config:
@@ -405,12 +578,16 @@ def build_yfinance_data(tier: DatasetTier, yaml_config: dict, tracker: BuildTrac
         )
 
         # Run yfinance spider
-        run_job(temp_config_path)
+        summary = run_job(temp_config_path)
 
         # Clean up temp file
         os.unlink(temp_config_path)
 
-        tracker.log_stage_output("stage_01_extract", "yfinance collection completed")
+        tracker.log_stage_output(
+            "stage_01_extract",
+            f"yfinance collection completed: fetched={summary['fetched']}, "
+            f"errors={summary['errors']}, throughput={summary['throughput_per_second']:.2f}/s",
+        )
         return True
 
     except Exception as e:
@@ -453,9 +630,11 @@ def build_sec_edgar_data(tier: DatasetTier, yaml_config: dict, tracker: BuildTra
 
         # Extract CIK numbers from companies
         ciks = []
+        cik_to_ticker = {}
         for ticker, company_data in companies.items():
             if "cik" in company_data:
                 ciks.append(company_data["cik"])
+                cik_to_ticker[str(company_data["cik"])] = ticker
 
         if not ciks:
             print(f"   ⚠️ No CIK numbers found for {tier.value} companies")
@@ -471,7 +650,10 @@ def build_sec_edgar_data(tier: DatasetTier, yaml_config: dict, tracker: BuildTra
             # Include other API config parameters
             "base_url": sec_api_config.get("base_url", "https://data.sec.gov"),
             "timeout_seconds": sec_api_config.get("timeout_seconds", 60),
-            "rate_limits": sec_api_config.get("rate_limits", {}),
+            "incremental": sec_api_config.get("incremental", True),
+            "rate_limits": sec_config.get("rate_limits") or sec_api_config.get("rate_limits", {}),
+            "filing_types": sec_api_config.get("filing_types", {}),
+            "cik_to_ticker": cik_to_ticker,
         }
 
         # Write temporary config file
@@ -498,94 +680,76 @@ def build_sec_edgar_data(tier: DatasetTier, yaml_config: dict, tracker: BuildTra
         return False
 
 
-def run_dcf_analysis(tier: DatasetTier, tracker: BuildTracker) -> int:
-    """Run DCF analysis on available data with SEC document integration"""
-
-    # Check critical dependencies before starting
-    print(f"   🔍 Checking DCF analysis dependencies...")
+def build_sec_filing_chunks(tracker: BuildTracker) -> bool:
+    """Parse, clean and chunk the latest SEC filings into per-filing chunk files"""
     try:
-        # Test semantic retrieval availability
-        from pathlib import Path as PathCheck
-
-        from ETL.semantic_retrieval import SemanticRetriever
-
-        # Try to create a minimal semantic retriever to test dependencies
-        # Use SSOT path for embeddings check
-        embeddings_path = directory_manager.get_subdir_path(DataLayer.PROCESSED_DATA, "embeddings")
-        test_path = PathCheck(str(embeddings_path))
-        if not test_path.exists():
-            raise RuntimeError("Embeddings directory not found - semantic retrieval unavailable")
-
-        test_retriever = SemanticRetriever(test_path)
-        # This will trigger the dependency check and raise an exception if dependencies are missing
-        test_retriever.load_embeddings()
-        print(f"   ✅ Semantic retrieval dependencies verified")
+        from common.schemas.graph_rag_schema import DEFAULT_EMBEDDING_CONFIG
+        from ETL.sec_filing_processor import default_chunk_dir, process_filings
+
+        sec_dir = directory_manager.get_subdir_path(DataLayer.DAILY_DELTA, "sec_edgar")
+        stats = process_filings(
+            str(sec_dir),
+            str(default_chunk_dir()),
+            chunk_size=DEFAULT_EMBEDDING_CONFIG.chunk_size,
+            chunk_overlap=DEFAULT_EMBEDDING_CONFIG.chunk_overlap,
+            max_workers=DEFAULT_EMBEDDING_CONFIG.processing_workers or None,
+            tracker=tracker,
+        )
+        print(
+            f"   📄 SEC filings: {stats['processed']} processed, {stats['unchanged']} unchanged, "
+            f"{stats['errors']} errors, {stats['chunks']} chunks "
+            f"({stats['workers']} workers, {stats['elapsed_seconds']:.1f}s)"
+        )
+        return stats["errors"] == 0
 
     except Exception as e:
-        error_msg = f"DCF analysis dependencies not available: {e}"
-        print(f"   ❌ {error_msg}")
-        tracker.log_stage_output("stage_04_analysis", error_msg)
-        raise RuntimeError(error_msg) from e
+        print(f"   ❌ SEC filing processing failed: {e}")
+        tracker.log_stage_output("stage_02_transform", f"SEC filing processing error: {e}")
+        return False
 
-    try:
-        # Import SEC-integrated DCF analyzer
-        sys.path.insert(0, str(Path(__file__).parent.parent))
-        from dcf_engine.llm_dcf_generator import LLMDCFGenerator
 
-        print(f"   📊 Running SEC-enhanced DCF analysis for {tier.value}...")
-        tracker.log_stage_output(
-            "stage_04_analysis", f"Starting SEC-enhanced DCF analysis for {tier.value}"
+def build_price_store(tracker: BuildTracker) -> bool:
+    """Consolidate the yfinance extracts into the date x ticker price store"""
+    try:
+        from ETL.price_store import build_price_store as build_store
+        from ETL.price_store import default_store_path
+
+        yfinance_dir = directory_manager.get_subdir_path(DataLayer.DAILY_DELTA, "yfinance")
+        stats = build_store(str(yfinance_dir), str(default_store_path()))
+        panels = ", ".join(
+            f"{interval}: {panel['tickers']} tickers x {panel['dates']} dates"
+            for interval, panel in stats["intervals"].items()
         )
-
-        # Get companies list from new ETL configuration system
-        # Build runtime config to get companies
-        stock_list_name = tier_to_config_name(tier)
-        runtime_config = build_etl_config(
-            stock_list=stock_list_name,
-            data_sources=["yfinance", "sec_edgar"],
-            scenario="development",
+        print(
+            f"   💹 Price store: {stats['files']} extracts, {stats['errors']} errors"
+            + (f" ({panels})" if panels else "")
         )
+        tracker.log_stage_output("stage_02_transform", f"Price store built: {panels or 'empty'}")
+        return stats["errors"] == 0
 
-        companies = runtime_config.stock_list.companies
+    except Exception as e:
+        print(f"   ❌ Price store build failed: {e}")
+        tracker.log_stage_output("stage_02_transform", f"Price store error: {e}")
+        return False
 
-        if not companies:
-            print(f"   ⚠️  No companies found in {tier.value} configuration")
-            return 0
-
-        # Use SEC-integrated DCF generator
-        analyzer = LLMDCFGenerator(config_path=None)
-        companies_analyzed = 0
-
-        for ticker in companies.keys():
-            try:
-                # Use the correct method name for LLMDCFGenerator
-                report = analyzer.generate_comprehensive_dcf_report(ticker)
-                if report:
-                    companies_analyzed += 1
-                    # Log intermediate process files for debugging
-                    build_dir = analyzer._get_current_build_dir()
-                    tracker.log_stage_output(
-                        "stage_04_analysis",
-                        f"SEC-enhanced DCF analysis completed for {ticker}. Intermediate files saved to {build_dir}",
-                    )
-            except Exception as e:
-                tracker.log_stage_output("stage_04_analysis", f"Failed to analyze {ticker}: {e}")
-                print(f"   ❌ Error analyzing {ticker}: {e}")
-
-        print(f"   ✅ Analyzed {companies_analyzed} companies")
-        return companies_analyzed
 
-    except Exception as e:
-        print(f"   ❌ DCF analysis failed: {e}")
-        tracker.log_stage_output("stage_04_analysis", f"DCF analysis error: {e}")
-        return 0
+# LLMDCFGenerator per analysis worker thread; generators are not shared between threads
+_analyzers = threading.local()
+
 
+def _thread_analyzer():
+    analyzer = getattr(_analyzers, "generator", None)
+    if analyzer is None:
+        sys.path.insert(0, str(Path(__file__).parent.parent))
+        from dcf_engine.llm_dcf_generator import LLMDCFGenerator
+
+        analyzer = _analyzers.generator = LLMDCFGenerator(config_path=None)
+    return analyzer
 
-def run_report_generation(tier: DatasetTier, tracker: BuildTracker) -> int:
-    """Generate final reports"""
 
-    # Check critical dependencies before starting (same as DCF analysis)
-    print(f"   🔍 Checking report generation dependencies...")
+def check_analysis_dependencies(tier: DatasetTier, tracker: BuildTracker) -> None:
+    """Check the dependencies of DCF analysis and reporting, raising RuntimeError if missing"""
+    print(f"   🔍 Checking DCF analysis dependencies...")
     try:
         # Test semantic retrieval availability
         from pathlib import Path as PathCheck
@@ -602,76 +766,52 @@ def run_report_generation(tier: DatasetTier, tracker: BuildTracker) -> int:
         test_retriever = SemanticRetriever(test_path)
         # This will trigger the dependency check and raise an exception if dependencies are missing
         test_retriever.load_embeddings()
-        print(f"   ✅ Report generation dependencies verified")
+        print(f"   ✅ Semantic retrieval dependencies verified")
 
     except Exception as e:
-        error_msg = f"Report generation dependencies not available: {e}"
+        error_msg = f"DCF analysis dependencies not available: {e}"
         print(f"   ❌ {error_msg}")
-        tracker.log_stage_output("stage_05_reporting", error_msg)
+        tracker.log_stage_output("stage_04_analysis", error_msg)
         raise RuntimeError(error_msg) from e
 
-    try:
-        # Import DCF report generator
-        sys.path.insert(0, str(Path(__file__).parent.parent))
-        from dcf_engine.llm_dcf_generator import LLMDCFGenerator
-
-        print(f"   📄 Generating reports for {tier.value}...")
-        tracker.log_stage_output(
-            "stage_05_reporting", f"Starting report generation for {tier.value}"
-        )
-
-        # Get companies list from new ETL configuration system
-        # Build runtime config to get companies
-        stock_list_name = tier_to_config_name(tier)
-        runtime_config = build_etl_config(
-            stock_list=stock_list_name,
-            data_sources=["yfinance", "sec_edgar"],
-            scenario="development",
-        )
-
-        # Extract company tickers from configuration
-        tickers = list(runtime_config.stock_list.companies.keys())
+    print(f"   📊 Running SEC-enhanced DCF analysis for {tier.value}...")
+    tracker.log_stage_output(
+        "stage_04_analysis", f"Starting SEC-enhanced DCF analysis for {tier.value}"
+    )
 
-        # Default to M7 if no specific tickers found
-        if not tickers:
-            print(f"   ⚠️  No companies found in {tier.value} configuration, using M7 default")
-            tickers = None  # Will use M7 default
-        else:
-            print(f"   📊 Generating report for {len(tickers)} companies: {', '.join(tickers)}")
-
-        # Initialize DCF generator for report generation
-        analyzer = LLMDCFGenerator(config_path=None)
-
-        # Generate DCF reports for each ticker
-        reports_generated = 0
-
-        if not tickers:
-            tickers = ["MSFT", "NVDA"]  # F2 default
-
-        for ticker in tickers:
-            try:
-                report = analyzer.generate_comprehensive_dcf_report(ticker)
-                if report:
-                    reports_generated += 1
-                    tracker.log_stage_output(
-                        "stage_05_reporting", f"DCF report generated for {ticker}"
-                    )
-            except Exception as e:
-                tracker.log_stage_output(
-                    "stage_05_reporting", f"Failed to generate report for {ticker}: {e}"
-                )
-                print(f"   ❌ Error generating report for {ticker}: {e}")
 
-        print(f"   ✅ Generated {reports_generated} DCF reports")
+def analyze_ticker(ticker: str, tracker: BuildTracker) -> bool:
+    """Run SEC-enhanced DCF analysis for one ticker"""
+    try:
+        analyzer = _thread_analyzer()
+        report = analyzer.generate_comprehensive_dcf_report(ticker)
+        if report:
+            # Log intermediate process files for debugging
+            build_dir = analyzer._get_current_build_dir()
+            tracker.log_stage_output(
+                "stage_04_analysis",
+                f"SEC-enhanced DCF analysis completed for {ticker}. Intermediate files saved to {build_dir}",
+            )
+            return True
+    except Exception as e:
+        tracker.log_stage_output("stage_04_analysis", f"Failed to analyze {ticker}: {e}")
+        print(f"   ❌ Error analyzing {ticker}: {e}")
+    return False
 
-        # Track completion
-        tracker.log_stage_output("stage_05_reporting", f"Generated {reports_generated} DCF reports")
-        return reports_generated
 
+def generate_ticker_report(ticker: str, tracker: BuildTracker) -> bool:
+    """Generate the DCF report for one ticker"""
+    try:
+        report = _thread_analyzer().generate_comprehensive_dcf_report(ticker)
+        if report:
+            tracker.log_stage_output("stage_05_reporting", f"DCF report generated for {ticker}")
+            return True
     except Exception as e:
-        print(f"   ❌ Report generation failed: {e}")
-        tracker.log_stage_output("stage_05_reporting", f"Report generation error: {e}")
-        return 0
+        tracker.log_stage_output(
+            "stage_05_reporting", f"Failed to generate report for {ticker}: {e}"
+        )
+        print(f"   ❌ Error generating report for {ticker}: {e}")
+    return False
 
 
 def validate_build(tier: DatasetTier, tracker: BuildTracker) -> bool:
@@ -740,6 +880,33 @@ def main():
     )
     parser.add_argument("--config", help="Optional path to specific config file")
     parser.add_argument("--validate", action="store_true", help="Run validation after build")
+    parser.add_argument(
+        "--skip-markdown-index",
+        action="store_true",
+        help="Skip README.md index generation for ticker directories (production builds)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help=f"Concurrent per-ticker analysis tasks (default: {DEFAULT_ANALYSIS_WORKERS})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every stage even when its inputs match a cached build",
+    )
+    parser.add_argument(
+        "--cache-link",
+        choices=LINK_MODES,
+        default="copy",
+        help="Restore cached stage outputs as copies or as symlinks into the cache",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="BUILD_ID",
+        help="Continue an interrupted build, skipping the tasks it already completed",
+    )
 
     logger.info("About to parse arguments...")
     args = parser.parse_args()
@@ -748,7 +915,15 @@ def main():
     )
 
     logger.info("About to call build_dataset()...")
-    success = build_dataset(args.tier, args.config)
+    success = build_dataset(
+        args.tier,
+        args.config,
+        args.skip_markdown_index,
+        args.workers,
+        use_cache=not args.no_cache,
+        cache_link=args.cache_link,
+        resume_build_id=args.resume,
+    )
     logger.info(f"build_dataset() returned: {success}")
 
     if success and args.validate:
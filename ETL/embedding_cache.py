@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL Embedding Cache Module
+
+Persistent, content-addressed cache of chunk embeddings so unchanged text is
+never sent to the model twice. Entries are keyed by a 16-byte BLAKE2b digest
+of (model_name, chunk text) and stored in one directory per model:
+- cache_meta.json: format version, model name, dimension, logical clock
+- keys.bin: 16-byte digests, appended in slot order
+- vectors.f32: raw float32 rows (dimension values per slot), appended in slot order
+- last_used.npy: int64 logical clock of each slot's last hit, for LRU eviction
+
+Appends are crash tolerant: on open, the slot count is the number of rows
+present in both keys.bin and vectors.f32, so a torn tail is ignored.
+Eviction writes the surviving entries as a new generation of the data files
+(keys.<n>.bin, vectors.<n>.f32, last_used.<n>.npy) and switches to it by
+rewriting cache_meta.json, so keys and vectors are always replaced together;
+files of other generations are removed. A cache directory is meant to have a
+single writer.
+
+Part of Stage 3 (Load) in the ETL pipeline.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "cache_meta.json"
+KEYS_FILE = "keys.bin"
+VECTORS_FILE = "vectors.f32"
+LAST_USED_FILE = "last_used.npy"
+FORMAT_VERSION = 1
+KEY_BYTES = 16
+
+# Default size cap for one model's cache (vectors + keys + LRU clock)
+DEFAULT_MAX_BYTES = 2 * 1024**3
+# Fraction of the cap kept after an eviction pass, so evictions are not triggered every flush
+EVICTION_LOW_WATERMARK = 0.9
+
+
+def embedding_key(model_name: str, text: str) -> bytes:
+    """Content address of a chunk: BLAKE2b-128 over model name and text."""
+    digest = hashlib.blake2b(digest_size=KEY_BYTES)
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+
+def _generation_file(name: str, generation: int) -> str:
+    """keys.bin -> keys.<generation>.bin; generation 0 keeps the plain name"""
+    if not generation:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{generation}{ext}"
+
+
+def _model_slug(model_name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+
+
+class EmbeddingCache:
+    """
+    Disk-backed (model_name, text) -> float32 vector cache with LRU eviction.
+
+    Usage:
+        cache = EmbeddingCache.for_model(cache_root, "sentence-transformers/all-MiniLM-L6-v2")
+        hits, vectors = cache.get_many(texts)      # vectors[i] valid where hits[i]
+        cache.put_many(missed_texts, new_vectors)
+        cache.flush()
+    """
+
+    def __init__(self, path: Path, model_name: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.dimension: Optional[int] = None
+        self.clock = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._slots: Dict[bytes, int] = {}
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._vectors: Optional[np.ndarray] = None
+        self._count = 0
+        self._dirty = False
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    @classmethod
+    def for_model(
+        cls, cache_root: Path, model_name: str, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> "EmbeddingCache":
+        """Open the cache for model_name under cache_root/embeddings."""
+        return cls(Path(cache_root) / "embeddings" / _model_slug(model_name), model_name, max_bytes)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def entry_bytes(self) -> int:
+        return KEY_BYTES + 8 + 4 * (self.dimension or 0)
+
+    @property
+    def max_entries(self) -> int:
+        return max(1, self.max_bytes // self.entry_bytes) if self.dimension else 0
+
+    def _data_file(self, name: str) -> Path:
+        """Path of KEYS_FILE, VECTORS_FILE or LAST_USED_FILE in the current generation"""
+        return self.path / _generation_file(name, self.generation)
+
+    def _remove_data_files(self, keep_current: bool = False):
+        for name in (KEYS_FILE, VECTORS_FILE, LAST_USED_FILE):
+            stem, ext = os.path.splitext(name)
+            for path in self.path.glob(f"{stem}*{ext}"):
+                if not (keep_current and path == self._data_file(name)):
+                    path.unlink(missing_ok=True)
+
+    def _load(self):
+        meta_file = self.path / META_FILE
+        if not meta_file.exists():
+            # Entries appended before the first flush have no metadata to trust
+            self._remove_data_files()
+            return
+        try:
+            with open(meta_file, "r") as f:
+                meta = json.load(f)
+            compatible = meta.get("format_version") == FORMAT_VERSION
+            if not compatible or meta.get("model_name") != self.model_name:
+                logger.warning(f"Discarding incompatible embedding cache at {self.path}")
+                self.clear()
+                return
+            self.dimension = int(meta["dimension"])
+            self.clock = int(meta.get("clock", 0))
+            self.generation = int(meta.get("generation", 0))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable embedding cache at {self.path}: {e}")
+            self.clear()
+            return
+
+        # Left behind by an eviction interrupted before or after its switch
+        self._remove_data_files(keep_current=True)
+
+        keys = np.zeros(0, dtype=np.uint8)
+        if self._data_file(KEYS_FILE).exists():
+            keys = np.fromfile(self._data_file(KEYS_FILE), dtype=np.uint8)
+        vector_rows = 0
+        if self._data_file(VECTORS_FILE).exists():
+            vector_rows = self._data_file(VECTORS_FILE).stat().st_size // (4 * self.dimension)
+        self._count = min(len(keys) // KEY_BYTES, vector_rows)
+
+        key_bytes = keys[: self._count * KEY_BYTES].tobytes()
+        self._slots = {
+            key_bytes[i * KEY_BYTES : (i + 1) * KEY_BYTES]: i for i in range(self._count)
+        }
+        last_used = np.zeros(self._count, dtype=np.int64)
+        if self._data_file(LAST_USED_FILE).exists():
+            stored = np.load(self._data_file(LAST_USED_FILE))
+            n = min(len(stored), self._count)
+            last_used[:n] = stored[:n]
+        self._last_used = last_used
+        self._map_vectors()
+
+    def _map_vectors(self):
+        if self._count and self.dimension:
+            self._vectors = np.memmap(
+                self._data_file(VECTORS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(self._count, self.dimension),
+            )
+        else:
+            self._vectors = None
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Look up many texts at once.
+
+        Returns:
+            (hits, vectors): boolean hit mask, and an (n, dimension) float32 array
+            whose rows are valid where hits is True (None if the cache is empty)
+        """
+        self.clock += 1
+        slots = np.fromiter(
+            (self._slots.get(embedding_key(self.model_name, text), -1) for text in texts),
+            dtype=np.int64,
+            count=len(texts),
+        )
+        hits = slots >= 0
+        n_hits = int(hits.sum())
+        self.hits += n_hits
+        self.misses += len(texts) - n_hits
+        if not n_hits:
+            return hits, None
+
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        hit_slots = slots[hits]
+        # Sorted slot order turns the gather into mostly sequential reads of the memmap
+        order = np.argsort(hit_slots, kind="stable")
+        rows = np.flatnonzero(hits)[order]
+        vectors[rows] = self._vectors[hit_slots[order]]
+        self._last_used[hit_slots] = self.clock
+        self._dirty = True
+        return hits, vectors
+
+    def put_many(self, texts: Sequence[str], vectors) -> int:
+        """Append vectors for texts not yet cached. Returns the number of new entries."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            logger.warning(
+                f"Not caching {len(texts)} vectors of dimension {vectors.shape[1]} "
+                f"(cache dimension {self.dimension})"
+            )
+            return 0
+
+        new_keys: List[bytes] = []
+        new_rows: List[int] = []
+        for row, text in enumerate(texts):
+            key = embedding_key(self.model_name, text)
+            if key in self._slots:
+                continue
+            self._slots[key] = self._count + len(new_keys)
+            new_keys.append(key)
+            new_rows.append(row)
+        if not new_keys:
+            return 0
+
+        # Vectors first: a torn keys.bin tail then never points past the vector file
+        with open(self._data_file(VECTORS_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(vectors[new_rows]).tobytes())
+        with open(self._data_file(KEYS_FILE), "ab") as f:
+            f.write(b"".join(new_keys))
+
+        self._count += len(new_keys)
+        self._last_used = np.concatenate(
+            [self._last_used, np.full(len(new_keys), self.clock, dtype=np.int64)]
+        )
+        self._map_vectors()
+        self._dirty = True
+        return len(new_keys)
+
+    def flush(self):
+        """Persist LRU state and metadata, evicting least recently used entries over the cap."""
+        if not self._dirty or self.dimension is None:
+            return
+        if self._count > self.max_entries:
+            self._evict(int(self.max_entries * EVICTION_LOW_WATERMARK))
+        np.save(self._data_file(LAST_USED_FILE), self._last_used)
+        self._write_meta()
+        self._dirty = False
+
+    def _write_meta(self):
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "model_name": self.model_name,
+            "dimension": self.dimension,
+            "count": self._count,
+            "clock": self.clock,
+            "generation": self.generation,
+        }
+        tmp_file = self.path / (META_FILE + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_file, self.path / META_FILE)
+
+    def _evict(self, keep: int):
+        """
+        Rewrite the cache keeping only the `keep` most recently used entries,
+        as a new generation of data files that cache_meta.json switches to.
+        """
+        keep_slots = np.sort(np.argsort(-self._last_used, kind="stable")[:keep])
+        key_bytes = np.fromfile(self._data_file(KEYS_FILE), dtype=np.uint8)
+        keys = key_bytes[: self._count * KEY_BYTES].reshape(self._count, KEY_BYTES)[keep_slots]
+        vectors = np.asarray(self._vectors[keep_slots])
+        self._vectors = None
+
+        evicted = self._count - keep
+        previous = self.generation
+        self.generation += 1
+        self._last_used = self._last_used[keep_slots]
+        vectors.tofile(self._data_file(VECTORS_FILE))
+        keys.tofile(self._data_file(KEYS_FILE))
+        np.save(self._data_file(LAST_USED_FILE), self._last_used)
+        self._count = keep
+        # The switch: until the metadata names the new generation, the old files stay in use
+        self._write_meta()
+        for name in (KEYS_FILE, VECTORS_FILE, LAST_USED_FILE):
+            (self.path / _generation_file(name, previous)).unlink(missing_ok=True)
+
+        logger.info(f"Evicted {evicted} embedding cache entries from {self.path}")
+        flat = keys.tobytes()
+        self._slots = {flat[i * KEY_BYTES : (i + 1) * KEY_BYTES]: i for i in range(keep)}
+        self._map_vectors()
+
+    def clear(self):
+        """Remove all entries."""
+        (self.path / META_FILE).unlink(missing_ok=True)
+        self._remove_data_files()
+        self.dimension = None
+        self.clock = 0
+        self.generation = 0
+        self._slots = {}
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._vectors = None
+        self._count = 0
+        self._dirty = False
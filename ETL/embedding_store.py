@@ -0,0 +1,842 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL Embedding Store Module
+
+Memory-mapped on-disk layout for document embeddings:
+- embeddings_manifest.json: small header (format version, count, dimension, dtype)
+- embeddings_vectors.npy: L2-normalized float32 matrix, opened with mmap_mode="r"
+- embeddings_metadata.jsonl: one compact JSON object per row
+- embeddings_metadata.offsets.npy: int64 byte offsets of each metadata row
+- embeddings_postings.npz: row ids per ticker and per content type, for
+  pre-filtered search
+
+Opening a store only reads the manifest and the offsets array; vectors and
+metadata rows are paged in on demand and shared between processes through the
+OS page cache.
+
+Incremental builds use a segmented layout on top of that: every delta is
+written as a new store in a segment_NNNNNN subdirectory, and segments.json
+(rewritten atomically, the single commit point) lists the segments, the row
+ranges deleted from each (tombstones), and which row range holds each
+document. Replacing a document appends its new rows and tombstones the old
+range; compaction merges all live rows into one segment. With an "ivf" index
+configured, segments of at least IVF_MIN_ROWS rows also get an IVF index
+saved next to their embeddings_vectors.npy. Otherwise, with a compression
+configured, segments of at least QUANTIZATION_MIN_ROWS rows get quantized
+codes that are searched in memory and re-ranked against the memmap.
+
+Part of Stage 3 (Load) in the ETL pipeline.
+"""
+
+import bisect
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import weakref
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ETL.vector_index import INDEX_TYPES, IVF_MIN_ROWS, IVFVectorIndex, SegmentedVectorIndex
+from ETL.vector_quantization import (
+    COMPRESSION_TYPES,
+    QUANTIZATION_MIN_ROWS,
+    QUANTIZERS,
+    QuantizedVectorIndex,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "embeddings_manifest.json"
+VECTORS_FILE = "embeddings_vectors.npy"
+METADATA_FILE = "embeddings_metadata.jsonl"
+METADATA_OFFSETS_FILE = "embeddings_metadata.offsets.npy"
+POSTINGS_FILE = "embeddings_postings.npz"
+FORMAT_VERSION = 2
+
+SEGMENTS_FILE = "segments.json"
+SEGMENTS_FORMAT_VERSION = 1
+SEGMENT_PREFIX = "segment_"
+IVF_INDEX_FILE = "vector_index_ivf"
+QUANTIZED_INDEX_FILE = "vector_index_quantized"
+
+# Metadata fields indexed by posting lists
+POSTING_FIELDS = ("ticker", "content_type")
+
+# Compaction policy: merge when there are too many segments or too many dead rows
+COMPACT_MAX_SEGMENTS = 8
+COMPACT_MAX_DELETED_RATIO = 0.25
+
+
+def write_metadata_rows(output_path: Path, rows: Iterable[Dict[str, Any]]) -> int:
+    """Write metadata rows as JSON lines plus a byte-offset index. Returns row count."""
+    offsets = [0]
+    with open(output_path / METADATA_FILE, "wb") as f:
+        for row in rows:
+            line = json.dumps(row, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(output_path / METADATA_OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+    return len(offsets) - 1
+
+
+def write_manifest(output_path: Path, count: int, dimension: int, **extra) -> Dict[str, Any]:
+    """Write the store header last, so a store without a manifest is never half-read."""
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "count": count,
+        "dimension": dimension,
+        "dtype": "float32",
+        "normalized": True,
+        "vectors_file": VECTORS_FILE,
+        "metadata_file": METADATA_FILE,
+        "metadata_offsets_file": METADATA_OFFSETS_FILE,
+        "created_at": datetime.now().isoformat(),
+    }
+    manifest.update(extra)
+    with open(output_path / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class PostingLists:
+    """
+    Inverted index from metadata field values to sorted row-id arrays.
+
+    Used to pre-filter vector search: a content filter on indexed fields
+    resolves to the exact set of candidate rows before any scoring.
+    """
+
+    def __init__(self, lists: Dict[str, Dict[str, np.ndarray]]):
+        self.lists = lists
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence[Any]]) -> "PostingLists":
+        """Build from one value per row for each field (None values are not indexed)."""
+        lists = {}
+        for field, values in columns.items():
+            keys = np.array(["" if v is None else str(v) for v in values], dtype=object)
+            postings = {}
+            if len(keys):
+                uniques, inverse = np.unique(keys.astype(str), return_inverse=True)
+                order = np.argsort(inverse, kind="stable")
+                bounds = np.searchsorted(inverse[order], np.arange(len(uniques) + 1))
+                for i, value in enumerate(uniques):
+                    if value:
+                        postings[str(value)] = order[bounds[i] : bounds[i + 1]].astype(np.int64)
+            lists[field] = postings
+        return cls(lists)
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Dict[str, Any]], fields: Sequence[str] = POSTING_FIELDS
+    ) -> "PostingLists":
+        columns = {field: [] for field in fields}
+        for row in rows:
+            for field in fields:
+                columns[field].append(row.get(field))
+        return cls.from_columns(columns)
+
+    @classmethod
+    def merge(cls, parts: Sequence[Tuple["PostingLists", np.ndarray]]) -> "PostingLists":
+        """
+        Combine per-segment lists into global ones.
+        Each part comes with an array mapping local row -> global row id (-1 drops the row).
+        """
+        lists: Dict[str, Dict[str, List[np.ndarray]]] = {}
+        for postings, mapping in parts:
+            for field, values in postings.lists.items():
+                merged = lists.setdefault(field, {})
+                for value, rows in values.items():
+                    mapped = mapping[rows]
+                    merged.setdefault(value, []).append(mapped[mapped >= 0])
+        return cls(
+            {
+                field: {
+                    value: np.sort(np.concatenate(chunks))
+                    for value, chunks in values.items()
+                    if sum(len(c) for c in chunks)
+                }
+                for field, values in lists.items()
+            }
+        )
+
+    def save(self, path: Path):
+        arrays = {}
+        for field, values in self.lists.items():
+            keys = sorted(values)
+            arrays[f"{field}.values"] = np.array(keys, dtype=str)
+            arrays[f"{field}.offsets"] = np.cumsum([0] + [len(values[k]) for k in keys])
+            arrays[f"{field}.rows"] = (
+                np.concatenate([values[k] for k in keys]) if keys else np.zeros(0, np.int64)
+            )
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "PostingLists":
+        lists = {}
+        with np.load(path) as data:
+            for name in data.files:
+                if not name.endswith(".values"):
+                    continue
+                field = name[: -len(".values")]
+                offsets, rows = data[f"{field}.offsets"], data[f"{field}.rows"]
+                lists[field] = {
+                    str(value): rows[offsets[i] : offsets[i + 1]]
+                    for i, value in enumerate(data[name])
+                }
+        return cls(lists)
+
+    def select(self, content_filter: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Resolve the indexed part of a content filter.
+
+        Values may be scalars or lists (any of). Returns (rows, residual):
+        the sorted row ids matching every indexed key (None if no key is
+        indexed), and the filter keys that still need checking per row.
+        """
+        rows = None
+        residual = {}
+        for field, wanted in content_filter.items():
+            if field not in self.lists:
+                residual[field] = wanted
+                continue
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            parts = [self.lists[field].get(str(getattr(v, "value", v))) for v in values]
+            parts = [p for p in parts if p is not None]
+            matched = np.unique(np.concatenate(parts)) if parts else np.zeros(0, np.int64)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows, residual
+
+
+def write_embedding_store(
+    output_path: Path,
+    vectors: np.ndarray,
+    metadata_rows: Iterable[Dict[str, Any]],
+    **manifest_extra,
+) -> Dict[str, Any]:
+    """
+    Write a complete store.
+
+    Args:
+        output_path: Target directory
+        vectors: (count, dimension) L2-normalized vectors
+        metadata_rows: One metadata dict per vector row, in row order
+        manifest_extra: Additional manifest fields (e.g. model_name)
+    """
+    output_path.mkdir(parents=True, exist_ok=True)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    np.save(output_path / VECTORS_FILE, vectors)
+
+    columns = {field: [] for field in POSTING_FIELDS}
+
+    def recorded(rows):
+        for row in rows:
+            for field in POSTING_FIELDS:
+                columns[field].append(row.get(field))
+            yield row
+
+    count = write_metadata_rows(output_path, recorded(metadata_rows))
+    if count != vectors.shape[0]:
+        raise ValueError(f"Metadata rows ({count}) do not match vector rows ({vectors.shape[0]})")
+    PostingLists.from_columns(columns).save(output_path / POSTINGS_FILE)
+    manifest_extra.setdefault("postings_file", POSTINGS_FILE)
+    return write_manifest(output_path, count, int(vectors.shape[1]), **manifest_extra)
+
+
+class RowMetadata(Mapping):
+    """
+    Read-only row_id -> metadata dict mapping backed by a memory-mapped JSONL file.
+    Rows are decoded only when accessed.
+    """
+
+    def __init__(self, metadata_file: Path, offsets_file: Path):
+        self._offsets = np.load(offsets_file, mmap_mode="r")
+        self._file = open(metadata_file, "rb")
+        size = self._offsets[-1] if len(self._offsets) else 0
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return max(0, len(self._offsets) - 1)
+
+    def __contains__(self, row_id) -> bool:
+        try:
+            return 0 <= int(row_id) < len(self)
+        except (TypeError, ValueError):
+            return False
+
+    def __getitem__(self, row_id) -> Dict[str, Any]:
+        if row_id not in self:
+            raise KeyError(row_id)
+        row_id = int(row_id)
+        start, end = int(self._offsets[row_id]), int(self._offsets[row_id + 1])
+        return json.loads(self._data[start:end])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class EmbeddingStore:
+    """Memory-mapped view of an embeddings directory written by write_embedding_store."""
+
+    def __init__(self, path: Path, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self.vectors = np.load(path / manifest["vectors_file"], mmap_mode="r")
+        self.metadata = RowMetadata(
+            path / manifest["metadata_file"], path / manifest["metadata_offsets_file"]
+        )
+
+    @property
+    def count(self) -> int:
+        return int(self.manifest["count"])
+
+    @property
+    def dimension(self) -> int:
+        return int(self.manifest["dimension"])
+
+    def postings(self) -> PostingLists:
+        """Posting lists of this store, rebuilt from metadata for stores written without them."""
+        postings_file = self.manifest.get("postings_file")
+        if postings_file and (self.path / postings_file).exists():
+            return PostingLists.load(self.path / postings_file)
+        return PostingLists.from_rows(self.metadata.values())
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (path / MANIFEST_FILE).exists()
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["EmbeddingStore"]:
+        """Open the store in path, or return None if no manifest is present."""
+        manifest_file = path / MANIFEST_FILE
+        if not manifest_file.exists():
+            return None
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported embedding store version {manifest.get('format_version')} in {path}"
+            )
+        return cls(path, manifest)
+
+
+def document_ranges(
+    rows: Sequence[Dict[str, Any]], key: str = "document_id"
+) -> Dict[str, List[int]]:
+    """
+    Map each document id to the [start, end) row range holding its chunks.
+    A document's rows must be contiguous.
+    """
+    ranges: Dict[str, List[int]] = {}
+    previous = None
+    for row, item in enumerate(rows):
+        doc_id = item[key]
+        if doc_id != previous:
+            if doc_id in ranges:
+                raise ValueError(f"Rows of document {doc_id} are not contiguous")
+            ranges[doc_id] = [row, row + 1]
+            previous = doc_id
+        else:
+            ranges[doc_id][1] = row + 1
+    return ranges
+
+
+def _deleted_mask(count: int, deleted_ranges: Iterable[Sequence[int]]) -> Optional[np.ndarray]:
+    ranges = list(deleted_ranges)
+    if not ranges:
+        return None
+    mask = np.zeros(count, dtype=bool)
+    for start, end in ranges:
+        mask[start:end] = True
+    return mask
+
+
+class _SegmentLease:
+    """
+    Keeps segment directories on disk while a view over them is alive.
+    Released when the lease is garbage collected.
+    """
+
+    def __init__(self, store: "SegmentedEmbeddingStore", names: List[str]):
+        self.names = names
+        store._acquire(names)
+        weakref.finalize(self, store._release, names)
+
+
+class SegmentedMetadata(Mapping):
+    """
+    Read-only global row_id -> metadata mapping over all segments.
+    Global ids number the rows of the segments in order; deleted rows are absent.
+    owner is kept alive as long as the mapping (e.g. a lease on the segments' files).
+    """
+
+    def __init__(
+        self,
+        segments: List[Tuple[int, RowMetadata, Optional[np.ndarray]]],
+        owner: Any = None,
+    ):
+        self.owner = owner
+        self._segments = segments
+        self._bases = [base for base, _, _ in segments]
+        self._total = sum(len(rows) for _, rows, _ in segments)
+        self._deleted = sum(int(mask.sum()) for _, _, mask in segments if mask is not None)
+
+    def _locate(self, row_id) -> Optional[Tuple[RowMetadata, int]]:
+        try:
+            row_id = int(row_id)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= row_id < self._total:
+            return None
+        base, rows, mask = self._segments[bisect.bisect_right(self._bases, row_id) - 1]
+        local = row_id - base
+        if mask is not None and mask[local]:
+            return None
+        return rows, local
+
+    def __len__(self) -> int:
+        return self._total - self._deleted
+
+    def __contains__(self, row_id) -> bool:
+        return self._locate(row_id) is not None
+
+    def __getitem__(self, row_id) -> Dict[str, Any]:
+        located = self._locate(row_id)
+        if located is None:
+            raise KeyError(row_id)
+        rows, local = located
+        return rows[local]
+
+    def __iter__(self) -> Iterator[int]:
+        for base, rows, mask in self._segments:
+            for local in range(len(rows)):
+                if mask is None or not mask[local]:
+                    yield base + local
+
+
+# (segment manifest entry, global id of its first row, opened segment, deleted mask)
+SegmentView = Tuple[Dict[str, Any], int, EmbeddingStore, Optional[np.ndarray]]
+
+
+class SegmentedEmbeddingStore:
+    """
+    Append-only collection of EmbeddingStore segments with tombstones.
+
+    Each update() writes only the delta: a new segment for new or replaced
+    documents, plus tombstones for the row ranges they supersede. Readers see
+    a consistent snapshot of segments.json taken at open().
+    A store directory is meant to have a single writer process.
+
+    Views returned by metadata and vector_index() hold a lease on the
+    segments they read. Segments dropped by compaction while still leased are
+    only closed and deleted once the last view over them is released.
+    """
+
+    def __init__(self, path: Path, manifest: Dict[str, Any]):
+        self.path = path
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self._opened: Dict[str, EmbeddingStore] = {}
+        # Reentrant: a lease may be finalized by garbage collection while held
+        self._refs_lock = threading.RLock()
+        self._refs: Dict[str, int] = {}
+        self._retired = set()
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (path / SEGMENTS_FILE).exists()
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["SegmentedEmbeddingStore"]:
+        """Open the segmented store in path, or return None if none is present."""
+        segments_file = path / SEGMENTS_FILE
+        if not segments_file.exists():
+            return None
+        with open(segments_file, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SEGMENTS_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported segmented store version {manifest.get('format_version')} in {path}"
+            )
+        return cls(path, manifest)
+
+    @classmethod
+    def create(cls, path: Path, **manifest_extra) -> "SegmentedEmbeddingStore":
+        """
+        Start an empty store in path. Segments of a store previously in path
+        are removed once the new (empty) manifest is committed.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        previous = cls.open(path) if cls.exists(path) else None
+        next_segment = previous.manifest["next_segment"] if previous else 1
+        manifest = {
+            "format_version": SEGMENTS_FORMAT_VERSION,
+            "next_segment": next_segment,
+            "segments": [],
+            "documents": {},
+        }
+        manifest.update(manifest_extra)
+        store = cls(path, manifest)
+        store._commit()
+        if previous:
+            store._remove_segments(seg["name"] for seg in previous.manifest["segments"])
+        return store
+
+    # ------------------------------------------------------------------ reads
+
+    @property
+    def documents(self) -> Dict[str, Dict[str, Any]]:
+        """document_id -> {"segment", "start", "end", "content_hash"}"""
+        return self.manifest["documents"]
+
+    @property
+    def total_count(self) -> int:
+        return sum(seg["count"] for seg in self.manifest["segments"])
+
+    @property
+    def deleted_count(self) -> int:
+        return sum(
+            end - start for seg in self.manifest["segments"] for start, end in seg["deleted"]
+        )
+
+    @property
+    def count(self) -> int:
+        return self.total_count - self.deleted_count
+
+    def document_hashes(self) -> Dict[str, Optional[str]]:
+        return {doc_id: doc.get("content_hash") for doc_id, doc in self.documents.items()}
+
+    def segment(self, name: str) -> EmbeddingStore:
+        if name not in self._opened:
+            self._opened[name] = EmbeddingStore.open(self.path / name)
+        return self._opened[name]
+
+    def _segment_views(self) -> Tuple[List[SegmentView], _SegmentLease]:
+        """Snapshot the current segments and lease them so compaction cannot delete them."""
+        with self._lock:
+            segments = json.loads(json.dumps(self.manifest["segments"]))
+            lease = _SegmentLease(self, [seg["name"] for seg in segments])
+        views = []
+        base = 0
+        for seg in segments:
+            mask = _deleted_mask(seg["count"], seg["deleted"])
+            views.append((seg, base, self.segment(seg["name"]), mask))
+            base += seg["count"]
+        return views, lease
+
+    @property
+    def metadata(self) -> SegmentedMetadata:
+        views, lease = self._segment_views()
+        return SegmentedMetadata(
+            [(base, store.metadata, mask) for _, base, store, mask in views], owner=lease
+        )
+
+    def postings(self) -> PostingLists:
+        """Global posting lists over live rows, merged from the segments' lists."""
+        parts = []
+        views, _ = self._segment_views()
+        for _, base, store, mask in views:
+            mapping = base + np.arange(store.count, dtype=np.int64)
+            if mask is not None:
+                mapping[mask] = -1
+            parts.append((store.postings(), mapping))
+        return PostingLists.merge(parts)
+
+    def vector_index(self, nprobe: int = 16, rerank: int = 10, **kwargs) -> SegmentedVectorIndex:
+        """
+        Search over the memory-mapped segments, skipping tombstoned rows.
+        Segments with an IVF index are searched approximately with nprobe lists.
+        Quantized segments keep only their codes in memory and re-rank the
+        best rerank * k candidates against the memory-mapped vectors.
+        """
+        searchers = []
+        views, lease = self._segment_views()
+        for seg, _, store, mask in views:
+            if seg.get("index") == "ivf":
+                searcher = IVFVectorIndex.load(
+                    self.path / seg["name"] / IVF_INDEX_FILE, mmap_mode="r", nprobe=nprobe
+                )
+            elif seg.get("index") in QUANTIZERS:
+                searcher = QuantizedVectorIndex.load(
+                    self.path / seg["name"] / QUANTIZED_INDEX_FILE,
+                    vectors=store.vectors,
+                    rerank=rerank,
+                )
+            else:
+                searcher = store.vectors
+            searchers.append((searcher, mask))
+        return SegmentedVectorIndex(
+            searchers, dimension=self.manifest.get("dimension"), owner=lease, **kwargs
+        )
+
+    def set_index_config(
+        self,
+        index_type: str = "flat",
+        nlist: int = 0,
+        compression: str = "none",
+        pq_subspaces: int = 0,
+    ):
+        """Choose the index built for segments written from now on (persisted on next commit)."""
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+        if compression not in COMPRESSION_TYPES:
+            raise ValueError(
+                f"Unknown compression {compression!r}, expected one of {COMPRESSION_TYPES}"
+            )
+        self.manifest["index"] = {
+            "type": index_type,
+            "nlist": nlist,
+            "compression": compression,
+            "pq_subspaces": pq_subspaces,
+        }
+
+    def _build_segment_index(self, name: str, count: int) -> Optional[str]:
+        """Build the configured index for a freshly written segment; returns its type."""
+        config = self.manifest.get("index") or {}
+        vectors = np.load(self.path / name / VECTORS_FILE, mmap_mode="r")
+        if config.get("type") == "ivf" and count >= IVF_MIN_ROWS:
+            IVFVectorIndex.build(vectors, nlist=config.get("nlist", 0)).save(
+                self.path / name / IVF_INDEX_FILE
+            )
+            return "ivf"
+        compression = config.get("compression", "none")
+        if compression != "none" and count >= QUANTIZATION_MIN_ROWS:
+            QuantizedVectorIndex.build(
+                vectors, compression, pq_subspaces=config.get("pq_subspaces", 0)
+            ).save(self.path / name / QUANTIZED_INDEX_FILE)
+            return compression
+        return None
+
+    # ----------------------------------------------------------------- writes
+
+    def update(
+        self,
+        vectors: np.ndarray,
+        metadata_rows: Sequence[Dict[str, Any]],
+        content_hashes: Optional[Dict[str, Optional[str]]] = None,
+        removed: Iterable[str] = (),
+    ) -> Dict[str, int]:
+        """
+        Apply a delta.
+
+        Args:
+            vectors: (n, dimension) L2-normalized vectors of new or replaced documents
+            metadata_rows: One row per vector; rows of a document must be contiguous
+            content_hashes: document_id -> content hash recorded for change detection
+            removed: Document ids to delete
+
+        Returns:
+            Counts of rows added and rows tombstoned
+        """
+        content_hashes = content_hashes or {}
+        ranges = document_ranges(metadata_rows)
+        with self._lock:
+            name = None
+            if len(metadata_rows):
+                name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:06d}"
+                self.manifest["next_segment"] += 1
+                write_embedding_store(self.path / name, vectors, metadata_rows)
+                self.manifest.setdefault("dimension", int(np.shape(vectors)[1]))
+                index = self._build_segment_index(name, len(metadata_rows))
+
+            tombstoned = 0
+            for doc_id in list(ranges) + [d for d in removed if d not in ranges]:
+                tombstoned += self._tombstone(doc_id)
+
+            if name:
+                segment = {"name": name, "count": len(metadata_rows), "deleted": []}
+                if index:
+                    segment["index"] = index
+                self.manifest["segments"].append(segment)
+                for doc_id, (start, end) in ranges.items():
+                    self.documents[doc_id] = {
+                        "segment": name,
+                        "start": start,
+                        "end": end,
+                        "content_hash": content_hashes.get(doc_id),
+                    }
+            self._commit()
+        return {"rows_added": len(metadata_rows), "rows_deleted": tombstoned}
+
+    def _tombstone(self, doc_id: str) -> int:
+        doc = self.documents.pop(doc_id, None)
+        if doc is None:
+            return 0
+        for seg in self.manifest["segments"]:
+            if seg["name"] == doc["segment"]:
+                seg["deleted"].append([doc["start"], doc["end"]])
+                return doc["end"] - doc["start"]
+        return 0
+
+    def _commit(self):
+        """Atomically replace segments.json with the in-memory manifest."""
+        self.manifest["updated_at"] = datetime.now().isoformat()
+        tmp_file = self.path / (SEGMENTS_FILE + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(self.manifest, f, separators=(",", ":"))
+        os.replace(tmp_file, self.path / SEGMENTS_FILE)
+
+    def _acquire(self, names: Iterable[str]):
+        with self._refs_lock:
+            for name in names:
+                self._refs[name] = self._refs.get(name, 0) + 1
+
+    def _release(self, names: Iterable[str]):
+        with self._refs_lock:
+            for name in names:
+                self._refs[name] -= 1
+                if self._refs[name] == 0:
+                    del self._refs[name]
+                    if name in self._retired:
+                        self._retired.discard(name)
+                        self._delete_segment(name)
+
+    def _remove_segments(self, names: Iterable[str]):
+        """Delete segments no longer in the manifest, deferring those still leased."""
+        with self._refs_lock:
+            for name in names:
+                if self._refs.get(name):
+                    self._retired.add(name)
+                else:
+                    self._delete_segment(name)
+
+    def _delete_segment(self, name: str):
+        store = self._opened.pop(name, None)
+        if store is not None:
+            store.metadata.close()
+        shutil.rmtree(self.path / name, ignore_errors=True)
+
+    # ------------------------------------------------------------- compaction
+
+    def needs_compaction(
+        self,
+        max_segments: int = COMPACT_MAX_SEGMENTS,
+        max_deleted_ratio: float = COMPACT_MAX_DELETED_RATIO,
+    ) -> bool:
+        segments = self.manifest["segments"]
+        if len(segments) > max_segments:
+            return True
+        total = self.total_count
+        return bool(total) and self.deleted_count / total > max_deleted_ratio
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Merge every live row into a single segment.
+
+        The merged segment is written from a snapshot of the manifest without
+        holding the lock, so update() can keep appending meanwhile. At the
+        swap, documents replaced or removed during the merge are tombstoned in
+        the merged segment, and segments added during the merge are kept.
+        """
+        with self._lock:
+            snapshot = json.loads(json.dumps(self.manifest))
+            name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:06d}"
+            self.manifest["next_segment"] += 1
+        merged_names = [seg["name"] for seg in snapshot["segments"]]
+        if not merged_names:
+            return {"segments_merged": 0, "rows": 0}
+
+        order = {seg_name: i for i, seg_name in enumerate(merged_names)}
+        docs = sorted(
+            snapshot["documents"].items(),
+            key=lambda kv: (order[kv[1]["segment"]], kv[1]["start"]),
+        )
+        live_rows = sum(doc["end"] - doc["start"] for _, doc in docs)
+        dimension = snapshot.get("dimension") or self.segment(merged_names[0]).dimension
+
+        # Stream vectors and raw metadata lines straight from the old segments
+        out_dir = self.path / name
+        out_dir.mkdir(parents=True, exist_ok=True)
+        vectors = np.lib.format.open_memmap(
+            out_dir / VECTORS_FILE, mode="w+", dtype=np.float32, shape=(live_rows, dimension)
+        )
+        offsets = np.empty(live_rows + 1, dtype=np.int64)
+        offsets[0] = 0
+        new_ranges = {}
+        remaps = {seg_name: None for seg_name in merged_names}
+        row = 0
+        with open(out_dir / METADATA_FILE, "wb") as meta_out:
+            for doc_id, doc in docs:
+                source = self.segment(doc["segment"])
+                start, end = doc["start"], doc["end"]
+                vectors[row : row + end - start] = source.vectors[start:end]
+                line_offsets = source.metadata._offsets[start : end + 1]
+                meta_out.write(source.metadata._data[int(line_offsets[0]) : int(line_offsets[-1])])
+                line_lengths = line_offsets[1:] - line_offsets[0]
+                offsets[row + 1 : row + 1 + end - start] = offsets[row] + line_lengths
+                new_ranges[doc_id] = (row, row + end - start, doc)
+                if remaps[doc["segment"]] is None:
+                    remaps[doc["segment"]] = np.full(source.count, -1, dtype=np.int64)
+                remaps[doc["segment"]][start:end] = np.arange(row, row + end - start)
+                row += end - start
+        vectors.flush()
+        del vectors
+        np.save(out_dir / METADATA_OFFSETS_FILE, offsets)
+        PostingLists.merge(
+            [
+                (self.segment(seg_name).postings(), remap)
+                for seg_name, remap in remaps.items()
+                if remap is not None
+            ]
+        ).save(out_dir / POSTINGS_FILE)
+        write_manifest(out_dir, live_rows, dimension, postings_file=POSTINGS_FILE)
+        index = self._build_segment_index(name, live_rows)
+
+        with self._lock:
+            merged = {"name": name, "count": live_rows, "deleted": []}
+            if index:
+                merged["index"] = index
+            for doc_id, (start, end, old) in new_ranges.items():
+                current = self.documents.get(doc_id)
+                if (
+                    current is not None
+                    and current["segment"] == old["segment"]
+                    and current["start"] == old["start"]
+                ):
+                    current.update(segment=name, start=start, end=end)
+                else:
+                    merged["deleted"].append([start, end])
+            kept = [seg for seg in self.manifest["segments"] if seg["name"] not in order]
+            self.manifest["segments"] = [merged] + kept
+            self._commit()
+        self._remove_segments(merged_names)
+
+        logger.info(
+            f"Compacted {len(merged_names)} embedding segments into {name} ({live_rows} rows)"
+        )
+        return {"segments_merged": len(merged_names), "rows": live_rows}
+
+    def start_compaction(
+        self, on_complete: Optional[Callable[[], None]] = None
+    ) -> threading.Thread:
+        """
+        Run compact() in a background thread and return it. on_complete is
+        called from that thread once the merged segment is committed, so
+        callers can swap in views over it and release the old segments.
+        """
+        thread = threading.Thread(
+            target=self._compact_logged, args=(on_complete,), name="embedding-compaction"
+        )
+        thread.start()
+        return thread
+
+    def _compact_logged(self, on_complete: Optional[Callable[[], None]] = None):
+        try:
+            self.compact()
+            if on_complete is not None:
+                on_complete()
+        except Exception as e:
+            logger.error(f"Embedding store compaction failed: {e}")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched Neo4j writes for graph data integration.
+
+GraphBatchWriter collects node rows per label and relationship rows per
+relationship type, and writes them with one parameterized statement per
+batch instead of one round trip per node:
+
+    UNWIND $rows AS row MERGE (n:Stock {ticker: row.ticker}) SET n += row
+
+Each flush runs in one explicit transaction: all node statements (in the
+order their labels were first seen) before all relationship statements, so
+relationships find the nodes they connect. A failed flush raises
+GraphWriteError; callers that catch errors per input file should let it
+propagate, since the lost batch holds rows queued by other files. The
+writer takes the database
+handle (neomodel's ``db``, or anything with ``cypher_query`` and a
+``transaction`` context manager), so it has no driver import of its own.
+
+Part of Stage 3 (Load) in the ETL pipeline.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+# Labels, relationship types and property keys are interpolated into Cypher
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+logger = logging.getLogger(__name__)
+
+
+class GraphWriteError(RuntimeError):
+    """A batched write transaction failed; none of the flushed rows were written."""
+
+
+def _identifier(name: str) -> str:
+    if not IDENTIFIER.fullmatch(name):
+        raise ValueError(f"Invalid Cypher identifier: {name!r}")
+    return name
+
+
+def node_statement(label: str, key: str) -> str:
+    label, key = _identifier(label), _identifier(key)
+    return f"UNWIND $rows AS row MERGE (n:{label} {{{key}: row.{key}}}) SET n += row"
+
+
+def relationship_statement(rel_type: str, start: Tuple[str, str], end: Tuple[str, str]) -> str:
+    (start_label, start_key), (end_label, end_key) = start, end
+    return (
+        f"UNWIND $rows AS row "
+        f"MATCH (a:{_identifier(start_label)} {{{_identifier(start_key)}: row.start}}) "
+        f"MATCH (b:{_identifier(end_label)} {{{_identifier(end_key)}: row.end}}) "
+        f"MERGE (a)-[:{_identifier(rel_type)}]->(b)"
+    )
+
+
+class GraphBatchWriter:
+    """
+    Buffers MERGE rows and writes them in UNWIND batches of ``batch_size``.
+
+    Buffers are flushed when any of them reaches ``batch_size`` rows, and on
+    ``flush()`` (call it before reading back what was written). ``stats``
+    counts statements, transactions and rows written, and rows written per
+    node label (``nodes``) and relationship type (``relationships``); rows
+    are counted only once their transaction has committed.
+    """
+
+    def __init__(self, db, batch_size: int = 1000):
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        self.db = db
+        self.batch_size = batch_size
+        self._nodes: Dict[str, List[Dict[str, Any]]] = {}
+        self._relationships: Dict[str, List[Dict[str, Any]]] = {}
+        # Statement -> node label or relationship type it writes
+        self._kinds: Dict[str, str] = {}
+        self.stats = {
+            "statements": 0,
+            "transactions": 0,
+            "rows": 0,
+            "seconds": 0.0,
+            "nodes": {},
+            "relationships": {},
+        }
+
+    @property
+    def pending(self) -> int:
+        return sum(map(len, self._nodes.values())) + sum(map(len, self._relationships.values()))
+
+    def merge_node(self, label: str, key: str, properties: Dict[str, Any]):
+        """Queue MERGE of a ``label`` node on ``properties[key]``, setting all properties."""
+        self._add(self._nodes, node_statement(label, key), properties, label)
+
+    def merge_relationship(
+        self,
+        rel_type: str,
+        start: Tuple[str, str],
+        start_value: Any,
+        end: Tuple[str, str],
+        end_value: Any,
+    ):
+        """
+        Queue MERGE of (start)-[:rel_type]->(end) between existing nodes;
+        ``start`` and ``end`` are (label, key) and the values select the nodes.
+        """
+        statement = relationship_statement(rel_type, start, end)
+        self._add(
+            self._relationships, statement, {"start": start_value, "end": end_value}, rel_type
+        )
+
+    def _add(
+        self,
+        buffers: Dict[str, List[Dict[str, Any]]],
+        statement: str,
+        row: Dict[str, Any],
+        kind: str,
+    ):
+        self._kinds[statement] = kind
+        rows = buffers.setdefault(statement, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write every buffered row in one transaction, batch_size rows per statement.
+        Raises GraphWriteError if the transaction fails.
+        """
+        batches = [
+            (counts, statement, rows[i : i + self.batch_size])
+            for buffers, counts in ((self._nodes, "nodes"), (self._relationships, "relationships"))
+            for statement, rows in buffers.items()
+            for i in range(0, len(rows), self.batch_size)
+        ]
+        # Rows are dropped even when the transaction fails: retrying would fail the same way
+        self._nodes, self._relationships = {}, {}
+        if not batches:
+            return
+
+        n_rows = sum(len(rows) for _, _, rows in batches)
+        start = time.perf_counter()
+        try:
+            with self.db.transaction:
+                for _, statement, rows in batches:
+                    self.db.cypher_query(statement, {"rows": rows})
+        except Exception as e:
+            raise GraphWriteError(f"Batched write of {n_rows} rows failed: {e}") from e
+        elapsed = time.perf_counter() - start
+
+        for counts, statement, rows in batches:
+            kind = self._kinds[statement]
+            self.stats[counts][kind] = self.stats[counts].get(kind, 0) + len(rows)
+        self.stats["statements"] += len(batches)
+        self.stats["transactions"] += 1
+        self.stats["rows"] += n_rows
+        self.stats["seconds"] += elapsed
+        logger.debug(f"Flushed {len(batches)} statements ({n_rows} rows) in {elapsed:.3f}s")
@@ -36,6 +36,7 @@ from common.graph_rag_schema import (
     SECFilingNode,
     StockNode,
 )
+from ETL.graph_batch_writer import GraphBatchWriter, GraphWriteError
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +54,7 @@ class GraphDataIntegrator:
         neo4j_url: str = "bolt://localhost:7687",
         username: str = "neo4j",
         password: str = "password",
+        batch_size: int = 1000,
     ):
         """
         Initialize the graph data integrator.
@@ -61,11 +63,13 @@ class GraphDataIntegrator:
             neo4j_url: Neo4j database URL
             username: Database username
             password: Database password
+            batch_size: Rows per batched UNWIND write statement
         """
         self.neo4j_url = neo4j_url
         self.username = username
         self.password = password
         self.setup_connection()
+        self.writer = GraphBatchWriter(db, batch_size=batch_size)
 
     def setup_connection(self):
         """Setup Neo4j connection and constraints."""
@@ -118,11 +122,15 @@ class GraphDataIntegrator:
             data_dir: Directory containing processed data
 
         Returns:
-            GraphNodesOutput with integration statistics
+            GraphNodesOutput with integration statistics, counting only rows
+            whose batched write committed
+
+        Raises:
+            GraphWriteError: A batched write failed; rows queued before it are lost
         """
         logger.info("Starting M7 data integration into graph database")
 
-        stats = {"nodes_created": 0, "relationships_created": 0, "node_types": {}}
+        written_before = self._written_counts()
 
         try:
             # Process each M7 company
@@ -130,23 +138,28 @@ class GraphDataIntegrator:
                 logger.info(f"Processing {ticker} data integration")
 
                 # Create stock node
-                stock_stats = self._create_stock_node(ticker)
-                self._update_stats(stats, stock_stats)
+                self._create_stock_node(ticker)
 
                 # Process SEC filings
-                sec_stats = self._integrate_sec_filings(ticker, data_dir)
-                self._update_stats(stats, sec_stats)
+                self._integrate_sec_filings(ticker, data_dir)
 
                 # Process Yahoo Finance data
-                yf_stats = self._integrate_yfinance_data(ticker, data_dir)
-                self._update_stats(stats, yf_stats)
+                self._integrate_yfinance_data(ticker, data_dir)
 
                 # Process DCF results if available
-                dcf_stats = self._integrate_dcf_results(ticker, data_dir)
-                self._update_stats(stats, dcf_stats)
+                self._integrate_dcf_results(ticker, data_dir)
 
                 logger.info(f"Completed {ticker} integration")
 
+            # Write the remaining batched nodes before relating them
+            self.writer.flush()
+            logger.info(
+                f"Batched writes: {self.writer.stats['rows']} rows in "
+                f"{self.writer.stats['statements']} statements, "
+                f"{self.writer.stats['transactions']} transactions"
+            )
+            stats = self._written_counts(since=written_before)
+
             # Create cross-company relationships
             relation_stats = self._create_industry_relationships()
             self._update_stats(stats, relation_stats)
@@ -167,8 +180,28 @@ class GraphDataIntegrator:
             logger.error(f"Failed to integrate M7 data: {e}")
             raise
 
-    def _create_stock_node(self, ticker: str) -> Dict[str, int]:
-        """Create or update stock node for a ticker."""
+    def _written_counts(self, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Nodes and relationships written by the batch writer so far, as
+        integration statistics; with since, only those written after it.
+        """
+        node_types = dict(self.writer.stats["nodes"])
+        relationships = sum(self.writer.stats["relationships"].values())
+        if since is not None:
+            node_types = {
+                label: count - since["node_types"].get(label, 0)
+                for label, count in node_types.items()
+                if count > since["node_types"].get(label, 0)
+            }
+            relationships -= since["relationships_created"]
+        return {
+            "nodes_created": sum(node_types.values()),
+            "relationships_created": relationships,
+            "node_types": node_types,
+        }
+
+    def _create_stock_node(self, ticker: str):
+        """Queue creation or update of the stock node for a ticker."""
         cik = MAGNIFICENT_7_CIKS[ticker]
 
         # Company metadata (simplified for demo)
@@ -224,20 +257,10 @@ class GraphDataIntegrator:
             created_at=datetime.now(),
         )
 
-        # Create node in Neo4j
-        cypher = """
-        MERGE (s:Stock {ticker: $ticker})
-        SET s.node_id = $node_id,
-            s.company_name = $company_name,
-            s.cik = $cik,
-            s.sector = $sector,
-            s.industry = $industry,
-            s.created_at = $created_at,
-            s.updated_at = $updated_at
-        """
-
-        db.cypher_query(
-            cypher,
+        # Queue node for the next batched write
+        self.writer.merge_node(
+            "Stock",
+            "ticker",
             {
                 "ticker": stock_node.ticker,
                 "node_id": stock_node.node_id,
@@ -250,30 +273,27 @@ class GraphDataIntegrator:
             },
         )
 
-        logger.debug(f"Created/updated stock node for {ticker}")
-        return {"nodes_created": 1, "node_types": {"Stock": 1}}
-
-    def _integrate_sec_filings(self, ticker: str, data_dir: Path) -> Dict[str, int]:
-        """Integrate SEC filings for a ticker."""
-        stats = {"nodes_created": 0, "relationships_created": 0, "node_types": {}}
+        logger.debug(f"Queued stock node for {ticker}")
 
+    def _integrate_sec_filings(self, ticker: str, data_dir: Path):
+        """Queue SEC filings for a ticker."""
         sec_dir = data_dir / "stage_01_extract" / "sec_edgar"
         if not sec_dir.exists():
             logger.warning(f"SEC data directory not found: {sec_dir}")
-            return stats
+            return
 
         # Find latest SEC data partition
         partitions = [d for d in sec_dir.iterdir() if d.is_dir() and d.name.isdigit()]
         if not partitions:
             logger.warning(f"No SEC data partitions found in {sec_dir}")
-            return stats
+            return
 
         latest_partition = max(partitions, key=lambda x: x.name)
         ticker_dir = latest_partition / ticker
 
         if not ticker_dir.exists():
             logger.warning(f"No SEC data for {ticker} in {ticker_dir}")
-            return stats
+            return
 
         # Process SEC files
         sec_files = list(ticker_dir.glob(f"{ticker}_sec_edgar_*.txt"))
@@ -301,32 +321,19 @@ class GraphDataIntegrator:
 
                     # Create filing node and relationship
                     self._create_sec_filing_node(filing_node, ticker)
-                    stats["nodes_created"] += 1
-                    stats["relationships_created"] += 1
-                    stats["node_types"]["SECFiling"] = stats["node_types"].get("SECFiling", 0) + 1
 
+            except GraphWriteError:
+                # A batch flushed by this file also held other files' rows
+                raise
             except Exception as e:
                 logger.error(f"Failed to process SEC file {sec_file}: {e}")
                 continue
 
-        return stats
-
     def _create_sec_filing_node(self, filing_node: SECFilingNode, ticker: str):
-        """Create SEC filing node and relationships."""
-        cypher = """
-        MERGE (f:SECFiling {accession_number: $accession_number})
-        SET f.node_id = $node_id,
-            f.filing_type = $filing_type,
-            f.filing_date = $filing_date,
-            f.company_cik = $company_cik,
-            f.created_at = $created_at
-        WITH f
-        MATCH (s:Stock {ticker: $ticker})
-        MERGE (s)-[:HAS_FILING]->(f)
-        """
-
-        db.cypher_query(
-            cypher,
+        """Queue SEC filing node and relationships."""
+        self.writer.merge_node(
+            "SECFiling",
+            "accession_number",
             {
                 "accession_number": filing_node.accession_number,
                 "node_id": filing_node.node_id,
@@ -334,19 +341,23 @@ class GraphDataIntegrator:
                 "filing_date": filing_node.filing_date.isoformat(),
                 "company_cik": filing_node.company_cik,
                 "created_at": filing_node.created_at.isoformat(),
-                "ticker": ticker,
             },
         )
+        self.writer.merge_relationship(
+            "HAS_FILING",
+            ("Stock", "ticker"),
+            ticker,
+            ("SECFiling", "accession_number"),
+            filing_node.accession_number,
+        )
 
-    def _integrate_yfinance_data(self, ticker: str, data_dir: Path) -> Dict[str, int]:
-        """Integrate Yahoo Finance data for financial metrics."""
-        stats = {"nodes_created": 0, "relationships_created": 0, "node_types": {}}
-
+    def _integrate_yfinance_data(self, ticker: str, data_dir: Path):
+        """Queue Yahoo Finance data for financial metrics."""
         # Find YFinance data files
         yf_dir = data_dir / "stage_01_extract" / "yfinance"
         if not yf_dir.exists():
             logger.warning(f"YFinance data directory not found: {yf_dir}")
-            return stats
+            return
 
         # Find latest partition with ticker data
         for partition_dir in sorted(yf_dir.iterdir(), reverse=True):
@@ -377,34 +388,19 @@ class GraphDataIntegrator:
                 )
 
                 self._create_financial_metrics_node(metrics_node, ticker)
-                stats["nodes_created"] += 1
-                stats["relationships_created"] += 1
-                stats["node_types"]["FinancialMetrics"] = (
-                    stats["node_types"].get("FinancialMetrics", 0) + 1
-                )
-
                 break
 
+            except GraphWriteError:
+                raise
             except Exception as e:
                 logger.error(f"Failed to process YFinance file {latest_file}: {e}")
                 continue
 
-        return stats
-
     def _create_financial_metrics_node(self, metrics_node: FinancialMetricsNode, ticker: str):
-        """Create financial metrics node and relationships."""
-        cypher = """
-        MERGE (m:FinancialMetrics {node_id: $node_id})
-        SET m.ticker = $ticker,
-            m.report_date = $report_date,
-            m.created_at = $created_at
-        WITH m
-        MATCH (s:Stock {ticker: $ticker})
-        MERGE (s)-[:HAS_METRIC]->(m)
-        """
-
-        db.cypher_query(
-            cypher,
+        """Queue financial metrics node and relationships."""
+        self.writer.merge_node(
+            "FinancialMetrics",
+            "node_id",
             {
                 "node_id": metrics_node.node_id,
                 "ticker": metrics_node.ticker,
@@ -412,20 +408,25 @@ class GraphDataIntegrator:
                 "created_at": metrics_node.created_at.isoformat(),
             },
         )
+        self.writer.merge_relationship(
+            "HAS_METRIC",
+            ("Stock", "ticker"),
+            ticker,
+            ("FinancialMetrics", "node_id"),
+            metrics_node.node_id,
+        )
 
-    def _integrate_dcf_results(self, ticker: str, data_dir: Path) -> Dict[str, int]:
-        """Integrate DCF valuation results if available."""
-        stats = {"nodes_created": 0, "relationships_created": 0, "node_types": {}}
-
+    def _integrate_dcf_results(self, ticker: str, data_dir: Path):
+        """Queue DCF valuation results if available."""
         # Check for DCF results in stage_03_load
         dcf_dir = data_dir / "stage_03_load"
         if not dcf_dir.exists():
-            return stats
+            return
 
         # Look for DCF result files (simplified implementation)
         dcf_files = list(dcf_dir.glob("**/dcf_results*.json"))
         if not dcf_files:
-            return stats
+            return
 
         # Process DCF results (simplified)
         for dcf_file in dcf_files:
@@ -445,35 +446,18 @@ class GraphDataIntegrator:
                     )
 
                     self._create_dcf_valuation_node(dcf_node, ticker)
-                    stats["nodes_created"] += 1
-                    stats["relationships_created"] += 1
-                    stats["node_types"]["DCFValuation"] = (
-                        stats["node_types"].get("DCFValuation", 0) + 1
-                    )
 
+            except GraphWriteError:
+                raise
             except Exception as e:
                 logger.error(f"Failed to process DCF file {dcf_file}: {e}")
                 continue
 
-        return stats
-
     def _create_dcf_valuation_node(self, dcf_node: DCFValuationNode, ticker: str):
-        """Create DCF valuation node and relationships."""
-        cypher = """
-        MERGE (d:DCFValuation {node_id: $node_id})
-        SET d.ticker = $ticker,
-            d.valuation_date = $valuation_date,
-            d.intrinsic_value = $intrinsic_value,
-            d.discount_rate = $discount_rate,
-            d.terminal_growth_rate = $terminal_growth_rate,
-            d.created_at = $created_at
-        WITH d
-        MATCH (s:Stock {ticker: $ticker})
-        MERGE (s)-[:HAS_VALUATION]->(d)
-        """
-
-        db.cypher_query(
-            cypher,
+        """Queue DCF valuation node and relationships."""
+        self.writer.merge_node(
+            "DCFValuation",
+            "node_id",
             {
                 "node_id": dcf_node.node_id,
                 "ticker": dcf_node.ticker,
@@ -484,6 +468,13 @@ class GraphDataIntegrator:
                 "created_at": dcf_node.created_at.isoformat(),
             },
         )
+        self.writer.merge_relationship(
+            "HAS_VALUATION",
+            ("Stock", "ticker"),
+            ticker,
+            ("DCFValuation", "node_id"),
+            dcf_node.node_id,
+        )
 
     def _create_industry_relationships(self) -> Dict[str, int]:
         """Create relationships between companies in the same industry."""
@@ -1,18 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import logging
 
 # Use environment variable for secure database configuration
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime
 
 import yaml
 
 # Import config from neomodel and set database connection
-from neomodel import config
+from neomodel import config, db
 
 db_host = os.getenv("NEO4J_HOST", "localhost")
 db_port = os.getenv("NEO4J_PORT", "7687")
@@ -26,6 +25,9 @@ from common.logger import StreamToLogger, setup_logger
 from common.monitoring.progress import create_progress_bar
 from common.utils.general_utils import is_file_recent, sanitize_data, suppress_third_party_logs
 from common.utils.snowflake import Snowflake
+from ETL.graph_batch_writer import GraphBatchWriter, GraphWriteError
+from ETL.price_import import PRICE_FIELDS, AdminCsvExport, history_columns, queue_prices
+from ETL.yfinance_columnar import read_extract
 
 # Optionally suppress third-party log messages (e.g. requests/urllib3)
 suppress_third_party_logs()
@@ -34,18 +36,22 @@ suppress_third_party_logs()
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 STAGE_01_EXTRACT_DIR = directory_manager.get_layer_path(DataLayer.DAILY_DELTA)
 
+# Columnar extracts only load the history columns imported as PriceData
+HISTORY_COLUMNS = {"history": list(PRICE_FIELDS.values())}
+
 # Import models (ensure ETL is in PYTHONPATH)
-from models import FastInfo, Info, PriceData, Recommendations, Stock, Sustainability
+from models import FastInfo, Info, Recommendations, Stock, Sustainability
 
 
-def import_json_file(file_path, logger):
+def import_json_file(file_path, logger, writer=None):
     """
     Read a single JSON file and import data to Neo4j (via Neomodel models).
     Based on the ticker field in the JSON, first get or create a Stock node, then create Info, FastInfo, PriceData, Recommendations and Sustainability nodes, and establish relationships.
+    Price history is queued on writer (a GraphBatchWriter) and written in UNWIND batches;
+    without a writer the file's prices are flushed before returning.
     """
     logger.info(f"Processing file: {file_path}")
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_extract(file_path, tables=["history"], columns=HISTORY_COLUMNS)
 
     ticker = data.get("ticker")
     if not ticker:
@@ -123,60 +129,59 @@ def import_json_file(file_path, logger):
         sus_node.save()
         stock.sustainability.connect(sus_node)
 
-    # Process historical stock price data, assuming history section is a dictionary with arrays for each field
+    # Process historical stock price data: a dictionary of column lists with its Date index
     history_data = data.get("history")
     if history_data:
-        opens = history_data.get("Open", [])
-        highs = history_data.get("High", [])
-        lows = history_data.get("Low", [])
-        closes = history_data.get("Close", [])
-        volumes = history_data.get("Volume", [])
-        # If there's a date field in JSON, it should be used; here using base date as example
-        base_date = datetime(2025, 1, 1)
-        count = min(len(opens), len(highs), len(lows), len(closes), len(volumes))
-        for i in range(count):
-            price_node = PriceData(
-                date=base_date + timedelta(days=i),
-                open=opens[i],
-                high=highs[i],
-                low=lows[i],
-                close=closes[i],
-                volume=volumes[i],
+        columns = history_columns(history_data)
+        if columns is None:
+            logger.warning(
+                f"History in {file_path} has no dates (extracted before dates were saved); "
+                "re-extract it to import prices"
             )
-            price_node.save()
-            stock.prices.connect(price_node)
+        else:
+            batch_writer = writer or GraphBatchWriter(db)
+            count = queue_prices(batch_writer, ticker, data.get("interval"), columns)
+            if writer is None:
+                batch_writer.flush()
+            logger.info(f"Queued {count} prices for {ticker}")
 
     logger.info(f"Imported data for ticker: {ticker}")
 
 
-def import_all_json_files(source, tickers, logger):
+def latest_ticker_dir(source, ticker):
+    """Directory of a ticker's extracts in the latest stage_01_extract partition of source."""
+    # Use latest data from stage_01_extract
+    latest_link = os.path.join(STAGE_01_EXTRACT_DIR, source, "latest")
+    if os.path.exists(latest_link):
+        return os.path.join(latest_link, ticker)
+    # Fallback to most recent date partition
+    source_dir = os.path.join(STAGE_01_EXTRACT_DIR, source)
+    if os.path.exists(source_dir):
+        date_dirs = [
+            d
+            for d in os.listdir(source_dir)
+            if os.path.isdir(os.path.join(source_dir, d)) and d.isdigit()
+        ]
+        if date_dirs:
+            latest_date = max(date_dirs)
+            return os.path.join(source_dir, latest_date, ticker)
+        return os.path.join(source_dir, ticker)  # fallback
+    return os.path.join(STAGE_01_EXTRACT_DIR, source, ticker)
+
+
+def import_all_json_files(source, tickers, logger, writer=None):
     """
     For the given tickers list, read all JSON files from SSOT data directories,
     and call import_json_file() to write data to Neo4j.
     Uses DirectoryManager to resolve data paths following SSOT principles.
+    Prices of all files share one GraphBatchWriter (writer, or one for this call
+    that is flushed at the end). A failed batch write is raised rather than
+    counted against the file that triggered it, since it lost other files' rows.
     """
+    batch_writer = writer or GraphBatchWriter(db)
     total_files = 0
     for ticker in tickers:
-        # Use latest data from stage_01_extract
-        latest_link = os.path.join(STAGE_01_EXTRACT_DIR, source, "latest")
-        if os.path.exists(latest_link):
-            ticker_dir = os.path.join(latest_link, ticker)
-        else:
-            # Fallback to most recent date partition
-            source_dir = os.path.join(STAGE_01_EXTRACT_DIR, source)
-            if os.path.exists(source_dir):
-                date_dirs = [
-                    d
-                    for d in os.listdir(source_dir)
-                    if os.path.isdir(os.path.join(source_dir, d)) and d.isdigit()
-                ]
-                if date_dirs:
-                    latest_date = max(date_dirs)
-                    ticker_dir = os.path.join(source_dir, latest_date, ticker)
-                else:
-                    ticker_dir = os.path.join(source_dir, ticker)  # fallback
-            else:
-                ticker_dir = os.path.join(STAGE_01_EXTRACT_DIR, source, ticker)
+        ticker_dir = latest_ticker_dir(source, ticker)
         if not os.path.isdir(ticker_dir):
             logger.warning(f"Directory does not exist: {ticker_dir}")
             continue
@@ -185,26 +190,7 @@ def import_all_json_files(source, tickers, logger):
     progress_bar = create_progress_bar(total_files, description="JSON Files")
     errors = 0
     for ticker in tickers:
-        # Use latest data from stage_01_extract
-        latest_link = os.path.join(STAGE_01_EXTRACT_DIR, source, "latest")
-        if os.path.exists(latest_link):
-            ticker_dir = os.path.join(latest_link, ticker)
-        else:
-            # Fallback to most recent date partition
-            source_dir = os.path.join(STAGE_01_EXTRACT_DIR, source)
-            if os.path.exists(source_dir):
-                date_dirs = [
-                    d
-                    for d in os.listdir(source_dir)
-                    if os.path.isdir(os.path.join(source_dir, d)) and d.isdigit()
-                ]
-                if date_dirs:
-                    latest_date = max(date_dirs)
-                    ticker_dir = os.path.join(source_dir, latest_date, ticker)
-                else:
-                    ticker_dir = os.path.join(source_dir, ticker)  # fallback
-            else:
-                ticker_dir = os.path.join(STAGE_01_EXTRACT_DIR, source, ticker)
+        ticker_dir = latest_ticker_dir(source, ticker)
         if not os.path.isdir(ticker_dir):
             continue
         for fname in os.listdir(ticker_dir):
@@ -215,15 +201,47 @@ def import_all_json_files(source, tickers, logger):
                     progress_bar.update(1)
                     continue
                 try:
-                    import_json_file(file_path, logger)
+                    import_json_file(file_path, logger, batch_writer)
+                except GraphWriteError:
+                    raise
                 except Exception as e:
                     errors += 1
                     logger.exception(f"Error importing file {file_path}: {e}")
                 progress_bar.update(1)
     progress_bar.close()
+    if writer is None:
+        batch_writer.flush()
     logger.info(f"All JSON files imported. Total errors: {errors}")
 
 
+def export_admin_csv(source, tickers, export, logger):
+    """
+    Write the Stock and price history of every JSON file of tickers to an
+    AdminCsvExport, for a full initial load with neo4j-admin import.
+    """
+    for ticker in tickers:
+        ticker_dir = latest_ticker_dir(source, ticker)
+        if not os.path.isdir(ticker_dir):
+            logger.warning(f"Directory does not exist: {ticker_dir}")
+            continue
+        for fname in sorted(os.listdir(ticker_dir)):
+            if not fname.endswith(".json"):
+                continue
+            file_path = os.path.join(ticker_dir, fname)
+            try:
+                data = read_extract(file_path, tables=["history"], columns=HISTORY_COLUMNS)
+                export.add_stock(
+                    ticker, data.get("period"), data.get("interval"), data.get("fetched_at")
+                )
+                columns = history_columns(data.get("history") or {})
+                if columns is None:
+                    logger.warning(f"History in {file_path} has no dates; skipped")
+                    continue
+                export.add_prices(ticker, data.get("interval"), columns)
+            except Exception as e:
+                logger.exception(f"Error exporting file {file_path}: {e}")
+
+
 def run_job(config_path):
     """
     Based on YAML configuration file (e.g. config.yml), read configuration and import JSON files from SSOT data paths to Neo4j.
@@ -231,12 +249,18 @@ def run_job(config_path):
     Configuration file should contain:
       - tickers: list of ticker symbols
       - source: data source name (e.g. "yfinance")
+    Optional:
+      - import_mode: "unwind" (default) writes through Neo4j in UNWIND batches;
+        "admin_csv" writes Stock / PriceData / HAS_PRICE CSVs for neo4j-admin import
+      - batch_size: rows per UNWIND statement (default 1000)
+      - csv_dir: output directory for admin_csv (default stage_02 neo4j_import)
     """
     with open(config_path, "r", encoding="utf-8") as f:
         config_data = yaml.safe_load(f)
 
     tickers = config_data.get("tickers", [])
     source = config_data.get("source", "yfinance")
+    import_mode = config_data.get("import_mode", "unwind")
 
     job_id = f"{source}"
     date_str = datetime.now().strftime("%y%m%d-%H%M%S")
@@ -244,7 +268,18 @@ def run_job(config_path):
     logger = setup_logger(job_id, date_str)
     logger.info(f"Job started: exe_id={exe_id}")
 
+    if import_mode == "admin_csv":
+        csv_dir = config_data.get("csv_dir") or str(
+            directory_manager.get_subdir_path(DataLayer.DAILY_INDEX, "neo4j_import")
+        )
+        with AdminCsvExport(csv_dir) as export:
+            export_admin_csv(source, tickers, export, logger)
+        logger.info(f"Job finished: exe_id={exe_id}, CSV export {export.stats} in {csv_dir}")
+        print(f"Job summary: Exported {export.stats} to {csv_dir}")
+        return
+
     sf = Snowflake(machine_id=1)
+    writer = GraphBatchWriter(db, batch_size=config_data.get("batch_size", 1000))
     total = len(tickers)
     processed = 0
     progress_bar = create_progress_bar(total, description="Tickers")
@@ -253,12 +288,16 @@ def run_job(config_path):
         ticker_logger = logging.LoggerAdapter(logger, {"request_logid": request_logid})
         ticker_logger.info(f"Processing ticker: {ticker}")
         try:
-            import_all_json_files(source, [ticker], ticker_logger)
+            import_all_json_files(source, [ticker], ticker_logger, writer)
+        except GraphWriteError:
+            raise
         except Exception:
             ticker_logger.exception(f"Error processing ticker {ticker}")
         processed += 1
         progress_bar.update(1)
     progress_bar.close()
+    writer.flush()
+    logger.info(f"Price writes: {writer.stats}")
 
     logger.info(f"Job finished: exe_id={exe_id}, Processed {processed} tickers")
     print(f"Job summary: Processed {processed} tickers")
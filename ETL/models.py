@@ -54,6 +54,8 @@ class FastInfo(StructuredNode):
 
 class PriceData(StructuredNode):
     # Historical stock price data, each record corresponds to one date
+    price_id = StringProperty(unique_index=True)  # TICKER_interval_date, see ETL/price_import.py
+    interval = StringProperty()
     date = DateTimeProperty()
     open = FloatProperty()
     high = FloatProperty()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk import of yfinance price history into Neo4j.
+
+A yfinance extract stores its history as a dict of lists (``Open``, ``High``,
+``Low``, ``Close``, ``Volume`` and the ``Date`` index). ``history_columns``
+turns it into typed column lists with the real bar dates, and prices are
+then written in bulk one of two ways:
+
+- ``queue_prices`` queues PriceData nodes and HAS_PRICE relationships on a
+  GraphBatchWriter, which writes them in UNWIND batches. PriceData nodes are
+  merged on ``price_id`` (ticker, interval and bar date), so re-importing an
+  extract, or overlapping periods of the same ticker, does not duplicate
+  prices.
+- ``AdminCsvExport`` writes CSV files for ``neo4j-admin database import``,
+  for a full initial load into an empty database:
+
+      neo4j-admin database import full \\
+          --nodes=Stock=stocks.csv --nodes=PriceData=prices.csv \\
+          --relationships=HAS_PRICE=has_price.csv neo4j
+
+  Create the Stock / PriceData unique constraints after the import.
+
+Dates are stored as epoch seconds, as neomodel's DateTimeProperty does.
+"""
+
+import csv
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Model property -> yfinance history column
+PRICE_FIELDS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# yfinance names the index Date for daily and longer bars, Datetime for intraday
+DATE_COLUMNS = ("Date", "Datetime")
+
+
+def parse_timestamp(value: str) -> float:
+    """Epoch seconds of an ISO timestamp; naive timestamps are taken as UTC."""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _volume(value) -> Optional[int]:
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else int(value)
+
+
+def history_columns(history: Dict[str, List[Any]]) -> Optional[Dict[str, List[Any]]]:
+    """
+    Column lists (day, date, open, high, low, close, volume) of a history
+    dict; ``day`` is the bar date as in the extract and ``date`` its epoch
+    seconds. Returns None for histories saved without their date index.
+    """
+    days = next((history[name] for name in DATE_COLUMNS if history.get(name)), None)
+    if not days:
+        return None
+    count = min([len(days)] + [len(history.get(column, [])) for column in PRICE_FIELDS.values()])
+    columns = {"day": list(days[:count]), "date": [parse_timestamp(day) for day in days[:count]]}
+    for field, column in PRICE_FIELDS.items():
+        values = history[column][:count]
+        columns[field] = [_volume(v) for v in values] if field == "volume" else list(values)
+    return columns
+
+
+def _csv_value(value):
+    """Missing values (None, NaN) as empty CSV fields, which neo4j-admin skips."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return value
+
+
+def price_id(ticker: str, interval: Optional[str], day: str) -> str:
+    return f"{ticker}_{interval or ''}_{day}"
+
+
+def price_rows(ticker: str, interval: Optional[str], columns: Dict[str, List[Any]]):
+    """PriceData properties, one dict per bar."""
+    fields = ["date"] + list(PRICE_FIELDS)
+    for i, day in enumerate(columns["day"]):
+        row = {field: columns[field][i] for field in fields}
+        row["price_id"] = price_id(ticker, interval, day)
+        row["interval"] = interval
+        yield row
+
+
+def queue_prices(
+    writer, ticker: str, interval: Optional[str], columns: Dict[str, List[Any]]
+) -> int:
+    """Queue every bar of ``columns`` on a GraphBatchWriter; the Stock node must exist."""
+    count = 0
+    for row in price_rows(ticker, interval, columns):
+        writer.merge_node("PriceData", "price_id", row)
+        writer.merge_relationship(
+            "HAS_PRICE", ("Stock", "ticker"), ticker, ("PriceData", "price_id"), row["price_id"]
+        )
+        count += 1
+    return count
+
+
+class AdminCsvExport:
+    """
+    Stock, PriceData and HAS_PRICE CSV files for neo4j-admin import.
+
+    Add each ticker's extracts one after another: bars repeated across the
+    periods of a ticker (same interval and date) are written once.
+    """
+
+    STOCK_HEADER = ["ticker:ID(Stock)", "period", "interval", "fetched_at:double"]
+    PRICE_HEADER = [
+        "price_id:ID(PriceData)",
+        "date:double",
+        "interval",
+        "open:double",
+        "high:double",
+        "low:double",
+        "close:double",
+        "volume:long",
+    ]
+    HAS_PRICE_HEADER = [":START_ID(Stock)", ":END_ID(PriceData)"]
+
+    def __init__(self, output_dir: str):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self._files = []
+        self._stocks = self._writer("stocks.csv", self.STOCK_HEADER)
+        self._prices = self._writer("prices.csv", self.PRICE_HEADER)
+        self._has_price = self._writer("has_price.csv", self.HAS_PRICE_HEADER)
+        self._tickers = set()
+        self._ticker = None
+        self._seen = set()  # price_ids of the current ticker
+        self.stats = {"stocks": 0, "prices": 0, "duplicates": 0}
+
+    def _writer(self, name, header):
+        f = open(os.path.join(self.output_dir, name), "w", encoding="utf-8", newline="")
+        self._files.append(f)
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return writer
+
+    def add_stock(self, ticker: str, period=None, interval=None, fetched_at: Optional[str] = None):
+        if ticker in self._tickers:
+            return
+        self._tickers.add(ticker)
+        fetched = parse_timestamp(fetched_at) if fetched_at else None
+        self._stocks.writerow([ticker, period, interval, fetched])
+        self.stats["stocks"] += 1
+
+    def add_prices(self, ticker: str, interval: Optional[str], columns: Dict[str, List[Any]]):
+        if ticker != self._ticker:
+            self._ticker, self._seen = ticker, set()
+        for row in price_rows(ticker, interval, columns):
+            if row["price_id"] in self._seen:
+                self.stats["duplicates"] += 1
+                continue
+            self._seen.add(row["price_id"])
+            values = [row["price_id"], row["date"], interval] + [row[f] for f in PRICE_FIELDS]
+            self._prices.writerow([_csv_value(value) for value in values])
+            self._has_price.writerow([ticker, row["price_id"]])
+            self.stats["prices"] += 1
+
+    def close(self):
+        for f in self._files:
+            f.close()
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL Price Store Module
+
+Consolidated price history of every extracted ticker, built from the
+yfinance extracts in stage_01_daily_delta (JSON or columnar, see
+ETL/yfinance_columnar.py) so that cross-sectional queries do not open and
+parse one file per (ticker, period, fetch).
+
+For each interval the store holds a date x ticker panel:
+- price_store.json: manifest (format version, and per interval the panel
+  directory, ticker order, fields and date range); rewritten atomically
+  after the panels, so it is the single commit point of a build
+- <interval>_<build>/dates.npy: sorted datetime64[s] bar dates
+- <interval>_<build>/<field>.npy: float64 matrix, one row per date and one
+  column per ticker, NaN where a ticker has no bar; opened with
+  mmap_mode="r"
+
+Rows are dates, so a date range is a contiguous block of rows. Bar dates are
+the exchange-local times yfinance labels bars with (midnight for daily bars).
+Every extract of a ticker and interval is merged, newer fetches overriding
+older bars, so overlapping periods (3mo, 5y, max) fill one series.
+
+Part of Stage 2 (Transform) in the ETL pipeline.
+"""
+
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ETL.price_import import PRICE_FIELDS, history_columns
+from ETL.yfinance_columnar import read_extract
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "price_store.json"
+DATES_FILE = "dates.npy"
+FIELDS = list(PRICE_FIELDS)
+HISTORY_COLUMNS = {"history": list(PRICE_FIELDS.values())}
+
+
+def _bar_dates(days: Sequence[str]) -> np.ndarray:
+    # "2024-03-08T00:00:00-05:00" -> exchange-local 2024-03-08T00:00:00
+    return np.array([day[:19] for day in days], dtype="datetime64[s]")
+
+
+def _extract_files(extract_dir: Path) -> List[Path]:
+    """Extract JSON files under <extract_dir>/<date partition>/<ticker>/, oldest first."""
+    files = []
+    for partition in sorted(p for p in extract_dir.iterdir() if p.is_dir() and p.name.isdigit()):
+        for ticker_dir in sorted(p for p in partition.iterdir() if p.is_dir()):
+            files.extend(sorted(ticker_dir.glob(f"{ticker_dir.name}_*.json")))
+    # Filenames end in the fetch timestamp (<ticker>_<source>_<oid>_<yymmdd-HHMMSS>.json)
+    return sorted(files, key=lambda path: (path.parent.parent.name, path.stem.rsplit("_", 1)[-1]))
+
+
+def _merge(parts: List[Tuple[np.ndarray, Dict[str, np.ndarray]]]):
+    """One series from several extracts, later extracts winning on shared dates."""
+    dates = np.concatenate([part[0] for part in parts])
+    values = {field: np.concatenate([part[1][field] for part in parts]) for field in FIELDS}
+    # np.unique keeps the first occurrence, so search the reversed series
+    unique, first = np.unique(dates[::-1], return_index=True)
+    keep = len(dates) - 1 - first
+    return unique, {field: column[keep] for field, column in values.items()}
+
+
+def _bound(value: Any, end: bool = False) -> Tuple[Optional[np.datetime64], str]:
+    """datetime64 bound of a query and the searchsorted side that makes it inclusive."""
+    if value is None:
+        return None, "left"
+    if isinstance(value, str) and len(value) == 10:
+        value = date.fromisoformat(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        # A whole day: an end date includes every bar of that day
+        if end:
+            return np.datetime64(value + timedelta(days=1), "s"), "left"
+        return np.datetime64(value, "s"), "left"
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return np.datetime64(value, "s"), "right" if end else "left"
+
+
+class PricePanel:
+    """The memory-mapped date x ticker matrices of one interval."""
+
+    def __init__(self, path: Path, entry: Dict[str, Any]):
+        self.path = path
+        self.tickers: List[str] = entry["tickers"]
+        self.fields: List[str] = entry["fields"]
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.dates = np.load(path / DATES_FILE, mmap_mode="r")
+        self._values = {
+            field: np.load(path / f"{field}.npy", mmap_mode="r") for field in self.fields
+        }
+
+    def values(self, field: str) -> np.ndarray:
+        if field not in self._values:
+            raise KeyError(f"Unknown price field {field!r}; fields are {self.fields}")
+        return self._values[field]
+
+    def column_indexes(self, tickers: Optional[Iterable[str]]) -> Optional[List[int]]:
+        if tickers is None:
+            return None
+        tickers = list(tickers)
+        missing = [ticker for ticker in tickers if ticker not in self.columns]
+        if missing:
+            raise KeyError(f"No prices for {missing}")
+        return [self.columns[ticker] for ticker in tickers]
+
+    def rows(self, start: Any = None, end: Any = None) -> slice:
+        """Rows of the dates in [start, end]; date-only bounds cover whole days."""
+        low, low_side = _bound(start)
+        high, high_side = _bound(end, end=True)
+        first = 0 if low is None else int(np.searchsorted(self.dates, low, side=low_side))
+        last = (
+            len(self.dates)
+            if high is None
+            else int(np.searchsorted(self.dates, high, side=high_side))
+        )
+        return slice(first, max(first, last))
+
+
+class PriceStore:
+    """
+    Read access to a built price store.
+
+    ``get_array`` and ``get_prices`` return a field for a date range of some
+    tickers, as NumPy arrays or a DataFrame; ``get_asof`` returns the last
+    value of each ticker at a point in time.
+    """
+
+    def __init__(self, path: Path, manifest: Dict[str, Any]):
+        self.path = Path(path)
+        self.manifest = manifest
+        self._panels: Dict[str, PricePanel] = {}
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["PriceStore"]:
+        """Open the store in path, or return None if no manifest is present."""
+        manifest_file = Path(path) / MANIFEST_FILE
+        if not manifest_file.exists():
+            return None
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported price store version {manifest.get('format_version')} in {path}"
+            )
+        return cls(path, manifest)
+
+    @classmethod
+    def open_default(cls) -> Optional["PriceStore"]:
+        """Open the store built by build_dataset, or None if it has not been built."""
+        return cls.open(default_store_path())
+
+    @property
+    def intervals(self) -> List[str]:
+        return list(self.manifest["intervals"])
+
+    def tickers(self, interval: str = "1d") -> List[str]:
+        return list(self.panel(interval).tickers)
+
+    def panel(self, interval: str = "1d") -> PricePanel:
+        if interval not in self._panels:
+            entry = self.manifest["intervals"].get(interval)
+            if entry is None:
+                raise KeyError(
+                    f"No {interval} prices in {self.path}; intervals are {self.intervals}"
+                )
+            self._panels[interval] = PricePanel(self.path / entry["path"], entry)
+        return self._panels[interval]
+
+    def get_array(
+        self,
+        tickers: Optional[Iterable[str]] = None,
+        start: Any = None,
+        end: Any = None,
+        field: str = "close",
+        interval: str = "1d",
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (dates, values) of ``field`` for ``tickers`` (default all) between
+        ``start`` and ``end`` inclusive: values has one row per date and one
+        column per ticker, in the order given. Unknown tickers raise KeyError.
+        """
+        panel = self.panel(interval)
+        rows = panel.rows(start, end)
+        columns = panel.column_indexes(tickers)
+        block = panel.values(field)[rows]
+        return panel.dates[rows], block if columns is None else block[:, columns]
+
+    def get_prices(
+        self,
+        tickers: Optional[Iterable[str]] = None,
+        start: Any = None,
+        end: Any = None,
+        field: str = "close",
+        interval: str = "1d",
+    ):
+        """``get_array`` as a pandas DataFrame indexed by bar date, one column per ticker."""
+        import pandas as pd
+
+        tickers = self.tickers(interval) if tickers is None else list(tickers)
+        dates, values = self.get_array(tickers, start, end, field, interval)
+        return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name="date"), columns=tickers)
+
+    def get_asof(
+        self, tickers: Iterable[str], when: Any, field: str = "close", interval: str = "1d"
+    ) -> np.ndarray:
+        """Last non-missing value of each ticker at or before ``when`` (NaN if none)."""
+        panel = self.panel(interval)
+        columns = panel.column_indexes(tickers)
+        block = panel.values(field)[panel.rows(None, when)][:, columns]
+        if not len(block):
+            return np.full(len(columns), np.nan)
+        present = ~np.isnan(block)
+        # Index of the last present row per column
+        last = len(block) - 1 - np.argmax(present[::-1], axis=0)
+        found = present.any(axis=0)
+        result = np.full(len(columns), np.nan)
+        result[found] = block[last[found], np.flatnonzero(found)]
+        return result
+
+
+def default_store_path() -> Path:
+    from common.core.directory_manager import DataLayer, directory_manager
+
+    return directory_manager.get_subdir_path(DataLayer.DAILY_INDEX, "price_store")
+
+
+def build_price_store(extract_dir: str, store_dir: str) -> Dict[str, Any]:
+    """
+    Build the price store in ``store_dir`` from the extracts of every date
+    partition of ``extract_dir`` (stage_01_daily_delta/yfinance), replacing
+    the previous build. Returns build statistics.
+    """
+    extract_dir, store_dir = Path(extract_dir), Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    stats = {"files": 0, "skipped": 0, "errors": 0, "intervals": {}}
+
+    # interval -> ticker -> [(dates, {field: values})], oldest extract first
+    series: Dict[str, Dict[str, List]] = {}
+    files = _extract_files(extract_dir) if extract_dir.exists() else []
+    for path in files:
+        try:
+            data = read_extract(str(path), tables=["history"], columns=HISTORY_COLUMNS)
+            columns = history_columns(data.get("history") or {})
+        except Exception as e:
+            stats["errors"] += 1
+            logger.warning(f"Skipping unreadable extract {path}: {e}")
+            continue
+        if columns is None or not data.get("ticker"):
+            stats["skipped"] += 1
+            continue
+        stats["files"] += 1
+        values = {
+            field: np.array([np.nan if v is None else v for v in columns[field]], dtype=np.float64)
+            for field in FIELDS
+        }
+        by_ticker = series.setdefault(data.get("interval") or "1d", {})
+        by_ticker.setdefault(data["ticker"], []).append((_bar_dates(columns["day"]), values))
+
+    build_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    intervals = {}
+    for interval, by_ticker in sorted(series.items()):
+        tickers = sorted(by_ticker)
+        merged = [_merge(by_ticker[ticker]) for ticker in tickers]
+        dates = np.unique(np.concatenate([ticker_dates for ticker_dates, _ in merged]))
+        panel_name = f"{interval}_{build_id}"
+        panel_dir = store_dir / panel_name
+        panel_dir.mkdir()
+        np.save(panel_dir / DATES_FILE, dates)
+        rows = [np.searchsorted(dates, ticker_dates) for ticker_dates, _ in merged]
+        for field in FIELDS:
+            # Written in place, so a build holds the staged series and one page-cached panel
+            matrix = np.lib.format.open_memmap(
+                panel_dir / f"{field}.npy",
+                mode="w+",
+                dtype=np.float64,
+                shape=(len(dates), len(tickers)),
+            )
+            matrix[:] = np.nan
+            for column, (ticker_rows, (_, values)) in enumerate(zip(rows, merged)):
+                matrix[ticker_rows, column] = values[field]
+            matrix.flush()
+            del matrix
+        intervals[interval] = {
+            "path": panel_name,
+            "tickers": tickers,
+            "fields": FIELDS,
+            "rows": len(dates),
+            "first": str(dates[0]),
+            "last": str(dates[-1]),
+        }
+        stats["intervals"][interval] = {"tickers": len(tickers), "dates": len(dates)}
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "built_at": datetime.now().isoformat(),
+        "intervals": intervals,
+    }
+    tmp_file = store_dir / (MANIFEST_FILE + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_file, store_dir / MANIFEST_FILE)
+
+    # Panels of earlier builds; readers that still map them keep their pages
+    live = {entry["path"] for entry in intervals.values()}
+    for old in store_dir.iterdir():
+        if old.is_dir() and old.name not in live:
+            shutil.rmtree(old, ignore_errors=True)
+
+    logger.info(f"Built price store {store_dir}: {stats}")
+    return stats
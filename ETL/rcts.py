@@ -1,5 +1,15 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from ETL.sec_filing_processor.chunker import chunk_spans, chunk_texts
 
-sec_text_doc_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500, chunk_overlap=50, separators=["\n\n", "\n", ".", " ", ""]
-)
+
+class SecTextSplitter:
+    """split_text over the offset-based chunker, so SEC text is chunked one way everywhere."""
+
+    def __init__(self, chunk_size, chunk_overlap):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text):
+        return list(chunk_texts(text, chunk_spans(text, self.chunk_size, self.chunk_overlap)))
+
+
+sec_text_doc_splitter = SecTextSplitter(chunk_size=500, chunk_overlap=50)
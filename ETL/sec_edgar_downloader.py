@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Concurrent, rate-limited SEC EDGAR filing downloader.
+
+Lists filings from the EDGAR submissions API (data.sec.gov) and downloads the
+full submission text files from the EDGAR archives (www.sec.gov). All workers
+share one RateLimiter, so the aggregate request rate across both hosts stays
+within the SEC fair-access limit (10 requests per second per user agent).
+Work is drained from a priority queue: lower ``priority`` values from the
+filing type config (e.g. 10-K before 10-Q before 8-K) are downloaded first.
+
+Filings are immutable, so with a manifest directory the downloader syncs
+incrementally: a per-CIK manifest records every accession already on disk and
+the last submissions listing with its validators. Reruns revalidate the
+listing with a conditional GET, download only new accessions and hard-link
+known filings into the new date partition instead of fetching them again.
+
+Part of Stage 1 (Extract) in the ETL pipeline.
+"""
+
+import gzip
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from common.utils.rate_limiting import RateLimiter, call_with_retries
+
+DATA_URL = "https://data.sec.gov"
+ARCHIVES_URL = "https://www.sec.gov"
+
+# Config filing type keys -> EDGAR form names
+FORM_NAMES = {"10K": "10-K", "10Q": "10-Q", "8K": "8-K", "13F": "13F-HR"}
+
+# Throttling and transient server errors; anything else (e.g. 404) fails at once
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Used when a job config has no rate_limits: stay below the 10 req/s SEC limit
+DEFAULT_RATE_LIMITS = {"requests_per_second": 8}
+
+logger = logging.getLogger(__name__)
+
+
+class EdgarRequestError(Exception):
+    """A request to EDGAR failed."""
+
+    def __init__(self, url: str, reason: str, status: Optional[int] = None):
+        super().__init__(f"{reason} for {url}")
+        self.url = url
+        self.status = status
+
+
+class RetryableEdgarError(EdgarRequestError):
+    """Throttling, server or connection error worth retrying with backoff."""
+
+
+class EdgarClient:
+    """
+    Minimal EDGAR HTTP client.
+
+    Every attempt, including retries, takes one token from ``rate_limiter``.
+    ``data_url`` and ``archives_url`` can point at a local server for tests.
+    """
+
+    def __init__(
+        self,
+        user_agent: str,
+        data_url: str = DATA_URL,
+        archives_url: str = ARCHIVES_URL,
+        timeout: float = 60,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_retries: int = 3,
+        retry_after_seconds: float = 2.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.user_agent = user_agent
+        self.data_url = data_url.rstrip("/")
+        self.archives_url = archives_url.rstrip("/")
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.retry_after_seconds = retry_after_seconds
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+
+    def _get_once(self, url: str, headers: Dict[str, str]) -> Tuple[Optional[bytes], Any]:
+        with self._lock:
+            self.requests += 1
+        request = urllib.request.Request(
+            url,
+            headers=dict(
+                headers, **{"User-Agent": self.user_agent, "Accept-Encoding": "gzip, deflate"}
+            ),
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                response_headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, e.headers
+            error_class = RetryableEdgarError if e.code in RETRYABLE_STATUS else EdgarRequestError
+            raise error_class(url, f"HTTP {e.code}", e.code) from e
+        except (urllib.error.URLError, OSError) as e:
+            raise RetryableEdgarError(url, f"Connection error ({e})") from e
+        with self._lock:
+            self.bytes_received += len(body)
+        encoding = response_headers.get("Content-Encoding", "")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+        return body, response_headers
+
+    def _get(self, url: str, headers: Dict[str, str]) -> Tuple[Optional[bytes], Any]:
+        return call_with_retries(
+            lambda: self._get_once(url, headers),
+            max_retries=self.max_retries,
+            retry_after_seconds=self.retry_after_seconds,
+            limiter=self.rate_limiter,
+            sleep=self._sleep,
+            retry_on=(RetryableEdgarError,),
+        )
+
+    def get(self, url: str) -> bytes:
+        """GET ``url`` with rate limiting and exponential backoff on retryable errors."""
+        return self._get(url, {})[0]
+
+    def get_if_modified(
+        self, url: str, validators: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[bytes], Dict[str, str]]:
+        """
+        Conditional GET with the ``etag`` / ``last_modified`` of an earlier response.
+
+        Returns ``(None, validators)`` when the server answers 304 Not Modified,
+        otherwise the body and the validators of the new response.
+        """
+        validators = validators or {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        body, response_headers = self._get(url, headers)
+        new_validators = {
+            "etag": response_headers.get("ETag") or validators.get("etag"),
+            "last_modified": (
+                response_headers.get("Last-Modified") or validators.get("last_modified")
+            ),
+        }
+        return body, new_validators
+
+    def submissions_url(self, cik: str) -> str:
+        return f"{self.data_url}/submissions/CIK{int(cik):010d}.json"
+
+    def submissions(self, cik: str) -> Dict[str, Any]:
+        """Company submissions document (name, tickers and recent filings)."""
+        return json.loads(self.get(self.submissions_url(cik)))
+
+    def filing_url(self, cik: str, accession: str) -> str:
+        """URL of the full submission text file of one filing."""
+        folder = accession.replace("-", "")
+        return f"{self.archives_url}/Archives/edgar/data/{int(cik)}/{folder}/{accession}.txt"
+
+
+def select_filings(
+    submissions: Dict[str, Any], form: str, count: int, start_date: Optional[str] = None
+) -> List[Dict[str, str]]:
+    """
+    Pick the ``count`` most recent filings of ``form`` from a submissions document.
+
+    Only ``filings.recent`` (the latest 1000 filings or one year) is searched;
+    amendments (e.g. 10-K/A) are not matched.
+    """
+    recent = submissions.get("filings", {}).get("recent", {})
+    selected = []
+    for accession, filing_form, filing_date in zip(
+        recent.get("accessionNumber", []), recent.get("form", []), recent.get("filingDate", [])
+    ):
+        if filing_form != form or (start_date and filing_date < start_date):
+            continue
+        selected.append({"accession": accession, "filing_date": filing_date})
+        if len(selected) >= count:
+            break
+    return selected
+
+
+def compact_submissions(submissions: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a submissions document select_filings reads, for the manifest."""
+    recent = submissions.get("filings", {}).get("recent", {})
+    return {
+        "tickers": submissions.get("tickers", []),
+        "filings": {
+            "recent": {
+                key: recent.get(key, []) for key in ("accessionNumber", "form", "filingDate")
+            }
+        },
+    }
+
+
+def read_json(path: str) -> Optional[Any]:
+    """Parsed JSON file, or None when it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable {path}: {e}")
+        return None
+
+
+def write_json(path: str, data: Any) -> None:
+    """Write JSON through a temporary file so readers never see a partial file."""
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def filing_filename(ticker: str, filing_type: str, timestamp: str, accession: str) -> str:
+    """TICKER_sec_edgar_FILING_TYPE_TIMESTAMP_ACCESSION.txt, as read by the later stages."""
+    return f"{ticker}_sec_edgar_{filing_type.lower()}_{timestamp}_{accession}.txt"
+
+
+class PriorityScheduler:
+    """
+    Thread pool draining a priority queue; running tasks may submit new ones.
+
+    Tasks with a lower priority value start first, ties in submission order.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, int(max_workers))
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+
+    def submit(self, priority: float, func: Callable[..., Any], *args) -> None:
+        self._queue.put((priority, next(self._counter), func, args))
+
+    def _worker(self) -> None:
+        while True:
+            _, _, func, args = self._queue.get()
+            try:
+                if func is None:
+                    return
+                func(*args)
+            except Exception:
+                logger.exception("Scheduled task failed")
+            finally:
+                self._queue.task_done()
+
+    def run(self) -> None:
+        """Run until the queue and every task it spawned are done."""
+        workers = [
+            threading.Thread(target=self._worker, daemon=True) for _ in range(self.max_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        self._queue.join()
+        for _ in workers:
+            self.submit(math.inf, None)
+        for worker in workers:
+            worker.join()
+
+
+class EdgarDownloader:
+    """
+    Download the latest filings of many companies concurrently.
+
+    One listing task per CIK fetches its submissions document, then queues one
+    download task per selected filing at the priority of its filing type.
+    Files are written to ``<output_dir>/<TICKER>/`` under ``filing_filename``;
+    filings whose accession is already in that directory are skipped.
+
+    With ``manifest_dir`` the sync is incremental: accessions recorded in
+    ``<manifest_dir>/CIK##########.json`` whose file still exists are
+    hard-linked into ``output_dir`` (copied across filesystems). The listing is
+    cached in ``CIK##########.submissions.json`` and only re-read when the
+    server does not answer 304 Not Modified.
+    """
+
+    def __init__(
+        self,
+        client: EdgarClient,
+        output_dir: str,
+        max_workers: int = 4,
+        progress: Optional[Callable[[int], Any]] = None,
+        manifest_dir: Optional[str] = None,
+    ):
+        self.client = client
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.progress = progress
+        self.manifest_dir = manifest_dir
+        self.timestamp = datetime.now().strftime("%y%m%d-%H%M%S")
+        self._lock = threading.Lock()
+        self._manifests = {}
+        self.stats = {
+            "listed": 0,
+            "downloaded": 0,
+            "linked": 0,
+            "skipped": 0,
+            "errors": 0,
+            "bytes": 0,
+        }
+
+    def _count(self, key: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def run(
+        self,
+        ciks: Iterable[str],
+        filing_types: List[Tuple[str, float, int]],
+        cik_to_ticker: Optional[Dict[str, str]] = None,
+        start_date: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Download ``(filing_type, priority, max_filings)`` for every CIK.
+
+        Tickers come from ``cik_to_ticker``, then from the submissions document,
+        falling back to ``CIK_<cik>``. Returns the download stats.
+        """
+        scheduler = PriorityScheduler(self.max_workers)
+        # Listing comes first: it discovers the work for every priority
+        list_priority = min((priority for _, priority, _ in filing_types), default=0) - 1
+        for cik in ciks:
+            scheduler.submit(
+                list_priority,
+                self._list_company,
+                scheduler,
+                str(cik),
+                filing_types,
+                (cik_to_ticker or {}).get(str(cik)),
+                start_date,
+            )
+        try:
+            scheduler.run()
+        finally:
+            self._save_manifests()
+        return dict(self.stats)
+
+    def manifest_path(self, cik: str, kind: str = "") -> str:
+        suffix = f".{kind}" if kind else ""
+        return os.path.join(self.manifest_dir, f"CIK{int(cik):010d}{suffix}.json")
+
+    def _load_manifest(self, cik: str) -> Dict[str, Any]:
+        manifest = {"cik": cik, "validators": {}, "filings": {}}
+        manifest.update(read_json(self.manifest_path(cik)) or {})
+        manifest["changed"] = False
+        with self._lock:
+            self._manifests[cik] = manifest
+        return manifest
+
+    def _record(self, cik: str, accession: str, path: str, filing_type: str) -> None:
+        if self.manifest_dir is None:
+            return
+        record = {"filing_type": filing_type, "path": os.path.abspath(path)}
+        with self._lock:
+            manifest = self._manifests[cik]
+            if manifest["filings"].get(accession) != record:
+                manifest["filings"][accession] = record
+                manifest["changed"] = True
+
+    def _save_manifests(self) -> None:
+        if self.manifest_dir is None:
+            return
+        with self._lock:
+            # Manifests of CIKs not listed by this run lost their flag when last saved
+            manifests = [m for m in self._manifests.values() if m.pop("changed", False)]
+        for manifest in manifests:
+            manifest["updated_at"] = datetime.now().isoformat()
+            write_json(self.manifest_path(manifest["cik"]), manifest)
+
+    def _list_submissions(self, cik: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Submissions document and manifest of ``cik``, revalidating a cached listing."""
+        if self.manifest_dir is None:
+            return self.client.submissions(cik), {"filings": {}}
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        manifest = self._load_manifest(cik)
+        cache_path = self.manifest_path(cik, "submissions")
+        cached = read_json(cache_path)
+        body, validators = self.client.get_if_modified(
+            self.client.submissions_url(cik), manifest["validators"] if cached else None
+        )
+        if body is None:
+            return cached, manifest
+        submissions = compact_submissions(json.loads(body))
+        write_json(cache_path, submissions)
+        with self._lock:
+            manifest["validators"] = validators
+            manifest["changed"] = True
+        return submissions, manifest
+
+    def _link(self, source: str, path: str) -> bool:
+        """Hard-link (or copy across filesystems) a known filing; False if it is gone."""
+        try:
+            os.link(source, path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            try:
+                shutil.copy2(source, path)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def _list_company(self, scheduler, cik, filing_types, ticker, start_date) -> None:
+        try:
+            submissions, manifest = self._list_submissions(cik)
+        except Exception as e:
+            logger.error(f"Error listing filings of CIK {cik}: {e}")
+            self._count("errors")
+            return
+        ticker = ticker or next(iter(submissions.get("tickers") or []), None) or f"CIK_{cik}"
+        ticker_dir = os.path.join(self.output_dir, ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        existing = {
+            name.rsplit("_", 1)[-1][: -len(".txt")]: name
+            for name in os.listdir(ticker_dir)
+            if name.endswith(".txt")
+        }
+
+        for filing_type, priority, max_filings in filing_types:
+            form = FORM_NAMES.get(filing_type)
+            if form is None:
+                logger.error(f"Unsupported filing type: {filing_type}, CIK: {cik}")
+                self._count("errors")
+                continue
+            for filing in select_filings(submissions, form, max_filings, start_date):
+                self._count("listed")
+                accession = filing["accession"]
+                if accession in existing:
+                    path = os.path.join(ticker_dir, existing[accession])
+                    self._record(cik, accession, path, filing_type)
+                    self._count("skipped")
+                    continue
+                known = manifest["filings"].get(accession)
+                if known:
+                    path = os.path.join(ticker_dir, os.path.basename(known["path"]))
+                    if self._link(known["path"], path):
+                        self._record(cik, accession, path, filing_type)
+                        self._count("linked")
+                        continue
+                path = os.path.join(
+                    ticker_dir, filing_filename(ticker, filing_type, self.timestamp, accession)
+                )
+                scheduler.submit(priority, self._download, cik, accession, path, filing_type)
+
+    def _download(self, cik: str, accession: str, path: str, filing_type: str) -> None:
+        try:
+            content = self.client.get(self.client.filing_url(cik, accession))
+            tmp_path = f"{path}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error downloading {accession} (CIK {cik}): {e}")
+            self._count("errors")
+            return
+        self._record(cik, accession, path, filing_type)
+        self._count("downloaded")
+        self._count("bytes", len(content))
+        if self.progress is not None:
+            self.progress(1)
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 """
-Please install lxml library first:
-    pip install lxml
+SEC Edgar spider: downloads the latest 10-K / 10-Q / 8-K filings of each CIK.
 
 CIK numbers for the Magnificent 7 (7 major tech companies):
   - Apple (AAPL):       0000320193
@@ -12,20 +11,12 @@ CIK numbers for the Magnificent 7 (7 major tech companies):
   - Tesla (TSLA):       0001318605
   - Netflix (NFLX):     0001065280
 
-It's recommended to use the above CIK numbers directly in configuration files instead of ticker symbols,
-so the program will directly use CIK to query filings data, avoiding errors from internal conversion requests to /files/company_tickers.json.
+Configuration files list CIK numbers directly instead of ticker symbols, so
+filings are queried by CIK without a lookup in /files/company_tickers.json.
+Downloads run concurrently behind one shared rate limiter (see
+ETL/sec_edgar_downloader.py).
 """
 
-import warnings
-
-try:
-    from bs4 import XMLParsedAsHTMLWarning
-
-    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
-except ImportError:
-    print("⚠️ Warning: beautifulsoup4 not available - some warnings may appear")
-
-import json
 import logging
 import os
 import sys
@@ -38,21 +29,17 @@ import yaml
 # Add project root to path for common imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-try:
-    from secedgar import FilingType, filings
-
-    SECEDGAR_AVAILABLE = True
-    print("✅ secedgar import successful")
-except ImportError as e:
-    print(f"⚠️ secedgar not available: {e}")
-    print("SEC Edgar collection will be skipped")
-    FilingType = None
-    filings = None
-    SECEDGAR_AVAILABLE = False
 from tqdm import tqdm
 
-from common.build.metadata_manager import MetadataManager
 from common.core.directory_manager import DataLayer, directory_manager
+from common.utils.rate_limiting import RateLimiter
+from ETL.sec_edgar_downloader import (
+    ARCHIVES_URL,
+    DATA_URL,
+    DEFAULT_RATE_LIMITS,
+    EdgarClient,
+    EdgarDownloader,
+)
 
 # Set log output level to DEBUG
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -77,104 +64,127 @@ def is_file_recent(filepath, hours=1):
     return False
 
 
-def run_job(config_path):
+# Per-CIK accession manifests, kept next to (not inside) the date partitions
+MANIFEST_DIR_NAME = ".manifests"
+
+# Map CIK to ticker for the directory structure when the config gives no mapping
+CIK_TO_TICKER = {
+    "0000320193": "AAPL",
+    "0000789019": "MSFT",
+    "0001018724": "AMZN",
+    "0001652044": "GOOGL",
+    "0001318605": "TSLA",
+    "0001326801": "META",
+    "0001065280": "NFLX",
+}
+
+
+def parse_filing_types(config):
     """
-    Main task: Load configuration from YAML config file, and process each CIK and filing type in sequence,
-    directly calling secedgar.filings object's save() method to save filings data.
-    Data will be saved using SSOT DirectoryManager paths following SSOT principles.
-    Parameters:
-      config_path: configuration file path
+    Return [(filing_type, priority, max_filings)] sorted by priority.
+
+    ``filing_types`` (as in common/config/etl/source_sec_edgar.yml) gives each
+    type a priority and max_filings; a plain ``file_types`` list is prioritized
+    in list order and takes ``count`` filings of each type.
     """
-    if not SECEDGAR_AVAILABLE:
-        logging.warning("secedgar library not available - skipping SEC Edgar data collection")
-        print("⚠️ SEC Edgar collection skipped - secedgar dependency not available")
-        return
+    count = int(config.get("count", 8))
+    filing_types = config.get("filing_types")
+    if filing_types:
+        items = [
+            (str(ft), float(spec.get("priority", i)), int(spec.get("max_filings", count)))
+            for i, (ft, spec) in enumerate(filing_types.items())
+        ]
+    else:
+        file_types = config.get("file_types", ["10K", "10Q", "13F", "8K"])
+        items = [(str(ft), float(i), count) for i, ft in enumerate(file_types)]
+    return sorted(items, key=lambda item: item[1])
 
+
+def run_job(config_path):
+    """
+    Main task: load the YAML config and download the latest filings of every CIK.
+    The configuration should contain:
+      - tickers: list of CIK numbers
+      - email: user agent sent to SEC ("Name (email)")
+      - file_types and count, or filing_types with priority / max_filings per type
+    Optional keys:
+      - rate_limits: requests_per_second, requests_per_minute, retry_after_seconds,
+        max_retries and max_workers (see common/config/etl/source_sec_edgar.yml)
+      - max_workers: overrides rate_limits.max_workers
+      - base_url / archives_url: submissions API and archive hosts
+      - collection.start_date: ignore filings before this date
+      - cik_to_ticker: CIK -> ticker for the output directories
+      - incremental: keep per-CIK manifests of downloaded accessions and only fetch
+        new filings; known ones are hard-linked into today's partition (default true)
+
+    All (CIK, filing type) downloads run concurrently and share one token
+    bucket, so the aggregate request rate follows the configured limits.
+    Data is saved using SSOT DirectoryManager paths following SSOT principles.
+
+    Returns the job summary dict.
+    """
     logging.info(f"Loading configuration file: {config_path}")
     with open(config_path, "r", encoding="utf-8") as f:
         config = yaml.safe_load(f)
 
     # Directly use CIK numbers (e.g. "0000320193")
-    cik_list = config.get("tickers", [])
-    count = config.get("count", 8)
-    file_types = config.get("file_types", ["10K", "10Q", "13F", "8K"])
+    cik_list = [str(cik) for cik in config.get("tickers", [])]
+    filing_types = parse_filing_types(config)
     email = config.get("email", "ZitianSG (wangzitian0@gmail.com)")
-
-    # Initialize metadata manager
-    metadata_manager = MetadataManager(STAGE_01_EXTRACT_DIR)
-
-    total_tasks = len(cik_list) * len(file_types)
-    logging.info(f"Starting to process tasks, total {total_tasks} tasks")
-    pbar = tqdm(total=total_tasks, desc="Tickers Progress", unit="task")
-
-    filing_type_map = {
-        "10K": FilingType.FILING_10K,
-        "10Q": FilingType.FILING_10Q,
-        "13F": FilingType.FILING_13F,
-        "8K": FilingType.FILING_8K,
-    }
-
-    for cik in cik_list:
-        logging.info(f"Directly query using CIK: {cik}")
-        # Map CIK to ticker for new directory structure
-        cik_to_ticker = {
-            "0000320193": "AAPL",
-            "0000789019": "MSFT",
-            "0001018724": "AMZN",
-            "0001652044": "GOOGL",
-            "0001318605": "TSLA",
-            "0001326801": "META",
-            "0001065280": "NFLX",
-        }
-
-        ticker = cik_to_ticker.get(cik, f"CIK_{cik}")
-        date_partition = datetime.now().strftime("%Y%m%d")
-        ticker_dir = os.path.join(STAGE_01_EXTRACT_DIR, date_partition, ticker)
-        if not os.path.exists(ticker_dir):
-            os.makedirs(ticker_dir)
-        for ft in file_types:
-            logging.info(f"Starting to process {cik} {ft} filings")
-            filing_type_enum = filing_type_map.get(ft)
-            if filing_type_enum is None:
-                logging.error(f"Unsupported filing type: {ft}, CIK: {cik}")
-                pbar.update(1)
-                continue
-
-            # Create config info for this request
-            config_info = {"filing_type": ft, "count": count, "email": email}
-
-            # Skip metadata checking - always download fresh data
-            # All filings for a ticker go in the same directory
-            output_dir = ticker_dir
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-
-            try:
-                filings_obj = filings(
-                    cik_lookup=cik,
-                    filing_type=filing_type_enum,
-                    count=count,
-                    user_agent=email,
-                )
-                # Directly set cik_lookup internal mapping, avoiding calls to /files/company_tickers.json
-                filings_obj.cik_lookup._lookup_dict = {cik: cik}
-                filings_obj.save(output_dir)
-                logging.info(f"Successfully saved {cik} {ft} filings to {output_dir}")
-
-                # Skip metadata management for now - focus on data collection
-                logging.info(f"Skipping metadata tracking for {ticker} to avoid path issues")
-
-            except Exception as e:
-                error_msg = str(e)
-                logging.exception(f"Error processing {cik} {ft} filings: {e}")
-                logging.info(
-                    "Please check access permissions for /files/company_tickers.json, if issues persist please manually download the file."
-                )
-            pbar.update(1)
-            time.sleep(3)
-
-    pbar.close()
-    logging.info("All tasks processing completed")
+    rate_limits = config.get("rate_limits") or DEFAULT_RATE_LIMITS
+    max_workers = max(1, int(config.get("max_workers", rate_limits.get("max_workers", 4))))
+    rate_limiter = RateLimiter.from_config(rate_limits)
+    cik_to_ticker = dict(CIK_TO_TICKER, **(config.get("cik_to_ticker") or {}))
+    start_date = (config.get("collection") or {}).get("start_date")
+    manifest_dir = (
+        os.path.join(STAGE_01_EXTRACT_DIR, MANIFEST_DIR_NAME)
+        if config.get("incremental", True)
+        else None
+    )
+
+    client = EdgarClient(
+        email,
+        data_url=config.get("base_url", DATA_URL),
+        archives_url=config.get("archives_url", ARCHIVES_URL),
+        timeout=config.get("timeout_seconds", 60),
+        rate_limiter=rate_limiter,
+        max_retries=int(rate_limits.get("max_retries", 3)),
+        retry_after_seconds=float(rate_limits.get("retry_after_seconds", 2)),
+    )
+
+    date_partition = datetime.now().strftime("%Y%m%d")
+    output_dir = os.path.join(STAGE_01_EXTRACT_DIR, date_partition)
+    logging.info(
+        f"Starting to process {len(cik_list)} CIKs x {len(filing_types)} filing types "
+        f"with {max_workers} workers"
+    )
+    pbar = tqdm(desc="SEC filings", unit="filing")
+    downloader = EdgarDownloader(
+        client, output_dir, max_workers=max_workers, progress=pbar.update, manifest_dir=manifest_dir
+    )
+    start_time = time.monotonic()
+    try:
+        stats = downloader.run(cik_list, filing_types, cik_to_ticker, start_date)
+    finally:
+        pbar.close()
+    elapsed = time.monotonic() - start_time
+
+    summary = dict(
+        stats,
+        workers=max_workers,
+        requests=client.requests,
+        bytes_received=client.bytes_received,
+        elapsed_seconds=elapsed,
+        throughput_per_second=client.requests / elapsed if elapsed > 0 else 0.0,
+        rate_limit_wait_seconds=rate_limiter.total_wait_seconds,
+    )
+    logging.info(
+        f"All tasks processing completed: Listed={stats['listed']}, "
+        f"Downloaded={stats['downloaded']}, Linked={stats['linked']}, "
+        f"Skipped={stats['skipped']}, Errors={stats['errors']}, Requests={client.requests}, "
+        f"Received={client.bytes_received} bytes, Elapsed={elapsed:.1f}s"
+    )
+    return summary
 
 
 if __name__ == "__main__":
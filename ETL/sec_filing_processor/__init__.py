@@ -3,3 +3,29 @@
 This module handles the processing and parsing of SEC filing documents.
 Part of the ETL data processing pipeline.
 """
+
+from .chunker import chunk_file_spans, chunk_spans, chunk_texts
+from .processor import (
+    CHUNK_FILE_SUFFIX,
+    accession_from_filename,
+    default_chunk_dir,
+    find_filings,
+    iter_chunk_documents,
+    process_filing,
+    process_filings,
+    read_chunk_header,
+)
+
+__all__ = [
+    "CHUNK_FILE_SUFFIX",
+    "accession_from_filename",
+    "chunk_file_spans",
+    "chunk_spans",
+    "chunk_texts",
+    "default_chunk_dir",
+    "find_filings",
+    "iter_chunk_documents",
+    "process_filing",
+    "process_filings",
+    "read_chunk_header",
+]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offset-based text chunker.
+
+Chunks are (start, end) offsets into a buffer: a str, bytes or an mmap of a
+file. The buffer is only searched in place (rfind with bounds), never
+sliced, so chunking allocates nothing but the offset pairs; chunk text is
+materialized by the caller when it is embedded or returned.
+
+Chunks are at most ``chunk_size`` characters (bytes for binary buffers),
+end after the last sentence end or newline when one falls in the second
+half of the window, overlap the next chunk by ``chunk_overlap`` and are
+trimmed of surrounding whitespace, so ``buffer[start:end]`` needs no strip.
+"""
+
+import mmap
+from typing import Iterator, List, Tuple, Union
+
+Buffer = Union[str, bytes, bytearray, mmap.mmap]
+
+# Whitespace trimmed from chunks; set lookups keep the per-chunk loop cheap.
+# Unicode whitespace ends at U+3000; binary buffers index to ints.
+STR_WHITESPACE = frozenset(c for c in map(chr, range(0x3001)) if c.isspace())
+BYTES_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+
+def chunk_spans(
+    buffer: Buffer, chunk_size: int, chunk_overlap: int, start: int = 0, end: int = None
+) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the chunks of ``buffer[start:end]``."""
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if isinstance(buffer, str):
+        period, newline, whitespace = ".", "\n", STR_WHITESPACE
+    else:
+        period, newline, whitespace = b".", b"\n", BYTES_WHITESPACE
+    length = len(buffer) if end is None else min(end, len(buffer))
+    min_break = chunk_size // 2
+    rfind = buffer.rfind
+    spans = []
+    pos = start
+    while pos < length:
+        stop = pos + chunk_size
+        if stop < length:
+            # Break after the last sentence end or newline in the second half
+            break_point = max(rfind(period, pos, stop), rfind(newline, pos, stop))
+            if break_point - pos > min_break:
+                stop = break_point + 1
+        else:
+            stop = length
+
+        first, last = pos, stop
+        while first < last and buffer[first] in whitespace:
+            first += 1
+        while last > first and buffer[last - 1] in whitespace:
+            last -= 1
+        if first < last:
+            spans.append((first, last))
+
+        if stop >= length:
+            break
+        # Overlap, but always move forward
+        pos = stop - chunk_overlap if stop - chunk_overlap > pos else pos + 1
+    return spans
+
+
+def chunk_texts(buffer: Buffer, spans: List[Tuple[int, int]]) -> Iterator[str]:
+    """Materialize the text of ``spans``; binary buffers are decoded as UTF-8."""
+    for start, end in spans:
+        text = buffer[start:end]
+        yield text if isinstance(text, str) else text.decode("utf-8", "ignore")
+
+
+def chunk_file_spans(path: str, chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+    """Byte offset chunks of a text file, searched through an mmap of it."""
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return []
+        with mapped:
+            return chunk_spans(mapped, chunk_size, chunk_overlap)
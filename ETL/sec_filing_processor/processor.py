@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SEC filing processing stage: parse, clean and chunk every filing.
+
+Each filing is one work unit run in a process pool. A worker parses the full
+submission text file with ETL.sec_parser, keeps the textual documents (the
+main form and text exhibits, not GRAPHIC / ZIP / XBRL attachments), chunks
+their cleaned text and writes one compact chunk file per filing, named by
+accession number:
+
+    <output_dir>/<TICKER>/<accession>.chunks.jsonl
+
+The build writes them to default_chunk_dir() (stage_02_daily_index/sec_chunks),
+where the embedding stage reads them.
+
+Line 1 is a header (source file fingerprint, chunk settings, content hash);
+every further line is one document with its text and the [start, end]
+offsets of its chunks (see chunker.py), so overlapping chunks are not stored twice. Files
+whose chunk file is up to date with the source and the chunk settings are
+skipped.
+
+Part of Stage 2 (Transform) in the ETL pipeline.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ETL.sec_parser import MARKUP_TAG, iter_sec_documents
+
+from .chunker import chunk_spans
+
+CHUNK_FILE_SUFFIX = ".chunks.jsonl"
+CHUNK_FILE_VERSION = 2  # 2: chunk offsets are whitespace-trimmed
+
+# Documents with these filename extensions carry text worth chunking
+TEXT_SUFFIXES = (".htm", ".html", ".txt")
+
+ACCESSION_PATTERN = re.compile(r"\d{10}-\d{2}-\d{6}")
+FILING_TYPE_PATTERN = re.compile(r"_sec_edgar_([a-z0-9]+)_")
+
+logger = logging.getLogger(__name__)
+
+
+def accession_from_filename(filename: str) -> str:
+    """Accession number in a stage 1 filename, falling back to the file stem."""
+    match = ACCESSION_PATTERN.search(filename)
+    return match.group(0) if match else Path(filename).stem
+
+
+def filing_type_from_filename(filename: str) -> Optional[str]:
+    """Filing type (10k, 10q, 8k) of a TICKER_sec_edgar_TYPE_... filename."""
+    match = FILING_TYPE_PATTERN.search(filename)
+    return match.group(1) if match else None
+
+
+def source_fingerprint(path: str) -> Dict[str, int]:
+    stat = os.stat(path)
+    return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+
+def extract_documents(path: str) -> List[Dict[str, Any]]:
+    """
+    Textual documents of a filing with their cleaned text.
+
+    Files that are not full submission text files (no <DOCUMENT> blocks) are
+    treated as one document.
+    """
+    documents = []
+    found = False
+    for document in iter_sec_documents(path):
+        found = True
+        filename = (document.filename or "").lower()
+        if filename and not filename.endswith(TEXT_SUFFIXES):
+            continue
+        text = document.text
+        if text:
+            documents.append(
+                {
+                    "type": document.type,
+                    "sequence": document.sequence,
+                    "filename": document.filename,
+                    "description": document.description,
+                    "text": text,
+                }
+            )
+    if not found:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = MARKUP_TAG.sub("", f.read()).strip()
+        if text:
+            fields = dict.fromkeys(["type", "sequence", "filename", "description"])
+            documents.append({**fields, "text": text})
+    return documents
+
+
+def default_chunk_dir() -> Path:
+    from common.core.directory_manager import DataLayer, directory_manager
+
+    return directory_manager.get_subdir_path(DataLayer.DAILY_INDEX, "sec_chunks")
+
+
+def chunk_file_path(output_dir: str, ticker: str, accession: str) -> str:
+    return os.path.join(output_dir, ticker, f"{accession}{CHUNK_FILE_SUFFIX}")
+
+
+def read_chunk_header(path: str) -> Optional[Dict[str, Any]]:
+    """Header line of a chunk file, or None when it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+
+def iter_chunk_documents(path: str) -> Iterator[Dict[str, Any]]:
+    """Documents of a chunk file: type, sequence, filename, description, text, chunks."""
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()
+        for line in f:
+            yield json.loads(line)
+
+
+def process_filing(task: Tuple[str, str, str, int, int]) -> Dict[str, Any]:
+    """
+    Parse, clean and chunk one filing and write its chunk file.
+
+    ``task`` is (source_path, chunk_path, ticker, chunk_size, chunk_overlap).
+    Runs in a worker process, so it only returns a small summary.
+    """
+    source_path, chunk_path, ticker, chunk_size, chunk_overlap = task
+    start = time.perf_counter()
+    fingerprint = source_fingerprint(source_path)
+    documents = extract_documents(source_path)
+
+    content_hash = hashlib.blake2b(digest_size=16)
+    n_chunks = 0
+    for document in documents:
+        content_hash.update(document["text"].encode("utf-8", errors="ignore"))
+        document["chunks"] = chunk_spans(document["text"], chunk_size, chunk_overlap)
+        n_chunks += len(document["chunks"])
+
+    filename = os.path.basename(source_path)
+    header = {
+        "version": CHUNK_FILE_VERSION,
+        "accession": accession_from_filename(filename),
+        "ticker": ticker,
+        "filing_type": filing_type_from_filename(filename),
+        "source_file": source_path,
+        **fingerprint,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "content_hash": content_hash.hexdigest(),
+        "documents": len(documents),
+        "chunks": n_chunks,
+    }
+    os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+    tmp_path = f"{chunk_path}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in [header] + documents:
+            f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+            f.write("\n")
+    os.replace(tmp_path, chunk_path)
+
+    return {
+        "source": source_path,
+        "chunk_file": chunk_path,
+        "accession": header["accession"],
+        "ticker": ticker,
+        "documents": len(documents),
+        "chunks": n_chunks,
+        "bytes": fingerprint["source_size"],
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def find_filings(sec_dir: str) -> List[Tuple[str, str]]:
+    """
+    (ticker, path) of every filing in the latest date partition of ``sec_dir``,
+    in ticker then filename order.
+    """
+    if not os.path.isdir(sec_dir):
+        return []
+    partitions = [name for name in os.listdir(sec_dir) if name.isdigit()]
+    if not partitions:
+        return []
+    latest = os.path.join(sec_dir, max(partitions))
+
+    filings = []
+    for ticker in sorted(os.listdir(latest)):
+        company_dir = os.path.join(latest, ticker)
+        if not os.path.isdir(company_dir) or ticker.startswith("CIK_"):  # Skip CIK directories
+            continue
+        for name in sorted(os.listdir(company_dir)):
+            if "_sec_edgar_" in name and name.endswith(".txt"):
+                filings.append((ticker, os.path.join(company_dir, name)))
+    return filings
+
+
+def is_up_to_date(chunk_path: str, source_path: str, chunk_size: int, chunk_overlap: int) -> bool:
+    header = read_chunk_header(chunk_path)
+    if not header or header.get("version") != CHUNK_FILE_VERSION:
+        return False
+    try:
+        fingerprint = source_fingerprint(source_path)
+    except OSError:
+        return False  # Reprocessed so the worker reports the error
+    expected = {
+        **fingerprint,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+    return all(header.get(key) == value for key, value in expected.items())
+
+
+def process_filings(
+    sec_dir: str,
+    output_dir: str,
+    chunk_size: int = 512,
+    chunk_overlap: int = 50,
+    max_workers: Optional[int] = None,
+    tracker=None,
+    stage: str = "stage_02_transform",
+    rebuild: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run the stage over the latest partition of ``sec_dir``.
+
+    Stale filings are processed in a ProcessPoolExecutor with ``max_workers``
+    processes (default: every core); results come back in filing order, so
+    the output and the per-file timings logged to ``tracker`` are
+    deterministic. Returns the stage stats, with (ticker, source path, chunk
+    file) of every filing that did not fail, in filing order, under "outputs".
+    """
+    start = time.perf_counter()
+    filings = find_filings(sec_dir)
+    outputs = []
+    tasks = []
+    for ticker, path in filings:
+        chunk_path = chunk_file_path(output_dir, ticker, accession_from_filename(Path(path).name))
+        outputs.append((ticker, path, chunk_path))
+        if rebuild or not is_up_to_date(chunk_path, path, chunk_size, chunk_overlap):
+            tasks.append((path, chunk_path, ticker, chunk_size, chunk_overlap))
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks) or 1))
+    if max_workers == 1:
+        outcomes = [_run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(_run_task, tasks, chunksize=1))
+
+    results = []
+    errors = []
+    for task, (result, error) in zip(tasks, outcomes):
+        if error:
+            logger.error(f"Failed to process SEC file {task[0]}: {error}")
+            errors.append({"source": task[0], "error": error})
+        else:
+            results.append(result)
+    failed = {error["source"] for error in errors}
+    outputs = [output for output in outputs if output[1] not in failed]
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "filings": len(filings),
+        "processed": len(results),
+        "unchanged": len(filings) - len(tasks),
+        "errors": len(errors),
+        "chunks": sum(r["chunks"] for r in results),
+        "bytes": sum(r["bytes"] for r in results),
+        "workers": max_workers,
+        "elapsed_seconds": elapsed,
+        "outputs": outputs,
+    }
+    logger.info(
+        f"SEC filing processing: {stats['processed']} processed, {stats['unchanged']} unchanged, "
+        f"{stats['errors']} errors, {stats['chunks']} chunks, {max_workers} workers, "
+        f"{elapsed:.1f}s"
+    )
+    if tracker is not None and (results or errors):
+        lines = [f"SEC filing processing ({max_workers} workers, {elapsed:.2f}s):"]
+        lines += [
+            f"  {r['ticker']} {r['accession']}: {r['seconds']:.3f}s, "
+            f"{r['bytes'] / 2**20:.1f} MB, {r['documents']} documents, {r['chunks']} chunks"
+            for r in results
+        ]
+        lines += [f"  FAILED {e['source']}: {e['error']}" for e in errors]
+        tracker.log_stage_output(stage, "\n".join(lines))
+    return stats
+
+
+def _run_task(task):
+    """process_filing for the pool: errors come back as values to keep the order."""
+    try:
+        return process_filing(task), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
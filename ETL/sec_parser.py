@@ -1,9 +1,146 @@
+import html
 import re
 
-from bs4 import BeautifulSoup
-
 from common.core.directory_manager import DataLayer, directory_manager
 
+# Bytes read per step when scanning a filing
+CHUNK_SIZE = 1 << 20
+
+DOCUMENT_START = b"<DOCUMENT>"
+DOCUMENT_END = b"</DOCUMENT>"
+TEXT_START = b"<TEXT>"
+TEXT_END = b"</TEXT>"
+
+# Header fields are unclosed SGML tags: <TYPE>10-K up to the end of the line
+HEADER_FIELD = re.compile(rb"<(TYPE|SEQUENCE|FILENAME|DESCRIPTION)>[ \t]*([^<\r\n]*)")
+MARKUP_TAG = re.compile(r"<[^>]*>")
+
+
+class SecDocument:
+    """
+    One <DOCUMENT> block of an EDGAR full submission text file.
+
+    The header fields (type, sequence, filename, description) are parsed while
+    scanning; the TEXT body is only located by its file offsets, and is read,
+    decoded and stripped of markup when ``text`` is first accessed.
+    """
+
+    __slots__ = ("type", "sequence", "filename", "description", "file_path", "text_span", "_text")
+
+    def __init__(self, file_path, header, text_span=None):
+        fields = {}
+        for name, value in HEADER_FIELD.findall(header):
+            fields.setdefault(name.decode("ascii").lower(), value.strip().decode("utf-8", "ignore"))
+        self.type = fields.get("type")
+        self.sequence = fields.get("sequence")
+        self.filename = fields.get("filename")
+        self.description = fields.get("description")
+        self.file_path = file_path
+        self.text_span = text_span
+        self._text = None
+
+    @property
+    def raw_text(self):
+        """The undecoded TEXT body (including any HTML markup), read from the file, or None."""
+        if self.text_span is None:
+            return None
+        start, end = self.text_span
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    @property
+    def text(self):
+        """TEXT body with markup tags removed and entities unescaped, or None."""
+        if self._text is None and self.text_span is not None:
+            body = self.raw_text.decode("utf-8", "ignore")
+            self._text = html.unescape(MARKUP_TAG.sub("", body)).strip()
+        return self._text
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "sequence": self.sequence,
+            "filename": self.filename,
+            "description": self.description,
+            "text": self.text,
+        }
+
+
+def iter_sec_documents(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Stream the <DOCUMENT> blocks of an SEC filing, one SecDocument at a time.
+
+    The file is scanned once in ``chunk_size`` reads. Only document headers
+    are kept while scanning; TEXT bodies are skipped over and read back on
+    demand, so scanning memory is bounded by the chunk size and reading a
+    document's text by the size of that document. Tags are matched in the
+    upper case EDGAR uses.
+    """
+    # States: outside a document, in its header, in its TEXT, after its TEXT
+    outside, header, text, after_text = range(4)
+    markers = {
+        outside: (DOCUMENT_START,),
+        header: (TEXT_START, DOCUMENT_END),
+        text: (TEXT_END,),
+        after_text: (DOCUMENT_END,),
+    }
+    state = outside
+    buffer = bytearray()
+    base = 0  # File offset of buffer[0]
+    scanned = 0  # Offset in buffer already searched for the current markers
+    header_bytes = b""
+    text_start = None
+    text_span = None
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            while True:
+                candidates = []
+                for marker in markers[state]:
+                    found = buffer.find(marker, max(0, scanned - len(marker) + 1))
+                    if found >= 0:
+                        candidates.append((found, marker))
+                if not candidates:
+                    break
+                found, marker = min(candidates)
+                if state == outside:
+                    state = header
+                elif state == header:
+                    header_bytes = bytes(buffer[:found])
+                    if marker == TEXT_START:
+                        text_start = base + found + len(marker)
+                        state = text
+                    else:
+                        yield SecDocument(file_path, header_bytes)
+                        state = outside
+                elif state == text:
+                    text_span = (text_start, base + found)
+                    state = after_text
+                else:
+                    yield SecDocument(file_path, header_bytes, text_span)
+                    state = outside
+                del buffer[: found + len(marker)]
+                base += found + len(marker)
+                scanned = 0
+            if state != header:
+                # Only a possible partial marker is kept; headers stay buffered
+                keep = max(len(marker) for marker in markers[state]) - 1
+                drop = max(0, len(buffer) - keep)
+                del buffer[:drop]
+                base += drop
+            scanned = len(buffer)
+            if not chunk:
+                break
+    # Truncated filing: keep the unterminated last document
+    if state == header:
+        yield SecDocument(file_path, bytes(buffer))
+    elif state == text:
+        yield SecDocument(file_path, header_bytes, (text_start, base + len(buffer)))
+    elif state == after_text:
+        yield SecDocument(file_path, header_bytes, text_span)
+
 
 def preprocess_sec_content(content):
     """
@@ -22,56 +159,27 @@ def preprocess_sec_content(content):
 
 
 def parse_sec_file(file_path):
-    # Read the file content, ignoring errors for problematic characters.
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        raw_content = f.read()
-
-    # Preprocess content to insert closing tags for unclosed fields.
-    cleaned_content = preprocess_sec_content(raw_content)
-
-    # Use BeautifulSoup with a tolerant parser (html.parser) to handle SGML-like structure.
-    soup = BeautifulSoup(cleaned_content, "html.parser")
-
-    # Try to locate the main SEC-DOCUMENT element.
-    sec_document = soup.find("sec-document")
-    if not sec_document:
-        sec_document = soup  # If not found, use the whole document.
-
-    # Find all DOCUMENT sections.
-    documents = sec_document.find_all("document")
-    parsed_docs = []
-
-    for doc in documents:
-        # Extract each field; BeautifulSoup should now have proper closing tags.
-        doc_type = doc.find("type")
-        sequence = doc.find("sequence")
-        filename = doc.find("filename")
-        description = doc.find("description")
-        text = doc.find("text")
-
-        doc_info = {
-            "type": doc_type.get_text(strip=True) if doc_type else None,
-            "sequence": sequence.get_text(strip=True) if sequence else None,
-            "filename": filename.get_text(strip=True) if filename else None,
-            "description": description.get_text(strip=True) if description else None,
-            "text": text.get_text(strip=True) if text else None,
-        }
-        parsed_docs.append(doc_info)
+    """
+    Parse every DOCUMENT of an SEC filing into a dict of type, sequence,
+    filename, description and text.
 
-    return parsed_docs
+    Builds all documents at once; use iter_sec_documents to process large
+    filings one document at a time.
+    """
+    return [document.to_dict() for document in iter_sec_documents(file_path)]
 
 
 # Example usage
 if __name__ == "__main__":
-    from parser.rcts import sec_text_doc_splitter
+    from ETL.rcts import sec_text_doc_splitter
 
     # Use SSOT DirectoryManager to get SEC Edgar data path
     sec_edgar_path = directory_manager.get_subdir_path(DataLayer.RAW_DATA, "sec-edgar")
     file_path = sec_edgar_path / "0000320193/10k/0000320193/10-K/0000320193-24-000123.txt"
-    documents = parse_sec_file(file_path)
+    document = next(iter_sec_documents(file_path))
 
-    # Suppose you have a long SEC filing text in the variable sec_text
-    chunks = sec_text_doc_splitter.split_text(documents[0]["text"])
+    # Split the main document text into chunks
+    chunks = sec_text_doc_splitter.split_text(document.text)
 
     print(f"Number of chunks: {len(chunks)}")
     for chunk in chunks:
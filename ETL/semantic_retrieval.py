@@ -15,6 +15,7 @@ Part of Stage 3 (Load) in the ETL pipeline.
 
 import json
 import logging
+import threading
 from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
@@ -35,7 +36,7 @@ def _get_ml_service():
 
     try:
         # Try to use ML service from Docker container
-        from common.ml_fallback import get_ml_service
+        from common.utils.ml_fallback import get_ml_service
 
         ml_service = get_ml_service()
         ML_DEPENDENCIES_AVAILABLE = True
@@ -68,7 +69,7 @@ try:
 except ImportError:
     NUMPY_AVAILABLE = False
 
-from common.graph_rag_schema import (
+from common.schemas.graph_rag_schema import (
     DEFAULT_EMBEDDING_CONFIG,
     DocumentChunkNode,
     DocumentType,
@@ -76,12 +77,31 @@ from common.graph_rag_schema import (
     SemanticSearchResult,
     VectorEmbeddingConfig,
 )
+from ETL.sec_filing_processor import (
+    CHUNK_FILE_SUFFIX,
+    chunk_spans,
+    default_chunk_dir,
+    iter_chunk_documents,
+    process_filings,
+    read_chunk_header,
+)
+from ETL.yfinance_columnar import read_extract
+
+if NUMPY_AVAILABLE:
+    from ETL.embedding_cache import EmbeddingCache
+    from ETL.embedding_store import EmbeddingStore, PostingLists, SegmentedEmbeddingStore
+    from ETL.vector_index import IVF_MIN_ROWS, IVFVectorIndex, NumpyVectorIndex, normalize_rows
 
 logger = logging.getLogger(__name__)
 
 
+def _is_ndarray(value) -> bool:
+    """numpy arrays also have a .data attribute (a memoryview), unlike SimpleArray."""
+    return NUMPY_AVAILABLE and isinstance(value, np.ndarray)
+
+
 class SimpleVectorIndex:
-    """Simple vector index fallback when FAISS is not available"""
+    """Pure-Python vector index, used only when neither FAISS nor numpy is available"""
 
     def __init__(self, dimension):
         self.dimension = dimension
@@ -118,9 +138,7 @@ class SimpleVectorIndex:
             indices = [idx for _, idx in top_k]
             results.append((distances, indices))
 
-        if results:
-            return [results[0][0]], [results[0][1]]
-        return [], []
+        return [r[0] for r in results], [r[1] for r in results]
 
 
 class SemanticEmbeddingGenerator:
@@ -131,17 +149,23 @@ class SemanticEmbeddingGenerator:
     and provides similarity-based retrieval capabilities.
     """
 
-    def __init__(self, config: VectorEmbeddingConfig = None):
+    def __init__(self, config: VectorEmbeddingConfig = None, cache=None):
         """
         Initialize the semantic embedding generator.
 
         Args:
             config: Configuration for embedding generation
+            cache: Optional EmbeddingCache; by default one is opened under the
+                   build cache directory when config.cache_embeddings is set
         """
         self.config = config or DEFAULT_EMBEDDING_CONFIG
+        self.cache = cache
         self.model = None
         self.vector_index = None
         self.document_metadata = {}
+        self.store = None
+        self.compaction_thread = None
+        self._views_lock = threading.Lock()
         self.setup_model()
 
     def setup_model(self):
@@ -159,12 +183,22 @@ class SemanticEmbeddingGenerator:
             logger.error(f"Failed to setup ML service: {e}")
             self.model = None
 
-    def generate_document_embeddings(self, data_dir: Path) -> ETLStageOutput.EmbeddingsOutput:
+    def generate_document_embeddings(
+        self, data_dir: Path, rebuild: bool = False, chunk_dir: Optional[Path] = None
+    ) -> ETLStageOutput.EmbeddingsOutput:
         """
         Generate embeddings for all documents in the data directory.
 
+        With an existing segmented store, only new or changed documents are
+        chunked and encoded: they are appended as a new segment and their old
+        rows tombstoned, and documents whose source is gone are deleted. A
+        document that fails to load keeps its stored rows.
+
         Args:
             data_dir: Root directory containing document data
+            rebuild: Ignore the existing store and re-embed every document
+            chunk_dir: SEC chunk files written by the filing processing stage
+                       (default: default_chunk_dir())
 
         Returns:
             EmbeddingsOutput with generation statistics
@@ -174,31 +208,57 @@ class SemanticEmbeddingGenerator:
         embeddings_created = 0
         documents_processed = 0
         embedding_data = []
+        output_path = data_dir / "stage_03_load" / "embeddings"
 
         try:
-            # Process SEC documents
-            sec_stats = self._process_sec_documents(data_dir, embedding_data)
+            store = None if rebuild else self._open_store(output_path)
+            known_hashes = store.document_hashes() if store else {}
+            seen_hashes = {}
+
+            # Collect chunks from new or changed SEC documents
+            sec_stats = self._process_sec_documents(
+                data_dir, embedding_data, known_hashes, seen_hashes, chunk_dir
+            )
             embeddings_created += sec_stats["embeddings"]
             documents_processed += sec_stats["documents"]
 
-            # Process Yahoo Finance data
-            yf_stats = self._process_yfinance_documents(data_dir, embedding_data)
+            # Collect chunks from new or changed Yahoo Finance data
+            yf_stats = self._process_yfinance_documents(
+                data_dir, embedding_data, known_hashes, seen_hashes
+            )
             embeddings_created += yf_stats["embeddings"]
             documents_processed += yf_stats["documents"]
 
-            # Build vector index
-            if embedding_data:
-                self._build_vector_index(embedding_data)
+            # Encode all chunks in fixed-size batches into one float32 matrix,
+            # reusing cached vectors of chunks seen in earlier runs
+            self._open_cache()
+            embeddings, encode_stats = self._embed_chunks(embedding_data)
+            encode_stats["documents_unchanged"] = sec_stats["unchanged"] + yf_stats["unchanged"]
 
-            # Save embeddings and metadata
-            output_path = data_dir / "stage_03_load" / "embeddings"
             output_path.mkdir(parents=True, exist_ok=True)
+            if NUMPY_AVAILABLE and np:
+                removed = [doc_id for doc_id in known_hashes if doc_id not in seen_hashes]
+                encode_stats.update(
+                    self._update_embedding_store(
+                        output_path, store, embedding_data, embeddings, seen_hashes, removed
+                    )
+                )
+            else:
+                # Build vector index
+                if embedding_data:
+                    self._build_vector_index(embedding_data, embeddings)
 
-            self._save_embeddings_data(embedding_data, output_path)
+                # Save embeddings and metadata
+                self._save_embeddings_data(embedding_data, output_path, embeddings)
 
             logger.info(
                 f"Embedding generation completed. Documents processed: {documents_processed}, "
-                f"embeddings created: {embeddings_created}"
+                f"unchanged: {encode_stats['documents_unchanged']}, "
+                f"embeddings created: {embeddings_created}, "
+                f"cache hits: {encode_stats['cache_hits']}, "
+                f"cache misses: {encode_stats['cache_misses']}, "
+                f"batches: {encode_stats['batches']}, "
+                f"throughput: {encode_stats['texts_per_second']:.1f} texts/sec"
             )
 
             return ETLStageOutput.EmbeddingsOutput(
@@ -207,85 +267,225 @@ class SemanticEmbeddingGenerator:
                 model_used=self.config.model_name,
                 dimension=self.config.dimension,
                 output_path=str(output_path),
+                stats=encode_stats,
             )
 
         except Exception as e:
             logger.error(f"Failed to generate document embeddings: {e}")
             raise
 
-    def _process_sec_documents(self, data_dir: Path, embedding_data: List[Dict]) -> Dict[str, int]:
-        """Process SEC documents for embedding generation."""
-        stats = {"embeddings": 0, "documents": 0}
+    def _store_settings(self) -> Dict[str, Any]:
+        """Settings that invalidate every stored vector when they change."""
+        return {
+            "model_name": self.config.model_name,
+            "chunk_size": self.config.chunk_size,
+            "chunk_overlap": self.config.chunk_overlap,
+        }
+
+    def _open_store(self, output_path: Path):
+        """Open the segmented store for an incremental update, if it is compatible."""
+        if not (NUMPY_AVAILABLE and SegmentedEmbeddingStore.exists(output_path)):
+            return None
+        store = SegmentedEmbeddingStore.open(output_path)
+        settings = self._store_settings()
+        if any(store.manifest.get(key) != value for key, value in settings.items()):
+            logger.info("Embedding settings changed, rebuilding the embedding store")
+            return None
+        return store
+
+    def _update_embedding_store(
+        self,
+        output_path: Path,
+        store,
+        embedding_data: List[Dict],
+        embeddings,
+        content_hashes: Dict[str, str],
+        removed: List[str],
+    ) -> Dict[str, Any]:
+        """Append the delta to the segmented store and point the in-memory index at it."""
+        if store is None:
+            store = SegmentedEmbeddingStore.create(output_path, **self._store_settings())
+        store.set_index_config(
+            self.config.index_type,
+            self.config.ivf_nlist,
+            self.config.vector_compression,
+            self.config.pq_subspaces,
+        )
+
+        vectors = normalize_rows(embeddings) if len(embedding_data) else embeddings
+        rows = list(self._metadata_rows(embedding_data, embeddings))
+        delta = store.update(vectors, rows, content_hashes, removed)
+        logger.info(
+            f"Embedding store delta: {delta['rows_added']} rows added, "
+            f"{delta['rows_deleted']} rows tombstoned, {store.count} live rows"
+        )
+
+        self._refresh_store_views(store)
+        if store.needs_compaction():
+            self.compaction_thread = store.start_compaction(
+                on_complete=lambda: self._refresh_store_views(store)
+            )
+        return delta
 
-        sec_dir = data_dir / "stage_01_extract" / "sec_edgar"
-        if not sec_dir.exists():
-            logger.warning(f"SEC directory not found: {sec_dir}")
-            return stats
+    def _refresh_store_views(self, store):
+        """
+        Point vector_index and document_metadata at the store's current segments.
+        Both views are swapped together; the previous ones keep their segments
+        on disk until they are dropped.
+        """
+        vector_index = store.vector_index(
+            nprobe=self.config.ivf_nprobe, rerank=self.config.rerank_factor
+        )
+        document_metadata = store.metadata
+        with self._views_lock:
+            self.store = store
+            self.vector_index = vector_index
+            self.document_metadata = document_metadata
+
+    @staticmethod
+    def _document_hash(content: str) -> str:
+        """Content hash used to detect changed documents between runs."""
+        import hashlib
+
+        return hashlib.blake2b(content.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+
+    def _process_sec_documents(
+        self,
+        data_dir: Path,
+        embedding_data: List[Dict],
+        known_hashes: Optional[Dict[str, str]] = None,
+        seen_hashes: Optional[Dict[str, str]] = None,
+        chunk_dir: Optional[Path] = None,
+    ) -> Dict[str, int]:
+        """
+        Process SEC documents for embedding generation.
 
-        # Find latest partition
-        partitions = [d for d in sec_dir.iterdir() if d.is_dir() and d.name.isdigit()]
-        if not partitions:
+        Filings are parsed, cleaned and chunked by the sec_filing_processor
+        stage (in parallel, only when their chunk file is stale); this reads
+        the per-filing chunk files it writes to chunk_dir. Documents whose
+        content hash is in known_hashes are skipped; the hash of every
+        document found is recorded in seen_hashes.
+        """
+        known_hashes = known_hashes or {}
+        seen_hashes = {} if seen_hashes is None else seen_hashes
+        stats = {"embeddings": 0, "documents": 0, "unchanged": 0}
+
+        chunk_dir = self._sec_chunk_dir(
+            data_dir, default_chunk_dir() if chunk_dir is None else chunk_dir
+        )
+        if chunk_dir is None:
             return stats
 
-        latest_partition = max(partitions, key=lambda x: x.name)
+        for chunk_file in sorted(chunk_dir.glob(f"*/*{CHUNK_FILE_SUFFIX}")):
+            header = read_chunk_header(str(chunk_file))
+            if header is None:  # Unreadable chunk file
+                continue
+            sec_file = Path(header["source_file"])
+            if not sec_file.exists():  # Filing removed since it was chunked
+                continue
+            ticker = header["ticker"]
 
-        # Process each company's SEC files
-        for company_dir in latest_partition.iterdir():
-            if not company_dir.is_dir():
+            seen_hashes[sec_file.stem] = header["content_hash"]
+            if known_hashes.get(sec_file.stem) == header["content_hash"]:
+                stats["unchanged"] += 1
                 continue
 
-            ticker = company_dir.name
-            if ticker.startswith("CIK_"):  # Skip CIK directories
+            # Queue chunks for batched embedding
+            try:
+                documents = list(iter_chunk_documents(chunk_file))
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to read SEC chunk file {chunk_file}: {e}")
+                self._keep_stored_rows(sec_file.stem, known_hashes, seen_hashes)
                 continue
+            i = 0
+            for document in documents:
+                text = document["text"]
+                for start, end in document["chunks"]:
+                    # Create document chunk metadata
+                    chunk_data = {
+                        "node_id": f"chunk_{sec_file.stem}_{i}",
+                        "document_id": sec_file.stem,
+                        "chunk_index": i,
+                        "content": text[start:end],
+                        "content_type": self._get_sec_document_type(sec_file.name),
+                        "parent_document": sec_file.name,
+                        "ticker": ticker,
+                        "metadata": {
+                            "file_path": str(sec_file),
+                            "accession": header["accession"],
+                            "document_type": document["type"],
+                            "chunk_start": start,
+                            "chunk_end": end,
+                        },
+                    }
 
-            sec_files = list(company_dir.glob("*_sec_edgar_*.txt"))
-            logger.info(f"Processing {len(sec_files)} SEC files for {ticker}")
-
-            for sec_file in sec_files:
-                try:
-                    # Read and chunk document
-                    with open(sec_file, "r", encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-
-                    chunks = self._chunk_document(content, sec_file.stem)
-
-                    # Generate embeddings for chunks
-                    for i, chunk in enumerate(chunks):
-                        chunk_embedding = self._generate_chunk_embedding(chunk["content"])
-
-                        # Create document chunk metadata
-                        chunk_data = {
-                            "node_id": f"chunk_{sec_file.stem}_{i}",
-                            "document_id": sec_file.stem,
-                            "chunk_index": i,
-                            "content": chunk["content"],
-                            "content_type": self._get_sec_document_type(sec_file.name),
-                            "embedding_vector": chunk_embedding.tolist(),
-                            "parent_document": sec_file.name,
-                            "ticker": ticker,
-                            "metadata": {
-                                "file_path": str(sec_file),
-                                "chunk_start": chunk["start"],
-                                "chunk_end": chunk["end"],
-                            },
-                        }
+                    embedding_data.append(chunk_data)
+                    stats["embeddings"] += 1
+                    i += 1
 
-                        embedding_data.append(chunk_data)
-                        stats["embeddings"] += 1
+            stats["documents"] += 1
 
-                    stats["documents"] += 1
+        return stats
 
-                except Exception as e:
-                    logger.error(f"Failed to process SEC file {sec_file}: {e}")
-                    continue
+    @staticmethod
+    def _keep_stored_rows(doc_id: str, known_hashes: Dict[str, str], seen_hashes: Dict[str, str]):
+        """
+        Record a document that failed to load as unchanged, so a transient read
+        error does not tombstone its stored rows.
+        """
+        if doc_id in known_hashes:
+            seen_hashes[doc_id] = known_hashes[doc_id]
+        else:
+            seen_hashes.pop(doc_id, None)
 
-        return stats
+    def _sec_chunk_dir(self, data_dir: Path, chunk_dir: Path) -> Optional[Path]:
+        """
+        Directory of the SEC chunk files to embed: chunk_dir, as written by
+        the filing processing stage. Only when it is missing, or was chunked
+        with other settings than this config, are the filings under data_dir
+        chunked here. None when there are no filings.
+        """
+        chunk_dir = Path(chunk_dir)
+        settings = {
+            "chunk_size": self.config.chunk_size,
+            "chunk_overlap": self.config.chunk_overlap,
+        }
+        if chunk_dir.is_dir():
+            headers = (read_chunk_header(str(p)) for p in chunk_dir.glob(f"*/*{CHUNK_FILE_SUFFIX}"))
+            header = next((h for h in headers if h), None)
+            if header is None or all(header.get(k) == v for k, v in settings.items()):
+                return chunk_dir
+            logger.info(f"SEC chunks in {chunk_dir} use other chunk settings, re-chunking filings")
+        else:
+            logger.info(f"SEC chunk directory {chunk_dir} not found, chunking filings")
+
+        sec_dir = data_dir / "stage_01_extract" / "sec_edgar"
+        if not sec_dir.exists():
+            logger.warning(f"SEC directory not found: {sec_dir}")
+            return None
+        chunk_dir = data_dir / "stage_02_transform" / "sec_chunks"
+        process_filings(
+            str(sec_dir),
+            str(chunk_dir),
+            max_workers=self.config.processing_workers or None,
+            **settings,
+        )
+        return chunk_dir
 
     def _process_yfinance_documents(
-        self, data_dir: Path, embedding_data: List[Dict]
+        self,
+        data_dir: Path,
+        embedding_data: List[Dict],
+        known_hashes: Optional[Dict[str, str]] = None,
+        seen_hashes: Optional[Dict[str, str]] = None,
     ) -> Dict[str, int]:
-        """Process Yahoo Finance JSON documents for embedding generation."""
-        stats = {"embeddings": 0, "documents": 0}
+        """
+        Process Yahoo Finance JSON documents for embedding generation.
+        Unchanged documents are skipped as in _process_sec_documents.
+        """
+        known_hashes = known_hashes or {}
+        seen_hashes = {} if seen_hashes is None else seen_hashes
+        stats = {"embeddings": 0, "documents": 0, "unchanged": 0}
 
         yf_dir = data_dir / "stage_01_extract" / "yfinance"
         if not yf_dir.exists():
@@ -312,14 +512,18 @@ class SemanticEmbeddingGenerator:
 
                 for yf_file in yf_files:
                     try:
-                        with open(yf_file, "r") as f:
-                            yf_data = json.load(f)
+                        # Of the columnar tables only dividends and splits become text
+                        yf_data = read_extract(str(yf_file), tables=["dividends", "splits"])
 
                         # Convert financial data to text for embedding
                         text_content = self._yfinance_to_text(yf_data, ticker)
 
                         if text_content:
-                            chunk_embedding = self._generate_chunk_embedding(text_content)
+                            content_hash = self._document_hash(text_content)
+                            seen_hashes[yf_file.stem] = content_hash
+                            if known_hashes.get(yf_file.stem) == content_hash:
+                                stats["unchanged"] += 1
+                                continue
 
                             chunk_data = {
                                 "node_id": f"chunk_{yf_file.stem}",
@@ -327,7 +531,6 @@ class SemanticEmbeddingGenerator:
                                 "chunk_index": 0,
                                 "content": text_content,
                                 "content_type": DocumentType.YFINANCE_DATA.value,
-                                "embedding_vector": chunk_embedding.tolist(),
                                 "parent_document": yf_file.name,
                                 "ticker": ticker,
                                 "metadata": {
@@ -342,6 +545,7 @@ class SemanticEmbeddingGenerator:
 
                     except Exception as e:
                         logger.error(f"Failed to process YFinance file {yf_file}: {e}")
+                        self._keep_stored_rows(yf_file.stem, known_hashes, seen_hashes)
                         continue
 
             # Process only the latest partition
@@ -360,65 +564,230 @@ class SemanticEmbeddingGenerator:
         Returns:
             List of document chunks with metadata
         """
-        chunk_size = self.config.chunk_size
-        chunk_overlap = self.config.chunk_overlap
-
-        chunks = []
-        start = 0
+        return [
+            {"content": content[start:end], "start": start, "end": end}
+            for start, end in chunk_spans(
+                content, self.config.chunk_size, self.config.chunk_overlap
+            )
+        ]
 
-        while start < len(content):
-            end = start + chunk_size
-            chunk_text = content[start:end]
+    def _open_cache(self):
+        """Open the persistent embedding cache under the build cache directory."""
+        if self.cache is not None or not (NUMPY_AVAILABLE and self.config.cache_embeddings):
+            return
+        try:
+            from common.core.directory_manager import directory_manager
 
-            # Try to break at sentence boundaries
-            if end < len(content):
-                last_period = chunk_text.rfind(".")
-                last_newline = chunk_text.rfind("\n")
-                break_point = max(last_period, last_newline)
+            self.cache = EmbeddingCache.for_model(
+                directory_manager.get_cache_path(),
+                self.config.model_name,
+                max_bytes=self.config.cache_max_bytes,
+            )
+            logger.info(f"Embedding cache at {self.cache.path} holds {len(self.cache)} vectors")
+        except Exception as e:
+            logger.warning(f"Embedding cache unavailable, encoding all chunks: {e}")
+            self.cache = None
 
-                if break_point > start + chunk_size // 2:  # At least half the chunk size
-                    end = start + break_point + 1
-                    chunk_text = content[start:end]
+    def _model_is_cacheable(self) -> bool:
+        """Only real model output is cached, never hash-fallback vectors."""
+        return self.model is not None and getattr(self.model, "container_available", True)
 
-            chunks.append({"content": chunk_text.strip(), "start": start, "end": end})
+    def _embed_chunks(
+        self, embedding_data: List[Dict], use_cache: bool = True
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Encode the content of every chunk in fixed-size batches.
 
-            start = end - chunk_overlap
+        Cached vectors are looked up for all chunks in one pass; only the
+        misses are sent to the model, packed into batches of
+        config.batch_size (one encode request per batch, with up to
+        config.batches_in_flight requests in flight at once). Results are
+        written straight into a preallocated float32 matrix whose rows follow
+        embedding_data order, and new vectors are added to the cache.
 
-        return chunks
+        Returns:
+            (embeddings, stats) where embeddings is an (n, dimension) array
+            (a list of lists when numpy is unavailable)
+        """
+        import time
+
+        total = len(embedding_data)
+        texts = [item["content"] for item in embedding_data]
+        batch_size = max(1, int(getattr(self.config, "batch_size", 256)))
+        cache = self.cache if use_cache and NUMPY_AVAILABLE and self._model_is_cacheable() else None
+        start_time = time.perf_counter()
+
+        embeddings = None
+        miss_rows = list(range(total))
+        if cache is not None and total:
+            hits, cached = cache.get_many(texts)
+            if cached is not None:
+                embeddings = np.empty((total, cached.shape[1]), dtype=np.float32)
+                embeddings[hits] = cached[hits]
+            miss_rows = np.flatnonzero(~hits).tolist()
+
+        batches = 0
+        blank_rows = []
+        batch_rows = [miss_rows[i : i + batch_size] for i in range(0, len(miss_rows), batch_size)]
+        in_flight = max(1, int(getattr(self.config, "batches_in_flight", 1)))
+        for first in range(0, len(batch_rows), in_flight):
+            window = batch_rows[first : first + in_flight]
+            window_texts = [[texts[row] for row in rows] for rows in window]
+            encoded, cacheable = self._encode_many(window_texts)
+            for rows, batch_texts, vectors in zip(window, window_texts, encoded):
+                batches += 1
+                if not any(text.strip() for text in batch_texts):
+                    # Blank texts are zero vectors of whatever width the model gives the rest
+                    blank_rows.extend(rows)
+                    continue
+                if embeddings is None:
+                    width = len(vectors[0])
+                    if NUMPY_AVAILABLE and np:
+                        embeddings = np.empty((total, width), dtype=np.float32)
+                    else:
+                        embeddings = [None] * total
+                elif NUMPY_AVAILABLE and np and vectors.shape[1] != embeddings.shape[1]:
+                    if cache is not None:
+                        # The model behind this name changed dimension: cached vectors are stale
+                        logger.warning("Embedding dimension changed, clearing the embedding cache")
+                        cache.clear()
+                        return self._embed_chunks(embedding_data, use_cache=False)
+                    # Hash fallback of a failed request among model vectors: not comparable
+                    logger.warning(
+                        f"Zeroing {len(rows)} embeddings of dimension {vectors.shape[1]} "
+                        f"(expected {embeddings.shape[1]})"
+                    )
+                    vectors = np.zeros((len(rows), embeddings.shape[1]), dtype=np.float32)
 
-    def _generate_chunk_embedding(self, text: str):
-        """Generate embedding vector for a text chunk."""
-        try:
-            # Clean text
-            text = text.replace("\n", " ").replace("\r", " ").strip()
-            if not text:
-                return [0.0] * self.config.dimension
+                if NUMPY_AVAILABLE and np:
+                    embeddings[rows] = vectors
+                else:
+                    for row, vector in zip(rows, vectors):
+                        embeddings[row] = vector
+                if cache is not None and cacheable:
+                    keep = [i for i, text in enumerate(batch_texts) if text.strip()]
+                    cache.put_many([batch_texts[i] for i in keep], vectors[keep])
 
-            # Generate embedding using ML service
-            if self.model:
-                embeddings = self.model.encode_texts([text])
-                if hasattr(embeddings, "data"):  # SimpleArray from fallback
-                    return embeddings.data[0]
-                else:  # numpy array
-                    return embeddings[0]
+        if embeddings is None:
+            if NUMPY_AVAILABLE and np:
+                embeddings = np.empty((total, self.config.dimension), dtype=np.float32)
             else:
-                # Simple fallback without ML service
-                import hashlib
+                embeddings = [None] * total
+        if NUMPY_AVAILABLE and np:
+            embeddings[blank_rows] = 0.0
+        else:
+            width = next((len(row) for row in embeddings if row is not None), None)
+            for row in blank_rows:
+                embeddings[row] = [0.0] * (width or self.config.dimension)
+        if cache is not None:
+            cache.flush()
+
+        elapsed = time.perf_counter() - start_time
+        stats = {
+            "texts_encoded": len(miss_rows),
+            "cache_hits": total - len(miss_rows),
+            "cache_misses": len(miss_rows),
+            "batches": batches,
+            "batch_size": batch_size,
+            "encode_seconds": elapsed,
+            "texts_per_second": total / elapsed if elapsed > 0 else 0.0,
+        }
+        return embeddings, stats
+
+    def _encode_batch(self, texts: List[str]):
+        """
+        Encode a batch of texts with a single model call.
+        Empty texts map to zero vectors. Returns an (n, dimension) array, or a
+        list of lists when numpy is unavailable.
+        """
+        return self._encode_texts(texts)[0]
 
-                text_hash = hashlib.md5(text.encode()).hexdigest()
-                # Create simple embedding from hash
-                embedding = []
-                for i in range(min(len(text_hash), self.config.dimension // 16)):
-                    chunk = text_hash[i * 2 : (i + 1) * 2]
-                    if chunk:
-                        embedding.append(int(chunk, 16) / 255.0 - 0.5)
-                while len(embedding) < self.config.dimension:
-                    embedding.append(0.0)
-                return embedding[: self.config.dimension]
+    def _encode_texts(self, texts: List[str]) -> Tuple[Any, bool]:
+        """
+        Encode a batch of texts with a single model call.
 
+        Returns:
+            (vectors, cacheable): vectors as in _encode_batch, and whether they
+            are real model output that may be cached
+        """
+        encoded, cacheable = self._encode_many([texts])
+        return encoded[0], cacheable
+
+    def _encode_many(self, batches: List[List[str]]) -> Tuple[List[Any], bool]:
+        """
+        Encode several batches, one model call each. Services with
+        encode_batches (MLService) get all the calls in flight at once.
+
+        Returns:
+            (vectors per batch, cacheable) as in _encode_texts; cacheable is
+            False if any of the batches fell back to hash embeddings
+        """
+        # Clean text
+        cleaned = [
+            [text.replace("\n", " ").replace("\r", " ").strip() for text in texts]
+            for texts in batches
+        ]
+        dimensions = [self.config.dimension] * len(cleaned)
+        rows = [[[0.0] * self.config.dimension for _ in texts] for texts in cleaned]
+        todo = [[i for i, text in enumerate(texts) if text] for texts in cleaned]
+        requested = [k for k, indexes in enumerate(todo) if indexes]
+        cacheable = False
+
+        try:
+            if requested and self.model:
+                # Generate embeddings using ML service, one request per batch
+                inputs = [[cleaned[k][i] for i in todo[k]] for k in requested]
+                if len(inputs) > 1 and hasattr(self.model, "encode_batches"):
+                    results = self.model.encode_batches(inputs)
+                else:
+                    results = [self.model.encode_texts(texts) for texts in inputs]
+                for k, encoded in zip(requested, results):
+                    if not _is_ndarray(encoded) and hasattr(encoded, "data"):  # SimpleArray
+                        encoded = encoded.data
+                    if NUMPY_AVAILABLE and np:
+                        encoded = np.asarray(encoded, dtype=np.float32)
+                        if encoded.shape[1] != dimensions[k]:
+                            dimensions[k] = encoded.shape[1]
+                            rows[k] = [[0.0] * dimensions[k] for _ in cleaned[k]]
+                    for row, i in enumerate(todo[k]):
+                        rows[k][i] = encoded[row]
+                cacheable = self._model_is_cacheable() and not getattr(
+                    self.model, "last_encode_fallback", False
+                )
+            else:
+                # Simple fallback without ML service
+                for k in requested:
+                    for i in todo[k]:
+                        rows[k][i] = self._hash_embedding(cleaned[k][i])
         except Exception as e:
-            logger.error(f"Failed to generate embedding for text chunk: {e}")
-            return [0.0] * self.config.dimension
+            chunks = sum(len(texts) for texts in batches)
+            logger.error(f"Failed to generate embeddings for {chunks} chunks: {e}")
+
+        if NUMPY_AVAILABLE and np:
+            return [
+                np.asarray(batch_rows, dtype=np.float32).reshape(len(texts), dimension)
+                for batch_rows, texts, dimension in zip(rows, cleaned, dimensions)
+            ], cacheable
+        return [[list(row) for row in batch_rows] for batch_rows in rows], cacheable
+
+    def _hash_embedding(self, text: str) -> List[float]:
+        """Deterministic hash-based embedding used when no ML service is available."""
+        import hashlib
+
+        text_hash = hashlib.md5(text.encode()).hexdigest()
+        # Create simple embedding from hash
+        embedding = []
+        for i in range(min(len(text_hash), self.config.dimension // 16)):
+            chunk = text_hash[i * 2 : (i + 1) * 2]
+            if chunk:
+                embedding.append(int(chunk, 16) / 255.0 - 0.5)
+        while len(embedding) < self.config.dimension:
+            embedding.append(0.0)
+        return embedding[: self.config.dimension]
+
+    def _generate_chunk_embedding(self, text: str):
+        """Generate embedding vector for a single text chunk."""
+        return self._encode_batch([text])[0]
 
     def _get_sec_document_type(self, filename: str) -> str:
         """Extract SEC document type from filename."""
@@ -452,30 +821,37 @@ class SemanticEmbeddingGenerator:
             logger.error(f"Failed to convert YFinance data to text: {e}")
             return ""
 
-    def _build_vector_index(self, embedding_data: List[Dict]):
-        """Build FAISS vector index for similarity search."""
+    def _build_vector_index(self, embedding_data: List[Dict], embeddings=None):
+        """
+        Build the in-memory vector index for stores saved without NumPy; with
+        NumPy, the segmented store provides the index instead.
+        """
         try:
             if not embedding_data:
                 return
 
             # Extract embeddings
-            embeddings_list = [item["embedding_vector"] for item in embedding_data]
+            if embeddings is None:
+                embeddings = [item["embedding_vector"] for item in embedding_data]
+            embeddings_list = embeddings
 
             # Get dimension
-            if embeddings_list and len(embeddings_list[0]) > 0:
+            if len(embeddings_list) and len(embeddings_list[0]) > 0:
                 dimension = len(embeddings_list[0])
             else:
                 dimension = 384  # Default dimension
 
             # Create vector index
-            if FAISS_AVAILABLE:
-                # Use FAISS if available
-                import numpy as np
-
-                embeddings = np.array(embeddings_list)
-                self.vector_index = faiss.IndexFlatIP(dimension)
-                faiss.normalize_L2(embeddings)
-                self.vector_index.add(embeddings)
+            if NUMPY_AVAILABLE:
+                normalized = normalize_rows(embeddings_list)
+                if self.config.index_type == "ivf" and len(normalized) >= IVF_MIN_ROWS:
+                    # Approximate search over k-means inverted lists
+                    self.vector_index = IVFVectorIndex.build(
+                        normalized, nlist=self.config.ivf_nlist, nprobe=self.config.ivf_nprobe
+                    )
+                else:
+                    # Exact search over a contiguous float32 matrix
+                    self.vector_index = NumpyVectorIndex.from_matrix(normalized)
             else:
                 # Use simple fallback
                 self.vector_index = SimpleVectorIndex(dimension)
@@ -498,52 +874,59 @@ class SemanticEmbeddingGenerator:
             logger.error(f"Failed to build vector index: {e}")
             raise
 
-    def _save_embeddings_data(self, embedding_data: List[Dict], output_path: Path):
-        """Save embeddings and metadata to disk."""
+    @staticmethod
+    def _metadata_rows(embedding_data: List[Dict], embeddings):
+        """Metadata rows without embedding vectors (vectors live in the .npy matrix)."""
+        for item, vector in zip(embedding_data, embeddings):
+            meta_item = {k: v for k, v in item.items() if k != "embedding_vector"}
+            meta_item["embedding_dimension"] = len(vector)
+            yield meta_item
+
+    def _save_embeddings_data(self, embedding_data: List[Dict], output_path: Path, embeddings=None):
+        """Save embeddings and metadata to disk, replacing any previous store (full rebuild)."""
         try:
-            # Save embeddings metadata
-            metadata_file = output_path / "embeddings_metadata.json"
-            with open(metadata_file, "w") as f:
-                # Remove embedding vectors for metadata file (save space)
-                metadata = []
-                for item in embedding_data:
-                    meta_item = item.copy()
-                    meta_item["embedding_dimension"] = len(item["embedding_vector"])
-                    del meta_item["embedding_vector"]  # Remove large vectors from metadata
-                    metadata.append(meta_item)
-
-                json.dump(metadata, f, indent=2, default=str)
-
-            # Save embeddings separately
-            embeddings_file = output_path / "embeddings_vectors.npy"
-            embeddings_list = [item["embedding_vector"] for item in embedding_data]
+            if embeddings is None:
+                embeddings = [item["embedding_vector"] for item in embedding_data]
+
             if NUMPY_AVAILABLE and np:
-                embeddings = np.array(embeddings_list)
-                np.save(embeddings_file, embeddings)
+                # Memory-mappable segmented store holding a single segment
+                if embedding_data:
+                    vectors = normalize_rows(embeddings)
+                else:
+                    vectors = np.empty((0, self.config.dimension), dtype=np.float32)
+                store = SegmentedEmbeddingStore.create(output_path, **self._store_settings())
+                store.set_index_config(
+                    self.config.index_type,
+                    self.config.ivf_nlist,
+                    self.config.vector_compression,
+                    self.config.pq_subspaces,
+                )
+                store.update(vectors, list(self._metadata_rows(embedding_data, embeddings)))
+                self.store = store
             else:
-                embeddings = embeddings_list
                 # Save as JSON when numpy not available
-                import json
-
-                with open(str(embeddings_file).replace(".npy", ".json"), "w") as f:
-                    json.dump(embeddings, f)
-
-            # Save vector index if available
-            if self.vector_index and FAISS_AVAILABLE:
-                index_file = output_path / "vector_index.faiss"
-                faiss.write_index(self.vector_index, str(index_file))
-            elif self.vector_index:
-                # Save simple index as JSON
-                index_file = output_path / "vector_index.json"
-                with open(index_file, "w") as f:
+                with open(output_path / "embeddings_metadata.json", "w") as f:
                     json.dump(
-                        {
-                            "dimension": self.vector_index.dimension,
-                            "vectors": self.vector_index.vectors,
-                            "ntotal": self.vector_index.ntotal,
-                        },
+                        list(self._metadata_rows(embedding_data, embeddings)),
                         f,
+                        indent=2,
+                        default=str,
                     )
+                with open(output_path / "embeddings_vectors.json", "w") as f:
+                    json.dump([list(vector) for vector in embeddings], f)
+
+                if isinstance(self.vector_index, SimpleVectorIndex):
+                    # Save simple index as JSON
+                    index_file = output_path / "vector_index.json"
+                    with open(index_file, "w") as f:
+                        json.dump(
+                            {
+                                "dimension": self.vector_index.dimension,
+                                "vectors": self.vector_index.vectors,
+                                "ntotal": self.vector_index.ntotal,
+                            },
+                            f,
+                        )
 
             logger.info(f"Saved embeddings data to {output_path}")
 
@@ -572,7 +955,9 @@ class SemanticRetriever:
         self.config = config or DEFAULT_EMBEDDING_CONFIG
         self.model = None
         self.vector_index = None
+        self.store = None
         self.document_metadata = {}
+        self.postings = None
         self.load_embeddings()
 
     def load_embeddings(self):
@@ -589,7 +974,30 @@ class SemanticRetriever:
                 logger.warning("No ML service available for retrieval")
                 self.model = None
 
-            # Load metadata
+            # Segmented store: segments are memory-mapped, tombstoned rows skipped
+            if NUMPY_AVAILABLE and SegmentedEmbeddingStore.exists(self.embeddings_path):
+                self.store = SegmentedEmbeddingStore.open(self.embeddings_path)
+                self.document_metadata = self.store.metadata
+                self.vector_index = self.store.vector_index(
+                    nprobe=self.config.ivf_nprobe, rerank=self.config.rerank_factor
+                )
+                self.postings = self.store.postings()
+                logger.info(
+                    f"Mapped {len(self.store.manifest['segments'])} embedding segments "
+                    f"with {self.vector_index.ntotal} live vectors"
+                )
+                return
+
+            # Single memory-mapped store: only the manifest and row offsets are read eagerly
+            if NUMPY_AVAILABLE and EmbeddingStore.exists(self.embeddings_path):
+                self.store = EmbeddingStore.open(self.embeddings_path)
+                self.document_metadata = self.store.metadata
+                self.postings = self.store.postings()
+                self.vector_index = NumpyVectorIndex.from_matrix(self.store.vectors)
+                logger.info(f"Mapped embedding store with {self.vector_index.ntotal} vectors")
+                return
+
+            # Legacy layout: embeddings_metadata.json + vector_index.{faiss,json}
             metadata_file = self.embeddings_path / "embeddings_metadata.json"
             if metadata_file.exists():
                 with open(metadata_file, "r") as f:
@@ -603,16 +1011,26 @@ class SemanticRetriever:
                     self.vector_index = faiss.read_index(str(index_file))
                     logger.info(f"Loaded FAISS index with {self.vector_index.ntotal} vectors")
             else:
-                # Load simple index from JSON
                 index_file = self.embeddings_path / "vector_index.json"
                 if index_file.exists():
+                    # Load legacy simple index from JSON
                     with open(index_file, "r") as f:
                         index_data = json.load(f)
-                    self.vector_index = SimpleVectorIndex(index_data["dimension"])
-                    self.vector_index.vectors = index_data["vectors"]
-                    self.vector_index.ntotal = index_data["ntotal"]
+                    if NUMPY_AVAILABLE:
+                        self.vector_index = NumpyVectorIndex(index_data["dimension"])
+                        if index_data["vectors"]:
+                            self.vector_index.add(index_data["vectors"])
+                    else:
+                        self.vector_index = SimpleVectorIndex(index_data["dimension"])
+                        self.vector_index.vectors = index_data["vectors"]
+                        self.vector_index.ntotal = index_data["ntotal"]
                     logger.info(f"Loaded simple index with {self.vector_index.ntotal} vectors")
 
+            if NUMPY_AVAILABLE and self.document_metadata:
+                self.postings = PostingLists.from_rows(
+                    self.document_metadata[i] for i in range(len(self.document_metadata))
+                )
+
         except Exception as e:
             logger.error(f"Failed to load embeddings: {e}")
             raise
@@ -649,7 +1067,7 @@ class SemanticRetriever:
             # Generate query embedding using ML service
             if self.model:
                 embeddings = self.model.encode_texts([query])
-                if hasattr(embeddings, "data"):  # SimpleArray from fallback
+                if not _is_ndarray(embeddings) and hasattr(embeddings, "data"):  # SimpleArray
                     if NUMPY_AVAILABLE and np:
                         query_embedding = np.array([embeddings.data[0]], dtype=np.float32)
                     else:
@@ -676,7 +1094,10 @@ class SemanticRetriever:
                     query_embedding = [embedding[: self.config.dimension]]
             # Normalize query embedding
             if FAISS_AVAILABLE:
+                query_embedding = np.ascontiguousarray(query_embedding, dtype=np.float32)
                 faiss.normalize_L2(query_embedding)
+            elif NUMPY_AVAILABLE:
+                query_embedding = normalize_rows(query_embedding)
             else:
                 # Manual normalization
                 if isinstance(query_embedding, list):
@@ -686,10 +1107,28 @@ class SemanticRetriever:
                             for i in range(len(vec)):
                                 vec[i] /= norm
 
+            # Resolve ticker/content_type filters to candidate rows via posting lists
+            candidate_rows = None
+            if (
+                content_filter
+                and self.postings is not None
+                and hasattr(self.vector_index, "search_subset")
+            ):
+                candidate_rows, content_filter = self.postings.select(content_filter)
+
             # Search vector index
-            scores, indices = self.vector_index.search(
-                query_embedding, min(top_k * 2, self.vector_index.ntotal)
-            )
+            if candidate_rows is not None:
+                # Score only matching rows; exact filtered top-k unless a residual filter remains
+                candidates = top_k * 2 if content_filter else top_k
+                if not len(candidate_rows):
+                    return []
+                scores, indices = self.vector_index.search_subset(
+                    query_embedding, min(candidates, len(candidate_rows)), candidate_rows
+                )
+            else:
+                scores, indices = self.vector_index.search(
+                    query_embedding, min(top_k * 2, self.vector_index.ntotal)
+                )
 
             results = []
             # Handle empty results safely
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL Vector Index Module
+
+NumPy-backed vector indexes used by semantic retrieval when FAISS is not
+installed. Indexes follow the FAISS calling convention so they can be swapped
+in transparently:
+- add(vectors) appends rows
+- search(queries, k) returns (scores, indices) arrays of shape (n_queries, k),
+  padded with -inf scores and -1 indices when fewer than k rows exist; an
+  optional boolean deleted mask excludes rows from the scan
+- search_subset(queries, k, rows) does the same over the given row ids only
+
+NumpyVectorIndex is exact. IVFVectorIndex is approximate: rows are grouped
+by nearest k-means centroid and a query scans only its nprobe closest lists.
+
+Part of Stage 3 (Load) in the ETL pipeline.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the (queries x rows) score block held in memory at once (64 MB of float32)
+DEFAULT_MAX_BLOCK_ELEMENTS = 1 << 24
+
+# Index types selectable through VectorEmbeddingConfig.index_type
+INDEX_TYPES = ("flat", "ivf")
+# Below this many rows an exact scan is about as fast as IVF and has perfect recall
+IVF_MIN_ROWS = 10_000
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return a float32 C-contiguous copy of vectors with unit L2 row norms."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2, order="C")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def merge_top_k(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k best columns per row of a (n_queries, n_candidates) score matrix.
+
+    Uses argpartition so only the selected candidates are sorted.
+    Returns scores and indices sorted by descending score.
+    """
+    n_candidates = scores.shape[1]
+    if n_candidates > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        indices = np.take_along_axis(indices, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+def empty_results(n_queries: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """FAISS-style padding: -inf scores and -1 indices."""
+    return (
+        np.full((n_queries, k), -np.inf, dtype=np.float32),
+        np.full((n_queries, k), -1, dtype=np.int64),
+    )
+
+
+def blocked_top_k(
+    queries: np.ndarray,
+    matrix: np.ndarray,
+    k: int,
+    row_ids: Optional[np.ndarray] = None,
+    max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+    deleted: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact inner-product top-k of every query against every row of matrix.
+
+    Rows are scored in blocks so the score buffer never exceeds
+    max_block_elements; the running top-k of each query is merged with each
+    block's candidates. row_ids maps matrix rows to returned indices
+    (defaults to the row position). Rows flagged in the deleted mask score
+    -inf and never displace a live row.
+    """
+    n_queries = queries.shape[0]
+    n_rows = matrix.shape[0]
+    best_scores, best_indices = empty_results(n_queries, k)
+    if n_rows == 0 or k <= 0:
+        return best_scores, best_indices
+
+    block_rows = max(1, max_block_elements // max(1, n_queries))
+    for start in range(0, n_rows, block_rows):
+        end = min(start + block_rows, n_rows)
+        block_scores = queries @ matrix[start:end].T
+        if row_ids is None:
+            block_ids = np.arange(start, end, dtype=np.int64)
+        else:
+            block_ids = np.asarray(row_ids[start:end], dtype=np.int64)
+        block_ids = np.broadcast_to(block_ids, block_scores.shape)
+        if deleted is not None:
+            block_dead = deleted[start:end]
+            block_scores[:, block_dead] = -np.inf
+            block_ids = np.where(block_dead, -1, block_ids)
+
+        # Reduce the block to its own top-k before merging with the running best
+        block_scores, block_ids = merge_top_k(block_scores, block_ids, min(k, end - start))
+        best_scores, best_indices = merge_top_k(
+            np.concatenate([best_scores, block_scores], axis=1),
+            np.concatenate([best_indices, block_ids], axis=1),
+            k,
+        )
+
+    return best_scores, best_indices
+
+
+def gathered_top_k(
+    queries: np.ndarray,
+    matrix: np.ndarray,
+    k: int,
+    rows: np.ndarray,
+    row_ids: Optional[np.ndarray] = None,
+    max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact inner-product top-k of every query against matrix[rows] only.
+
+    Candidate rows are gathered a block at a time, so scoring cost and memory
+    are proportional to len(rows) rather than to the matrix size. row_ids
+    gives the id returned for each entry of rows (defaults to rows itself).
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    row_ids = rows if row_ids is None else np.asarray(row_ids, dtype=np.int64)
+    best_scores, best_indices = empty_results(queries.shape[0], k)
+    if len(rows) == 0 or k <= 0:
+        return best_scores, best_indices
+
+    block_rows = max(1, max_block_elements // max(queries.shape[0], matrix.shape[1], 1))
+    for start in range(0, len(rows), block_rows):
+        end = min(start + block_rows, len(rows))
+        block_scores, block_ids = blocked_top_k(
+            queries,
+            matrix[rows[start:end]],
+            k,
+            row_ids=row_ids[start:end],
+            max_block_elements=max_block_elements,
+        )
+        best_scores, best_indices = merge_top_k(
+            np.concatenate([best_scores, block_scores], axis=1),
+            np.concatenate([best_indices, block_ids], axis=1),
+            k,
+        )
+    return best_scores, best_indices
+
+
+class NumpyVectorIndex:
+    """
+    Exact inner-product index over a contiguous float32 matrix.
+
+    Stand-in for faiss.IndexFlatIP: vectors are expected to be L2-normalized
+    so inner product equals cosine similarity. Many queries are scored with a
+    single matrix multiply per block, and top-k selection uses argpartition.
+    """
+
+    index_type = "flat"
+
+    def __init__(self, dimension: int, max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS):
+        self.dimension = dimension
+        self.max_block_elements = max_block_elements
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self.ntotal = 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored rows (n_total, dimension)."""
+        return self._vectors[: self.ntotal]
+
+    def add(self, vectors):
+        """Append vectors, growing storage geometrically to keep adds amortized O(n)."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        needed = self.ntotal + vectors.shape[0]
+        if needed > self._vectors.shape[0]:
+            capacity = max(needed, 2 * self._vectors.shape[0], 1024)
+            grown = np.empty((capacity, self.dimension), dtype=np.float32)
+            grown[: self.ntotal] = self._vectors[: self.ntotal]
+            self._vectors = grown
+        self._vectors[self.ntotal : needed] = vectors
+        self.ntotal = needed
+
+    def search(
+        self, query_vectors, k: int, deleted: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, indices) of the k best rows not flagged in deleted for every query."""
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        return blocked_top_k(
+            queries, self.vectors, k, max_block_elements=self.max_block_elements, deleted=deleted
+        )
+
+    def search_subset(self, query_vectors, k: int, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, indices) of the k best rows among the given row ids."""
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        return gathered_top_k(
+            queries, self.vectors, k, rows, max_block_elements=self.max_block_elements
+        )
+
+    def save(self, path: Path):
+        """Save the index matrix as a .npy file."""
+        np.save(path, self.vectors)
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray, **kwargs) -> "NumpyVectorIndex":
+        """
+        Wrap an existing (n, dimension) float32 matrix without copying it.
+        A read-only memmap stays shared with other processes until add() grows it.
+        """
+        index = cls(matrix.shape[1], **kwargs)
+        if matrix.dtype != np.float32 or not matrix.flags["C_CONTIGUOUS"]:
+            matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        index._vectors = matrix
+        index.ntotal = matrix.shape[0]
+        return index
+
+    @classmethod
+    def load(cls, path: Path, mmap_mode: Optional[str] = None, **kwargs) -> "NumpyVectorIndex":
+        """Load an index previously written by save(), optionally memory-mapped."""
+        return cls.from_matrix(np.load(path, mmap_mode=mmap_mode), **kwargs)
+
+
+def kmeans(
+    data: np.ndarray,
+    n_clusters: int,
+    n_iter: int = 10,
+    seed: int = 0,
+    max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+    spherical: bool = True,
+) -> np.ndarray:
+    """
+    Spherical k-means (cosine) on L2-normalized rows. Returns unit-norm centroids.
+    With spherical=False runs plain Euclidean k-means (mean centroids), as used
+    for product-quantization codebooks. Empty clusters are re-seeded from random rows.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        bias = None if spherical else euclidean_bias(centroids)
+        assignment = assign_to_centroids(data, centroids, max_block_elements, bias=bias)
+        # Per-cluster sums via one sort + reduceat (np.add.at is unbuffered and slow)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        present = counts > 0
+        sums[present] = np.add.reduceat(data[order], starts[present], axis=0)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        if spherical:
+            centroids = normalize_rows(sums)
+        else:
+            centroids = sums / np.maximum(counts, 1)[:, None].astype(np.float32)
+    return centroids
+
+
+def euclidean_bias(centroids: np.ndarray) -> np.ndarray:
+    """-|c|^2 / 2 per centroid: argmax(x.c - |c|^2 / 2) is the nearest centroid in L2."""
+    return -0.5 * np.einsum("ij,ij->i", centroids, centroids)
+
+
+def assign_to_centroids(
+    data: np.ndarray,
+    centroids: np.ndarray,
+    max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+    bias: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Index of the highest inner-product centroid for every row, computed in blocks.
+    A per-centroid bias is added to the scores (see euclidean_bias).
+    """
+    assignment = np.empty(len(data), dtype=np.int64)
+    block_rows = max(1, max_block_elements // max(1, len(centroids)))
+    for start in range(0, len(data), block_rows):
+        end = min(start + block_rows, len(data))
+        block = np.asarray(data[start:end], dtype=np.float32)
+        scores = block @ centroids.T
+        if bias is not None:
+            scores += bias
+        assignment[start:end] = np.argmax(scores, axis=1)
+    return assignment
+
+
+class IVFVectorIndex:
+    """
+    Inverted-file approximate inner-product index (IVF-Flat).
+
+    Vectors are partitioned by their nearest of nlist k-means centroids and
+    stored contiguously per list. A query scores the centroids, then scans
+    only the nprobe closest lists, so cost is about nprobe / nlist of an
+    exact scan. Raising nprobe trades latency for recall; nprobe == nlist is
+    exact. Built once from a full matrix (no incremental add).
+    """
+
+    index_type = "ivf"
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        nprobe: int = 16,
+        max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+    ):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.ids = ids
+        self.vectors = vectors
+        self.nprobe = nprobe
+        self.max_block_elements = max_block_elements
+        self.dimension = vectors.shape[1]
+        self.ntotal = vectors.shape[0]
+        self._positions = None
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def default_nlist(n_rows: int) -> int:
+        """About 2 * sqrt(n) lists, with at least 39 training rows per centroid."""
+        return int(max(1, min(2 * np.sqrt(n_rows), n_rows // 39)))
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: int = 0,
+        nprobe: int = 16,
+        n_iter: int = 10,
+        train_size: int = 64,
+        seed: int = 0,
+        **kwargs,
+    ) -> "IVFVectorIndex":
+        """
+        Train centroids on a sample of at most nlist * train_size rows of the
+        (L2-normalized) matrix, then bucket every row. nlist=0 picks default_nlist.
+        """
+        n_rows = matrix.shape[0]
+        nlist = min(nlist or cls.default_nlist(n_rows), n_rows)
+        rng = np.random.default_rng(seed)
+        sample_size = min(n_rows, nlist * train_size)
+        sample = np.asarray(matrix[np.sort(rng.choice(n_rows, sample_size, replace=False))])
+        centroids = kmeans(sample, nlist, n_iter=n_iter, seed=seed)
+
+        assignment = assign_to_centroids(matrix, centroids)
+        ids = np.argsort(assignment, kind="stable")
+        list_offsets = np.searchsorted(assignment[ids], np.arange(nlist + 1)).astype(np.int64)
+        vectors = np.ascontiguousarray(np.asarray(matrix)[ids], dtype=np.float32)
+        return cls(centroids, list_offsets, ids.astype(np.int64), vectors, nprobe, **kwargs)
+
+    def search(
+        self, query_vectors, k: int, deleted: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return approximate (scores, indices) of the k best rows for every query.
+        deleted is a mask over row ids; flagged rows are skipped while scanning.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        best_scores, best_indices = empty_results(queries.shape[0], k)
+        if self.ntotal == 0 or k <= 0:
+            return best_scores, best_indices
+
+        nprobe = max(1, min(self.nprobe, self.nlist))
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.broadcast_to(np.arange(self.nlist), (queries.shape[0], self.nlist))
+
+        for q, query in enumerate(queries):
+            lists = [
+                (start, end)
+                for start, end in zip(
+                    self.list_offsets[probes[q]], self.list_offsets[probes[q] + 1]
+                )
+                if end > start
+            ]
+            if not lists:
+                continue
+            # Each probed list is a contiguous slice, scored with one matrix-vector product
+            scores = np.concatenate([self.vectors[start:end] @ query for start, end in lists])
+            positions = np.concatenate([np.arange(start, end) for start, end in lists])
+            if deleted is not None:
+                live = ~deleted[self.ids[positions]]
+                scores, positions = scores[live], positions[live]
+                if not len(scores):
+                    continue
+            top_scores, top_positions = merge_top_k(
+                scores[None, :], positions[None, :], min(k, len(scores))
+            )
+            best_scores[q, : top_scores.shape[1]] = top_scores[0]
+            best_indices[q, : top_scores.shape[1]] = self.ids[top_positions[0]]
+        return best_scores, best_indices
+
+    def search_subset(self, query_vectors, k: int, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact search over the given row ids (pre-filtered candidate sets are small)."""
+        if self._positions is None:
+            self._positions = np.empty_like(self.ids)
+            self._positions[self.ids] = np.arange(len(self.ids))
+        rows = np.asarray(rows, dtype=np.int64)
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        return gathered_top_k(
+            queries,
+            self.vectors,
+            k,
+            self._positions[rows],
+            row_ids=rows,
+            max_block_elements=self.max_block_elements,
+        )
+
+    def save(self, path: Path):
+        """
+        Save as path.npz (centroids, list offsets, ids) and path.vectors.npy
+        (list-ordered vectors, memory-mappable).
+        """
+        path = Path(path)
+        np.savez(
+            path.with_suffix(".npz"),
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            ids=self.ids,
+        )
+        np.save(path.with_suffix(".vectors.npy"), self.vectors)
+
+    @classmethod
+    def load(
+        cls, path: Path, mmap_mode: Optional[str] = None, nprobe: int = 16, **kwargs
+    ) -> "IVFVectorIndex":
+        path = Path(path)
+        with np.load(path.with_suffix(".npz")) as data:
+            centroids, list_offsets, ids = data["centroids"], data["list_offsets"], data["ids"]
+        vectors = np.load(path.with_suffix(".vectors.npy"), mmap_mode=mmap_mode)
+        return cls(centroids, list_offsets, ids, vectors, nprobe, **kwargs)
+
+
+Searcher = Union[np.ndarray, NumpyVectorIndex, IVFVectorIndex]
+
+
+class SegmentedVectorIndex:
+    """
+    Search over several read-only segments, each a matrix (exact) or an index.
+
+    Global row ids number the rows of all segments in order. Rows flagged in a
+    segment's deleted mask are never returned: the mask is passed down to the
+    segment's scan, so each segment yields at most k live rows, and the
+    per-segment results are merged into the global top-k. owner is kept
+    alive as long as the index (e.g. a lease on the segments' files).
+    """
+
+    index_type = "segmented"
+
+    def __init__(
+        self,
+        segments: Sequence[Tuple[Searcher, Optional[np.ndarray]]],
+        dimension: Optional[int] = None,
+        max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+        owner: Any = None,
+    ):
+        self.max_block_elements = max_block_elements
+        self.owner = owner
+        self._segments: List[Tuple[int, Searcher, Optional[np.ndarray], int]] = []
+        base = 0
+        live = 0
+        for searcher, deleted in segments:
+            if isinstance(searcher, np.ndarray):
+                searcher = NumpyVectorIndex.from_matrix(
+                    searcher, max_block_elements=max_block_elements
+                )
+            n_deleted = int(deleted.sum()) if deleted is not None else 0
+            self._segments.append((base, searcher, deleted, n_deleted))
+            base += searcher.ntotal
+            live += searcher.ntotal - n_deleted
+        if dimension is None:
+            dimension = self._segments[0][1].dimension if self._segments else 0
+        self.dimension = dimension
+        self.ntotal = live
+
+    def search(self, query_vectors, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, indices) of the k best live rows for every query."""
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        best_scores, best_indices = empty_results(queries.shape[0], k)
+        for base, searcher, deleted, n_deleted in self._segments:
+            if searcher.ntotal == n_deleted:
+                continue
+            scores, indices = searcher.search(
+                queries, min(k, searcher.ntotal - n_deleted), deleted=deleted
+            )
+            indices = np.where(indices >= 0, indices + base, -1)
+            best_scores, best_indices = merge_top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_indices, indices], axis=1),
+                k,
+            )
+        return best_scores, best_indices
+
+    def search_subset(self, query_vectors, k: int, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, indices) of the k best rows among the given global row ids.
+        rows must be sorted and contain only live rows (e.g. from posting lists).
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        rows = np.asarray(rows, dtype=np.int64)
+        best_scores, best_indices = empty_results(queries.shape[0], k)
+        bases = np.array([base for base, _, _, _ in self._segments], dtype=np.int64)
+        bounds = np.searchsorted(rows, np.append(bases, np.iinfo(np.int64).max))
+        for i, (base, searcher, _, _) in enumerate(self._segments):
+            segment_rows = rows[bounds[i] : bounds[i + 1]]
+            if not len(segment_rows):
+                continue
+            scores, indices = searcher.search_subset(queries, k, segment_rows - base)
+            indices = np.where(indices >= 0, indices + base, -1)
+            best_scores, best_indices = merge_top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_indices, indices], axis=1),
+                k,
+            )
+        return best_scores, best_indices
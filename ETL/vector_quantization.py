@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ETL Vector Quantization Module
+
+Compressed in-memory representations of L2-normalized float32 embeddings,
+for corpora whose full-precision matrix does not fit in RAM:
+- float16: half-precision copy (2x smaller)
+- int8: per-dimension scalar quantization to one byte per value (4x smaller)
+- pq: product quantization, one byte per subspace (a slice of about 8 dimensions)
+  (384-dim vectors with 48 subspaces take 48 bytes, 32x smaller)
+
+QuantizedVectorIndex scores queries against the codes with asymmetric
+distance computation (the query stays float32, only the database side is
+quantized), keeps rerank * k candidates, and re-ranks them exactly against
+the full-precision vectors, usually the segment's memory-mapped
+embeddings_vectors.npy, of which only the candidate rows are paged in.
+
+Part of Stage 3 (Load) in the ETL pipeline.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ETL.vector_index import (
+    DEFAULT_MAX_BLOCK_ELEMENTS,
+    assign_to_centroids,
+    empty_results,
+    euclidean_bias,
+    gathered_top_k,
+    kmeans,
+    merge_top_k,
+)
+
+logger = logging.getLogger(__name__)
+
+# Compression modes selectable through VectorEmbeddingConfig.vector_compression
+COMPRESSION_TYPES = ("none", "float16", "int8", "pq")
+# Segments smaller than this are scanned at full precision; compression would save little
+QUANTIZATION_MIN_ROWS = 4096
+# Centroids per PQ subspace, so that every code fits in one byte
+PQ_CENTROIDS = 256
+# Rows encoded per block while building, so a memory-mapped matrix is never loaded whole
+ENCODE_BLOCK_ROWS = 16384
+# Code values decoded per scan block; small blocks keep the float32 copy cache resident
+SCAN_BLOCK_ELEMENTS = 1 << 20
+
+
+class Float16Quantizer:
+    """Half-precision copy of the vectors; scores are upcast a block at a time."""
+
+    name = "float16"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    @classmethod
+    def train(cls, sample: np.ndarray, **kwargs) -> "Float16Quantizer":
+        return cls(sample.shape[1])
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"dimension": np.int64(self.dimension)}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "Float16Quantizer":
+        return cls(int(state["dimension"]))
+
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+
+class Int8Quantizer:
+    """
+    Scalar quantization: every dimension is mapped linearly from its trained
+    [min, max] range onto 0..255. A score decomposes as
+    q . (offset + scale * code) = q . offset + (q * scale) . code,
+    so queries are rescaled once and codes are used as they are.
+    """
+
+    name = "int8"
+
+    def __init__(self, offset: np.ndarray, scale: np.ndarray):
+        self.offset = offset.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+        self.dimension = len(offset)
+
+    @classmethod
+    def train(cls, sample: np.ndarray, **kwargs) -> "Int8Quantizer":
+        low = sample.min(axis=0)
+        high = sample.max(axis=0)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        return cls(low, scale)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        levels = np.rint((np.asarray(vectors, dtype=np.float32) - self.offset) / self.scale)
+        return np.clip(levels, 0, 255).astype(np.uint8)
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        scaled = queries * self.scale
+        return (scaled @ codes.astype(np.float32).T) + (queries @ self.offset)[:, None]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "Int8Quantizer":
+        return cls(state["offset"], state["scale"])
+
+    @property
+    def nbytes(self) -> int:
+        return self.offset.nbytes + self.scale.nbytes
+
+
+class ProductQuantizer:
+    """
+    Product quantization: the dimensions are split into n_subspaces equal
+    slices, each slice is replaced by the id of its nearest of 256 k-means
+    centroids. A query precomputes one (n_subspaces, 256) table of partial
+    inner products, after which a row's score is a sum of n_subspaces lookups.
+    """
+
+    name = "pq"
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = codebooks.astype(np.float32)
+        self.n_subspaces, self.n_centroids, self.sub_dimension = codebooks.shape
+        self.dimension = self.n_subspaces * self.sub_dimension
+
+    @staticmethod
+    def default_subspaces(dimension: int) -> int:
+        """Subspaces of about 8 dimensions (largest divisor of dimension <= dimension / 8)."""
+        target = max(1, dimension // 8)
+        return max(m for m in range(1, target + 1) if dimension % m == 0)
+
+    @classmethod
+    def train(
+        cls, sample: np.ndarray, n_subspaces: int = 0, n_iter: int = 10, seed: int = 0, **kwargs
+    ) -> "ProductQuantizer":
+        dimension = sample.shape[1]
+        n_subspaces = n_subspaces or cls.default_subspaces(dimension)
+        if dimension % n_subspaces:
+            raise ValueError(
+                f"PQ subspaces ({n_subspaces}) must divide the dimension ({dimension})"
+            )
+        sub_dimension = dimension // n_subspaces
+        n_centroids = min(PQ_CENTROIDS, len(sample))
+        codebooks = np.stack(
+            [
+                kmeans(
+                    np.ascontiguousarray(sample[:, j * sub_dimension : (j + 1) * sub_dimension]),
+                    n_centroids,
+                    n_iter=n_iter,
+                    seed=seed + j,
+                    spherical=False,
+                )
+                for j in range(n_subspaces)
+            ]
+        )
+        return cls(codebooks)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((len(vectors), self.n_subspaces), dtype=np.uint8)
+        for j, codebook in enumerate(self.codebooks):
+            codes[:, j] = assign_to_centroids(
+                vectors[:, j * self.sub_dimension : (j + 1) * self.sub_dimension],
+                codebook,
+                bias=euclidean_bias(codebook),
+            )
+        return codes
+
+    def score(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # (n_queries, n_subspaces, n_centroids) partial inner products, flattened per query
+        tables = np.einsum(
+            "qmd,mcd->qmc", queries.reshape(len(queries), self.n_subspaces, -1), self.codebooks
+        ).reshape(len(queries), -1)
+        # Position of each code in the flattened table, shared by all queries of the block
+        lookup = codes.astype(np.int32)
+        lookup += np.arange(self.n_subspaces, dtype=np.int32) * self.n_centroids
+        return np.stack([np.take(table, lookup).sum(axis=1) for table in tables])
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "ProductQuantizer":
+        return cls(state["codebooks"])
+
+    @property
+    def nbytes(self) -> int:
+        return self.codebooks.nbytes
+
+
+QUANTIZERS = {q.name: q for q in (Float16Quantizer, Int8Quantizer, ProductQuantizer)}
+
+
+class QuantizedVectorIndex:
+    """
+    Exhaustive inner-product search over quantized codes with exact re-ranking.
+
+    Every row is scored from its codes (memory per row: 2 * dimension bytes
+    for float16, dimension bytes for int8, n_subspaces bytes for pq). The best
+    rerank * k candidates are then re-scored exactly against vectors, the
+    full-precision matrix; without it, the approximate scores are returned.
+    Built once from a full matrix (no incremental add).
+    """
+
+    index_type = "quantized"
+
+    def __init__(
+        self,
+        quantizer,
+        codes: np.ndarray,
+        vectors: Optional[np.ndarray] = None,
+        rerank: int = 4,
+        max_block_elements: int = DEFAULT_MAX_BLOCK_ELEMENTS,
+    ):
+        self.quantizer = quantizer
+        self.codes = codes
+        self.vectors = vectors
+        self.rerank = rerank
+        self.max_block_elements = max_block_elements
+        self.dimension = quantizer.dimension
+        self.ntotal = len(codes)
+
+    @property
+    def compression(self) -> str:
+        return self.quantizer.name
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index itself (codes and codebooks, not the re-rank vectors)."""
+        return self.codes.nbytes + self.quantizer.nbytes
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        compression: str,
+        pq_subspaces: int = 0,
+        train_size: int = PQ_CENTROIDS * 64,
+        seed: int = 0,
+        vectors: Optional[np.ndarray] = None,
+        **kwargs,
+    ) -> "QuantizedVectorIndex":
+        """
+        Train the quantizer on a sample of at most train_size rows of the
+        (L2-normalized) matrix, then encode every row a block at a time.
+        vectors (the re-rank rows) defaults to matrix itself.
+        """
+        if compression not in QUANTIZERS:
+            raise ValueError(
+                f"Unknown compression {compression!r}, expected one of {tuple(QUANTIZERS)}"
+            )
+        n_rows = matrix.shape[0]
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(n_rows, min(n_rows, train_size), replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+        quantizer = QUANTIZERS[compression].train(sample, n_subspaces=pq_subspaces, seed=seed)
+
+        parts = [
+            quantizer.encode(matrix[start : start + ENCODE_BLOCK_ROWS])
+            for start in range(0, n_rows, ENCODE_BLOCK_ROWS)
+        ]
+        codes = np.concatenate(parts) if parts else quantizer.encode(matrix[:0])
+        return cls(quantizer, codes, matrix if vectors is None else vectors, **kwargs)
+
+    def _approximate_top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray] = None,
+        deleted: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k by quantized scores over all rows, or over the given row ids.
+        Rows flagged in the deleted mask are left out.
+        """
+        n_candidates = self.ntotal if rows is None else len(rows)
+        best_scores, best_indices = empty_results(queries.shape[0], k)
+        code_width = self.codes.shape[1] if self.codes.ndim > 1 else 1
+        block_rows = max(
+            1,
+            min(
+                self.max_block_elements // max(queries.shape[0], 1),
+                SCAN_BLOCK_ELEMENTS // code_width,
+            ),
+        )
+        for start in range(0, n_candidates, block_rows):
+            end = min(start + block_rows, n_candidates)
+            block_ids = np.arange(start, end) if rows is None else rows[start:end]
+            codes = self.codes[start:end] if rows is None else self.codes[block_ids]
+            scores = self.quantizer.score(queries, codes).astype(np.float32)
+            if deleted is not None:
+                block_dead = deleted[block_ids]
+                scores[:, block_dead] = -np.inf
+                block_ids = np.where(block_dead, -1, block_ids)
+            best_scores, best_indices = merge_top_k(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_indices, np.broadcast_to(block_ids, scores.shape)], axis=1),
+                k,
+            )
+        return best_scores, best_indices
+
+    def _rerank(
+        self, queries: np.ndarray, candidates: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact scores of each query's candidates against the full-precision vectors."""
+        best_scores, best_indices = empty_results(queries.shape[0], k)
+        for q, query in enumerate(queries):
+            # Sorted ids turn the gather into mostly sequential reads of a memmap
+            rows = np.unique(candidates[q][candidates[q] >= 0])
+            if not len(rows):
+                continue
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            top_scores, top_rows = merge_top_k(scores[None, :], rows[None, :], min(k, len(rows)))
+            best_scores[q, : top_scores.shape[1]] = top_scores[0]
+            best_indices[q, : top_scores.shape[1]] = top_rows[0]
+        return best_scores, best_indices
+
+    def search(
+        self, query_vectors, k: int, deleted: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, indices) of the k best rows not flagged in deleted for every query."""
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if self.ntotal == 0 or k <= 0:
+            return empty_results(queries.shape[0], k)
+        if self.vectors is None:
+            return self._approximate_top_k(queries, k, deleted=deleted)
+        _, candidates = self._approximate_top_k(
+            queries, min(self.ntotal, k * self.rerank), deleted=deleted
+        )
+        return self._rerank(queries, candidates, k)
+
+    def search_subset(self, query_vectors, k: int, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, indices) of the k best rows among the given row ids.
+        Pre-filtered candidate sets are small, so they are scored exactly when
+        the full-precision vectors are available.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension)
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.vectors is not None:
+            return gathered_top_k(
+                queries, self.vectors, k, rows, max_block_elements=self.max_block_elements
+            )
+        return self._approximate_top_k(queries, k, rows)
+
+    def save(self, path: Path):
+        """Save as path.npz (compression and quantizer parameters) and path.codes.npy."""
+        path = Path(path)
+        state = self.quantizer.state()
+        np.savez(path.with_suffix(".npz"), compression=np.array(self.compression), **state)
+        np.save(path.with_suffix(".codes.npy"), self.codes)
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        vectors: Optional[np.ndarray] = None,
+        mmap_mode: Optional[str] = None,
+        rerank: int = 4,
+        **kwargs,
+    ) -> "QuantizedVectorIndex":
+        """
+        Load an index written by save(). The codes are read into memory unless
+        mmap_mode is given; vectors are the full-precision rows used for re-ranking.
+        """
+        path = Path(path)
+        with np.load(path.with_suffix(".npz")) as data:
+            state = {name: data[name] for name in data.files}
+        quantizer = QUANTIZERS[str(state.pop("compression"))].from_state(state)
+        codes = np.load(path.with_suffix(".codes.npy"), mmap_mode=mmap_mode)
+        return cls(quantizer, codes, vectors, rerank, **kwargs)
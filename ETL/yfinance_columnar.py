@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar storage of yfinance extracts.
+
+The spider saves an extract as one JSON file. In the columnar format the
+JSON file keeps only the small fields (ticker, period, info, fast_info,
+news, ...) and a ``tables`` map, and the tabular fields are written as
+Parquet files next to it (``<extract stem>.<field>.parquet``):
+
+- ``history``: one row per bar, with the typed ``Date`` (or ``Datetime``)
+  column and one column per price field.
+- ``dividends``, ``splits``: one row per date, with a ``value`` column.
+- ``earnings``, ``quarterly_earnings``, ``balance_sheet``, ``cashflow``:
+  statements keyed by period date, stored one row per period with a typed
+  ``Date`` column and one column per line item.
+
+Dates are stored as UTC timestamps. Timezone-aware dates keep their UTC
+offset in a ``utc_offset`` column (seconds), so ``read_extract`` gives back
+the exact ISO strings of the JSON layout. A field that does not fit its
+table layout (e.g. statements keyed by year) stays in the JSON file.
+
+``read_extract`` returns an extract in the JSON layout whatever its format,
+loading only the tables and columns asked for; ``read_table`` returns one
+field as a pyarrow Table.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from ETL.price_import import DATE_COLUMNS
+
+TABLE_FILE_SUFFIX = ".parquet"
+DATE_COLUMN = "Date"
+OFFSET_COLUMN = "utc_offset"
+VALUE_COLUMN = "value"
+
+# Extract field -> table layout
+TABLE_LAYOUTS = {
+    "history": "history",
+    "dividends": "series",
+    "splits": "series",
+    "earnings": "statement",
+    "quarterly_earnings": "statement",
+    "balance_sheet": "statement",
+    "cashflow": "statement",
+}
+
+
+def _date_columns(name: str, values: List[str]) -> Dict[str, "pa.Array"]:
+    """Typed timestamp column of ISO date strings, plus their UTC offsets if timezone-aware."""
+    moments = [datetime.fromisoformat(value) for value in values]
+    offsets = [moment.utcoffset() for moment in moments]
+    if all(offset is None for offset in offsets):
+        return {name: pa.array(moments, pa.timestamp("us"))}
+    if any(offset is None for offset in offsets):
+        raise ValueError("mix of naive and timezone-aware dates")
+    return {
+        name: pa.array(moments, pa.timestamp("us", tz="UTC")),
+        OFFSET_COLUMN: pa.array([int(o.total_seconds()) for o in offsets], pa.int32()),
+    }
+
+
+def _utc_offset(seconds: int) -> str:
+    """UTC offset as datetime.isoformat() writes it"""
+    sign = "-" if seconds < 0 else "+"
+    hours, rest = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}" + (f":{seconds:02d}" if seconds else "")
+
+
+def _iso_dates(table: "pa.Table", name: str) -> List[str]:
+    """ISO strings of a date column, formatted in Arrow rather than row by row."""
+    micros = table.column(name).cast(pa.int64())
+    offsets = table.column(OFFSET_COLUMN) if OFFSET_COLUMN in table.column_names else None
+    if offsets is not None:
+        micros = pc.add(micros, pc.multiply(offsets.cast(pa.int64()), 1_000_000))
+    try:
+        # Whole seconds only; isoformat() adds a fraction otherwise
+        local = micros.cast(pa.timestamp("us")).cast(pa.timestamp("s"))
+    except pa.ArrowInvalid:
+        moments = table.column(name).to_pylist()
+        if offsets is None:
+            return [moment.isoformat() for moment in moments]
+        return [
+            moment.astimezone(timezone(timedelta(seconds=offset))).isoformat()
+            for moment, offset in zip(moments, offsets.to_pylist())
+        ]
+    text = pc.strftime(local, "%Y-%m-%dT%H:%M:%S")
+    if offsets is not None:
+        distinct = pc.unique(offsets)
+        suffixes = pa.array([_utc_offset(o) for o in distinct.to_pylist()]).take(
+            pc.index_in(offsets, distinct)
+        )
+        text = pc.binary_join_element_wise(text, suffixes, "")
+    return text.to_pylist()
+
+
+def _values(column: "pa.ChunkedArray") -> List[Any]:
+    # NumPy converts null-free numeric columns to Python lists several times faster
+    if column.null_count == 0 and (
+        pa.types.is_floating(column.type) or pa.types.is_integer(column.type)
+    ):
+        return column.to_numpy().tolist()
+    return column.to_pylist()
+
+
+def _date_name(table: "pa.Table") -> str:
+    return next((name for name in DATE_COLUMNS if name in table.column_names), DATE_COLUMN)
+
+
+def to_table(field: str, value: Any) -> Optional["pa.Table"]:
+    """Table of an extract field in the JSON layout, or None if it does not fit the layout."""
+    layout = TABLE_LAYOUTS.get(field)
+    if not layout or not value or not isinstance(value, dict):
+        return None
+    try:
+        if layout == "history":
+            date_name = next((name for name in DATE_COLUMNS if value.get(name)), None)
+            if date_name is None:
+                return None
+            columns = _date_columns(date_name, value[date_name])
+            for name, values in value.items():
+                if name != date_name:
+                    columns[name] = pa.array(values)
+        elif layout == "series":
+            columns = _date_columns(DATE_COLUMN, list(value))
+            columns[VALUE_COLUMN] = pa.array(list(value.values()))
+        else:
+            if not all(isinstance(items, dict) for items in value.values()):
+                return None
+            columns = _date_columns(DATE_COLUMN, list(value))
+            names = list(dict.fromkeys(name for items in value.values() for name in items))
+            for name in names:
+                columns[str(name)] = pa.array([items.get(name) for items in value.values()])
+        return pa.table(columns)
+    except (ValueError, TypeError, pa.ArrowException):
+        return None
+
+
+def from_table(field: str, table: "pa.Table") -> Any:
+    """Extract field in the JSON layout from its table."""
+    layout = TABLE_LAYOUTS[field]
+    date_name = _date_name(table)
+    dates = _iso_dates(table, date_name)
+    values = {
+        name: _values(table.column(name))
+        for name in table.column_names
+        if name not in (date_name, OFFSET_COLUMN)
+    }
+    if layout == "history":
+        return {date_name: dates, **values}
+    if layout == "series":
+        return dict(zip(dates, values.get(VALUE_COLUMN, [None] * len(dates))))
+    return {
+        date: {name: column[row] for name, column in values.items()}
+        for row, date in enumerate(dates)
+    }
+
+
+def write_extract(data: Dict[str, Any], json_path: str) -> List[str]:
+    """
+    Write an extract in the columnar format: the tables first, then the JSON
+    file listing them, so an extract whose JSON file exists is complete.
+    Returns the paths written, the JSON file last.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for the columnar extract format")
+    directory = os.path.dirname(json_path)
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    document = dict(data)
+    tables = {}
+    written = []
+    for field in TABLE_LAYOUTS:
+        table = to_table(field, data.get(field))
+        if table is None:
+            continue
+        filename = f"{stem}.{field}{TABLE_FILE_SUFFIX}"
+        pq.write_table(table, os.path.join(directory, filename), compression="zstd")
+        written.append(os.path.join(directory, filename))
+        tables[field] = filename
+        del document[field]
+    document["tables"] = tables
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, default=str)
+    written.append(json_path)
+    return written
+
+
+def _read_parquet(path: str, columns: Optional[Iterable[str]]) -> "pa.Table":
+    if columns is None:
+        return pq.read_table(path)
+    names = pq.ParquetFile(path).schema_arrow.names
+    keep = set(columns) | set(DATE_COLUMNS) | {DATE_COLUMN, OFFSET_COLUMN}
+    return pq.read_table(path, columns=[name for name in names if name in keep])
+
+
+def read_extract(
+    json_path: str,
+    tables: Optional[Iterable[str]] = None,
+    columns: Optional[Dict[str, Iterable[str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Extract in the JSON layout, from either format.
+
+    For columnar extracts only the fields in ``tables`` (default all) are
+    loaded, each with only its ``columns[field]`` (default all) and its date
+    columns. JSON extracts are returned whole.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    stored = data.pop("tables", None)
+    if not stored:
+        return data
+    directory = os.path.dirname(json_path)
+    wanted = None if tables is None else set(tables)
+    for field, filename in stored.items():
+        if wanted is not None and field not in wanted:
+            continue
+        table = _read_parquet(os.path.join(directory, filename), (columns or {}).get(field))
+        data[field] = from_table(field, table)
+    return data
+
+
+def read_table(
+    json_path: str, field: str, columns: Optional[Iterable[str]] = None
+) -> Optional["pa.Table"]:
+    """One field of an extract (either format) as a typed table, or None if it has none."""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required to read extract tables")
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    stored = data.get("tables")
+    if stored is not None and field in stored:
+        return _read_parquet(os.path.join(os.path.dirname(json_path), stored[field]), columns)
+    table = to_table(field, data.get(field))
+    if table is None or columns is None:
+        return table
+    keep = set(columns) | set(DATE_COLUMNS) | {DATE_COLUMN, OFFSET_COLUMN}
+    return table.select([name for name in table.column_names if name in keep])
@@ -11,6 +11,8 @@ import logging  # Needed for LoggerAdapter and our custom stream
 import os
 import re
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 import yaml
@@ -25,6 +27,8 @@ from common.core.directory_manager import DataLayer, directory_manager
 from common.logger import setup_logger
 from common.monitoring.progress import create_progress_bar
 from common.utils.general_utils import is_file_recent, sanitize_data, suppress_third_party_logs
+from common.utils.rate_limiting import RateLimiter, call_with_retries
+from ETL.yfinance_columnar import PYARROW_AVAILABLE, write_extract
 
 # Optionally suppress third-party log messages (requests/urllib3)
 suppress_third_party_logs()
@@ -56,14 +60,20 @@ class StreamToLogger(object):
         pass
 
 
-def save_data(ticker, source, oid, data, logger, metadata_manager, config_info):
+def save_data(
+    ticker, source, oid, data, logger, metadata_manager, config_info, output_format="json"
+):
     """
     Save the data as a JSON file with the filename format:
     <ticker>_<source>_<oid>_<date_str>.json.
     The file is stored under data/stage_01_extract/<source>/<date_partition>/<ticker>/.
+    With output_format "parquet", history and statement tables are written as
+    Parquet files next to a JSON file holding the other fields (see
+    ETL/yfinance_columnar.py).
     Before saving, the data is sanitized so that all keys are valid.
     If no data is available, an exception is raised and nothing is saved.
-    Also updates metadata and generates index.
+    Also updates metadata and marks the ticker's README.md index for regeneration
+    (written once per ticker by run_job at the end of the job).
     """
     if not data:
         logger.error(f"No data to save for ticker {ticker}. Skipping save.")
@@ -77,17 +87,38 @@ def save_data(ticker, source, oid, data, logger, metadata_manager, config_info):
     os.makedirs(ticker_dir, exist_ok=True)
     filepath = os.path.join(ticker_dir, filename)
     sanitized_data = sanitize_data(data, logger)
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(sanitized_data, f, ensure_ascii=False, indent=2, default=str)
+    if output_format == "parquet":
+        write_extract(sanitized_data, filepath)
+    else:
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(sanitized_data, f, ensure_ascii=False, indent=2, default=str)
 
-    # Update metadata and generate index
+    # Update metadata; the index is regenerated once per ticker at job end
     metadata_manager.add_file_record(source, ticker, filepath, oid, config_info)
-    metadata_manager.generate_markdown_index(source, ticker)
+    metadata_manager.mark_index_dirty(source, ticker)
 
     return filepath
 
 
-def fetch_stock_data(ticker, period, interval):
+def create_ticker_session(ticker):
+    """
+    Create a yfinance Ticker object for the given symbol.
+    A single session is reused for every period fetched for that ticker so that
+    info, fundamentals and other period-independent data are only downloaded once.
+    """
+    import warnings
+
+    import yfinance as yf
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            return yf.Ticker(ticker)
+        except Exception as e:
+            raise Exception(f"yfinance Ticker initialization error for {ticker}: {e}")
+
+
+def fetch_stock_data(ticker, period, interval, tkr=None, limiter=None):
     """
     Use yfinance to fetch various types of data for the given ticker.
     Data includes:
@@ -102,24 +133,34 @@ def fetch_stock_data(ticker, period, interval):
       - Options data
       - News
     All yfinance calls are wrapped in a warnings context to ignore DeprecationWarnings.
+    An existing Ticker session may be passed as tkr to share it across periods.
+    Every yfinance call is a separate HTTP request, so each one first takes a
+    token from limiter (when given).
     """
     import warnings
 
-    import yfinance as yf
+    if tkr is None:
+        tkr = create_ticker_session(ticker)
+
+    def take_token():
+        if limiter is not None:
+            limiter.acquire()
 
+    take_token()
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", DeprecationWarning)
-        try:
-            tkr = yf.Ticker(ticker)
-        except Exception as e:
-            raise Exception(f"yfinance Ticker initialization error for {ticker}: {e}")
         try:
             hist = tkr.history(period=period, interval=interval)
         except Exception as e:
             raise Exception(f"yfinance history fetching error for {ticker}: {e}")
-    history_data = hist.to_dict(orient="list") if not hist.empty else {}
+    history_data = {}
+    if not hist.empty:
+        # to_dict drops the index, so the bar dates are kept as their own column
+        history_data = {hist.index.name or "Date": [ts.isoformat() for ts in hist.index]}
+        history_data.update(hist.to_dict(orient="list"))
 
     def safe_get(attr, to_dict=False, orient="dict"):
+        take_token()
         try:
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore", DeprecationWarning)
@@ -165,20 +206,13 @@ def fetch_stock_data(ticker, period, interval):
     return data
 
 
-def run_job(config_path):
+def parse_period_items(config):
     """
-    Run the job using the YAML configuration file.
-    The configuration should contain:
-      - tickers: list of ticker symbols
-      - source: string for data source (e.g., "yfinance")
-      - data_periods: list of dictionaries with keys: oid, period, interval
+    Normalize the data_periods config into a list of (oid, period, interval) tuples.
+    Accepts the dict format (new), the list format (legacy) and the api_config
+    "periods" block from common/config/etl/source_yfinance.yml.
     """
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
-
-    tickers = config.get("tickers", [])
-    source = config.get("source", "yfinance")
-    data_periods = config.get("data_periods", {})
+    data_periods = config.get("data_periods", config.get("periods", {}))
 
     # Handle both dict format (new) and list format (legacy)
     if isinstance(data_periods, dict):
@@ -188,101 +222,212 @@ def run_job(config_path):
         # Legacy format: data_periods is a list with oid inside each item
         period_items = [(period_cfg.get("oid"), period_cfg) for period_cfg in data_periods]
 
+    parsed = []
     for oid, period_cfg in period_items:
         # Handle case where period_cfg might be a string (from periods list)
         if isinstance(period_cfg, str):
             # If period_cfg is a string, it's the period value itself
-            period = period_cfg
-            interval = "1d"  # Default interval
+            parsed.append((oid, period_cfg, "1d"))  # Default interval
         else:
             # Normal dictionary format
-            period = period_cfg.get("period")
-            interval = period_cfg.get("interval")
-
-        job_id = f"{source}_{oid}"
-        date_str = datetime.now().strftime("%y%m%d-%H%M%S")
-        exe_id = f"{job_id}_{date_str}"
-
-        # Set up the job-level logger; it writes to file only.
-        logger = setup_logger(job_id, date_str)
-        logger.info(f"Job started: exe_id={exe_id}")
-
-        # Initialize metadata manager
-        metadata_manager = MetadataManager(STAGE_01_EXTRACT_DIR)
-
-        total = len(tickers)
-        success = 0
-        errors = 0
-        skipped = 0
-
-        progress_bar = create_progress_bar(total, description="Tickers Progress")
-        # Create a Snowflake instance for generating unique request log IDs.
-        from common.utils.snowflake import Snowflake
-
-        sf = Snowflake(machine_id=1)
-        for ticker in tickers:
-            # Generate a unique log ID for this ticker request.
-            request_logid = sf.get_id()
-            # Create a LoggerAdapter that adds the request_logid to every log record.
-            ticker_logger = logging.LoggerAdapter(logger, {"request_logid": request_logid})
-            # Redirect sys.stderr to capture underlying errors using ticker_logger.
-            original_stderr = sys.stderr
-            sys.stderr = StreamToLogger(ticker_logger, logging.ERROR)
-
-            # Create config info for this request
-            config_info = {
-                "period": period,
-                "interval": interval,
-                "oid": oid,
-                "exe_id": exe_id,
-            }
-
-            # Check if recent data exists using metadata manager
-            if metadata_manager.check_file_exists_recent(
-                source, ticker, oid, config_info, hours=24
-            ):
-                skipped += 1
-                success += 1
-                ticker_logger.info(f"Ticker {ticker}: Recent data exists (skipped).")
-            else:
-                try:
-                    ticker_logger.info(
-                        f"Fetching data for ticker: {ticker} (period={period}, interval={interval})"
-                    )
-                    data = fetch_stock_data(ticker, period, interval)
-                    if not data:
-                        raise Exception("No data fetched.")
-                    filepath = save_data(
-                        ticker,
-                        source,
-                        oid,
-                        data,
-                        ticker_logger,
-                        metadata_manager,
-                        config_info,
-                    )
-                    success += 1
-                    ticker_logger.info(f"Ticker {ticker}: Data saved at {filepath}")
-                except Exception as e:
-                    errors += 1
-                    error_msg = str(e)
-                    metadata_manager.mark_download_failed(
-                        source, ticker, oid, config_info, error_msg
-                    )
-                    ticker_logger.exception(f"Ticker {ticker}: Error fetching data")
-            # Restore sys.stderr
-            sys.stderr = original_stderr
-            progress_bar.update(1)
+            parsed.append((oid, period_cfg.get("period"), period_cfg.get("interval")))
+    return parsed
+
+
+def fetch_ticker_periods(
+    ticker,
+    period_items,
+    source,
+    exe_id,
+    logger,
+    metadata_manager,
+    rate_limiter=None,
+    max_retries=0,
+    retry_after_seconds=0,
+    ticker_factory=create_ticker_session,
+    output_format="json",
+):
+    """
+    Fetch and save every configured period for one ticker.
+    All periods share a single yf.Ticker session. Every underlying yfinance request
+    takes one token from the shared rate limiter (retries included), so a period
+    fetch is charged once per attribute it downloads.
+    Returns a dict with success/skipped/errors/fetched counts for the ticker.
+    """
+    result = {"success": 0, "skipped": 0, "errors": 0, "fetched": 0}
+    tkr = None
+
+    for oid, period, interval in period_items:
+        # Create config info for this request
+        config_info = {
+            "period": period,
+            "interval": interval,
+            "oid": oid,
+            "exe_id": exe_id,
+        }
+
+        # Check if recent data exists using metadata manager
+        if metadata_manager.check_file_exists_recent(source, ticker, oid, config_info, hours=24):
+            result["skipped"] += 1
+            result["success"] += 1
+            logger.info(f"Ticker {ticker} ({oid}): Recent data exists (skipped).")
+            continue
+
+        try:
+            logger.info(
+                f"Fetching data for ticker: {ticker} (period={period}, interval={interval})"
+            )
+            if tkr is None:
+                tkr = ticker_factory(ticker)
+            data = call_with_retries(
+                lambda: fetch_stock_data(ticker, period, interval, tkr=tkr, limiter=rate_limiter),
+                max_retries=max_retries,
+                retry_after_seconds=retry_after_seconds,
+            )
+            result["fetched"] += 1
+            if not data:
+                raise Exception("No data fetched.")
+            filepath = save_data(
+                ticker, source, oid, data, logger, metadata_manager, config_info, output_format
+            )
+            result["success"] += 1
+            logger.info(f"Ticker {ticker} ({oid}): Data saved at {filepath}")
+        except Exception as e:
+            result["errors"] += 1
+            metadata_manager.mark_download_failed(source, ticker, oid, config_info, str(e))
+            logger.exception(f"Ticker {ticker} ({oid}): Error fetching data")
+
+    return result
+
+
+def run_job(config_path, ticker_factory=create_ticker_session):
+    """
+    Run the job using the YAML configuration file.
+    The configuration should contain:
+      - tickers: list of ticker symbols
+      - source: string for data source (e.g., "yfinance")
+      - data_periods: list of dictionaries with keys: oid, period, interval
+    Optional keys:
+      - rate_limits: requests_per_second, requests_per_minute, retry_after_seconds,
+        max_retries and max_workers (see common/config/etl/source_yfinance.yml)
+      - max_workers: overrides rate_limits.max_workers
+      - markdown_index: regenerate README.md indexes of updated tickers at job end
+        (default true; false skips markdown generation, e.g. on production builds)
+      - output_formats: scenario output formats; with "parquet" listed (and pyarrow
+        installed) extracts are saved in the columnar format
+
+    Tickers are the unit of work: each worker fetches all periods of one ticker,
+    and all workers share one token bucket so the aggregate request rate follows
+    the configured limits. max_workers=1 keeps the sequential behaviour.
+
+    Returns the job summary dict, including the achieved fetch throughput.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    tickers = config.get("tickers", [])
+    source = config.get("source", "yfinance")
+    period_items = parse_period_items(config)
+    rate_limits = config.get("rate_limits", {}) or {}
+    max_workers = max(1, int(config.get("max_workers", rate_limits.get("max_workers", 1))))
+    max_retries = int(rate_limits.get("max_retries", 0))
+    retry_after_seconds = float(rate_limits.get("retry_after_seconds", 0))
+    rate_limiter = RateLimiter.from_config(rate_limits)
+    markdown_index = bool(config.get("markdown_index", True))
+    columnar = "parquet" in (config.get("output_formats") or [])
+    output_format = "parquet" if columnar and PYARROW_AVAILABLE else "json"
+
+    job_id = f"{source}_{'+'.join(str(oid) for oid, _, _ in period_items)}"
+    date_str = datetime.now().strftime("%y%m%d-%H%M%S")
+    exe_id = f"{job_id}_{date_str}"
+
+    # Set up the job-level logger; it writes to file only.
+    logger = setup_logger(job_id, date_str)
+    logger.info(f"Job started: exe_id={exe_id}, workers={max_workers}")
+    if columnar and not PYARROW_AVAILABLE:
+        logger.warning("parquet output requested but pyarrow is not installed; saving JSON")
+
+    # Initialize metadata manager
+    metadata_manager = MetadataManager(STAGE_01_EXTRACT_DIR)
+
+    total = len(tickers) * len(period_items)
+    totals = {"success": 0, "skipped": 0, "errors": 0, "fetched": 0}
+
+    progress_bar = create_progress_bar(len(tickers), description="Tickers Progress")
+    # Create a Snowflake instance for generating unique request log IDs.
+    from common.utils.snowflake import Snowflake
+
+    sf = Snowflake(machine_id=1)
+
+    def process(ticker):
+        # Generate a unique log ID for this ticker request.
+        request_logid = sf.get_id()
+        # Create a LoggerAdapter that adds the request_logid to every log record.
+        ticker_logger = logging.LoggerAdapter(logger, {"request_logid": request_logid})
+        return fetch_ticker_periods(
+            ticker,
+            period_items,
+            source,
+            exe_id,
+            ticker_logger,
+            metadata_manager,
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            retry_after_seconds=retry_after_seconds,
+            ticker_factory=ticker_factory,
+            output_format=output_format,
+        )
+
+    # Redirect sys.stderr to capture underlying errors; workers share the job logger.
+    original_stderr = sys.stderr
+    sys.stderr = StreamToLogger(logger, logging.ERROR)
+    start_time = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(process, ticker) for ticker in tickers]
+            for future in as_completed(futures):
+                for key, value in future.result().items():
+                    totals[key] += value
+                progress_bar.update(1)
+    finally:
+        # Restore sys.stderr
+        sys.stderr = original_stderr
         progress_bar.close()
+    elapsed = time.monotonic() - start_time
 
-        logger.info(f"Job finished: exe_id={exe_id}")
+    indexes_written = 0
+    if markdown_index:
+        index_start = time.monotonic()
+        indexes_written = metadata_manager.flush_markdown_indexes(max_workers=max_workers)
         logger.info(
-            f"Summary: Processed={total}, Success={success}, Skipped={skipped}, Errors={errors}"
-        )
-        print(
-            f"Job summary for {exe_id}: Processed={total}, Success={success}, Skipped={skipped}, Errors={errors}"
+            f"Regenerated {indexes_written} README.md indexes in "
+            f"{time.monotonic() - index_start:.1f}s"
         )
 
+    summary = {
+        "exe_id": exe_id,
+        "processed": total,
+        "success": totals["success"],
+        "skipped": totals["skipped"],
+        "errors": totals["errors"],
+        "fetched": totals["fetched"],
+        "workers": max_workers,
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": totals["fetched"] / elapsed if elapsed > 0 else 0.0,
+        "rate_limit_wait_seconds": rate_limiter.total_wait_seconds,
+        "indexes_written": indexes_written,
+    }
+
+    logger.info(f"Job finished: exe_id={exe_id}")
+    summary_line = (
+        f"Processed={total}, Success={summary['success']}, Skipped={summary['skipped']}, "
+        f"Errors={summary['errors']}, Fetched={summary['fetched']}, "
+        f"Elapsed={elapsed:.1f}s, Throughput={summary['throughput_per_second']:.2f}/s"
+    )
+    logger.info(f"Summary: {summary_line}")
+    print(f"Job summary for {exe_id}: {summary_line}")
+    return summary
+
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
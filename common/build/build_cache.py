@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of build stage outputs.
+
+A cached task declares what its outputs depend on: a config dict, input
+files or directories, and the source files of the code producing them.
+``fingerprint`` hashes all three into the cache key. After a successful run
+the outputs are recorded under that key, each file copied once into a
+content-addressed object store (``objects/ab/abcdef...``), so content shared
+between builds is stored once. A later build with the same key restores the
+outputs (copies, or symlinks into the object store) instead of running the
+task; files already in place with the recorded content are left alone.
+
+File hashes are memoized by (size, mtime_ns, inode), as MetadataManager does
+for downloads, so a no-change rebuild does not re-read unchanged files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .metadata_manager import HASH_BUFFER_SIZE, MetadataManager
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cache entry when the entry layout changes
+CACHE_VERSION = 1
+
+LINK_MODES = ("copy", "symlink")
+
+
+def _atomic_write_json(path: Path, document: Any) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class BuildCache:
+    """
+    Stage output cache under ``cache_dir``.
+
+    ``link`` is how outputs are restored: ``copy`` (default) or ``symlink``.
+    Stored objects are read-only, so writing through a symlinked output fails
+    instead of corrupting the cache.
+    """
+
+    def __init__(self, cache_dir: str, link: str = "copy"):
+        if link not in LINK_MODES:
+            raise ValueError(f"link must be one of {LINK_MODES}, got {link!r}")
+        self.cache_dir = Path(cache_dir)
+        self.link = link
+        self.objects_dir = self.cache_dir / "objects"
+        self.entries_dir = self.cache_dir / "entries"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self._hashes_path = self.cache_dir / "file_hashes.json"
+        self._lock = threading.Lock()
+        try:
+            with open(self._hashes_path, "r", encoding="utf-8") as f:
+                self._hashes: Dict[str, List] = json.load(f)
+        except (OSError, ValueError):
+            self._hashes = {}
+
+    def file_digest(self, path: str) -> str:
+        """SHA-256 of a file, reusing the last hash while its stat fingerprint is unchanged."""
+        path = os.path.abspath(path)
+        fingerprint = MetadataManager.file_fingerprint(path)
+        if fingerprint is None:
+            raise FileNotFoundError(path)
+        with self._lock:
+            known = self._hashes.get(path)
+        if known and tuple(known[:3]) == fingerprint:
+            return known[3]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+                digest.update(chunk)
+        with self._lock:
+            self._hashes[path] = [*fingerprint, digest.hexdigest()]
+        return digest.hexdigest()
+
+    @staticmethod
+    def _files(root: Path) -> List[Tuple[str, Path]]:
+        """(relative path, path) of the files under ``root``, skipping caches and dotfiles."""
+        if root.is_file():
+            return [(".", root)]
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__" and d[0] != ".")
+            for name in sorted(filenames):
+                if name[0] != ".":
+                    path = Path(dirpath) / name
+                    files.append((path.relative_to(root).as_posix(), path))
+        return files
+
+    def _tree(self, root: str) -> Dict[str, str]:
+        return {rel: self.file_digest(path) for rel, path in self._files(Path(root))}
+
+    def fingerprint(
+        self,
+        task: str,
+        config: Optional[Dict[str, Any]] = None,
+        inputs: Iterable[str] = (),
+        sources: Iterable[str] = (),
+    ) -> str:
+        """Cache key of ``task`` from its config and the content of its inputs and sources."""
+        document = {
+            "version": CACHE_VERSION,
+            "task": task,
+            "config": config,
+            "inputs": {str(path): self._tree(path) for path in inputs},
+            "sources": {str(path): self._tree(path) for path in sources},
+        }
+        canonical = json.dumps(document, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cache entry for ``key``, or None if missing or if any of its objects is gone."""
+        try:
+            with open(self.entries_dir / f"{key}.json", "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        for files in entry["outputs"].values():
+            if not all(self._object_path(digest).exists() for digest in files.values()):
+                return None
+        return entry
+
+    def store(self, key: str, task: str, outputs: Iterable[str], value: Any = None):
+        """Record the current content of ``outputs`` (files or directories) under ``key``."""
+        entry_outputs = {}
+        for root in outputs:
+            files = {}
+            for rel, path in self._files(Path(root)):
+                digest = self.file_digest(path)
+                target = self._object_path(digest)
+                if not target.exists():
+                    target.parent.mkdir(exist_ok=True)
+                    tmp_path = target.with_name(f".{digest}.{threading.get_ident()}")
+                    shutil.copyfile(path, tmp_path)
+                    os.chmod(tmp_path, 0o444)
+                    os.replace(tmp_path, target)
+                files[rel] = digest
+            entry_outputs[str(root)] = files
+        entry = {
+            "key": key,
+            "task": task,
+            "created": datetime.now().isoformat(),
+            "value": value,
+            "outputs": entry_outputs,
+        }
+        _atomic_write_json(self.entries_dir / f"{key}.json", entry)
+        return entry
+
+    def restore(self, entry: Dict[str, Any]) -> int:
+        """Put the outputs of ``entry`` in place; returns the number of files written."""
+        restored = 0
+        for root, files in entry["outputs"].items():
+            for rel, digest in files.items():
+                target = Path(root) / rel
+                try:
+                    if self.file_digest(target) == digest:
+                        continue
+                except FileNotFoundError:
+                    pass
+                if target.is_symlink() or target.exists():
+                    target.unlink()
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if self.link == "symlink":
+                    os.symlink(self._object_path(digest), target)
+                else:
+                    shutil.copyfile(self._object_path(digest), target)
+                restored += 1
+        return restored
+
+    def run(
+        self,
+        task: str,
+        func: Callable[[], Any],
+        outputs: Iterable[str],
+        config: Optional[Dict[str, Any]] = None,
+        inputs: Iterable[str] = (),
+        sources: Iterable[str] = (),
+    ) -> Tuple[Any, str, str]:
+        """
+        Restore ``task``'s outputs from the cache, or run ``func`` and cache them.
+
+        Outputs are only cached when ``func`` returns a truthy value. Returns
+        (value, "hit" or "miss", key).
+        """
+        outputs = list(outputs)
+        key = self.fingerprint(task, config, inputs, sources)
+        entry = self.lookup(key)
+        if entry is not None:
+            restored = self.restore(entry)
+            self.save()
+            logger.info(f"Cache hit for {task} ({key[:12]}), {restored} files restored")
+            return entry["value"], "hit", key
+
+        value = func()
+        if value:
+            self.store(key, task, outputs, value)
+        self.save()
+        logger.info(f"Cache miss for {task} ({key[:12]})")
+        return value, "miss", key
+
+    def save(self) -> None:
+        """Persist the file hash memo."""
+        with self._lock:
+            hashes = dict(self._hashes)
+        _atomic_write_json(self._hashes_path, hashes)
@@ -7,7 +7,9 @@ Tracks every build execution with comprehensive manifests and logs.
 import json
 import logging
 import os
+import re
 import shutil
+import threading
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -17,6 +19,9 @@ from ..core.directory_manager import DataLayer, DirectoryManager
 
 logger = logging.getLogger(__name__)
 
+# Replaced in checkpoint file names (task names look like "analysis:MSFT")
+UNSAFE_FILENAME_CHARS = re.compile(r"[^\w.-]")
+
 # Try to import quality reporter, handle gracefully if not available
 try:
     from .quality_reporter import QUALITY_REPORTING_AVAILABLE, setup_quality_reporter
@@ -28,7 +33,7 @@ except ImportError:
 
 
 class BuildTracker:
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, build_id: str = None):
         # Use DirectoryManager for SSOT directory management
         self.directory_manager = DirectoryManager()
 
@@ -42,8 +47,12 @@ class BuildTracker:
             self.build_base_path = Path(base_path)
         self.build_base_path.mkdir(parents=True, exist_ok=True)
 
-        self.build_id = self._generate_build_id()
+        # Given a build_id, reopen that build to resume it from its checkpoints
+        self.build_id = build_id or self._generate_build_id()
         self.build_path = self.build_base_path / f"build_{self.build_id}"
+        manifest_path = self.build_path / "BUILD_MANIFEST.json"
+        if build_id and not manifest_path.exists():
+            raise ValueError(f"No build to resume: {manifest_path} not found")
         self.build_path.mkdir(exist_ok=True)
 
         # Create subdirectories
@@ -53,6 +62,9 @@ class BuildTracker:
         # Initialize quality reporter (will be set up in start_build)
         self.quality_reporter = None
 
+        # Stage tasks may run in worker threads (see common.build.stage_executor)
+        self._lock = threading.RLock()
+
         self.manifest = {
             "build_info": {
                 "build_id": self.build_id,
@@ -118,6 +130,18 @@ class BuildTracker:
             },
         }
 
+        # Completed (stage, unit) work recorded by checkpoint(), keyed by stage then unit
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+        if build_id:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            self.manifest["build_info"]["status"] = "in_progress"
+            self.manifest["build_info"]["end_time"] = None
+            self.manifest["build_info"].setdefault("resumed_at", []).append(
+                datetime.now().isoformat()
+            )
+            self._load_checkpoints()
+
     def _generate_build_id(self) -> str:
         """Generate unique build ID with timestamp"""
         return datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -220,11 +244,63 @@ class BuildTracker:
     def add_warning(self, stage: str, warning_message: str) -> None:
         """Add a warning to the build"""
         logger.warning(f"Stage {stage} warning: {warning_message}")
-        self.manifest["statistics"]["warnings"].append(
-            {"stage": stage, "warning": warning_message, "timestamp": datetime.now().isoformat()}
-        )
+        with self._lock:
+            self.manifest["statistics"]["warnings"].append(
+                {
+                    "stage": stage,
+                    "warning": warning_message,
+                    "timestamp": datetime.now().isoformat(),
+                }
+            )
+            self._save_manifest()
+
+    def record_cache(self, stage: str, task: str, status: str, key: str) -> None:
+        """Record whether a stage task was restored from the build cache ("hit") or ran ("miss")"""
+        if stage not in self.manifest["stages"]:
+            raise ValueError(f"Unknown stage: {stage}")
 
-        self._save_manifest()
+        logger.info(f"Stage {stage} task {task}: cache {status}")
+        with self._lock:
+            cache = self.manifest["stages"][stage].setdefault("cache", {})
+            cache[task] = {"status": status, "key": key}
+            self._save_manifest()
+
+    def checkpoint(self, stage: str, unit: str, value: Any = True) -> None:
+        """Durably record that ``unit`` (e.g. a ticker's task) of ``stage`` has completed"""
+        if stage not in self.manifest["stages"]:
+            raise ValueError(f"Unknown stage: {stage}")
+
+        checkpoint_dir = self.build_path / "checkpoints" / stage
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        path = checkpoint_dir / f"{UNSAFE_FILENAME_CHARS.sub('_', unit)}.json"
+        record = {"stage": stage, "unit": unit, "value": value, "time": datetime.now().isoformat()}
+        # Write and rename, so a crash never leaves a half-written checkpoint
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.checkpoints.setdefault(stage, {})[unit] = value
+
+    def get_checkpoint(self, stage: str, unit: str) -> Optional[Dict[str, Any]]:
+        """``{"value": ...}`` recorded for a completed unit, or None if it has not completed"""
+        with self._lock:
+            units = self.checkpoints.get(stage, {})
+            return {"value": units[unit]} if unit in units else None
+
+    def _load_checkpoints(self) -> None:
+        for path in sorted((self.build_path / "checkpoints").glob("*/*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                logger.warning(f"Ignoring unreadable checkpoint {path}")
+                continue
+            self.checkpoints.setdefault(record["stage"], {})[record["unit"]] = record["value"]
+        logger.info(
+            f"Resuming build {self.build_id} with "
+            f"{sum(len(units) for units in self.checkpoints.values())} checkpointed units"
+        )
 
     def log_stage_output(self, stage: str, log_content: str) -> None:
         """Save stage execution logs"""
@@ -233,7 +309,7 @@ class BuildTracker:
 
         log_file = log_dir / f"{stage}.log"
 
-        with open(log_file, "a", encoding="utf-8") as f:
+        with self._lock, open(log_file, "a", encoding="utf-8") as f:
             f.write(f"[{datetime.now().isoformat()}]\n")
             f.write(log_content)
             f.write("\n\n")
@@ -339,8 +415,12 @@ class BuildTracker:
         self.build_path.mkdir(parents=True, exist_ok=True)
 
         manifest_path = self.build_path / "BUILD_MANIFEST.json"
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            json.dump(self.manifest, f, indent=2)
+        with self._lock:
+            # Write and rename, so readers never see a half-written manifest
+            tmp_path = manifest_path.with_name(f".{manifest_path.name}.{threading.get_ident()}")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(tmp_path, manifest_path)
 
     def _generate_build_report(self) -> None:
         """Generate human-readable build report"""
@@ -368,6 +448,8 @@ class BuildTracker:
                 f.write(f"- **Start Time**: {info['start_time']}\n")
                 f.write(f"- **End Time**: {info['end_time']}\n")
                 f.write(f"- **Artifacts**: {len(info['artifacts'])} files\n")
+                for task, cache in info.get("cache", {}).items():
+                    f.write(f"- **Cache** ({task}): {cache['status']}\n")
 
                 if info["artifacts"]:
                     f.write("  - " + "\n  - ".join(info["artifacts"]) + "\n")
@@ -492,6 +574,7 @@ class BuildTracker:
         tracker.build_base_path = build_base_path
         tracker.build_id = build_id
         tracker.build_path = latest_build_path
+        tracker._lock = threading.RLock()
 
         # Load existing manifest
         manifest_path = latest_build_path / "BUILD_MANIFEST.json"
@@ -682,9 +765,12 @@ data/stage_01_extract/sec_edgar/
 **Storage Location**:
 ```
 data/stage_03_load/embeddings/
-├── embeddings_vectors.npy      # Vector data
-├── embeddings_metadata.json    # Metadata
-└── vector_index.faiss          # FAISS index
+├── segments.json                      # Segment list, tombstones, document -> row range
+└── segment_000001/                    # One segment per full build or daily delta
+    ├── embeddings_manifest.json       # Segment header (count, dimension, dtype)
+    ├── embeddings_vectors.npy         # Normalized float32 vectors (memory-mapped)
+    ├── embeddings_metadata.jsonl      # Per-row metadata
+    └── embeddings_metadata.offsets.npy  # Row id -> metadata byte offset
 ```
 
 ### Stage 3: Semantic Retrieval
@@ -9,6 +9,7 @@ This script provides commands for managing download metadata including:
 - Retrying failed downloads
 - Generating markdown indexes
 - Cleaning up orphaned metadata
+- Migrating legacy .metadata.json files into the metadata database
 """
 
 import argparse
@@ -43,8 +44,7 @@ def list_sources_and_tickers(metadata_manager):
             ticker_dirs = [d for d in source_dir.iterdir() if d.is_dir()]
             if ticker_dirs:
                 for ticker_dir in sorted(ticker_dirs):
-                    metadata_path = ticker_dir / ".metadata.json"
-                    if metadata_path.exists():
+                    if metadata_manager.has_metadata(source_dir.name, ticker_dir.name):
                         print(f"   ✓ {ticker_dir.name} (with metadata)")
                     else:
                         print(f"   ❌ {ticker_dir.name} (no metadata)")
@@ -116,8 +116,7 @@ def generate_indexes(metadata_manager, source=None, ticker=None):
         for ticker_dir in source_dir.iterdir():
             if ticker_dir.is_dir():
                 ticker = ticker_dir.name
-                metadata_path = ticker_dir / ".metadata.json"
-                if metadata_path.exists():
+                if metadata_manager.has_metadata(source, ticker):
                     print(f"  Processing {ticker}...")
                     metadata_manager.generate_markdown_index(source, ticker)
         print(f"✓ Generated indexes for all tickers in {source}")
@@ -131,8 +130,7 @@ def generate_indexes(metadata_manager, source=None, ticker=None):
                 for ticker_dir in source_dir.iterdir():
                     if ticker_dir.is_dir():
                         ticker = ticker_dir.name
-                        metadata_path = ticker_dir / ".metadata.json"
-                        if metadata_path.exists():
+                        if metadata_manager.has_metadata(source, ticker):
                             print(f"  Processing {ticker}...")
                             metadata_manager.generate_markdown_index(source, ticker)
         print("✓ Generated indexes for all sources and tickers")
@@ -221,8 +219,7 @@ def cleanup_orphaned(metadata_manager, source=None, ticker=None):
         for ticker_dir in source_dir.iterdir():
             if ticker_dir.is_dir():
                 ticker = ticker_dir.name
-                metadata_path = ticker_dir / ".metadata.json"
-                if metadata_path.exists():
+                if metadata_manager.has_metadata(source, ticker):
                     print(f"  Processing {ticker}...")
                     metadata_manager.cleanup_orphaned_metadata(source, ticker)
         print(f"✓ Cleaned orphaned metadata for all tickers in {source}")
@@ -236,18 +233,27 @@ def cleanup_orphaned(metadata_manager, source=None, ticker=None):
                 for ticker_dir in source_dir.iterdir():
                     if ticker_dir.is_dir():
                         ticker = ticker_dir.name
-                        metadata_path = ticker_dir / ".metadata.json"
-                        if metadata_path.exists():
+                        if metadata_manager.has_metadata(source, ticker):
                             print(f"  Processing {ticker}...")
                             metadata_manager.cleanup_orphaned_metadata(source, ticker)
         print("✓ Cleaned orphaned metadata for all sources and tickers")
 
 
+def migrate_metadata(metadata_manager):
+    """Import legacy per-ticker .metadata.json files into the metadata database."""
+    if not Path(metadata_manager.base_data_dir).exists():
+        print("No data directory found.")
+        return
+
+    imported = metadata_manager.migrate_json_metadata()
+    print(f"✓ Imported {imported} tickers into {metadata_manager.db_path}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Manage download metadata")
     parser.add_argument(
         "command",
-        choices=["list", "rebuild", "index", "failures", "cleanup"],
+        choices=["list", "rebuild", "index", "failures", "cleanup", "migrate"],
         help="Command to execute",
     )
     parser.add_argument("--source", "-s", help="Source name (e.g., 'yfinance', 'sec-edgar')")
@@ -268,6 +274,8 @@ def main():
         show_failed_downloads(metadata_manager, args.source, args.ticker)
     elif args.command == "cleanup":
         cleanup_orphaned(metadata_manager, args.source, args.ticker)
+    elif args.command == "migrate":
+        migrate_metadata(metadata_manager)
 
 
 if __name__ == "__main__":
@@ -3,114 +3,410 @@
 
 import hashlib
 import json
+import logging
 import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Read size for streaming file hashes
+HASH_BUFFER_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickers (
+    source TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    version TEXT NOT NULL,
+    PRIMARY KEY (source, ticker)
+);
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    filepath TEXT NOT NULL,
+    data_type TEXT,
+    config_hash TEXT NOT NULL,
+    file_size INTEGER,
+    md5_hash TEXT,
+    created_at TEXT NOT NULL,
+    record TEXT NOT NULL,
+    mtime_ns INTEGER,
+    inode INTEGER,
+    PRIMARY KEY (source, ticker, filename)
+);
+CREATE INDEX IF NOT EXISTS files_by_config
+    ON files (source, ticker, data_type, config_hash, created_at);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    action TEXT,
+    data_type TEXT,
+    config_hash TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_by_action
+    ON history (source, ticker, action, data_type, config_hash);
+CREATE TABLE IF NOT EXISTS dirty_indexes (
+    source TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    PRIMARY KEY (source, ticker)
+);
+"""
 
 
 class MetadataManager:
     """
     Manages download metadata including MD5 checksums, timestamps, and download tracking.
     Prevents unnecessary re-downloads and enables partial retry functionality.
+
+    Records are kept in one SQLite database per data directory (.metadata.sqlite):
+    a new file record is a single upsert and a history event a single append, so
+    writes cost the same however long a ticker's history grows, and freshness and
+    failure lookups are indexed by (source, ticker, data_type, config hash).
+    Legacy per-ticker .metadata.json files are imported the first time a ticker
+    is accessed (or all at once by migrate_json_metadata) and are no longer written.
+
+    Each file record also keeps the (size, mtime_ns, inode) fingerprint seen when
+    its hash was computed. Freshness checks trust the stored hash while the
+    fingerprint is unchanged and re-hash the file only when it differs.
+
+    README.md indexes can be regenerated lazily: writers call mark_index_dirty
+    and the job calls flush_markdown_indexes once at the end, so each ticker's
+    index is written once per run rather than once per saved file. Dirty
+    tickers are kept in the database until their index is written, so an
+    index that fails to generate is retried by the next run's flush.
     """
 
-    def __init__(self, base_data_dir: str):
+    db_filename = ".metadata.sqlite"
+    metadata_version = "1.0.0"
+
+    def __init__(self, base_data_dir: str, db_path: Optional[str] = None):
         self.base_data_dir = base_data_dir
         self.metadata_filename = ".metadata.json"
         self.index_filename = "README.md"
+        self.db_path = db_path or os.path.join(base_data_dir, self.db_filename)
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._known_tickers = set()
+        # Tickers already recorded in dirty_indexes since the last flush
+        self._dirty_indexes = set()
+        # source -> (source dir mtime_ns, partition names), refreshed when the mtime changes
+        self._partitions: Dict[str, Tuple[int, List[str]]] = {}
+
+    # ------------------------------------------------------------------ paths
+
+    def _date_partitions(self, source: str) -> List[str]:
+        """Sorted date partition names under a source, re-listed only when the directory changes."""
+        source_dir = os.path.join(self.base_data_dir, source)
+        try:
+            mtime_ns = os.stat(source_dir).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._partitions.get(source)
+        if cached is None or cached[0] != mtime_ns:
+            partitions = sorted(
+                d
+                for d in os.listdir(source_dir)
+                if d.isdigit() and os.path.isdir(os.path.join(source_dir, d))
+            )
+            cached = (mtime_ns, partitions)
+            self._partitions[source] = cached
+        return cached[1]
 
-    def get_metadata_path(self, source: str, ticker: str) -> str:
-        """Get the metadata file path for a specific ticker in the latest partition."""
-        # Use latest symlink or find most recent partition
+    def _ticker_dir(self, source: str, ticker: str) -> str:
+        """Ticker directory in the latest partition (latest symlink, newest date, or flat)."""
         latest_link = os.path.join(self.base_data_dir, source, "latest")
         if os.path.exists(latest_link):
-            ticker_dir = os.path.join(latest_link, ticker)
-        else:
-            # Fallback: find most recent date partition
-            source_dir = os.path.join(self.base_data_dir, source)
-            if os.path.exists(source_dir):
-                date_dirs = [
-                    d
-                    for d in os.listdir(source_dir)
-                    if os.path.isdir(os.path.join(source_dir, d)) and d.isdigit()
-                ]
-                if date_dirs:
-                    latest_date = max(date_dirs)
-                    ticker_dir = os.path.join(source_dir, latest_date, ticker)
-                else:
-                    # Fallback to old structure
-                    ticker_dir = os.path.join(source_dir, ticker)
-            else:
-                ticker_dir = os.path.join(self.base_data_dir, source, ticker)
-
-        return os.path.join(ticker_dir, self.metadata_filename)
+            return os.path.join(latest_link, ticker)
+        partitions = self._date_partitions(source)
+        if partitions:
+            return os.path.join(self.base_data_dir, source, partitions[-1], ticker)
+        # Fallback to old structure
+        return os.path.join(self.base_data_dir, source, ticker)
+
+    def get_metadata_path(self, source: str, ticker: str) -> str:
+        """Get the legacy metadata file path for a specific ticker in the latest partition."""
+        return os.path.join(self._ticker_dir(source, ticker), self.metadata_filename)
 
     def get_index_path(self, source: str, ticker: str) -> str:
         """Get the README.md index file path for a specific ticker in the latest partition."""
-        # Use latest symlink or find most recent partition
-        latest_link = os.path.join(self.base_data_dir, source, "latest")
-        if os.path.exists(latest_link):
-            ticker_dir = os.path.join(latest_link, ticker)
-        else:
-            # Fallback: find most recent date partition
-            source_dir = os.path.join(self.base_data_dir, source)
-            if os.path.exists(source_dir):
-                date_dirs = [
-                    d
-                    for d in os.listdir(source_dir)
-                    if os.path.isdir(os.path.join(source_dir, d)) and d.isdigit()
-                ]
-                if date_dirs:
-                    latest_date = max(date_dirs)
-                    ticker_dir = os.path.join(source_dir, latest_date, ticker)
-                else:
-                    # Fallback to old structure
-                    ticker_dir = os.path.join(source_dir, ticker)
-            else:
-                ticker_dir = os.path.join(self.base_data_dir, source, ticker)
-
-        return os.path.join(ticker_dir, self.index_filename)
+        return os.path.join(self._ticker_dir(source, ticker), self.index_filename)
+
+    def _legacy_metadata_paths(self, source: str, ticker: str) -> List[str]:
+        """Existing .metadata.json files of a ticker, oldest partition first."""
+        source_dir = os.path.join(self.base_data_dir, source)
+        candidates = [os.path.join(source_dir, ticker, self.metadata_filename)]
+        candidates += [
+            os.path.join(source_dir, partition, ticker, self.metadata_filename)
+            for partition in self._date_partitions(source)
+        ]
+        return [path for path in candidates if os.path.isfile(path)]
+
+    # --------------------------------------------------------------- database
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._upgrade_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _upgrade_schema(conn: sqlite3.Connection) -> None:
+        """Add fingerprint columns to databases created before they existed."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+        with conn:
+            for column in ("mtime_ns", "inode"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE files ADD COLUMN {column} INTEGER")
+
+    @staticmethod
+    def file_fingerprint(filepath: str) -> Optional[Tuple[int, int, int]]:
+        """(size, mtime_ns, inode) of a file, or None if it does not exist."""
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+    def close(self) -> None:
+        """Close the database connection (reopened on next use)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._known_tickers.clear()
+
+    @staticmethod
+    def config_hash(config_info: Optional[Dict[str, Any]]) -> str:
+        """Stable digest of a config, ignoring exe_id (see _config_matches_ignore_exe_id)."""
+        if config_info is None:
+            return ""
+        filtered = {k: v for k, v in config_info.items() if k != "exe_id"}
+        canonical = json.dumps(filtered, sort_keys=True, default=str)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    def _ensure_ticker(self, conn: sqlite3.Connection, source: str, ticker: str) -> None:
+        """Import legacy JSON metadata the first time a ticker is seen."""
+        if (source, ticker) in self._known_tickers:
+            return
+        exists = conn.execute(
+            "SELECT 1 FROM tickers WHERE source = ? AND ticker = ?", (source, ticker)
+        ).fetchone()
+        if not exists:
+            legacy = [self._read_json(path) for path in self._legacy_metadata_paths(source, ticker)]
+            legacy = [metadata for metadata in legacy if metadata]
+            if legacy:
+                with conn:
+                    self._import_metadata(conn, source, ticker, self._merge_metadata(legacy))
+        self._known_tickers.add((source, ticker))
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _merge_metadata(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine the per-partition JSON documents of one ticker."""
+        merged = dict(documents[-1])
+        merged["created_at"] = min(d.get("created_at", merged["created_at"]) for d in documents)
+        merged["files"] = {}
+        merged["download_history"] = []
+        for document in documents:
+            merged["files"].update(document.get("files", {}))
+            merged["download_history"].extend(document.get("download_history", []))
+        merged["download_history"].sort(key=lambda record: record.get("timestamp", ""))
+        return merged
+
+    def _touch_ticker(self, conn: sqlite3.Connection, source: str, ticker: str) -> None:
+        now = datetime.now().isoformat()
+        conn.execute(
+            "INSERT INTO tickers (source, ticker, created_at, updated_at, version) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, ticker) DO UPDATE SET updated_at = excluded.updated_at",
+            (source, ticker, now, now, self.metadata_version),
+        )
+
+    def _put_file(
+        self,
+        conn: sqlite3.Connection,
+        source: str,
+        ticker: str,
+        record: Dict,
+        fingerprint: Optional[Tuple[int, int, int]] = None,
+    ) -> None:
+        """Upsert a file record; fingerprint is the stat seen when md5_hash was computed."""
+        _, mtime_ns, inode = fingerprint or (None, None, None)
+        conn.execute(
+            "INSERT INTO files (source, ticker, filename, filepath, data_type, config_hash, "
+            "file_size, md5_hash, created_at, record, mtime_ns, inode) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, ticker, filename) DO UPDATE SET "
+            "filepath = excluded.filepath, data_type = excluded.data_type, "
+            "config_hash = excluded.config_hash, file_size = excluded.file_size, "
+            "md5_hash = excluded.md5_hash, created_at = excluded.created_at, "
+            "record = excluded.record, mtime_ns = excluded.mtime_ns, inode = excluded.inode",
+            (
+                source,
+                ticker,
+                record["filename"],
+                record.get("filepath", ""),
+                record.get("data_type"),
+                self.config_hash(record.get("config_info")),
+                record.get("file_size", 0),
+                record.get("md5_hash", ""),
+                record.get("created_at", ""),
+                json.dumps(record, ensure_ascii=False, default=str),
+                mtime_ns,
+                inode,
+            ),
+        )
+
+    def _append_history(
+        self, conn: sqlite3.Connection, source: str, ticker: str, records: Iterable[Dict]
+    ) -> None:
+        conn.executemany(
+            "INSERT INTO history (source, ticker, timestamp, action, data_type, config_hash, "
+            "record) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    source,
+                    ticker,
+                    record.get("timestamp", ""),
+                    record.get("action"),
+                    record.get("data_type"),
+                    self.config_hash(record["config_info"]) if "config_info" in record else None,
+                    json.dumps(record, ensure_ascii=False, default=str),
+                )
+                for record in records
+            ],
+        )
+
+    def _import_metadata(
+        self, conn: sqlite3.Connection, source: str, ticker: str, metadata: Dict[str, Any]
+    ) -> None:
+        """Replace everything stored for a ticker with a metadata document."""
+        conn.execute("DELETE FROM files WHERE source = ? AND ticker = ?", (source, ticker))
+        conn.execute("DELETE FROM history WHERE source = ? AND ticker = ?", (source, ticker))
+        now = datetime.now().isoformat()
+        conn.execute(
+            "INSERT OR REPLACE INTO tickers (source, ticker, created_at, updated_at, version) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                source,
+                ticker,
+                metadata.get("created_at", now),
+                metadata.get("updated_at", now),
+                metadata.get("version", self.metadata_version),
+            ),
+        )
+        for filename, record in metadata.get("files", {}).items():
+            self._put_file(conn, source, ticker, dict(record, filename=filename))
+        self._append_history(conn, source, ticker, metadata.get("download_history", []))
+
+    def migrate_json_metadata(self) -> int:
+        """
+        Import every legacy .metadata.json under base_data_dir whose ticker is not
+        in the database yet. Returns the number of tickers imported.
+        """
+        found = set()
+        for root, _dirs, files in os.walk(self.base_data_dir):
+            if self.metadata_filename in files:
+                metadata = self._read_json(os.path.join(root, self.metadata_filename)) or {}
+                relative = os.path.relpath(root, self.base_data_dir).split(os.sep)
+                source = metadata.get("source") or relative[0]
+                found.add((source, metadata.get("ticker") or relative[-1]))
+
+        imported = 0
+        with self._lock:
+            conn = self._connection()
+            for source, ticker in sorted(found):
+                known = conn.execute(
+                    "SELECT 1 FROM tickers WHERE source = ? AND ticker = ?", (source, ticker)
+                ).fetchone()
+                self._ensure_ticker(conn, source, ticker)
+                imported += not known
+        return imported
+
+    def has_metadata(self, source: str, ticker: str) -> bool:
+        """Whether any metadata (stored or legacy JSON) exists for a ticker."""
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            row = conn.execute(
+                "SELECT 1 FROM tickers WHERE source = ? AND ticker = ?", (source, ticker)
+            ).fetchone()
+        return row is not None
 
     def calculate_file_md5(self, filepath: str) -> str:
         """Calculate MD5 hash of a file."""
         hash_md5 = hashlib.md5()
         try:
             with open(filepath, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
+                for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
                     hash_md5.update(chunk)
             return hash_md5.hexdigest()
         except Exception:
             return ""
 
-    def load_metadata(self, source: str, ticker: str) -> Dict[str, Any]:
-        """Load existing metadata for a ticker."""
-        metadata_path = self.get_metadata_path(source, ticker)
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                pass
+    def load_metadata(
+        self, source: str, ticker: str, history_limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Load existing metadata for a ticker (only the latest history_limit history records)."""
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            header = conn.execute(
+                "SELECT created_at, updated_at, version FROM tickers "
+                "WHERE source = ? AND ticker = ?",
+                (source, ticker),
+            ).fetchone()
+            files = conn.execute(
+                "SELECT filename, record FROM files WHERE source = ? AND ticker = ? ORDER BY rowid",
+                (source, ticker),
+            ).fetchall()
+            history = conn.execute(
+                "SELECT record FROM history WHERE source = ? AND ticker = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (source, ticker, -1 if history_limit is None else history_limit),
+            ).fetchall()[::-1]
+
+        now = datetime.now().isoformat()
+        created_at, updated_at, version = header or (now, now, self.metadata_version)
         return {
             "ticker": ticker,
             "source": source,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
-            "version": "1.0.0",
-            "files": {},
-            "download_history": [],
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "version": version,
+            "files": {filename: json.loads(record) for filename, record in files},
+            "download_history": [json.loads(record) for (record,) in history],
         }
 
     def save_metadata(self, source: str, ticker: str, metadata: Dict[str, Any]) -> None:
-        """Save metadata for a ticker."""
-        ticker_dir = os.path.join(self.base_data_dir, source, ticker)
-        os.makedirs(ticker_dir, exist_ok=True)
-
+        """Replace all stored metadata for a ticker."""
         metadata["updated_at"] = datetime.now().isoformat()
-        metadata_path = self.get_metadata_path(source, ticker)
-
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._import_metadata(conn, source, ticker, metadata)
+            self._known_tickers.add((source, ticker))
 
     def add_file_record(
         self,
@@ -121,10 +417,10 @@ class MetadataManager:
         config_info: Dict[str, Any],
     ) -> None:
         """Add a file record to metadata."""
-        metadata = self.load_metadata(source, ticker)
-
         filename = os.path.basename(filepath)
-        file_size = os.path.getsize(filepath) if os.path.exists(filepath) else 0
+        # Stat before hashing: a write racing the hash leaves a stale fingerprint, not a bad hash
+        fingerprint = self.file_fingerprint(filepath)
+        file_size = fingerprint[0] if fingerprint else 0
         md5_hash = self.calculate_file_md5(filepath)
 
         file_record = {
@@ -137,8 +433,6 @@ class MetadataManager:
             "config_info": config_info,
         }
 
-        metadata["files"][filename] = file_record
-
         # Add to download history
         history_record = {
             "timestamp": datetime.now().isoformat(),
@@ -147,9 +441,14 @@ class MetadataManager:
             "data_type": data_type,
             "file_size": file_size,
         }
-        metadata["download_history"].append(history_record)
 
-        self.save_metadata(source, ticker, metadata)
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            with conn:
+                self._touch_ticker(conn, source, ticker)
+                self._put_file(conn, source, ticker, file_record, fingerprint)
+                self._append_history(conn, source, ticker, [history_record])
 
     def _config_matches_ignore_exe_id(
         self, config1: Dict[str, Any], config2: Dict[str, Any]
@@ -172,36 +471,59 @@ class MetadataManager:
         config_info: Dict[str, Any],
         hours: int = 24,
     ) -> bool:
-        """Check if a recent file with matching config exists."""
-        metadata = self.load_metadata(source, ticker)
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        """
+        Check if a recent file with matching config exists.
 
-        for filename, file_record in metadata["files"].items():
-            if file_record.get("data_type") == data_type and self._config_matches_ignore_exe_id(
-                file_record.get("config_info"), config_info
-            ):
-
-                created_at = datetime.fromisoformat(file_record["created_at"])
-                if created_at > cutoff_time:
-                    # Verify file still exists and matches MD5
-                    filepath = file_record["filepath"]
-                    if os.path.exists(filepath) and self.calculate_file_md5(
-                        filepath
-                    ) == file_record.get("md5_hash", ""):
-                        return True
+        A file whose (size, mtime_ns, inode) still matches the fingerprint stored
+        with its hash is trusted without reading it; otherwise it is re-hashed and,
+        if the hash still matches, the new fingerprint is stored.
+        """
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            candidates = conn.execute(
+                "SELECT record, file_size, mtime_ns, inode FROM files "
+                "WHERE source = ? AND ticker = ? AND data_type = ? "
+                "AND config_hash = ? AND created_at > ? ORDER BY created_at DESC",
+                (source, ticker, data_type, self.config_hash(config_info), cutoff_time.isoformat()),
+            ).fetchall()
+
+        for record, file_size, mtime_ns, inode in candidates:
+            file_record = json.loads(record)
+            if not self._config_matches_ignore_exe_id(file_record.get("config_info"), config_info):
+                continue
+            filepath = file_record["filepath"]
+            fingerprint = self.file_fingerprint(filepath)
+            if fingerprint is None:
+                continue
+            if fingerprint == (file_size, mtime_ns, inode):
+                return True
+            # Stat changed (or was never recorded): verify file still matches MD5
+            if self.calculate_file_md5(filepath) == file_record.get("md5_hash", ""):
+                with self._lock:
+                    conn = self._connection()
+                    with conn:
+                        conn.execute(
+                            "UPDATE files SET file_size = ?, mtime_ns = ?, inode = ? "
+                            "WHERE source = ? AND ticker = ? AND filename = ?",
+                            (*fingerprint, source, ticker, file_record["filename"]),
+                        )
+                return True
 
         return False
 
     def get_failed_downloads(self, source: str, ticker: str) -> List[Dict[str, Any]]:
         """Get list of failed download attempts for retry."""
-        metadata = self.load_metadata(source, ticker)
-        failed_downloads = []
-
-        for record in metadata["download_history"]:
-            if record.get("action") == "download_failed":
-                failed_downloads.append(record)
-
-        return failed_downloads
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            rows = conn.execute(
+                "SELECT record FROM history WHERE source = ? AND ticker = ? "
+                "AND action = 'download_failed' ORDER BY id",
+                (source, ticker),
+            ).fetchall()
+        return [json.loads(record) for (record,) in rows]
 
     def mark_download_failed(
         self,
@@ -212,8 +534,6 @@ class MetadataManager:
         error_msg: str,
     ) -> None:
         """Mark a download as failed for later retry."""
-        metadata = self.load_metadata(source, ticker)
-
         failure_record = {
             "timestamp": datetime.now().isoformat(),
             "action": "download_failed",
@@ -221,13 +541,17 @@ class MetadataManager:
             "config_info": config_info,
             "error_message": error_msg,
         }
-        metadata["download_history"].append(failure_record)
 
-        self.save_metadata(source, ticker, metadata)
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            with conn:
+                self._touch_ticker(conn, source, ticker)
+                self._append_history(conn, source, ticker, [failure_record])
 
     def generate_markdown_index(self, source: str, ticker: str) -> None:
         """Generate README.md index for a ticker directory."""
-        metadata = self.load_metadata(source, ticker)
+        metadata = self.load_metadata(source, ticker, history_limit=10)
         ticker_dir = os.path.join(self.base_data_dir, source, ticker)
         index_path = self.get_index_path(source, ticker)
 
@@ -309,6 +633,56 @@ class MetadataManager:
         with open(index_path, "w", encoding="utf-8") as f:
             f.write(markdown_content)
 
+    def mark_index_dirty(self, source: str, ticker: str) -> None:
+        """Record that a ticker's README.md index is out of date (see flush_markdown_indexes)."""
+        with self._lock:
+            if (source, ticker) in self._dirty_indexes:
+                return
+            conn = self._connection()
+            with conn:
+                # REPLACE gives a new rowid, so a flush in progress keeps this mark
+                conn.execute(
+                    "INSERT OR REPLACE INTO dirty_indexes (source, ticker) VALUES (?, ?)",
+                    (source, ticker),
+                )
+            self._dirty_indexes.add((source, ticker))
+
+    def flush_markdown_indexes(self, max_workers: int = 1) -> int:
+        """
+        Regenerate the README.md index of every ticker marked dirty, once each,
+        optionally in a thread pool. Tickers whose index fails to generate stay
+        in the database and are retried by the next flush, in this run or a
+        later one. Returns the number of indexes written.
+        """
+        with self._lock:
+            conn = self._connection()
+            dirty = conn.execute(
+                "SELECT rowid, source, ticker FROM dirty_indexes ORDER BY source, ticker"
+            ).fetchall()
+            self._dirty_indexes.clear()
+
+        def regenerate(row: Tuple[int, str, str]) -> bool:
+            _, source, ticker = row
+            try:
+                self.generate_markdown_index(source, ticker)
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to generate index for {source}/{ticker}: {e}")
+                return False
+
+        if max_workers > 1 and len(dirty) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(regenerate, dirty))
+        else:
+            results = [regenerate(row) for row in dirty]
+
+        written = [(row[0],) for row, ok in zip(dirty, results) if ok]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM dirty_indexes WHERE rowid = ?", written)
+        return len(written)
+
     def rebuild_metadata_from_files(self, source: str, ticker: str) -> None:
         """Rebuild metadata from existing files in directory."""
         ticker_dir = os.path.join(self.base_data_dir, source, ticker)
@@ -361,22 +735,29 @@ class MetadataManager:
 
     def cleanup_orphaned_metadata(self, source: str, ticker: str) -> None:
         """Remove metadata entries for files that no longer exist."""
-        metadata = self.load_metadata(source, ticker)
-        files_to_remove = []
-
-        for filename, file_record in metadata["files"].items():
-            filepath = file_record["filepath"]
-            if not os.path.exists(filepath):
-                files_to_remove.append(filename)
-
-        for filename in files_to_remove:
-            del metadata["files"][filename]
+        with self._lock:
+            conn = self._connection()
+            self._ensure_ticker(conn, source, ticker)
+            files = conn.execute(
+                "SELECT filename, filepath FROM files WHERE source = ? AND ticker = ? "
+                "ORDER BY rowid",
+                (source, ticker),
+            ).fetchall()
+            files_to_remove = [
+                filename for filename, filepath in files if not os.path.exists(filepath)
+            ]
+            if not files_to_remove:
+                return
 
-        if files_to_remove:
             history_record = {
                 "timestamp": datetime.now().isoformat(),
                 "action": "cleanup_orphaned",
                 "removed_files": files_to_remove,
             }
-            metadata["download_history"].append(history_record)
-            self.save_metadata(source, ticker, metadata)
+            with conn:
+                conn.executemany(
+                    "DELETE FROM files WHERE source = ? AND ticker = ? AND filename = ?",
+                    [(source, ticker, filename) for filename in files_to_remove],
+                )
+                self._touch_ticker(conn, source, ticker)
+                self._append_history(conn, source, ticker, [history_record])
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DAG executor for build stages.
+
+Build work is declared as named tasks with the tasks they depend on, and
+each task runs as soon as its dependencies have completed, in a bounded
+thread pool of its choosing. Independent tasks (yfinance and SEC extraction,
+the analysis of different tickers) overlap, so a build takes about as long
+as its critical path instead of the sum of its stages.
+
+Tasks belong to BuildTracker stages. The executor calls ``start_stage``
+when the first task of a stage is submitted and ``complete_stage`` (or
+``fail_stage``) once every task of the stage has finished. Tracker calls are
+made from the thread calling ``run()``; tasks may log stage output from
+their worker threads.
+
+Checkpointed tasks make a build resumable: each one that completes with a
+truthy value is recorded with ``tracker.checkpoint(stage, task)``, and a
+task the tracker already has a checkpoint for (a build reopened with
+``BuildTracker(build_id=...)``) is not run again; its recorded value becomes
+its result.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class TaskResult:
+    """Outcome of one task; ``start`` and ``end`` are ``time.perf_counter()`` values."""
+
+    name: str
+    stage: Optional[str]
+    status: str
+    value: Any = None
+    error: Optional[str] = None
+    start: Optional[float] = None
+    end: Optional[float] = None
+    resumed: bool = False
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start if self.start is not None else 0.0
+
+
+@dataclass
+class _Task:
+    name: str
+    func: Callable[[], Any]
+    stage: Optional[str]
+    deps: Tuple[str, ...]
+    pool: str
+    required: bool
+    checkpoint: bool
+
+
+def _call(task: _Task) -> TaskResult:
+    start = time.perf_counter()
+    try:
+        value = task.func()
+    except Exception as e:
+        logger.exception(f"Task {task.name} failed")
+        error = str(e) or repr(e)
+        return TaskResult(task.name, task.stage, FAILED, None, error, start, time.perf_counter())
+    return TaskResult(task.name, task.stage, COMPLETED, value, None, start, time.perf_counter())
+
+
+def _skipped(task: _Task, reason: str) -> TaskResult:
+    return TaskResult(task.name, task.stage, SKIPPED, error=reason)
+
+
+class StageExecutor:
+    """
+    Runs a DAG of tasks in bounded thread pools.
+
+    ``pools`` maps pool names to worker counts; the ``default`` pool has one
+    worker unless given. A task is skipped when one of its dependencies did
+    not complete. A non-required task that raises is recorded as a stage
+    warning; a required one fails its stage and cancels every task not yet
+    started (stages that never started stay pending in the manifest).
+    """
+
+    def __init__(self, tracker=None, pools: Optional[Dict[str, int]] = None):
+        self.tracker = tracker
+        self.pools = {"default": 1, **(pools or {})}
+        for pool, workers in self.pools.items():
+            if workers <= 0:
+                raise ValueError(f"Pool {pool} needs at least one worker, got {workers}")
+        self._tasks: Dict[str, _Task] = {}
+        self._summaries: Dict[str, Callable[[List[TaskResult]], Dict[str, Any]]] = {}
+        self.results: Dict[str, TaskResult] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        stage: Optional[str] = None,
+        deps: Iterable[str] = (),
+        pool: str = "default",
+        required: bool = False,
+        checkpoint: bool = False,
+    ) -> str:
+        """Declare a task; its dependencies must already be declared, so the graph is acyclic."""
+        deps = tuple(deps)
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        if pool not in self.pools:
+            raise ValueError(f"Unknown pool {pool} for task {name}")
+        unknown = [dep for dep in deps if dep not in self._tasks]
+        if unknown:
+            raise ValueError(f"Task {name} depends on undeclared tasks: {unknown}")
+        if checkpoint and not stage:
+            raise ValueError(f"Checkpointed task {name} needs a stage")
+        self._tasks[name] = _Task(name, func, stage, deps, pool, required, checkpoint)
+        return name
+
+    def on_stage_complete(
+        self, stage: str, summarize: Callable[[List[TaskResult]], Dict[str, Any]]
+    ) -> None:
+        """Keyword arguments for ``complete_stage``, computed from the stage's task results."""
+        self._summaries[stage] = summarize
+
+    def run(self) -> Dict[str, TaskResult]:
+        """Run every task and return their results by name, in declaration order."""
+        results: Dict[str, TaskResult] = {}
+        remaining: Dict[str, int] = {}
+        for task in self._tasks.values():
+            if task.stage:
+                remaining[task.stage] = remaining.get(task.stage, 0) + 1
+        started = set()
+        submitted = set()
+        running = {}
+        cancelled_by = None
+
+        def finish(result: TaskResult):
+            results[result.name] = result
+            stage = result.stage
+            if not stage:
+                return
+            task = self._tasks[result.name]
+            if result.status == FAILED and not task.required:
+                self._tracker_call("add_warning", stage, f"{result.name} failed: {result.error}")
+            if task.checkpoint and result.status == COMPLETED and result.value:
+                if not result.resumed:
+                    self._tracker_call("checkpoint", stage, result.name, result.value)
+            remaining[stage] -= 1
+            if remaining[stage] == 0:
+                self._finish_stage(stage, results, stage in started, cancelled_by)
+
+        pools = {
+            pool: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"stage-{pool}")
+            for pool, workers in self.pools.items()
+        }
+        try:
+            while True:
+                # Declaration order puts dependencies first, so one pass settles skips
+                for task in self._tasks.values():
+                    if task.name in results or task.name in submitted:
+                        continue
+                    if cancelled_by:
+                        finish(_skipped(task, f"cancelled after {cancelled_by} failed"))
+                        continue
+                    deps = [results.get(dep) for dep in task.deps]
+                    if any(dep is None for dep in deps):
+                        continue
+                    blocked = next((dep for dep in deps if dep.status != COMPLETED), None)
+                    if blocked:
+                        finish(_skipped(task, f"dependency {blocked.name} {blocked.status}"))
+                        continue
+                    if task.stage and task.stage not in started:
+                        started.add(task.stage)
+                        self._tracker_call("start_stage", task.stage)
+                    checkpoint = self._checkpointed(task)
+                    if checkpoint is not None:
+                        value = checkpoint["value"]
+                        finish(TaskResult(task.name, task.stage, COMPLETED, value, resumed=True))
+                        continue
+                    submitted.add(task.name)
+                    running[pools[task.pool].submit(_call, task)] = task
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    result = future.result()
+                    if result.status == FAILED and task.required and not cancelled_by:
+                        cancelled_by = task.name
+                    finish(result)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+        self.results = {name: results[name] for name in self._tasks}
+        return self.results
+
+    def _finish_stage(self, stage, results, started, cancelled_by):
+        stage_results = [r for r in results.values() if r.stage == stage]
+        if not started:
+            if cancelled_by:
+                return  # Never reached, as when the sequential build stopped early
+            self._tracker_call("start_stage", stage)
+            self._tracker_call("add_warning", stage, f"skipped: {stage_results[0].error}")
+        failed = [r for r in stage_results if r.status == FAILED and self._tasks[r.name].required]
+        if failed:
+            self._tracker_call("fail_stage", stage, failed[0].error)
+        elif cancelled_by and any(r.status == SKIPPED for r in stage_results):
+            self._tracker_call("fail_stage", stage, f"cancelled after {cancelled_by} failed")
+        else:
+            summarize = self._summaries.get(stage)
+            kwargs = summarize(stage_results) if summarize else {}
+            self._tracker_call("complete_stage", stage, **kwargs)
+
+    def _checkpointed(self, task: _Task) -> Optional[Dict[str, Any]]:
+        if not task.checkpoint or self.tracker is None:
+            return None
+        return self.tracker.get_checkpoint(task.stage, task.name)
+
+    def _tracker_call(self, method, *args, **kwargs):
+        if self.tracker is not None:
+            getattr(self.tracker, method)(*args, **kwargs)
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        Longest chain of dependent tasks by measured run time in the last run:
+        the wall-clock time the build needs with unlimited workers.
+        """
+        longest: Dict[str, Tuple[float, List[str]]] = {}
+        for name, task in self._tasks.items():
+            before = max((longest[dep] for dep in task.deps), default=(0.0, []))
+            longest[name] = (before[0] + self.results[name].seconds, before[1] + [name])
+        seconds, path = max(longest.values(), default=(0.0, []))
+        return path, seconds
@@ -53,6 +53,17 @@ class VectorEmbeddingConfig:
     dimension: int = 384
     similarity_threshold: float = 0.3
     max_results: int = 10
+    batch_size: int = 256  # Chunks per encode call during embedding generation
+    batches_in_flight: int = 4  # Encode calls sent to the ML service concurrently
+    cache_embeddings: bool = True  # Reuse vectors of unchanged chunks across runs
+    cache_max_bytes: int = 2 * 1024**3  # LRU size cap of the on-disk embedding cache
+    index_type: str = "flat"  # "flat" (exact) or "ivf" (approximate, for large corpora)
+    ivf_nlist: int = 0  # IVF inverted lists; 0 picks about 2 * sqrt(rows)
+    ivf_nprobe: int = 16  # IVF lists scanned per query; higher = better recall, slower
+    vector_compression: str = "none"  # "none", "float16", "int8" or "pq" for flat segments
+    pq_subspaces: int = 0  # PQ code bytes per vector; 0 picks dimension / 8
+    rerank_factor: int = 10  # Compressed candidates per result re-scored at full precision
+    processing_workers: int = 0  # Processes parsing and chunking SEC filings; 0 uses every core
 
 
 @dataclass
@@ -232,6 +243,7 @@ class ETLStageOutput:
         model_used: str
         dimension: int
         output_path: str
+        stats: Optional[Dict[str, Any]] = None
 
     @dataclass
     class VectorIndexOutput:
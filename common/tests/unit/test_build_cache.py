@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for build_cache.py - content-addressed stage output cache
+Tests cache keys over config, inputs and sources, output restore and the hash memo.
+"""
+
+import os
+
+import pytest
+
+from common.build.build_cache import BuildCache
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def stage(tmp_path):
+    """A stage copying its input directory into its output directory in upper case."""
+    inputs = tmp_path / "inputs"
+    outputs = tmp_path / "outputs"
+    write(inputs / "a.txt", "alpha")
+    write(inputs / "sub" / "b.txt", "beta")
+    calls = []
+
+    def func():
+        calls.append(1)
+        for path in inputs.rglob("*.txt"):
+            write(outputs / path.relative_to(inputs), path.read_text().upper())
+        return {"files": 2}
+
+    return inputs, outputs, func, calls
+
+
+def run(cache, stage, config=None):
+    inputs, outputs, func, _ = stage
+    return cache.run("transform", func, [str(outputs)], config=config, inputs=[str(inputs)])
+
+
+@pytest.mark.build
+class TestBuildCache:
+    """Test BuildCache keys, hits, misses and restores."""
+
+    def test_unchanged_inputs_hit_and_restore_outputs(self, tmp_path, stage):
+        inputs, outputs, _, calls = stage
+        cache = BuildCache(str(tmp_path / "cache"))
+
+        value, status, key = run(cache, stage)
+        assert (value, status, len(calls)) == ({"files": 2}, "miss", 1)
+
+        (outputs / "a.txt").unlink()
+        (outputs / "sub" / "b.txt").write_text("corrupted")
+        value, status, hit_key = run(BuildCache(str(tmp_path / "cache")), stage)
+
+        assert (value, status, hit_key, len(calls)) == ({"files": 2}, "hit", key, 1)
+        assert (outputs / "a.txt").read_text() == "ALPHA"
+        assert (outputs / "sub" / "b.txt").read_text() == "BETA"
+
+    def test_changed_input_or_config_misses(self, tmp_path, stage):
+        inputs, _, _, calls = stage
+        cache = BuildCache(str(tmp_path / "cache"))
+        _, _, key = run(cache, stage)
+
+        _, status, config_key = run(cache, stage, config={"chunk_size": 10})
+        assert status == "miss" and config_key != key
+
+        write(inputs / "a.txt", "gamma")
+        _, status, input_key = run(cache, stage)
+        assert status == "miss" and input_key not in (key, config_key)
+        assert len(calls) == 3
+
+    def test_changed_source_misses(self, tmp_path, stage):
+        inputs, outputs, func, _ = stage
+        source = tmp_path / "stage.py"
+        write(source, "VERSION = 1")
+        cache = BuildCache(str(tmp_path / "cache"))
+
+        _, _, key = cache.run("transform", func, [str(outputs)], sources=[str(source)])
+        write(source, "VERSION = 2")
+        _, status, new_key = cache.run("transform", func, [str(outputs)], sources=[str(source)])
+
+        assert status == "miss" and new_key != key
+
+    def test_failed_run_is_not_cached(self, tmp_path, stage):
+        _, outputs, _, _ = stage
+        cache = BuildCache(str(tmp_path / "cache"))
+
+        assert cache.run("transform", lambda: False, [str(outputs)])[1] == "miss"
+        assert cache.run("transform", lambda: False, [str(outputs)])[1] == "miss"
+
+    def test_missing_object_invalidates_entry(self, tmp_path, stage):
+        _, _, _, calls = stage
+        cache = BuildCache(str(tmp_path / "cache"))
+        run(cache, stage)
+
+        for path in (tmp_path / "cache" / "objects").rglob("*"):
+            if path.is_file():
+                os.chmod(path, 0o644)
+                path.unlink()
+
+        assert run(cache, stage)[1] == "miss"
+        assert len(calls) == 2
+
+    def test_symlink_restore_points_into_object_store(self, tmp_path, stage):
+        _, outputs, _, _ = stage
+        cache = BuildCache(str(tmp_path / "cache"), link="symlink")
+        run(cache, stage)
+
+        (outputs / "a.txt").unlink()
+        assert run(cache, stage)[1] == "hit"
+        assert (outputs / "a.txt").is_symlink()
+        assert (outputs / "a.txt").read_text() == "ALPHA"
+
+    def test_file_digest_reuses_memo_until_file_changes(self, tmp_path):
+        path = tmp_path / "data.txt"
+        write(path, "alpha")
+        cache = BuildCache(str(tmp_path / "cache"))
+        digest = cache.file_digest(str(path))
+        cache.save()
+
+        reopened = BuildCache(str(tmp_path / "cache"))
+        assert reopened.file_digest(str(path)) == digest
+        write(path, "beta!")
+        assert reopened.file_digest(str(path)) != digest
+
+    def test_rejects_unknown_link_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            BuildCache(str(tmp_path / "cache"), link="hardlink")
@@ -200,6 +200,21 @@ class TestBuildStageManagement:
 
             mock_save.assert_called_once()
 
+    def test_record_cache(self, tracker):
+        """Test build cache hit/miss recording per stage task."""
+        stage = "stage_02_transform"
+
+        with patch.object(tracker, "_save_manifest") as mock_save:
+            tracker.record_cache(stage, "transform_sec_filings", "hit", "abc123")
+
+            cache = tracker.manifest["stages"][stage]["cache"]
+            assert cache["transform_sec_filings"] == {"status": "hit", "key": "abc123"}
+
+            mock_save.assert_called_once()
+
+        with pytest.raises(ValueError, match="Unknown stage"):
+            tracker.record_cache("invalid_stage", "task", "miss", "abc123")
+
 
 @pytest.mark.build
 class TestBuildArtifactManagement:
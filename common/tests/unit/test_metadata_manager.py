@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Unit tests for metadata_manager.py - SQLite-backed download metadata
+Tests indexed freshness/failure lookups, legacy JSON migration and partition lookup.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from common.build.metadata_manager import MetadataManager
+
+CONFIG = {"period": "1y", "interval": "1d", "oid": "daily", "exe_id": "run-1"}
+
+
+def write_data_file(base_dir, partition, ticker, name, content="{}"):
+    ticker_dir = base_dir / "yfinance" / partition / ticker
+    ticker_dir.mkdir(parents=True, exist_ok=True)
+    path = ticker_dir / name
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.mark.build
+class TestMetadataManager:
+    """Test MetadataManager record storage and lookups."""
+
+    def test_recent_file_lookup_ignores_exe_id(self, tmp_path):
+        manager = MetadataManager(str(tmp_path))
+        path = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_daily.json")
+        manager.add_file_record("yfinance", "AAPL", path, "daily", CONFIG)
+
+        assert manager.check_file_exists_recent(
+            "yfinance", "AAPL", "daily", dict(CONFIG, exe_id="run-2")
+        )
+        assert not manager.check_file_exists_recent(
+            "yfinance", "AAPL", "daily", dict(CONFIG, period="5y")
+        )
+        assert not manager.check_file_exists_recent("yfinance", "AAPL", "weekly", CONFIG)
+        assert not manager.check_file_exists_recent("yfinance", "MSFT", "daily", CONFIG)
+
+    def test_modified_or_stale_file_is_not_recent(self, tmp_path):
+        manager = MetadataManager(str(tmp_path))
+        path = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_daily.json")
+        manager.add_file_record("yfinance", "AAPL", path, "daily", CONFIG)
+
+        assert not manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG, hours=0)
+        with open(path, "w") as f:
+            f.write('{"changed": true}')
+        assert not manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+
+    def test_unchanged_file_is_not_rehashed(self, tmp_path, monkeypatch):
+        manager = MetadataManager(str(tmp_path))
+        path = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_daily.json")
+        manager.add_file_record("yfinance", "AAPL", path, "daily", CONFIG)
+        hashed = []
+        md5 = manager.calculate_file_md5
+        monkeypatch.setattr(manager, "calculate_file_md5", lambda p: hashed.append(p) or md5(p))
+
+        assert manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+        assert hashed == []
+
+        # Touched but identical: re-hashed once, then trusted again with the new stat
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+        assert manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+        assert hashed == [path]
+
+        # Same size, new content and mtime: the hash no longer matches
+        with open(path, "w") as f:
+            f.write("[]")
+        assert not manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+
+    def test_database_without_fingerprint_columns_is_upgraded(self, tmp_path):
+        import sqlite3
+
+        db_path = tmp_path / ".metadata.sqlite"
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE files (source TEXT NOT NULL, ticker TEXT NOT NULL, "
+                "filename TEXT NOT NULL, filepath TEXT NOT NULL, data_type TEXT, "
+                "config_hash TEXT NOT NULL, file_size INTEGER, md5_hash TEXT, "
+                "created_at TEXT NOT NULL, record TEXT NOT NULL, "
+                "PRIMARY KEY (source, ticker, filename))"
+            )
+        manager = MetadataManager(str(tmp_path))
+        path = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_daily.json")
+
+        manager.add_file_record("yfinance", "AAPL", path, "daily", CONFIG)
+
+        assert manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+
+    def test_records_are_appended_without_json_rewrites(self, tmp_path):
+        manager = MetadataManager(str(tmp_path))
+        path = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_daily.json")
+        manager.add_file_record("yfinance", "AAPL", path, "daily", CONFIG)
+        manager.mark_download_failed("yfinance", "AAPL", "weekly", CONFIG, "timeout")
+        manager.mark_download_failed("yfinance", "AAPL", "monthly", CONFIG, "HTTP 429")
+
+        failures = manager.get_failed_downloads("yfinance", "AAPL")
+        metadata = manager.load_metadata("yfinance", "AAPL")
+
+        assert [f["data_type"] for f in failures] == ["weekly", "monthly"]
+        assert failures[1]["error_message"] == "HTTP 429"
+        assert list(metadata["files"]) == ["AAPL_yfinance_daily.json"]
+        assert metadata["files"]["AAPL_yfinance_daily.json"]["config_info"] == CONFIG
+        assert [r["action"] for r in metadata["download_history"]] == [
+            "file_created",
+            "download_failed",
+            "download_failed",
+        ]
+        assert not os.path.exists(manager.get_metadata_path("yfinance", "AAPL"))
+        assert os.path.exists(manager.db_path)
+
+    def test_concurrent_writers_share_one_manager(self, tmp_path):
+        manager = MetadataManager(str(tmp_path))
+        tickers = [f"T{i}" for i in range(16)]
+
+        def fail(ticker):
+            manager.mark_download_failed("yfinance", ticker, "daily", CONFIG, "boom")
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(fail, tickers * 3))
+
+        assert all(len(manager.get_failed_downloads("yfinance", t)) == 3 for t in tickers)
+
+    def test_cleanup_and_save_replace_records(self, tmp_path):
+        manager = MetadataManager(str(tmp_path))
+        kept = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_a.json")
+        removed = write_data_file(tmp_path, "20251015", "AAPL", "AAPL_yfinance_b.json")
+        for path in (kept, removed):
+            manager.add_file_record("yfinance", "AAPL", path, "daily", CONFIG)
+        os.remove(removed)
+
+        manager.cleanup_orphaned_metadata("yfinance", "AAPL")
+        metadata = manager.load_metadata("yfinance", "AAPL")
+        assert list(metadata["files"]) == ["AAPL_yfinance_a.json"]
+        assert metadata["download_history"][-1]["removed_files"] == ["AAPL_yfinance_b.json"]
+
+        metadata["download_history"] = []
+        manager.save_metadata("yfinance", "AAPL", metadata)
+        assert manager.load_metadata("yfinance", "AAPL")["download_history"] == []
+
+    def test_dirty_indexes_are_flushed_once(self, tmp_path, monkeypatch):
+        manager = MetadataManager(str(tmp_path))
+        for ticker in ("AAPL", "MSFT"):
+            for i in range(3):
+                path = write_data_file(tmp_path, "20251015", ticker, f"{ticker}_yfinance_{i}.json")
+                manager.add_file_record("yfinance", ticker, path, "daily", CONFIG)
+                manager.mark_index_dirty("yfinance", ticker)
+        manager.mark_download_failed("yfinance", "AAPL", "weekly", CONFIG, "timeout")
+
+        assert manager.flush_markdown_indexes(max_workers=2) == 2
+        assert manager.flush_markdown_indexes() == 0
+        readme = open(manager.get_index_path("yfinance", "AAPL"), encoding="utf-8").read()
+        assert "**Total Files**: 3" in readme
+        assert "Failed to download weekly - timeout" in readme
+
+        # A ticker whose index fails stays dirty for the next flush, even in a later run
+        def fail(source, ticker):
+            raise OSError("disk full")
+
+        manager.mark_index_dirty("yfinance", "MSFT")
+        monkeypatch.setattr(manager, "generate_markdown_index", fail)
+        assert manager.flush_markdown_indexes() == 0
+        assert manager.flush_markdown_indexes() == 0
+        manager.close()
+        assert MetadataManager(str(tmp_path)).flush_markdown_indexes() == 1
+
+    def test_history_limit_keeps_latest_records(self, tmp_path):
+        manager = MetadataManager(str(tmp_path))
+        for i in range(12):
+            manager.mark_download_failed("yfinance", "AAPL", f"type{i}", CONFIG, "boom")
+
+        history = manager.load_metadata("yfinance", "AAPL", history_limit=10)["download_history"]
+
+        assert [r["data_type"] for r in history] == [f"type{i}" for i in range(2, 12)]
+
+
+@pytest.mark.build
+class TestLegacyMigration:
+    """Test import of per-ticker .metadata.json files."""
+
+    def write_legacy(self, base_dir, partition, ticker, files, history):
+        ticker_dir = base_dir / "yfinance" / partition / ticker
+        ticker_dir.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            "ticker": ticker,
+            "source": "yfinance",
+            "created_at": "2025-10-0%sT00:00:00" % partition[-1],
+            "updated_at": "2025-10-10T00:00:00",
+            "version": "1.0.0",
+            "files": files,
+            "download_history": history,
+        }
+        (ticker_dir / ".metadata.json").write_text(json.dumps(metadata))
+
+    def file_record(self, path, created_at):
+        manager = MetadataManager("unused")
+        return {
+            "filename": os.path.basename(path),
+            "filepath": path,
+            "data_type": "daily",
+            "file_size": os.path.getsize(path),
+            "md5_hash": manager.calculate_file_md5(path),
+            "created_at": created_at,
+            "config_info": CONFIG,
+        }
+
+    def test_ticker_is_imported_on_first_access(self, tmp_path):
+        old = write_data_file(tmp_path, "20251001", "AAPL", "AAPL_yfinance_old.json")
+        new = write_data_file(tmp_path, "20251002", "AAPL", "AAPL_yfinance_new.json")
+        now = datetime.now().isoformat()
+        failure = {"timestamp": "2025-10-01T01:00:00", "action": "download_failed"}
+        self.write_legacy(
+            tmp_path,
+            "20251001",
+            "AAPL",
+            {"AAPL_yfinance_old.json": self.file_record(old, "2025-10-01T00:00:00")},
+            [dict(failure, data_type="weekly")],
+        )
+        self.write_legacy(
+            tmp_path,
+            "20251002",
+            "AAPL",
+            {"AAPL_yfinance_new.json": self.file_record(new, now)},
+            [{"timestamp": now, "action": "file_created", "filename": "AAPL_yfinance_new.json"}],
+        )
+        manager = MetadataManager(str(tmp_path))
+
+        assert manager.check_file_exists_recent("yfinance", "AAPL", "daily", CONFIG)
+        metadata = manager.load_metadata("yfinance", "AAPL")
+        assert set(metadata["files"]) == {"AAPL_yfinance_old.json", "AAPL_yfinance_new.json"}
+        assert metadata["created_at"] == "2025-10-01T00:00:00"
+        assert [f["data_type"] for f in manager.get_failed_downloads("yfinance", "AAPL")] == [
+            "weekly"
+        ]
+
+        # Stored records win over the JSON files from then on
+        manager.mark_download_failed("yfinance", "AAPL", "daily", CONFIG, "boom")
+        reopened = MetadataManager(str(tmp_path))
+        assert len(reopened.get_failed_downloads("yfinance", "AAPL")) == 2
+
+    def test_bulk_migration(self, tmp_path):
+        for ticker in ("AAPL", "MSFT"):
+            self.write_legacy(tmp_path, "20251001", ticker, {}, [])
+        manager = MetadataManager(str(tmp_path))
+
+        assert manager.migrate_json_metadata() == 2
+        assert manager.migrate_json_metadata() == 0
+        assert manager.has_metadata("yfinance", "MSFT")
+        assert not manager.has_metadata("yfinance", "NVDA")
+
+
+@pytest.mark.build
+def test_metadata_path_lists_partitions_only_when_source_dir_changes(tmp_path, monkeypatch):
+    (tmp_path / "yfinance" / "20251001").mkdir(parents=True)
+    manager = MetadataManager(str(tmp_path))
+    calls = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: calls.append(path) or listdir(path))
+
+    first = manager.get_metadata_path("yfinance", "AAPL")
+    for _ in range(5):
+        assert manager.get_metadata_path("yfinance", "AAPL") == first
+    assert len(calls) == 1
+    assert first.endswith(os.path.join("20251001", "AAPL", ".metadata.json"))
+
+    (tmp_path / "yfinance" / "20251002").mkdir()
+    # Same-second directory changes can keep the old mtime on coarse filesystems
+    stamp = (datetime.now() + timedelta(seconds=5)).timestamp()
+    os.utime(tmp_path / "yfinance", (stamp, stamp))
+    assert manager.get_index_path("yfinance", "AAPL").endswith(
+        os.path.join("20251002", "AAPL", "README.md")
+    )
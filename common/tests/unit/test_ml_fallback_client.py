@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Unit tests for utils/ml_fallback.py - pooled HTTP client for the ML container.
+Runs MLService against a local stub of infra/sentence_transformers_service.py.
+"""
+
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from common.utils.ml_fallback import ContainerClient, MLService
+
+DIMENSION = 8
+
+
+class StubMLHandler(BaseHTTPRequestHandler):
+    """Keep-alive stand-in for the sentence transformers service."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json({"status": "healthy", "ml_available": True, "model_loaded": True})
+            # Drop the socket without announcing it, like an idle timeout
+            self.close_connection = self.server.drop_after_health
+        else:
+            self._send_json({"error": "Endpoint not found"}, 404)
+
+    def do_POST(self):
+        request_data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/encode":
+            with self.server.lock:
+                self.server.in_flight += 1
+                self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            time.sleep(self.server.encode_delay)
+            with self.server.lock:
+                self.server.in_flight -= 1
+            embeddings = [
+                [float(len(text))] + [0.0] * (DIMENSION - 1) for text in request_data["texts"]
+            ]
+            self._send_json({"embeddings": embeddings, "count": len(embeddings)})
+        elif self.path == "/similarity":
+            self._send_json({"similarity": 0.5})
+        else:
+            self._send_json({"error": "Endpoint not found"}, 404)
+
+    def _send_json(self, data, status_code=200):
+        response = json.dumps(data).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubMLHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.encode_delay = 0.0
+    server.drop_after_health = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.mark.utils
+class TestMLServicePooledClient:
+    """Test MLService over a keep-alive connection pool."""
+
+    def test_health_check_and_encode_reuse_one_connection(self, stub_server):
+        service = MLService(base_url(stub_server))
+        assert service.container_available
+
+        for i in range(20):
+            embeddings = service.encode_texts(["a" * i, "bb"])
+            assert embeddings.shape == (2, DIMENSION)
+            assert embeddings[0][0] == i
+
+        assert service.calculate_similarity("x", "y") == 0.5
+        assert service.client.requests_sent == 22
+        assert service.client.connections_opened == 1
+        assert stub_server.connections == 1
+        service.client.close()
+
+    def test_concurrent_batches_are_in_flight_together(self, stub_server):
+        stub_server.encode_delay = 0.05
+        service = MLService(base_url(stub_server), max_connections=4)
+        batches = [[f"text {i}" * (i + 1)] for i in range(8)]
+
+        results = service.encode_batches(batches)
+
+        assert [result[0][0] for result in results] == [len(batch[0]) for batch in batches]
+        assert stub_server.max_in_flight > 1
+        assert service.client.connections_opened <= 4
+        service.client.close()
+
+    def test_unavailable_container_uses_fallback(self):
+        service = MLService("http://127.0.0.1:9")
+
+        assert not service.container_available
+        assert service.encode_texts(["hello"]).shape == (1, 384)
+
+    def test_error_status_raises_connection_error(self, stub_server):
+        client = ContainerClient(base_url(stub_server))
+
+        with pytest.raises(ConnectionError):
+            client.get_json("/missing")
+        # The connection survives an error response and is reused
+        assert client.get_json("/health")["ml_available"] is True
+        assert client.connections_opened == 1
+        client.close()
+
+    def test_stale_connection_is_replaced(self, stub_server):
+        stub_server.drop_after_health = True
+        client = ContainerClient(base_url(stub_server))
+        client.get_json("/health")
+        time.sleep(0.05)
+
+        assert client.get_json("/health")["status"] == "healthy"
+        assert client.connections_opened == 2
+        client.close()
+
+
+@pytest.mark.utils
+@pytest.mark.parametrize(
+    "base_url, connection_class, port",
+    [
+        ("http://ml-service/", http.client.HTTPConnection, 80),
+        ("https://ml-service/", http.client.HTTPSConnection, 443),
+        ("https://ml-service:8443/", http.client.HTTPSConnection, 8443),
+    ],
+)
+def test_connection_matches_url_scheme(base_url, connection_class, port):
+    conn = ContainerClient(base_url)._new_connection(timeout=1)
+
+    assert type(conn) is connection_class
+    assert conn.port == port
+
+
+def test_unsupported_url_scheme_is_rejected():
+    with pytest.raises(ValueError):
+        ContainerClient("ftp://ml-service/")
+
+
+def test_service_error_responses_keep_the_connection_in_sync(monkeypatch):
+    """Early error replies must consume the request body on a keep-alive connection."""
+    from infra import sentence_transformers_service as service
+
+    monkeypatch.setattr(service.SentenceTransformersHandler, "model", None)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), service.SentenceTransformersHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ContainerClient(base_url(server))
+    try:
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                client.post_json("/encode", {"texts": ["x" * 1000]})
+        assert client.get_json("/health")["model_loaded"] is False
+        assert client.connections_opened == 1
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
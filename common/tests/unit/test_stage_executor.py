@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Unit tests for stage_executor.py - DAG execution of build stages
+Tests dependency ordering, concurrency, failure handling and tracker bookkeeping.
+"""
+
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from common.build.build_tracker import BuildTracker
+from common.build.stage_executor import StageExecutor
+
+
+class RecordingTracker:
+    """Records BuildTracker stage calls in order."""
+
+    def __init__(self):
+        self.calls = []
+
+    def start_stage(self, stage):
+        self.calls.append(("start_stage", stage))
+
+    def complete_stage(self, stage, **kwargs):
+        self.calls.append(("complete_stage", stage, kwargs))
+
+    def fail_stage(self, stage, error_message):
+        self.calls.append(("fail_stage", stage, error_message))
+
+    def add_warning(self, stage, warning_message):
+        self.calls.append(("add_warning", stage, warning_message))
+
+
+def sleeper(seconds, value=True):
+    def run():
+        time.sleep(seconds)
+        return value
+
+    return run
+
+
+def fail(message):
+    def run():
+        raise RuntimeError(message)
+
+    return run
+
+
+@pytest.mark.build
+class TestStageExecutor:
+    """Test StageExecutor scheduling and stage bookkeeping."""
+
+    def test_independent_tasks_overlap(self):
+        """Tasks without dependencies on each other share the pool's workers."""
+        tracker = RecordingTracker()
+        executor = StageExecutor(tracker, pools={"extract": 2})
+        executor.add("yfinance", sleeper(0.2), "stage_01_extract", pool="extract")
+        executor.add("sec_edgar", sleeper(0.2), "stage_01_extract", pool="extract")
+        executor.on_stage_complete("stage_01_extract", lambda results: {"file_count": 2})
+
+        start = time.perf_counter()
+        results = executor.run()
+
+        assert time.perf_counter() - start < 0.35
+        assert [r.status for r in results.values()] == ["completed", "completed"]
+        assert tracker.calls == [
+            ("start_stage", "stage_01_extract"),
+            ("complete_stage", "stage_01_extract", {"file_count": 2}),
+        ]
+
+    def test_per_ticker_tasks_follow_their_own_dependencies(self):
+        """A ticker's report starts after its analysis, not after every analysis."""
+        tracker = RecordingTracker()
+        executor = StageExecutor(tracker, pools={"analysis": 2})
+        executor.add("load", sleeper(0), "stage_03_load")
+        executor.add("analysis:A", sleeper(0.05), "stage_04_analysis", ["load"], "analysis")
+        executor.add("analysis:B", sleeper(0.3), "stage_04_analysis", ["load"], "analysis")
+        executor.add("report:A", sleeper(0.05), "stage_05_reporting", ["analysis:A"], "analysis")
+        executor.add("report:B", sleeper(0.05), "stage_05_reporting", ["analysis:B"], "analysis")
+
+        results = executor.run()
+
+        assert results["report:A"].start >= results["analysis:A"].end
+        assert results["report:A"].end < results["analysis:B"].end
+        assert results["report:B"].start >= results["analysis:B"].end
+        stages = [call[:2] for call in tracker.calls]
+        assert stages.index(("start_stage", "stage_05_reporting")) < stages.index(
+            ("complete_stage", "stage_04_analysis")
+        )
+        path, seconds = executor.critical_path()
+        assert path == ["load", "analysis:B", "report:B"]
+        assert seconds == pytest.approx(0.35, abs=0.1)
+
+    def test_required_failure_fails_its_stage_and_cancels_the_rest(self):
+        """Later stages are never started once a required task fails."""
+        tracker = RecordingTracker()
+        executor = StageExecutor(tracker, pools={"extract": 2})
+        executor.add(
+            "yfinance",
+            fail("yfinance data collection failed"),
+            "stage_01_extract",
+            pool="extract",
+            required=True,
+        )
+        executor.add("sec_edgar", sleeper(0.1), "stage_01_extract", pool="extract")
+        executor.add("transform", sleeper(0), "stage_02_transform", ["sec_edgar"])
+
+        results = executor.run()
+
+        assert results["yfinance"].status == "failed"
+        assert results["sec_edgar"].status == "completed"
+        assert results["transform"].status == "skipped"
+        assert tracker.calls == [
+            ("start_stage", "stage_01_extract"),
+            ("fail_stage", "stage_01_extract", "yfinance data collection failed"),
+        ]
+
+    def test_optional_failure_is_a_warning_and_skips_dependents(self):
+        """Stages whose tasks were all skipped are completed with a warning."""
+        tracker = RecordingTracker()
+        executor = StageExecutor(tracker)
+        executor.add("preflight", fail("dependencies not available"), "stage_04_analysis")
+        executor.add("analysis:A", sleeper(0), "stage_04_analysis", ["preflight"])
+        executor.add("report:A", sleeper(0), "stage_05_reporting", ["analysis:A"])
+        executor.on_stage_complete("stage_05_reporting", lambda results: {"reports_generated": 0})
+
+        results = executor.run()
+
+        assert results["analysis:A"].error == "dependency preflight failed"
+        assert tracker.calls == [
+            ("start_stage", "stage_04_analysis"),
+            ("add_warning", "stage_04_analysis", "preflight failed: dependencies not available"),
+            ("complete_stage", "stage_04_analysis", {}),
+            ("start_stage", "stage_05_reporting"),
+            ("add_warning", "stage_05_reporting", "skipped: dependency analysis:A skipped"),
+            ("complete_stage", "stage_05_reporting", {"reports_generated": 0}),
+        ]
+
+    def test_invalid_tasks_are_rejected(self):
+        """Dependencies must be declared first and pools must exist."""
+        executor = StageExecutor()
+        executor.add("load", sleeper(0))
+
+        with pytest.raises(ValueError):
+            executor.add("analysis", sleeper(0), deps=["preflight"])
+        with pytest.raises(ValueError):
+            executor.add("report", sleeper(0), pool="analysis")
+        with pytest.raises(ValueError):
+            executor.add("load", sleeper(0))
+        with pytest.raises(ValueError):
+            StageExecutor(pools={"analysis": 0})
+        with pytest.raises(ValueError):
+            executor.add("unstaged", sleeper(0), checkpoint=True)
+
+
+@pytest.mark.build
+def test_build_tracker_records_concurrent_stage_output():
+    """Warnings and stage logs from worker threads are all kept."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tracker = BuildTracker(base_path=str(Path(temp_dir) / "test_build"))
+
+        def work(worker):
+            for i in range(20):
+                tracker.add_warning("stage_04_analysis", f"worker {worker} warning {i}")
+                tracker.log_stage_output("stage_04_analysis", f"worker {worker} log {i}")
+
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        manifest = json.loads((tracker.build_path / "BUILD_MANIFEST.json").read_text())
+        assert len(manifest["statistics"]["warnings"]) == 80
+        log = (tracker.build_path / "stage_logs" / "stage_04_analysis.log").read_text()
+        assert log.count(" log ") == 80
+
+
+@pytest.mark.build
+def test_resumed_build_skips_checkpointed_tasks():
+    """A build reopened by id runs only the tasks its checkpoints do not cover."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base_path = str(Path(temp_dir) / "test_build")
+        tickers = ["AAPL", "MSFT", "NVDA"]
+        runs = []
+
+        def analyze(ticker):
+            def run():
+                runs.append(ticker)
+                if ticker == "NVDA" and len(runs) <= 3:
+                    raise RuntimeError("crashed")
+                return {"ticker": ticker}
+
+            return run
+
+        def build(tracker):
+            executor = StageExecutor(tracker, pools={"analysis": 2})
+            executor.add("load", sleeper(0), "stage_03_load", checkpoint=True)
+            for ticker in tickers:
+                executor.add(
+                    f"analysis:{ticker}",
+                    analyze(ticker),
+                    "stage_04_analysis",
+                    deps=["load"],
+                    pool="analysis",
+                    checkpoint=True,
+                )
+            return executor.run()
+
+        tracker = BuildTracker(base_path=base_path)
+        tracker.start_build("f2", "test command")
+        first = build(tracker)
+        assert first["analysis:NVDA"].status == "failed"
+
+        resumed = BuildTracker(base_path=base_path, build_id=tracker.build_id)
+        results = build(resumed)
+
+        assert sorted(runs) == ["AAPL", "MSFT", "NVDA", "NVDA"]
+        assert [r.resumed for r in results.values()] == [True, True, True, False]
+        assert results["analysis:AAPL"].value == {"ticker": "AAPL"}
+        assert results["analysis:NVDA"].status == "completed"
+        assert resumed.manifest["build_info"]["resumed_at"]
+
+        with pytest.raises(ValueError):
+            BuildTracker(base_path=base_path, build_id="19700101_000000")
@@ -9,6 +9,7 @@ This module provides organized utility functions:
 - DataProcessing: Data transformation utilities
 - IDGeneration: ID systems (Snowflake)
 - ProgressTracking: Progress and status tracking
+- RateLimiting: Shared token bucket rate limiting for spiders
 
 Issue #184: Core library restructuring - Utility consolidation
 """
@@ -28,6 +29,7 @@ from .id_generation import Snowflake, generate_snowflake_id, generate_snowflake_
 from .io_operations import is_file_recent, sanitize_data, suppress_third_party_logs
 from .logging_setup import setup_logger
 from .progress_tracking import ProgressTracker, create_progress_bar, get_global_progress_tracker
+from .rate_limiting import RateLimiter, TokenBucket, call_with_retries
 
 __all__ = [
     # I/O operations
@@ -54,4 +56,8 @@ __all__ = [
     "create_progress_bar",
     "ProgressTracker",
     "get_global_progress_tracker",
+    # Rate limiting
+    "TokenBucket",
+    "RateLimiter",
+    "call_with_retries",
 ]
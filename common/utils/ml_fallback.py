@@ -4,8 +4,16 @@ ML Fallback Module
 Provides fallback implementations for ML functionality when containers are not available
 """
 import hashlib
+import http.client
+import json
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import queue
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 # Avoid numpy import due to circular import issues in pixi environment
 try:
@@ -75,12 +83,132 @@ class FallbackEmbeddings:
         return len(intersection) / len(union) if union else 0.0
 
 
+# Base URL of infra/sentence_transformers_service.py
+DEFAULT_ML_SERVICE_URL = os.environ.get("ML_SERVICE_URL", "http://localhost:8888")
+
+
+class ContainerClient:
+    """
+    Pooled keep-alive HTTP/1.1 client for the ML container.
+
+    Both http and https base URLs are supported; any other scheme raises
+    ValueError.
+
+    Connections are created lazily up to max_connections and reused across
+    requests, so each call costs one request/response on an open socket
+    instead of a process spawn and TCP handshake. Request bodies are
+    serialized in memory. Safe to share between threads: up to
+    max_connections requests are in flight at once, further callers wait for
+    a free connection.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_ML_SERVICE_URL,
+        max_connections: int = 4,
+        timeout: float = 30,
+    ):
+        parts = urlsplit(base_url)
+        if parts.scheme == "https":
+            self._connection_class = http.client.HTTPSConnection
+            default_port = 443
+        elif parts.scheme == "http":
+            self._connection_class = http.client.HTTPConnection
+            default_port = 80
+        else:
+            raise ValueError(f"Unsupported ML service URL scheme: {base_url!r}")
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or default_port
+        self.base_path = parts.path.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        return self._connection_class(self.host, self.port, timeout=timeout)
+
+    def request(
+        self, method: str, path: str, payload: Any = None, timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Send one request and return the decoded JSON response.
+
+        A stale keep-alive connection (closed by the server while idle) is
+        retried once on a fresh connection. Raises ConnectionError on HTTP
+        error statuses and transport failures.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        body = None
+        headers = {"Connection": "keep-alive"}
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        with self._slots:
+            for attempt in range(2):
+                try:
+                    conn = self._idle.get_nowait()
+                    reused = True
+                except queue.Empty:
+                    conn = self._new_connection(timeout)
+                    reused = False
+                conn.timeout = timeout
+
+                try:
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    conn.request(method, self.base_path + path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                except socket.timeout:
+                    conn.close()
+                    raise
+                except (http.client.HTTPException, OSError) as e:
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise ConnectionError(f"{method} {path} failed: {e}") from e
+
+                self.requests_sent += 1
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+
+                if response.status >= 400:
+                    raise ConnectionError(
+                        f"{method} {path} returned HTTP {response.status}: {data[:200]!r}"
+                    )
+                return json.loads(data)
+
+    def get_json(self, path: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self.request("GET", path, timeout=timeout)
+
+    def post_json(self, path: str, payload: Any, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self.request("POST", path, payload, timeout=timeout)
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 class MLService:
     """ML service that tries container first, falls back to simple implementation"""
 
-    def __init__(self):
+    def __init__(self, base_url: str = DEFAULT_ML_SERVICE_URL, max_connections: int = 4):
         self.container_available = False
         self.fallback_embeddings = None
+        # True when the last container encode fell back to hash embeddings
+        self.last_encode_fallback = False
+        self.client = ContainerClient(base_url, max_connections=max_connections)
         self._check_container()
 
     def get_sentence_embedding_dimension(self):
@@ -90,30 +218,20 @@ class MLService:
     def _check_container(self):
         """Check if ML container is available"""
         try:
-            # Try to import requests in pixi environment
-            import subprocess
-
-            result = subprocess.run(
-                ["curl", "-s", "http://localhost:8888/health"],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-
-            if result.returncode == 0:
-                import json
-
-                health = json.loads(result.stdout)
-                self.container_available = health.get("ml_available", False)
-                logger.info(f"ML container available via curl: {self.container_available}")
-            else:
-                logger.info(f"ML container check failed: {result.stderr}")
+            health = self.client.get_json("/health", timeout=5)
+            self.container_available = health.get("ml_available", False)
+            logger.info(f"ML container available: {self.container_available}")
         except Exception as e:
             logger.info(f"ML container not available: {e}")
 
         if not self.container_available:
             self.fallback_embeddings = FallbackEmbeddings()
 
+    def _fallback_encode(self, texts: List[str]):
+        if not self.fallback_embeddings:
+            self.fallback_embeddings = FallbackEmbeddings()
+        return self.fallback_embeddings.encode(texts)
+
     def encode_texts(self, texts: List[str]):
         """Encode texts to embeddings"""
         if self.container_available:
@@ -122,61 +240,43 @@ class MLService:
             logger.info("Using fallback embeddings")
             return self.fallback_embeddings.encode(texts)
 
-    def _encode_via_container(self, texts: List[str]):
-        """Encode via ML container using curl"""
-        try:
-            import json
-            import subprocess
-            import tempfile
+    def encode_batches(self, batches: List[List[str]], max_in_flight: Optional[int] = None):
+        """
+        Encode several batches, keeping up to max_in_flight requests open on
+        the connection pool at once. Returns one result per batch, in order;
+        last_encode_fallback is set if any batch fell back.
+        """
+        if not self.container_available:
+            return [self.encode_texts(batch) for batch in batches]
 
-            # Create temporary file with request data
-            request_data = {"texts": texts}
-            with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as f:
-                json.dump(request_data, f)
-                temp_file = f.name
+        workers = min(len(batches), max_in_flight or self.client.max_connections)
+        if workers <= 1:
+            outcomes = [self._post_encode(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(self._post_encode, batches))
+        self.last_encode_fallback = any(fell_back for _, fell_back in outcomes)
+        return [embeddings for embeddings, _ in outcomes]
 
-            try:
-                result = subprocess.run(
-                    [
-                        "curl",
-                        "-s",
-                        "-X",
-                        "POST",
-                        "-H",
-                        "Content-Type: application/json",
-                        "-d",
-                        f"@{temp_file}",
-                        "http://localhost:8888/encode",
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=30,
-                )
-
-                if result.returncode == 0:
-                    response_data = json.loads(result.stdout)
-                    embeddings = response_data["embeddings"]
-                    if NUMPY_AVAILABLE:
-                        return np.array(embeddings, dtype=np.float32)
-                    else:
-                        return SimpleArray(embeddings)
-                else:
-                    logger.error(f"Container encoding failed: {result.stderr}")
-                    # Fall back to simple embeddings
-                    if not self.fallback_embeddings:
-                        self.fallback_embeddings = FallbackEmbeddings()
-                    return self.fallback_embeddings.encode(texts)
-            finally:
-                import os
+    def _encode_via_container(self, texts: List[str]):
+        """Encode via ML container over the pooled HTTP client"""
+        embeddings, self.last_encode_fallback = self._post_encode(texts)
+        return embeddings
 
-                os.unlink(temp_file)
+    def _post_encode(self, texts: List[str]) -> Tuple[Any, bool]:
+        """(embeddings, fell_back) of one /encode request; safe to call from several threads"""
+        try:
+            response_data = self.client.post_json("/encode", {"texts": texts}, timeout=30)
+            embeddings = response_data["embeddings"]
+            if NUMPY_AVAILABLE:
+                return np.array(embeddings, dtype=np.float32), False
+            else:
+                return SimpleArray(embeddings), False
 
         except Exception as e:
-            logger.error(f"Container communication failed: {e}")
+            logger.error(f"Container encoding failed: {e}")
             # Fall back to simple embeddings
-            if not self.fallback_embeddings:
-                self.fallback_embeddings = FallbackEmbeddings()
-            return self.fallback_embeddings.encode(texts)
+            return self._fallback_encode(texts), True
 
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate text similarity"""
@@ -186,49 +286,17 @@ class MLService:
             return self.fallback_embeddings.similarity(text1, text2)
 
     def _similarity_via_container(self, text1: str, text2: str) -> float:
-        """Calculate similarity via ML container using curl"""
+        """Calculate similarity via ML container over the pooled HTTP client"""
         try:
-            import json
-            import subprocess
-            import tempfile
-
-            # Create temporary file with request data
-            request_data = {"text1": text1, "text2": text2}
-            with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as f:
-                json.dump(request_data, f)
-                temp_file = f.name
-
-            try:
-                result = subprocess.run(
-                    [
-                        "curl",
-                        "-s",
-                        "-X",
-                        "POST",
-                        "-H",
-                        "Content-Type: application/json",
-                        "-d",
-                        f"@{temp_file}",
-                        "http://localhost:8888/similarity",
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                )
-
-                if result.returncode == 0:
-                    response_data = json.loads(result.stdout)
-                    return response_data["similarity"]
-                else:
-                    logger.error(f"Container similarity failed: {result.stderr}")
-                    return self.fallback_embeddings.similarity(text1, text2)
-            finally:
-                import os
-
-                os.unlink(temp_file)
+            response_data = self.client.post_json(
+                "/similarity", {"text1": text1, "text2": text2}, timeout=10
+            )
+            return response_data["similarity"]
 
         except Exception as e:
-            logger.error(f"Container communication failed: {e}")
+            logger.error(f"Container similarity failed: {e}")
+            if not self.fallback_embeddings:
+                self.fallback_embeddings = FallbackEmbeddings()
             return self.fallback_embeddings.similarity(text1, text2)
 
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rate limiting utilities shared by concurrent data spiders.
+
+Provides a thread-safe token bucket and a composite limiter that enforces the
+``rate_limits`` block of a data source configuration
+(common/config/etl/source_*.yml) across every worker of a job.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._last)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+            0.0 when the tokens were taken, otherwise the seconds to wait
+            before enough tokens will be available.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            # Small tolerance so float rounding in the refill cannot spin forever
+            if self._tokens + 1e-9 >= tokens:
+                self._tokens = max(0.0, self._tokens - tokens)
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens are available. Returns total seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            self._sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """
+    Composite limiter enforcing per-second and per-minute request budgets.
+
+    A single instance is shared by all workers of a job so that the aggregate
+    request rate stays within the configured data source limits.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float] = None,
+        requests_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.buckets = []
+        if requests_per_second:
+            self.buckets.append(
+                TokenBucket(requests_per_second, max(1.0, requests_per_second), clock, sleep)
+            )
+        if requests_per_minute:
+            self.buckets.append(
+                TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute), clock, sleep)
+            )
+        self._lock = threading.Lock()
+        self.total_acquired = 0
+        self.total_wait_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, rate_limits: Optional[Dict[str, Any]], **kwargs) -> "RateLimiter":
+        """Build a limiter from a data source ``rate_limits`` config block."""
+        rate_limits = rate_limits or {}
+        return cls(
+            requests_per_second=rate_limits.get("requests_per_second"),
+            requests_per_minute=rate_limits.get("requests_per_minute"),
+            **kwargs,
+        )
+
+    def acquire(self) -> float:
+        """Block until every bucket grants one request. Returns seconds waited."""
+        waited = 0.0
+        for bucket in self.buckets:
+            waited += bucket.acquire()
+        with self._lock:
+            self.total_acquired += 1
+            self.total_wait_seconds += waited
+        return waited
+
+
+def call_with_retries(
+    func: Callable[[], Any],
+    max_retries: int = 3,
+    retry_after_seconds: float = 1.0,
+    limiter: Optional[RateLimiter] = None,
+    sleep: Callable[[float], None] = time.sleep,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+) -> Any:
+    """
+    Call ``func`` with exponential backoff.
+
+    Each attempt first takes a token from ``limiter`` (when given), so retries
+    count against the shared request budget. Only exceptions matching
+    ``retry_on`` are retried; the last one is re-raised once ``max_retries``
+    additional attempts have failed.
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func()
+        except retry_on:
+            if attempt >= max_retries:
+                raise
+            sleep(retry_after_seconds * (2**attempt))
+            attempt += 1
@@ -200,13 +200,10 @@ class BacktestEngine:
         """Load historical market data for all symbols in strategy"""
         symbols = list(set([signal.symbol for signal in signals] + [config.benchmark_symbol]))
 
-        # Placeholder for actual market data loading
-        # In real implementation, this would:
-        # 1. Query market data source for all symbols
-        # 2. Ensure data availability for full backtest period
-        # 3. Handle corporate actions (splits, dividends)
-        # 4. Fill missing data appropriately
+        if hasattr(self.market_data, "get_prices"):
+            return self._load_stored_prices(signals, symbols, config)
 
+        # Without a price store (see ETL/price_store.py), simulate prices
         date_range = pd.date_range(config.start_date, config.end_date, freq="D")
         data = {}
 
@@ -226,6 +223,23 @@ class BacktestEngine:
 
         return pd.DataFrame(data)
 
+    def _load_stored_prices(
+        self, signals: List[StrategySignal], symbols: List[str], config: BacktestConfig
+    ) -> pd.DataFrame:
+        """Daily closes of all symbols from a price store, in one range query"""
+        available = set(self.market_data.tickers("1d"))
+        missing = sorted({signal.symbol for signal in signals} - available)
+        if missing:
+            raise ValueError(f"No stored prices for strategy symbols: {missing}")
+        if config.benchmark_symbol not in available:
+            self.logger.warning(f"No stored prices for benchmark {config.benchmark_symbol}")
+            symbols = [symbol for symbol in symbols if symbol != config.benchmark_symbol]
+
+        # From the first stored date, so the last close before start_date carries into the
+        # backtest; prices are only ever filled forward
+        prices = self.market_data.get_prices(symbols, None, config.end_date.date(), field="close")
+        return prices.ffill().loc[pd.Timestamp(config.start_date.date()) :]
+
     def _run_simulation(
         self,
         signals: List[StrategySignal],
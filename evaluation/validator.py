@@ -30,6 +30,8 @@ except ImportError:
     # Fallback for development/testing
     GraphRAGSystem = None
 
+from ETL.price_store import PriceStore
+
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -60,6 +62,23 @@ class StrategyValidator:
             "VTI": "Total Stock Market",
         }
 
+        # Consolidated price history built by build_dataset; None until built
+        self.price_store = PriceStore.open_default()
+
+    def _close_history(self, tickers: List[str], start: datetime, end: datetime) -> Dict:
+        """Daily closes per ticker, from the price store when it has the ticker, else yfinance."""
+        closes = {}
+        stored = set(self.price_store.tickers()) if self.price_store else set()
+        in_store = [ticker for ticker in tickers if ticker in stored]
+        if in_store:
+            prices = self.price_store.get_prices(in_store, start, end, field="close")
+            for ticker in in_store:
+                closes[ticker] = prices[ticker].dropna()
+        for ticker in tickers:
+            if ticker not in stored:
+                closes[ticker] = yf.Ticker(ticker).history(start=start, end=end)["Close"]
+        return {ticker: closes[ticker] for ticker in tickers if not closes[ticker].empty}
+
     def load_tickers_from_config(self, config_file: Optional[str] = None) -> List[str]:
         """Load tickers from config file or return default M7 tickers."""
         if not config_file:
@@ -248,12 +267,9 @@ class StrategyValidator:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=365)
 
-            portfolio_data = {}
-            for ticker in self.tickers[:3]:  # Limit for demo
-                stock = yf.Ticker(ticker)
-                hist = stock.history(start=start_date, end=end_date)
-                if not hist.empty:
-                    portfolio_data[ticker] = hist["Close"]
+            portfolio_data = self._close_history(
+                self.tickers[:3], start_date, end_date  # Limit for demo
+            )
 
             if portfolio_data:
                 # Calculate simple equal-weight portfolio return
@@ -294,12 +310,12 @@ class StrategyValidator:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=365)
 
+            closes = self._close_history(list(self.benchmarks), start_date, end_date)
             for benchmark_ticker, benchmark_name in self.benchmarks.items():
-                benchmark = yf.Ticker(benchmark_ticker)
-                hist = benchmark.history(start=start_date, end=end_date)
+                close = closes.get(benchmark_ticker)
 
-                if not hist.empty:
-                    benchmark_return = (hist["Close"][-1] / hist["Close"][0] - 1) * 100
+                if close is not None:
+                    benchmark_return = (close.iloc[-1] / close.iloc[0] - 1) * 100
 
                     # Mock strategy return (would use actual backtest results)
                     strategy_return = 25.3  # Mock
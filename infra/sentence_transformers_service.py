@@ -6,7 +6,7 @@ Provides ML embedding services via HTTP API to avoid dependency conflicts
 import json
 import logging
 import traceback
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any, Dict, List
 
 try:
@@ -24,23 +24,40 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+def load_model():
+    """Load the standard sentence transformer model, or return None"""
+    if not ML_AVAILABLE:
+        return None
+    try:
+        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        logger.info("✅ Sentence transformer model loaded successfully")
+        return model
+    except Exception as e:
+        logger.error(f"❌ Failed to load model: {e}")
+        return None
+
+
 class SentenceTransformersHandler(BaseHTTPRequestHandler):
     """HTTP handler for sentence transformers requests"""
 
-    def __init__(self, *args, **kwargs):
-        self.model = None
-        if ML_AVAILABLE:
-            try:
-                # Load the standard sentence transformer model
-                self.model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-                logger.info("✅ Sentence transformer model loaded successfully")
-            except Exception as e:
-                logger.error(f"❌ Failed to load model: {e}")
-                self.model = None
-        super().__init__(*args, **kwargs)
+    # Keep connections open between requests so clients can pool them
+    protocol_version = "HTTP/1.1"
+
+    # Loaded once in main() and shared by every connection thread
+    model = None
 
     def do_POST(self):
         """Handle POST requests for embeddings"""
+        # Read the whole body first: on a keep-alive connection an unread
+        # body would be parsed as the next request
+        try:
+            content_length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            self._send_error_response(400, "Invalid Content-Length")
+            return
+        post_data = self.rfile.read(content_length)
+
         if not ML_AVAILABLE:
             self._send_error_response(500, f"ML dependencies not available: {ML_ERROR}")
             return
@@ -51,8 +68,6 @@ class SentenceTransformersHandler(BaseHTTPRequestHandler):
 
         try:
             # Parse request
-            content_length = int(self.headers["Content-Length"])
-            post_data = self.rfile.read(content_length)
             request_data = json.loads(post_data.decode("utf-8"))
 
             if self.path == "/encode":
@@ -134,6 +149,8 @@ class SentenceTransformersHandler(BaseHTTPRequestHandler):
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(response)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
         self.end_headers()
         self.wfile.write(response)
 
@@ -157,8 +174,10 @@ def main():
         logger.error(f"❌ ML dependencies not available: {ML_ERROR}")
         logger.info("Service will start but return errors for all ML requests")
 
+    SentenceTransformersHandler.model = load_model()
+
     try:
-        server = HTTPServer(("0.0.0.0", port), SentenceTransformersHandler)
+        server = ThreadingHTTPServer(("0.0.0.0", port), SentenceTransformersHandler)
         logger.info(f"✅ Server ready at http://0.0.0.0:{port}")
         logger.info("Available endpoints:")
         logger.info("  POST /encode - Encode texts to embeddings")
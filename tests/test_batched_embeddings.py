@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for batched chunk encoding in SemanticEmbeddingGenerator.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import ETL.semantic_retrieval as sr
+from common.schemas.graph_rag_schema import VectorEmbeddingConfig
+
+
+class CountingModel:
+    """Fake ML service recording the size of every encode call."""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.calls = []
+
+    def encode_texts(self, texts):
+        self.calls.append(len(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row, len(text) % self.dimension] = 1.0
+        return vectors
+
+
+class ConcurrentModel(CountingModel):
+    """Fake ML service that also takes several batches per call, like MLService."""
+
+    def __init__(self, dimension):
+        super().__init__(dimension)
+        self.windows = []
+
+    def encode_batches(self, batches):
+        self.windows.append([len(batch) for batch in batches])
+        return [self.encode_texts(batch) for batch in batches]
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setattr(sr, "FAISS_AVAILABLE", False)
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    gen = sr.SemanticEmbeddingGenerator(
+        VectorEmbeddingConfig(dimension=16, batch_size=4, cache_embeddings=False)
+    )
+    gen.model = CountingModel(16)
+    return gen
+
+
+def make_chunks(n):
+    return [{"node_id": f"chunk_{i}", "content": "x" * (i + 1)} for i in range(n)]
+
+
+def test_chunks_are_encoded_in_fixed_size_batches(generator):
+    chunks = make_chunks(10)
+    chunks[3]["content"] = "  "
+
+    embeddings, stats = generator._embed_chunks(chunks)
+
+    assert generator.model.calls == [3, 4, 2]  # the blank chunk is not sent
+    assert stats["batches"] == 3
+    assert stats["texts_encoded"] == 10
+    assert embeddings.shape == (10, 16)
+    assert embeddings.dtype == np.float32
+    assert not embeddings[3].any()
+    assert embeddings[9, 10] == 1.0
+
+
+def test_single_chunk_wrapper_matches_batch(generator):
+    chunks = make_chunks(5)
+    embeddings, _ = generator._embed_chunks(chunks)
+
+    np.testing.assert_array_equal(
+        generator._generate_chunk_embedding(chunks[2]["content"]), embeddings[2]
+    )
+
+
+def test_batches_are_sent_in_flight_together(generator):
+    chunks = make_chunks(10)
+    expected, _ = generator._embed_chunks(chunks)
+    generator.config.batches_in_flight = 2
+    generator.model = ConcurrentModel(16)
+
+    embeddings, stats = generator._embed_chunks(chunks)
+
+    assert generator.model.windows == [[4, 4]]  # the last window holds one batch
+    assert generator.model.calls == [4, 4, 2]
+    assert stats["batches"] == 3
+    np.testing.assert_array_equal(embeddings, expected)
+
+
+def test_hash_fallback_without_model(generator):
+    generator.model = None
+    embeddings, stats = generator._embed_chunks(make_chunks(3))
+
+    assert embeddings.shape == (3, 16)
+    assert stats["batches"] == 1
+    assert embeddings.any()
+
+
+def test_generate_document_embeddings_reports_stats(generator, tmp_path):
+    partition = tmp_path / "stage_01_extract" / "yfinance" / "20250101"
+    for i in range(6):
+        ticker_dir = partition / f"T{i}"
+        ticker_dir.mkdir(parents=True)
+        (ticker_dir / f"T{i}_yfinance_daily.json").write_text(
+            json.dumps({"ticker": f"T{i}", "info": {"longName": f"Company {i}"}})
+        )
+
+    result = generator.generate_document_embeddings(tmp_path)
+
+    assert result.embeddings_created == 6
+    assert result.stats["batches"] == 2
+    assert generator.model.calls == [4, 2]
+    assert generator.vector_index.ntotal == 6
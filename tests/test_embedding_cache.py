@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed embedding cache and its use by the generator.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import ETL.semantic_retrieval as sr
+from common.schemas.graph_rag_schema import VectorEmbeddingConfig
+from ETL.embedding_cache import KEYS_FILE, VECTORS_FILE, EmbeddingCache
+
+MODEL = "test/model"
+
+
+def vectors_for(texts, dim=8):
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        out[row, len(text) % dim] = len(text)
+    return out
+
+
+class TestEmbeddingCache:
+    def test_hits_survive_reopen(self, tmp_path):
+        texts = ["alpha", "beta", "gamma"]
+        cache = EmbeddingCache.for_model(tmp_path, MODEL)
+        assert cache.put_many(texts, vectors_for(texts)) == 3
+        assert cache.put_many(texts[:1], vectors_for(texts[:1])) == 0
+        cache.flush()
+
+        reopened = EmbeddingCache.for_model(tmp_path, MODEL)
+        hits, vectors = reopened.get_many(["gamma", "delta", "alpha"])
+
+        assert list(hits) == [True, False, True]
+        np.testing.assert_array_equal(vectors[[0, 2]], vectors_for(["gamma", "alpha"]))
+        assert (reopened.hits, reopened.misses) == (2, 1)
+
+    def test_keys_are_model_specific(self, tmp_path):
+        cache = EmbeddingCache.for_model(tmp_path, MODEL)
+        cache.put_many(["alpha"], vectors_for(["alpha"]))
+        cache.flush()
+
+        other = EmbeddingCache.for_model(tmp_path, "other/model")
+        assert not other.get_many(["alpha"])[0].any()
+
+    def test_lru_eviction_keeps_recently_used(self, tmp_path):
+        texts = [f"text {i}" for i in range(10)]
+        cache = EmbeddingCache.for_model(tmp_path, MODEL)
+        cache.put_many(texts, vectors_for(texts))
+        cache.get_many(texts[:3])
+        cache.max_bytes = 5 * cache.entry_bytes
+        cache.flush()
+
+        reopened = EmbeddingCache.for_model(tmp_path, MODEL)
+        assert len(reopened) == 4
+        hits, vectors = reopened.get_many(texts[:3])
+        assert hits.all()
+        np.testing.assert_array_equal(vectors, vectors_for(texts[:3]))
+        assert reopened._data_file(KEYS_FILE).stat().st_size == 4 * 16
+        assert sorted(p.name for p in reopened.path.iterdir()) == [
+            "cache_meta.json",
+            "keys.1.bin",
+            "last_used.1.npy",
+            "vectors.1.f32",
+        ]
+
+    def test_interrupted_eviction_keeps_keys_and_vectors_in_line(self, tmp_path):
+        texts = [f"text {i}" for i in range(10)]
+        cache = EmbeddingCache.for_model(tmp_path, MODEL)
+        cache.put_many(texts, vectors_for(texts))
+        cache.flush()
+        cache.get_many(texts[5:])
+        cache.max_bytes = 5 * cache.entry_bytes
+
+        # Crash after the new generation is written, before the metadata switches to it
+        def crash():
+            raise OSError("disk full")
+
+        cache._write_meta = crash
+        with pytest.raises(OSError):
+            cache.flush()
+
+        reopened = EmbeddingCache.for_model(tmp_path, MODEL)
+        assert len(reopened) == 10
+        hits, vectors = reopened.get_many(texts)
+        assert hits.all()
+        np.testing.assert_array_equal(vectors, vectors_for(texts))
+        assert not reopened.path.joinpath("keys.1.bin").exists()
+
+    def test_torn_append_is_ignored(self, tmp_path):
+        texts = ["alpha", "beta"]
+        cache = EmbeddingCache.for_model(tmp_path, MODEL)
+        cache.put_many(texts, vectors_for(texts))
+        cache.flush()
+        with open(cache.path / VECTORS_FILE, "ab") as f:
+            f.write(b"\0" * 10)
+
+        reopened = EmbeddingCache.for_model(tmp_path, MODEL)
+        assert len(reopened) == 2
+        assert reopened.get_many(texts)[0].all()
+
+
+class CountingModel:
+    container_available = True
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode_texts(self, texts):
+        self.encoded.extend(texts)
+        return vectors_for(texts, 16)
+
+
+@pytest.fixture
+def make_generator(monkeypatch, tmp_path):
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+
+    def make(model=None):
+        gen = sr.SemanticEmbeddingGenerator(
+            VectorEmbeddingConfig(dimension=16, batch_size=2),
+            cache=EmbeddingCache.for_model(tmp_path / "cache", MODEL),
+        )
+        gen.model = model
+        return gen
+
+    return make
+
+
+def test_generator_only_encodes_misses(make_generator):
+    chunks = [{"content": f"chunk {i} " * (i + 1)} for i in range(5)]
+    first = make_generator(CountingModel())
+    first_embeddings, first_stats = first._embed_chunks(chunks)
+    assert (first_stats["cache_hits"], first_stats["cache_misses"]) == (0, 5)
+
+    model = CountingModel()
+    second = make_generator(model)
+    chunks.append({"content": "new chunk"})
+    embeddings, stats = second._embed_chunks(chunks)
+
+    assert model.encoded == ["new chunk"]
+    assert (stats["cache_hits"], stats["cache_misses"], stats["batches"]) == (5, 1, 1)
+    np.testing.assert_array_equal(embeddings[:5], first_embeddings)
+    np.testing.assert_array_equal(embeddings[5], vectors_for(["new chunk"], 16)[0])
+
+
+def test_blank_batch_does_not_fix_the_dimension(make_generator):
+    # The first batch is blank (configured 16-wide zeros); the model gives 8-wide vectors
+    chunks = [{"content": " "}, {"content": ""}, {"content": "alpha"}, {"content": "beta"}]
+
+    class NarrowModel(CountingModel):
+        def encode_texts(self, texts):
+            return vectors_for(texts, 8)
+
+    for use_cache in (True, False):
+        embeddings, _ = make_generator(NarrowModel())._embed_chunks(chunks, use_cache=use_cache)
+        assert embeddings.shape == (4, 8)
+        assert not embeddings[:2].any()
+        np.testing.assert_array_equal(embeddings[2:], vectors_for(["alpha", "beta"], 8))
+
+
+def test_fallback_vectors_are_not_cached(make_generator):
+    chunks = [{"content": "alpha"}, {"content": "beta"}]
+    generator = make_generator(None)
+    generator._embed_chunks(chunks)
+
+    assert len(generator.cache) == 0
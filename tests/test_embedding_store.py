@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped embedding store and its use by SemanticRetriever.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.embedding_store import (
+    MANIFEST_FILE,
+    METADATA_FILE,
+    EmbeddingStore,
+    write_embedding_store,
+)
+from ETL.vector_index import normalize_rows
+
+
+def make_rows(n):
+    return [
+        {
+            "node_id": f"chunk_{i}",
+            "document_id": f"doc_{i // 2}",
+            "chunk_index": i % 2,
+            "content": f"content {i} é",
+            "content_type": "10k",
+            "parent_document": f"doc_{i // 2}.txt",
+            "ticker": "AAPL" if i % 2 else "MSFT",
+            "metadata": {"chunk_start": i},
+        }
+        for i in range(n)
+    ]
+
+
+class TestEmbeddingStore:
+    def test_round_trip_is_memory_mapped(self, tmp_path):
+        vectors = normalize_rows(np.random.default_rng(0).standard_normal((10, 8)))
+        manifest = write_embedding_store(tmp_path, vectors, make_rows(10), model_name="test")
+
+        store = EmbeddingStore.open(tmp_path)
+
+        assert manifest["count"] == store.count == 10
+        assert store.dimension == 8
+        assert isinstance(store.vectors, np.memmap)
+        np.testing.assert_array_equal(np.asarray(store.vectors), vectors)
+        assert store.metadata[3]["node_id"] == "chunk_3"
+        assert store.metadata[3]["content"] == "content 3 é"
+        assert np.int64(9) in store.metadata
+        assert 10 not in store.metadata
+        with pytest.raises(KeyError):
+            store.metadata[10]
+        assert [row["node_id"] for _, row in store.metadata.items()][:2] == [
+            "chunk_0",
+            "chunk_1",
+        ]
+
+    def test_metadata_is_one_line_per_row(self, tmp_path):
+        vectors = normalize_rows(np.eye(4))
+        write_embedding_store(tmp_path, vectors, make_rows(4))
+
+        lines = (tmp_path / METADATA_FILE).read_bytes().splitlines()
+        assert len(lines) == 4
+
+    def test_row_count_mismatch_is_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_embedding_store(tmp_path, normalize_rows(np.eye(3)), make_rows(2))
+
+    def test_missing_manifest_returns_none(self, tmp_path):
+        assert EmbeddingStore.open(tmp_path) is None
+        assert not (tmp_path / MANIFEST_FILE).exists()
+
+
+def test_retriever_reads_store_written_by_generator(tmp_path, monkeypatch):
+    import ETL.semantic_retrieval as sr
+
+    monkeypatch.setattr(sr, "FAISS_AVAILABLE", False)
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+
+    generator = sr.SemanticEmbeddingGenerator()
+    embedding_data = []
+    for i, row in enumerate(make_rows(6)):
+        vector = [0.0] * generator.config.dimension
+        vector[i] = 1.0
+        embedding_data.append(dict(row, embedding_vector=vector))
+    generator._build_vector_index(embedding_data)
+    generator._save_embeddings_data(embedding_data, tmp_path)
+
+    retriever = sr.SemanticRetriever(tmp_path)
+
+    assert retriever.store is not None
+    assert retriever.vector_index.ntotal == 6
+    scores, indices = retriever.vector_index.search(np.eye(generator.config.dimension)[:2], 1)
+    assert list(indices[:, 0]) == [0, 1]
+    assert retriever.document_metadata[int(indices[1, 0])]["node_id"] == "chunk_1"
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for posting-list pre-filtered vector search.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import ETL.semantic_retrieval as sr
+from common.schemas.graph_rag_schema import DocumentType
+from ETL.embedding_store import PostingLists, SegmentedEmbeddingStore
+from ETL.vector_index import NumpyVectorIndex, SegmentedVectorIndex, normalize_rows
+
+DIM = 16
+
+
+def make_rows(tickers):
+    return [
+        {
+            "node_id": f"chunk_{i}",
+            "document_id": f"doc_{i}",
+            "content": f"content {i}",
+            "content_type": "10k" if i % 3 else "8k",
+            "parent_document": f"doc_{i}.txt",
+            "ticker": ticker,
+        }
+        for i, ticker in enumerate(tickers)
+    ]
+
+
+def random_vectors(n, seed=0):
+    return normalize_rows(np.random.default_rng(seed).standard_normal((n, DIM)))
+
+
+class TestPostingLists:
+    def test_select_intersects_fields_and_unions_values(self):
+        postings = PostingLists.from_rows(make_rows(["AAPL", "MSFT", "NFLX", "AAPL", "MSFT"]))
+
+        rows, residual = postings.select({"ticker": ["AAPL", "NFLX"], "content_type": "10k"})
+        assert list(rows) == [2]
+        assert residual == {}
+
+        rows, residual = postings.select({"ticker": "TSLA", "document_id": "doc_1"})
+        assert len(rows) == 0
+        assert residual == {"document_id": "doc_1"}
+
+        assert postings.select({"document_id": "doc_1"})[0] is None
+
+    def test_save_load_round_trip(self, tmp_path):
+        postings = PostingLists.from_rows(make_rows(["AAPL", "MSFT", "AAPL"]))
+        postings.save(tmp_path / "postings.npz")
+
+        loaded = PostingLists.load(tmp_path / "postings.npz")
+        assert list(loaded.lists["ticker"]["AAPL"]) == [0, 2]
+        assert list(loaded.lists["content_type"]["8k"]) == [0]
+
+
+def brute_force_subset(queries, data, rows, k):
+    scores = queries @ data[rows].T
+    order = np.argsort(-scores, axis=1)[:, :k]
+    return np.asarray(rows)[order]
+
+
+def test_subset_search_matches_brute_force():
+    data = random_vectors(500)
+    queries = random_vectors(4, seed=1)
+    rows = np.sort(np.random.default_rng(2).choice(500, 60, replace=False))
+
+    flat = NumpyVectorIndex.from_matrix(data)
+    segmented = SegmentedVectorIndex([(data[:200], None), (data[200:], None)])
+    expected = brute_force_subset(queries, data, rows, 5)
+
+    np.testing.assert_array_equal(flat.search_subset(queries, 5, rows)[1], expected)
+    np.testing.assert_array_equal(segmented.search_subset(queries, 5, rows)[1], expected)
+    small_blocks = NumpyVectorIndex.from_matrix(data, max_block_elements=64)
+    np.testing.assert_array_equal(small_blocks.search_subset(queries, 5, rows)[1], expected)
+
+
+def test_store_postings_follow_tombstones_and_compaction(tmp_path):
+    store = SegmentedEmbeddingStore.create(tmp_path)
+    rows = make_rows(["AAPL", "NFLX", "MSFT", "NFLX"])
+    store.update(random_vectors(4), rows)
+    replacement = dict(rows[1], node_id="chunk_1_v2", ticker="MSFT")
+    store.update(random_vectors(1, seed=3), [replacement])
+
+    postings = store.postings()
+    assert list(postings.lists["ticker"]["NFLX"]) == [3]
+    assert list(postings.lists["ticker"]["MSFT"]) == [2, 4]
+
+    store.compact()
+    compacted = SegmentedEmbeddingStore.open(tmp_path)
+    nflx = compacted.postings().lists["ticker"]["NFLX"]
+    assert [compacted.metadata[int(i)]["node_id"] for i in nflx] == ["chunk_3"]
+
+
+class QueryModel:
+    def __init__(self, vector):
+        self.vector = vector
+
+    def encode_texts(self, texts):
+        return np.array([self.vector] * len(texts), dtype=np.float32)
+
+
+def test_rare_ticker_filter_returns_full_top_k(tmp_path, monkeypatch):
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    tickers = ["NFLX" if i % 50 == 0 else "AAPL" for i in range(500)]
+    vectors = random_vectors(500)
+
+    generator = sr.SemanticEmbeddingGenerator()
+    generator.config = sr.VectorEmbeddingConfig(dimension=DIM, cache_embeddings=False)
+    generator._save_embeddings_data(make_rows(tickers), tmp_path, vectors)
+
+    retriever = sr.SemanticRetriever(tmp_path)
+    retriever.model = QueryModel(vectors[1])
+    results = retriever.retrieve_relevant_content(
+        "netflix", top_k=5, min_similarity=-1.0, content_filter={"ticker": "NFLX"}
+    )
+
+    nflx_rows = [i for i, t in enumerate(tickers) if t == "NFLX"]
+    expected = brute_force_subset(vectors[1:2], vectors, nflx_rows, 5)[0]
+    assert [r.node_id for r in results] == [f"chunk_{i}" for i in expected]
+
+    typed = retriever.retrieve_relevant_content(
+        "netflix",
+        top_k=3,
+        min_similarity=-1.0,
+        content_filter={"ticker": "NFLX", "content_type": DocumentType.SEC_8K},
+    )
+    assert typed and all(r.document_type == DocumentType.SEC_8K for r in typed)
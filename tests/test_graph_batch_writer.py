@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for batched UNWIND writes to Neo4j.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.graph_batch_writer import GraphBatchWriter, GraphWriteError, node_statement
+
+
+class RecordingDB:
+    """Records statements per transaction, like neomodel's db.cypher_query / db.transaction."""
+
+    def __init__(self, fail_on=None):
+        self.transactions = []
+        self.fail_on = fail_on
+        self._open = None
+
+    @property
+    def transaction(self):
+        return self
+
+    def __enter__(self):
+        self._open = []
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.transactions.append(self._open)
+        self._open = None
+        return False
+
+    def cypher_query(self, query, params=None):
+        assert self._open is not None, "statement outside an explicit transaction"
+        if self.fail_on and self.fail_on in query:
+            raise RuntimeError("constraint violation")
+        self._open.append((query, params["rows"]))
+        return [], None
+
+
+def queue_filing(writer, ticker, accession):
+    writer.merge_node("SECFiling", "accession_number", {"accession_number": accession})
+    writer.merge_relationship(
+        "HAS_FILING", ("Stock", "ticker"), ticker, ("SECFiling", "accession_number"), accession
+    )
+
+
+def test_rows_are_written_in_unwind_batches_nodes_first():
+    db = RecordingDB()
+    writer = GraphBatchWriter(db, batch_size=3)
+
+    writer.merge_node("Stock", "ticker", {"ticker": "AAPL", "sector": "Technology"})
+    queue_filing(writer, "AAPL", "a1")
+    queue_filing(writer, "AAPL", "a2")
+    assert db.transactions == [] and writer.pending == 5
+    queue_filing(writer, "AAPL", "a3")  # Third filing fills the SECFiling batch
+    queue_filing(writer, "AAPL", "a4")
+    writer.flush()
+
+    first, second = db.transactions
+    assert [query.split()[5] for query, _ in first] == [
+        "(n:Stock",
+        "(n:SECFiling",
+        "(a:Stock",
+    ]
+    assert first[0] == (
+        "UNWIND $rows AS row MERGE (n:Stock {ticker: row.ticker}) SET n += row",
+        [{"ticker": "AAPL", "sector": "Technology"}],
+    )
+    assert first[1][1] == [{"accession_number": f"a{i}"} for i in (1, 2, 3)]
+    assert first[2][0] == (
+        "UNWIND $rows AS row MATCH (a:Stock {ticker: row.start}) "
+        "MATCH (b:SECFiling {accession_number: row.end}) MERGE (a)-[:HAS_FILING]->(b)"
+    )
+    assert first[2][1] == [{"start": "AAPL", "end": f"a{i}"} for i in (1, 2)]
+    assert [rows for _, rows in second] == [
+        [{"accession_number": "a4"}],
+        [{"start": "AAPL", "end": "a3"}, {"start": "AAPL", "end": "a4"}],
+    ]
+    assert writer.stats["statements"] == 5
+    assert writer.stats["transactions"] == 2
+    assert writer.stats["rows"] == 9
+    assert writer.stats["nodes"] == {"Stock": 1, "SECFiling": 4}
+    assert writer.stats["relationships"] == {"HAS_FILING": 4}
+    assert writer.pending == 0
+
+
+def test_flush_without_rows_sends_nothing():
+    db = RecordingDB()
+    writer = GraphBatchWriter(db)
+
+    writer.flush()
+
+    assert db.transactions == [] and writer.stats["transactions"] == 0
+
+
+def test_failed_flush_raises_and_drops_the_batch():
+    db = RecordingDB(fail_on="HAS_FILING")
+    writer = GraphBatchWriter(db, batch_size=10)
+    queue_filing(writer, "AAPL", "a1")
+
+    with pytest.raises(GraphWriteError):
+        writer.flush()
+
+    assert db.transactions == [] and writer.pending == 0
+    assert writer.stats["nodes"] == {} and writer.stats["relationships"] == {}
+    writer.merge_node("Stock", "ticker", {"ticker": "MSFT"})
+    writer.flush()
+    assert len(db.transactions) == 1
+    assert writer.stats["nodes"] == {"Stock": 1}
+
+
+def test_failed_automatic_flush_raises_from_the_queueing_call():
+    db = RecordingDB(fail_on="HAS_FILING")
+    writer = GraphBatchWriter(db, batch_size=2)
+    queue_filing(writer, "AAPL", "a1")
+
+    # The second SECFiling row fills its batch and flushes the pending HAS_FILING row too
+    with pytest.raises(GraphWriteError):
+        queue_filing(writer, "AAPL", "a2")
+    assert writer.stats["rows"] == 0 and writer.pending == 0
+
+
+def test_identifiers_are_validated():
+    with pytest.raises(ValueError):
+        node_statement("Stock}) DETACH DELETE (n", "ticker")
+    with pytest.raises(ValueError):
+        GraphBatchWriter(RecordingDB(), batch_size=0)
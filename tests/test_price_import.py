@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk price history import (UNWIND batches and neo4j-admin CSVs).
+"""
+
+import csv
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.graph_batch_writer import GraphBatchWriter
+from ETL.price_import import AdminCsvExport, history_columns, queue_prices
+
+HISTORY = {
+    "Date": ["2024-01-02T00:00:00-05:00", "2024-01-03T00:00:00-05:00", "2024-01-04T00:00:00-05:00"],
+    "Open": [187.15, 184.22, 182.15],
+    "High": [188.44, 185.88, 183.09],
+    "Low": [183.89, 183.43, 180.88],
+    "Close": [185.64, 184.25, float("nan")],
+    "Volume": [82488700, 58414500, 71983600.0],
+    "Dividends": [0.0, 0.0, 0.0],
+}
+
+
+class RecordingDB:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def transaction(self):
+        return self
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def cypher_query(self, query, params=None):
+        self.statements.append((query, params["rows"]))
+        return [], None
+
+
+def test_history_columns_use_the_real_bar_dates():
+    columns = history_columns(HISTORY)
+
+    assert columns["day"] == HISTORY["Date"]
+    assert datetime.fromtimestamp(columns["date"][0], timezone.utc) == datetime(
+        2024, 1, 2, 5, tzinfo=timezone.utc
+    )
+    assert columns["close"][:2] == [185.64, 184.25]
+    assert columns["volume"] == [82488700, 58414500, 71983600]
+    assert "Dividends" not in columns
+
+
+def test_history_without_dates_is_not_imported():
+    legacy = {key: value for key, value in HISTORY.items() if key != "Date"}
+
+    assert history_columns(legacy) is None
+    assert history_columns({}) is None
+
+
+def test_spider_history_keeps_its_date_index():
+    pd = pytest.importorskip("pandas")
+    from ETL.yfinance_spider import fetch_stock_data
+
+    class Ticker:
+        def history(self, period, interval):
+            index = pd.DatetimeIndex(["2024-01-02", "2024-01-03"], tz="America/New_York")
+            frame = pd.DataFrame({"Open": [1.0, 2.0], "Close": [1.5, 2.5]}, index=index)
+            frame.index.name = "Date"
+            return frame
+
+    data = fetch_stock_data("AAPL", "5d", "1d", tkr=Ticker())
+    history = json.loads(json.dumps(data["history"], default=str))
+
+    assert history["Date"] == ["2024-01-02T00:00:00-05:00", "2024-01-03T00:00:00-05:00"]
+    assert history["Close"] == [1.5, 2.5]
+
+
+def test_prices_are_queued_as_unwind_batches():
+    db = RecordingDB()
+    writer = GraphBatchWriter(db, batch_size=2)
+
+    assert queue_prices(writer, "AAPL", "1d", history_columns(HISTORY)) == 3
+    writer.flush()
+
+    nodes = [rows for query, rows in db.statements if "MERGE (n:PriceData" in query]
+    rels = [rows for query, rows in db.statements if "HAS_PRICE" in query]
+    assert [len(rows) for rows in nodes] == [2, 1]
+    first = nodes[0][0]
+    assert first["price_id"] == "AAPL_1d_2024-01-02T00:00:00-05:00"
+    assert first["interval"] == "1d"
+    assert first["open"] == 187.15 and first["volume"] == 82488700
+    assert [row["end"] for rows in rels for row in rows] == [
+        row["price_id"] for rows in nodes for row in rows
+    ]
+
+
+def test_admin_csv_export_writes_each_bar_once(tmp_path):
+    with AdminCsvExport(str(tmp_path)) as export:
+        export.add_stock("AAPL", "1y", "1d", "2025-01-01T00:00:00")
+        export.add_stock("AAPL", "5y", "1d", "2025-01-01T00:00:00")
+        export.add_prices("AAPL", "1d", history_columns(HISTORY))
+        export.add_prices("AAPL", "1d", history_columns(HISTORY))  # Overlapping period
+        export.add_prices("AAPL", "1mo", history_columns(HISTORY))
+
+    def read(name):
+        with open(tmp_path / name, newline="") as f:
+            return list(csv.reader(f))
+
+    stocks, prices, has_price = read("stocks.csv"), read("prices.csv"), read("has_price.csv")
+    assert stocks[0][0] == "ticker:ID(Stock)" and len(stocks) == 2
+    assert prices[0][0] == "price_id:ID(PriceData)" and len(prices) == 1 + 6
+    assert prices[3][6] == ""  # NaN close
+    assert has_price[1] == ["AAPL", "AAPL_1d_2024-01-02T00:00:00-05:00"]
+    assert export.stats == {"stocks": 1, "prices": 6, "duplicates": 3}
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests for the consolidated multi-ticker price store.
+"""
+
+import json
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.price_store import MANIFEST_FILE, PriceStore, build_price_store
+
+
+def history(days, closes, offset="-05:00"):
+    return {
+        "Date": [f"{day}T00:00:00{offset}" for day in days],
+        "Open": closes,
+        "High": closes,
+        "Low": closes,
+        "Close": closes,
+        "Volume": [1000] * len(closes),
+    }
+
+
+def write_extract(extract_dir, partition, ticker, stamp, hist, interval="1d"):
+    ticker_dir = extract_dir / partition / ticker
+    ticker_dir.mkdir(parents=True, exist_ok=True)
+    data = {"ticker": ticker, "period": "5y", "interval": interval, "history": hist}
+    path = ticker_dir / f"{ticker}_yfinance_D1_{stamp}.json"
+    path.write_text(json.dumps(data))
+
+
+@pytest.fixture
+def extracts(tmp_path):
+    extract_dir = tmp_path / "yfinance"
+    write_extract(
+        extract_dir,
+        "20240310",
+        "AAPL",
+        "240310-090000",
+        history(["2024-03-07", "2024-03-08"], [169.0, 170.7]),
+    )
+    # A later fetch overlapping the first, across a DST change
+    write_extract(
+        extract_dir,
+        "20240313",
+        "AAPL",
+        "240313-090000",
+        history(["2024-03-08", "2024-03-11", "2024-03-12"], [170.8, 172.8, 173.2], "-04:00"),
+    )
+    write_extract(
+        extract_dir,
+        "20240313",
+        "MSFT",
+        "240313-090000",
+        history(["2024-03-07", "2024-03-12"], [401.0, 415.0], "-04:00"),
+    )
+    return extract_dir
+
+
+class TestPriceStore:
+    def test_build_merges_extracts_into_one_panel(self, extracts, tmp_path):
+        stats = build_price_store(str(extracts), str(tmp_path / "store"))
+        store = PriceStore.open(tmp_path / "store")
+
+        assert stats["files"] == 3
+        assert store.tickers() == ["AAPL", "MSFT"]
+        dates, values = store.get_array()
+        assert [str(d) for d in dates.astype("datetime64[D]")] == [
+            "2024-03-07",
+            "2024-03-08",
+            "2024-03-11",
+            "2024-03-12",
+        ]
+        # Newer fetch wins on 2024-03-08; MSFT did not trade every day
+        np.testing.assert_array_equal(
+            values,
+            [[169.0, 401.0], [170.8, np.nan], [172.8, np.nan], [173.2, 415.0]],
+        )
+
+    def test_range_queries_are_inclusive(self, extracts, tmp_path):
+        build_price_store(str(extracts), str(tmp_path / "store"))
+        store = PriceStore.open(tmp_path / "store")
+
+        dates, values = store.get_array(["MSFT", "AAPL"], "2024-03-08", date(2024, 3, 12))
+        assert len(dates) == 3
+        np.testing.assert_array_equal(values[-1], [415.0, 173.2])
+        dates, _ = store.get_array(["AAPL"], end=datetime(2024, 3, 11))
+        assert len(dates) == 3
+        dates, _ = store.get_array(["AAPL"], "2024-03-13")
+        assert len(dates) == 0
+
+    def test_asof_takes_last_known_value(self, extracts, tmp_path):
+        build_price_store(str(extracts), str(tmp_path / "store"))
+        store = PriceStore.open(tmp_path / "store")
+
+        np.testing.assert_array_equal(
+            store.get_asof(["AAPL", "MSFT"], "2024-03-11"), [172.8, 401.0]
+        )
+        assert np.isnan(store.get_asof(["AAPL"], "2024-03-01")).all()
+
+    def test_unknown_tickers_and_intervals_raise(self, extracts, tmp_path):
+        build_price_store(str(extracts), str(tmp_path / "store"))
+        store = PriceStore.open(tmp_path / "store")
+
+        with pytest.raises(KeyError):
+            store.get_array(["NVDA"])
+        with pytest.raises(KeyError):
+            store.get_array(interval="1h")
+        with pytest.raises(KeyError):
+            store.get_array(field="adj_close")
+
+    def test_missing_store_opens_as_none(self, tmp_path):
+        assert PriceStore.open(tmp_path) is None
+
+    def test_rebuild_replaces_previous_panels(self, extracts, tmp_path):
+        store_dir = tmp_path / "store"
+        build_price_store(str(extracts), str(store_dir))
+        write_extract(
+            extracts,
+            "20240314",
+            "NVDA",
+            "240314-090000",
+            history(["2024-03-13"], [900.0], "-04:00"),
+        )
+        build_price_store(str(extracts), str(store_dir))
+
+        manifest = json.loads((store_dir / MANIFEST_FILE).read_text())
+        assert [p.name for p in store_dir.iterdir() if p.is_dir()] == [
+            manifest["intervals"]["1d"]["path"]
+        ]
+        assert PriceStore.open(store_dir).tickers() == ["AAPL", "MSFT", "NVDA"]
+
+    def test_get_prices_returns_dataframe(self, extracts, tmp_path):
+        pytest.importorskip("pandas")
+        build_price_store(str(extracts), str(tmp_path / "store"))
+        store = PriceStore.open(tmp_path / "store")
+
+        prices = store.get_prices(["MSFT"], "2024-03-12", "2024-03-12", field="volume")
+        assert list(prices.columns) == ["MSFT"]
+        assert prices.index[0] == datetime(2024, 3, 12)
+        assert prices["MSFT"].iloc[0] == 1000
+
+
+def test_backtest_engine_loads_prices_from_store(extracts, tmp_path):
+    pytest.importorskip("pandas")
+    from decimal import Decimal
+
+    from evaluation.backtesting.engine import (
+        BacktestConfig,
+        BacktestEngine,
+        RebalanceFrequency,
+        StrategySignal,
+    )
+
+    build_price_store(str(extracts), str(tmp_path / "store"))
+    engine = BacktestEngine(PriceStore.open(tmp_path / "store"))
+    config = BacktestConfig(
+        start_date=datetime(2024, 3, 8),
+        end_date=datetime(2024, 3, 12),
+        initial_capital=Decimal("100000"),
+        rebalance_frequency=RebalanceFrequency.DAILY,
+    )
+    signal = StrategySignal(
+        "MSFT", "BUY", Decimal("0.5"), Decimal("0.8"), "test", datetime(2024, 3, 8)
+    )
+
+    prices = engine._load_market_data([signal], config)
+
+    # SPY is not stored; MSFT's 2024-03-07 close carries into the days it has no bar
+    assert list(prices.columns) == ["MSFT"]
+    assert prices["MSFT"].tolist() == [401.0, 401.0, 415.0]
+
+    unknown = StrategySignal(
+        "NVDA", "BUY", Decimal("0.5"), Decimal("0.8"), "test", datetime(2024, 3, 8)
+    )
+    with pytest.raises(ValueError):
+        engine._load_market_data([unknown], config)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Tests for the concurrent, rate-limited SEC EDGAR downloader.
+Runs ETL/sec_edgar_spider.run_job against a local fake EDGAR HTTP server.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.sec_edgar_downloader import (
+    EdgarClient,
+    EdgarDownloader,
+    EdgarRequestError,
+    PriorityScheduler,
+    select_filings,
+)
+
+COMPANIES = {
+    "0000320193": ["10-K", "10-Q", "8-K", "10-Q", "10-K/A", "10-K"],
+    "0000789019": ["8-K", "10-Q", "10-K"],
+}
+
+
+def submissions(cik, companies=COMPANIES):
+    forms = companies[cik]
+    n = len(forms)
+    return {
+        "cik": str(int(cik)),
+        "tickers": ["SUB"],
+        "filings": {
+            "recent": {
+                # Newest first; accession numbers count up with filing order
+                "accessionNumber": [f"{cik}-24-{n - 1 - i:06d}" for i in range(n)],
+                "filingDate": [f"2024-{12 - i:02d}-01" for i in range(len(forms))],
+                "form": forms,
+            }
+        },
+    }
+
+
+class FakeEdgarHandler(BaseHTTPRequestHandler):
+    """Serves submissions JSON and filing text like data.sec.gov / www.sec.gov."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.user_agents.add(self.headers.get("User-Agent"))
+            failures = server.failures.get(self.path, 0)
+            if failures:
+                server.failures[self.path] = failures - 1
+        if failures:
+            return self._send(429, b"Too Many Requests")
+
+        match = re.fullmatch(r"/submissions/CIK(\d{10})\.json", self.path)
+        if match and match.group(1) in server.companies:
+            body = json.dumps(submissions(match.group(1), server.companies)).encode()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if server.etags and self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", etag)
+            return self._send(200, body, etag if server.etags else None)
+        match = re.fullmatch(r"/Archives/edgar/data/(\d+)/(\d{18})/([\d-]+)\.txt", self.path)
+        if match and match.group(3) not in server.missing:
+            return self._send(200, f"<SEC-DOCUMENT>{match.group(3)}".encode())
+        self._send(404, b"Not Found")
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def edgar():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeEdgarHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.user_agents = set()
+    server.failures = {}
+    server.missing = set()
+    server.companies = {cik: list(forms) for cik, forms in COMPANIES.items()}
+    server.etags = True
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def spider(tmp_path):
+    from ETL import sec_edgar_spider
+
+    with patch.object(sec_edgar_spider, "STAGE_01_EXTRACT_DIR", str(tmp_path / "extract")):
+        yield sec_edgar_spider
+
+
+def write_config(tmp_path, edgar, **overrides):
+    config = {
+        "tickers": list(COMPANIES),
+        "email": "Test Suite (test@example.com)",
+        "base_url": edgar.url,
+        "archives_url": edgar.url,
+        "filing_types": {
+            "8K": {"priority": 3, "max_filings": 1},
+            "10K": {"priority": 1, "max_filings": 2},
+            "10Q": {"priority": 2, "max_filings": 2},
+        },
+        "rate_limits": {"requests_per_second": 1000, "max_retries": 2, "retry_after_seconds": 0},
+        "max_workers": 4,
+    }
+    config.update(overrides)
+    config_path = tmp_path / "job.yml"
+    config_path.write_text(yaml.dump(config))
+    return str(config_path)
+
+
+def downloaded(tmp_path):
+    return sorted(p.relative_to(tmp_path / "extract").parts for p in tmp_path.rglob("*.txt"))
+
+
+class TestRunJob:
+    def test_downloads_latest_filings_of_each_type(self, spider, edgar, tmp_path):
+        summary = spider.run_job(write_config(tmp_path, edgar))
+
+        files = downloaded(tmp_path)
+        names = [re.sub(r"_\d{6}-\d{6}_", "_", name) for _, _, name in files]
+        assert names == [
+            "AAPL_sec_edgar_10k_0000320193-24-000000.txt",
+            "AAPL_sec_edgar_10k_0000320193-24-000005.txt",
+            "AAPL_sec_edgar_10q_0000320193-24-000002.txt",
+            "AAPL_sec_edgar_10q_0000320193-24-000004.txt",
+            "AAPL_sec_edgar_8k_0000320193-24-000003.txt",
+            "MSFT_sec_edgar_10k_0000789019-24-000000.txt",
+            "MSFT_sec_edgar_10q_0000789019-24-000001.txt",
+            "MSFT_sec_edgar_8k_0000789019-24-000002.txt",
+        ]
+        assert summary["downloaded"] == 8 and summary["errors"] == 0
+        assert summary["requests"] == len(edgar.requests) == 10
+        assert edgar.user_agents == {"Test Suite (test@example.com)"}
+
+    def test_filings_are_downloaded_in_priority_order(self, spider, edgar, tmp_path):
+        spider.run_job(write_config(tmp_path, edgar, max_workers=1))
+
+        forms = []
+        for path in edgar.requests:
+            if path.startswith("/Archives"):
+                company = COMPANIES[path.split("/")[4].zfill(10)]
+                forms.append(company[len(company) - 1 - int(path[-10:-4])])
+        assert forms == ["10-K"] * 3 + ["10-Q"] * 3 + ["8-K"] * 2
+
+    def test_throttled_requests_are_retried(self, spider, edgar, tmp_path):
+        edgar.failures["/submissions/CIK0000789019.json"] = 2
+        edgar.missing.add("0000320193-24-000003")
+
+        summary = spider.run_job(write_config(tmp_path, edgar))
+
+        # 429s are retried within the shared budget; the 404 is not retried
+        assert summary["downloaded"] == 7 and summary["errors"] == 1
+        assert summary["requests"] == 12
+        missing = "/Archives/edgar/data/320193/000032019324000003/0000320193-24-000003.txt"
+        assert edgar.requests.count(missing) == 1
+
+    def test_rerun_skips_filings_already_downloaded(self, spider, edgar, tmp_path):
+        config_path = write_config(tmp_path, edgar)
+        spider.run_job(config_path)
+        first = downloaded(tmp_path)
+
+        summary = spider.run_job(config_path)
+
+        assert summary["skipped"] == 8 and summary["downloaded"] == 0
+        assert summary["requests"] == 2
+        assert downloaded(tmp_path) == first
+
+    def test_unknown_cik_and_filing_type_are_errors(self, spider, edgar, tmp_path):
+        config_path = write_config(
+            tmp_path, edgar, tickers=["0000000001"], filing_types=None, file_types=["10K"]
+        )
+        assert spider.run_job(config_path)["errors"] == 1
+
+        config_path = write_config(tmp_path, edgar, filing_types={"S1": {"priority": 1}})
+        assert spider.run_job(config_path)["errors"] == 2
+
+
+class TestIncrementalSync:
+    FILING_TYPES = [("10K", 1, 2), ("10Q", 2, 2), ("8K", 3, 1)]
+
+    def sync(self, edgar, tmp_path, day):
+        client = EdgarClient("Test", data_url=edgar.url, archives_url=edgar.url)
+        downloader = EdgarDownloader(
+            client, str(tmp_path / day), manifest_dir=str(tmp_path / ".manifests")
+        )
+        stats = downloader.run(
+            list(COMPANIES), self.FILING_TYPES, {"0000320193": "AAPL", "0000789019": "MSFT"}
+        )
+        return stats, client
+
+    def test_unchanged_filings_are_linked_not_fetched(self, edgar, tmp_path):
+        self.sync(edgar, tmp_path, "20251015")
+        edgar.requests.clear()
+
+        stats, client = self.sync(edgar, tmp_path, "20251016")
+
+        assert stats["linked"] == 8 and stats["downloaded"] == 0
+        assert client.requests == 2 and client.bytes_received == 0
+        assert all(path.startswith("/submissions") for path in edgar.requests)
+        first, second = (sorted((tmp_path / d).rglob("*.txt")) for d in ("20251015", "20251016"))
+        assert [p.name for p in first] == [p.name for p in second]
+        assert all(os.path.samefile(a, b) for a, b in zip(first, second))
+
+    def test_only_new_accessions_are_downloaded(self, edgar, tmp_path):
+        self.sync(edgar, tmp_path, "20251015")
+        edgar.companies["0000789019"].insert(0, "8-K")
+        edgar.requests.clear()
+
+        stats, _ = self.sync(edgar, tmp_path, "20251016")
+
+        assert stats["downloaded"] == 1 and stats["linked"] == 7
+        assert edgar.requests[-1].endswith("0000789019-24-000003.txt")
+
+    def test_missing_source_file_is_downloaded_again(self, edgar, tmp_path):
+        self.sync(edgar, tmp_path, "20251015")
+        for path in (tmp_path / "20251015" / "AAPL").glob("*_10k_*.txt"):
+            path.unlink()
+        edgar.etags = False
+
+        stats, _ = self.sync(edgar, tmp_path, "20251016")
+
+        assert stats["downloaded"] == 2 and stats["linked"] == 6
+
+    def test_downloader_can_run_again_on_fewer_ciks(self, edgar, tmp_path):
+        client = EdgarClient("Test", data_url=edgar.url, archives_url=edgar.url)
+        downloader = EdgarDownloader(
+            client, str(tmp_path / "20251015"), manifest_dir=str(tmp_path / ".manifests")
+        )
+        downloader.run(list(COMPANIES), self.FILING_TYPES)
+        edgar.companies["0000320193"].insert(0, "8-K")
+
+        stats = downloader.run(["0000320193"], self.FILING_TYPES)
+
+        assert stats["errors"] == 0
+        manifest = json.loads((tmp_path / ".manifests/CIK0000320193.json").read_text())
+        assert "0000320193-24-000006" in manifest["filings"]
+
+    def test_run_job_keeps_manifests_unless_disabled(self, spider, edgar, tmp_path):
+        spider.run_job(write_config(tmp_path, edgar, incremental=False))
+        assert not (tmp_path / "extract" / ".manifests").exists()
+
+        spider.run_job(write_config(tmp_path, edgar))
+        manifest = json.loads((tmp_path / "extract/.manifests/CIK0000789019.json").read_text())
+        assert sorted(manifest["filings"]) == [f"0000789019-24-00000{i}" for i in range(3)]
+
+
+def test_parse_filing_types_orders_by_priority(spider):
+    config = {"count": 4, "filing_types": {"8K": {"priority": 3}, "10K": {"max_filings": 1}}}
+    assert spider.parse_filing_types(config) == [("10K", 1.0, 1), ("8K", 3.0, 4)]
+    assert spider.parse_filing_types({"file_types": ["10Q", "8K"]}) == [
+        ("10Q", 0.0, 8),
+        ("8K", 1.0, 8),
+    ]
+
+
+def test_select_filings_respects_form_count_and_start_date():
+    document = submissions("0000320193")
+
+    assert [f["accession"][-1] for f in select_filings(document, "10-K", 5)] == ["5", "0"]
+    assert select_filings(document, "10-Q", 5, start_date="2024-10-01") == [
+        {"accession": "0000320193-24-000004", "filing_date": "2024-11-01"}
+    ]
+
+
+def test_client_raises_without_retrying_client_errors(edgar):
+    sleeps = []
+    client = EdgarClient("Test", data_url=edgar.url, max_retries=3, sleep=sleeps.append)
+
+    with pytest.raises(EdgarRequestError) as error:
+        client.get(f"{edgar.url}/missing")
+
+    assert error.value.status == 404
+    assert client.requests == 1 and sleeps == []
+
+
+def test_priority_scheduler_runs_spawned_tasks_by_priority():
+    scheduler = PriorityScheduler(max_workers=1)
+    order = []
+
+    def task(name, children=()):
+        order.append(name)
+        for priority, child in children:
+            scheduler.submit(priority, task, child)
+
+    scheduler.submit(0, task, "list", [(2, "low"), (1, "high"), (1, "high-2")])
+    scheduler.submit(5, task, "last")
+    scheduler.run()
+
+    assert order == ["list", "high", "high-2", "low", "last"]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Tests for the SEC filing processing stage (parse, clean and chunk per filing).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.sec_filing_processor import (
+    CHUNK_FILE_SUFFIX,
+    chunk_file_spans,
+    chunk_spans,
+    iter_chunk_documents,
+    process_filings,
+    read_chunk_header,
+)
+
+PARAGRAPH = "<p>Revenue grew in every segment &amp; region. Margins held steady.</p>\n"
+
+
+def filing(accession, paragraphs):
+    return (
+        f"<SEC-DOCUMENT>{accession}.txt\n"
+        "<DOCUMENT>\n<TYPE>10-K\n<SEQUENCE>1\n<FILENAME>main.htm\n<TEXT>\n"
+        f"<html><body>{PARAGRAPH * paragraphs}</body></html>\n</TEXT>\n</DOCUMENT>\n"
+        "<DOCUMENT>\n<TYPE>GRAPHIC\n<SEQUENCE>2\n<FILENAME>chart.jpg\n<TEXT>\n"
+        "begin 644 chart.jpg\nM" + "A" * 60 + "\nend\n</TEXT>\n</DOCUMENT>\n"
+        "<DOCUMENT>\n<TYPE>EX-21\n<SEQUENCE>3\n<FILENAME>ex21.htm\n<TEXT>\n"
+        "Subsidiaries\n</TEXT>\n</DOCUMENT>\n</SEC-DOCUMENT>\n"
+    )
+
+
+SENTENCES = "First sentence here. Second one is longer than that.\n\n  Third\u00a0one.  " * 20
+
+
+def test_chunks_are_trimmed_offsets_broken_at_sentence_ends():
+    spans = chunk_spans(SENTENCES, 60, 10)
+
+    texts = [SENTENCES[start:end] for start, end in spans]
+    assert all(len(text) <= 60 and text == text.strip() for text in texts)
+    # Every chunk but the last ends at a sentence end, not just the first one
+    assert all(text.endswith(".") for text in texts[:-1])
+    assert spans[-1][1] == len(SENTENCES.rstrip())
+    # Consecutive chunks overlap and together cover the text
+    assert all(b[0] <= a[1] for a, b in zip(spans, spans[1:]))
+    covered = "".join(SENTENCES[a[1] : b[0]] for a, b in zip(spans, spans[1:]))
+    assert covered.strip() == ""
+
+
+def test_binary_and_mmap_buffers_give_the_same_offsets(tmp_path):
+    text = SENTENCES.replace("\u00a0", " ")
+    path = tmp_path / "text.txt"
+    path.write_text(text)
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+
+    assert chunk_spans(text.encode(), 60, 10) == chunk_spans(text, 60, 10)
+    assert chunk_file_spans(str(path), 60, 10) == chunk_spans(text, 60, 10)
+    assert chunk_file_spans(str(empty), 60, 10) == []
+
+
+def test_chunking_always_moves_forward():
+    assert chunk_spans("abcdefghij", 4, 10) == [(i, min(i + 4, 10)) for i in range(7)]
+    assert chunk_spans("   \n  ", 4, 1) == []
+    with pytest.raises(ValueError):
+        chunk_spans("text", 0, 0)
+
+
+class RecordingTracker:
+    def __init__(self):
+        self.logs = []
+
+    def log_stage_output(self, stage, log_content):
+        self.logs.append((stage, log_content))
+
+
+@pytest.fixture
+def sec_dir(tmp_path):
+    root = tmp_path / "sec_edgar"
+    (root / "20251015" / "AAPL").mkdir(parents=True)  # older partitions are ignored
+    partition = root / "20251016"
+    for ticker, cik, paragraphs in [("MSFT", "0000789019", 3), ("AAPL", "0000320193", 20)]:
+        ticker_dir = partition / ticker
+        ticker_dir.mkdir(parents=True)
+        for n, kind in enumerate(["10k", "10q"]):
+            accession = f"{cik}-24-00000{n}"
+            name = f"{ticker}_sec_edgar_{kind}_251016-000000_{accession}.txt"
+            (ticker_dir / name).write_text(filing(accession, paragraphs * (n + 1)))
+    (partition / "CIK_0000000001").mkdir()
+    return root
+
+
+def chunk_texts(chunk_file):
+    return [
+        document["text"][start:end]
+        for document in iter_chunk_documents(chunk_file)
+        for start, end in document["chunks"]
+    ]
+
+
+def test_filings_are_chunked_into_files_keyed_by_accession(sec_dir, tmp_path):
+    tracker = RecordingTracker()
+
+    stats = process_filings(
+        str(sec_dir), str(tmp_path / "chunks"), 200, 20, max_workers=2, tracker=tracker
+    )
+
+    assert (stats["processed"], stats["unchanged"], stats["errors"]) == (4, 0, 0)
+    assert [(ticker, Path(chunk).name) for ticker, _, chunk in stats["outputs"]] == [
+        ("AAPL", "0000320193-24-000000" + CHUNK_FILE_SUFFIX),
+        ("AAPL", "0000320193-24-000001" + CHUNK_FILE_SUFFIX),
+        ("MSFT", "0000789019-24-000000" + CHUNK_FILE_SUFFIX),
+        ("MSFT", "0000789019-24-000001" + CHUNK_FILE_SUFFIX),
+    ]
+    chunk_file = stats["outputs"][0][2]
+    header = read_chunk_header(chunk_file)
+    assert header["accession"] == "0000320193-24-000000"
+    assert header["filing_type"] == "10k"
+    assert header["documents"] == 2  # the GRAPHIC is skipped
+    documents = list(iter_chunk_documents(chunk_file))
+    assert [d["type"] for d in documents] == ["10-K", "EX-21"]
+    assert "<p>" not in documents[0]["text"] and "&amp;" not in documents[0]["text"]
+    texts = chunk_texts(chunk_file)
+    assert len(texts) == header["chunks"] > 2
+    assert all(len(text) <= 200 for text in texts)
+
+    # Per-file timings are logged in filing order
+    stage, log = tracker.logs[0]
+    assert stage == "stage_02_transform"
+    assert [line.split()[1].rstrip(":") for line in log.splitlines()[1:]] == [
+        "0000320193-24-000000",
+        "0000320193-24-000001",
+        "0000789019-24-000000",
+        "0000789019-24-000001",
+    ]
+
+
+def test_output_does_not_depend_on_worker_count(sec_dir, tmp_path):
+    serial = process_filings(str(sec_dir), str(tmp_path / "serial"), 200, 20, max_workers=1)
+    parallel = process_filings(str(sec_dir), str(tmp_path / "parallel"), 200, 20, max_workers=3)
+
+    for (_, _, a), (_, _, b) in zip(serial["outputs"], parallel["outputs"]):
+        assert Path(a).read_text().splitlines()[1:] == Path(b).read_text().splitlines()[1:]
+
+
+def test_only_stale_filings_are_reprocessed(sec_dir, tmp_path):
+    output_dir = str(tmp_path / "chunks")
+    first = process_filings(str(sec_dir), output_dir, 200, 20, max_workers=1)
+
+    assert process_filings(str(sec_dir), output_dir, 200, 20)["unchanged"] == 4
+
+    source = first["outputs"][1][1]
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    again = process_filings(str(sec_dir), output_dir, 200, 20, max_workers=1)
+    assert (again["processed"], again["unchanged"]) == (1, 3)
+
+    assert process_filings(str(sec_dir), output_dir, 300, 20, max_workers=1)["processed"] == 4
+
+
+def test_failed_filing_is_reported_and_left_out(sec_dir, tmp_path):
+    broken = sec_dir / "20251016" / "MSFT" / "MSFT_sec_edgar_8k_251016-000000_broken.txt"
+    broken.symlink_to(tmp_path / "missing.txt")
+    tracker = RecordingTracker()
+
+    stats = process_filings(str(sec_dir), str(tmp_path / "chunks"), 200, 20, tracker=tracker)
+
+    assert (stats["processed"], stats["errors"]) == (4, 1)
+    assert str(broken) not in [source for _, source, _ in stats["outputs"]]
+    assert "FAILED" in tracker.logs[0][1]
+
+
+def test_embedding_generator_reads_chunk_files(sec_dir, tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    import ETL.semantic_retrieval as sr
+    from common.schemas.graph_rag_schema import VectorEmbeddingConfig
+
+    data_dir = tmp_path / "data"
+    (data_dir / "stage_01_extract").mkdir(parents=True)
+    sec_dir.rename(data_dir / "stage_01_extract" / "sec_edgar")
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    config = VectorEmbeddingConfig(dimension=8, chunk_size=200, cache_embeddings=False)
+    generator = sr.SemanticEmbeddingGenerator(config)
+    generator.model = None
+
+    # Without the stage's chunk directory the generator chunks the filings itself
+    result = generator.generate_document_embeddings(data_dir, chunk_dir=tmp_path / "missing")
+
+    chunk_dir = data_dir / "stage_02_transform" / "sec_chunks"
+    chunk_files = sorted(chunk_dir.rglob("*" + CHUNK_FILE_SUFFIX))
+    assert len(chunk_files) == result.documents_processed == 4
+    assert result.embeddings_created == sum(len(chunk_texts(f)) for f in chunk_files)
+    rows = list(generator.document_metadata.values())
+    assert {row["metadata"]["accession"] for row in rows if row["ticker"] == "MSFT"} == {
+        "0000789019-24-000000",
+        "0000789019-24-000001",
+    }
+
+
+def test_embedding_generator_reads_the_stage_chunk_directory(sec_dir, tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    import ETL.semantic_retrieval as sr
+    from common.schemas.graph_rag_schema import VectorEmbeddingConfig
+
+    chunk_dir = tmp_path / "sec_chunks"
+    process_filings(str(sec_dir), str(chunk_dir), 200, 20, max_workers=1)
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    monkeypatch.setattr(sr, "default_chunk_dir", lambda: chunk_dir)
+    monkeypatch.setattr(sr, "process_filings", lambda *args, **kwargs: pytest.fail("re-chunked"))
+    config = VectorEmbeddingConfig(
+        dimension=8, chunk_size=200, chunk_overlap=20, cache_embeddings=False
+    )
+    generator = sr.SemanticEmbeddingGenerator(config)
+    generator.model = None
+
+    result = generator.generate_document_embeddings(tmp_path / "data")
+
+    assert result.documents_processed == 4
+    assert result.embeddings_created == sum(
+        len(chunk_texts(f)) for f in chunk_dir.rglob("*" + CHUNK_FILE_SUFFIX)
+    )
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming SEC full submission text parser.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.sec_parser import iter_sec_documents, parse_sec_file
+
+FILING = b"""<SEC-DOCUMENT>0000320193-24-000123.txt : 20241101
+<SEC-HEADER>0000320193-24-000123.hdr.sgml : 20241101
+<TYPE>10-K
+</SEC-HEADER>
+<DOCUMENT>
+<TYPE>10-K
+<SEQUENCE>1
+<FILENAME>aapl-20240928.htm
+<DESCRIPTION>10-K
+<TEXT>
+<html><body><p>Apple &amp; Co.</p>
+<p>Revenue grew.</p></body></html>
+</TEXT>
+</DOCUMENT>
+<DOCUMENT>
+<TYPE>EX-21.1
+<SEQUENCE>2
+<FILENAME>a10-kexhibit2112024.htm
+<TEXT>
+Subsidiaries of Apple Inc.
+</TEXT>
+</DOCUMENT>
+<DOCUMENT>
+<TYPE>ZIP
+<SEQUENCE>3
+</DOCUMENT>
+</SEC-DOCUMENT>
+"""
+
+
+@pytest.fixture
+def filing(tmp_path):
+    path = tmp_path / "0000320193-24-000123.txt"
+    path.write_bytes(FILING)
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1 << 20])
+def test_documents_are_split_for_any_chunk_size(filing, chunk_size):
+    documents = [doc.to_dict() for doc in iter_sec_documents(filing, chunk_size)]
+
+    assert documents == [
+        {
+            "type": "10-K",
+            "sequence": "1",
+            "filename": "aapl-20240928.htm",
+            "description": "10-K",
+            "text": "Apple & Co.\nRevenue grew.",
+        },
+        {
+            "type": "EX-21.1",
+            "sequence": "2",
+            "filename": "a10-kexhibit2112024.htm",
+            "description": None,
+            "text": "Subsidiaries of Apple Inc.",
+        },
+        {"type": "ZIP", "sequence": "3", "filename": None, "description": None, "text": None},
+    ]
+    assert parse_sec_file(filing) == documents
+
+
+def test_text_is_read_from_the_file_on_access(filing):
+    main = next(iter_sec_documents(filing))
+
+    start, end = main.text_span
+    assert FILING[start:end] == main.raw_text
+    assert main.raw_text.startswith(b"\n<html>")
+    assert main._text is None
+    assert main.text.startswith("Apple")
+
+
+def test_truncated_filing_keeps_last_document(tmp_path):
+    path = tmp_path / "truncated.txt"
+    path.write_bytes(FILING[: FILING.index(b"Subsidiaries") + len(b"Subsidiaries")])
+
+    documents = list(iter_sec_documents(path, chunk_size=16))
+
+    assert [doc.type for doc in documents] == ["10-K", "EX-21.1"]
+    assert documents[1].text == "Subsidiaries"
+
+
+def test_file_without_documents_yields_nothing(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"<html><body>not a full submission</body></html>")
+
+    assert parse_sec_file(path) == []
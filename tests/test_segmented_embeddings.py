@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Tests for the append/tombstone segmented embedding store and incremental generation.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import ETL.semantic_retrieval as sr
+from common.schemas.graph_rag_schema import VectorEmbeddingConfig
+from ETL.embedding_store import SegmentedEmbeddingStore
+from ETL.vector_index import (
+    IVFVectorIndex,
+    NumpyVectorIndex,
+    SegmentedVectorIndex,
+    normalize_rows,
+)
+from ETL.vector_quantization import QuantizedVectorIndex
+
+DIM = 8
+
+
+def doc_rows(doc_id, n, version=0):
+    return [
+        {"node_id": f"{doc_id}_{i}_v{version}", "document_id": doc_id, "content": f"{doc_id} {i}"}
+        for i in range(n)
+    ]
+
+
+def doc_vectors(seed, n):
+    return normalize_rows(np.random.default_rng(seed).standard_normal((n, DIM)))
+
+
+def live_node_ids(store):
+    return sorted(row["node_id"] for _, row in store.metadata.items())
+
+
+class TestSegmentedVectorIndex:
+    def test_deleted_rows_are_never_returned(self):
+        first, second = doc_vectors(0, 50), doc_vectors(1, 30)
+        deleted = np.zeros(50, dtype=bool)
+        deleted[::3] = True
+        index = SegmentedVectorIndex([(first, deleted), (second, None)])
+
+        queries = doc_vectors(2, 5)
+        scores, indices = index.search(queries, 10)
+
+        live = np.concatenate([first[~deleted], second])
+        live_ids = np.concatenate([np.flatnonzero(~deleted), 50 + np.arange(30)])
+        expected = live_ids[np.argsort(-(queries @ live.T), axis=1)[:, :10]]
+        assert index.ntotal == len(live)
+        np.testing.assert_array_equal(indices, expected)
+
+    @pytest.mark.parametrize(
+        "build",
+        [
+            NumpyVectorIndex.from_matrix,
+            lambda m: IVFVectorIndex.build(m, nlist=4, nprobe=4),
+            lambda m: QuantizedVectorIndex.build(m, "int8"),
+        ],
+        ids=["flat", "ivf", "quantized"],
+    )
+    def test_tombstones_are_masked_inside_the_segment_scan(self, build):
+        vectors = doc_vectors(0, 60)
+        deleted = np.zeros(60, dtype=bool)
+        deleted[:50] = True
+        searcher = build(vectors)
+        requested = []
+        search = searcher.search
+        searcher.search = lambda q, k, deleted=None: requested.append(k) or search(q, k, deleted)
+
+        scores, indices = SegmentedVectorIndex([(searcher, deleted)]).search(doc_vectors(1, 3), 5)
+
+        assert requested == [5]
+        assert np.isfinite(scores).all()
+        assert set(indices.ravel()) <= set(range(50, 60))
+
+
+class TestSegmentedEmbeddingStore:
+    def test_replace_and_remove_documents(self, tmp_path):
+        store = SegmentedEmbeddingStore.create(tmp_path, model_name="m")
+        rows = doc_rows("a", 3) + doc_rows("b", 2) + doc_rows("c", 2)
+        store.update(doc_vectors(0, 7), rows, {"a": "h1", "b": "h1", "c": "h1"})
+
+        delta = store.update(doc_vectors(1, 4), doc_rows("b", 4, version=1), {"b": "h2"}, ["c"])
+
+        assert delta == {"rows_added": 4, "rows_deleted": 4}
+        reopened = SegmentedEmbeddingStore.open(tmp_path)
+        assert reopened.count == 7
+        assert reopened.document_hashes() == {"a": "h1", "b": "h2"}
+        assert live_node_ids(reopened) == sorted(
+            [r["node_id"] for r in doc_rows("a", 3) + doc_rows("b", 4, version=1)]
+        )
+        index = reopened.vector_index()
+        _, indices = index.search(doc_vectors(0, 7), 7)
+        assert all(int(i) in reopened.metadata for i in indices.ravel() if i >= 0)
+        assert not set(indices[:, 0]) & {3, 4, 5, 6}
+
+    def test_compaction_merges_live_rows(self, tmp_path):
+        store = SegmentedEmbeddingStore.create(tmp_path)
+        for version in range(4):
+            store.update(doc_vectors(version, 2), doc_rows("a", 2, version), {"a": str(version)})
+        store.update(doc_vectors(9, 1), doc_rows("b", 1), {"b": "x"})
+        before = live_node_ids(store)
+        assert store.needs_compaction()
+
+        store.start_compaction().join()
+
+        reopened = SegmentedEmbeddingStore.open(tmp_path)
+        assert len(reopened.manifest["segments"]) == 1
+        assert reopened.deleted_count == 0
+        assert live_node_ids(reopened) == before
+        np.testing.assert_array_equal(
+            np.asarray(reopened.segment(reopened.documents["a"]["segment"]).vectors[:2]),
+            doc_vectors(3, 2),
+        )
+        assert sorted(p.name for p in tmp_path.iterdir() if p.is_dir()) == [
+            reopened.manifest["segments"][0]["name"]
+        ]
+
+    def test_open_views_keep_compacted_segments_until_released(self, tmp_path):
+        store = SegmentedEmbeddingStore.create(tmp_path)
+        for version in range(4):
+            store.update(doc_vectors(version, 2), doc_rows("a", 2, version), {"a": str(version)})
+        metadata, index = store.metadata, store.vector_index()
+        before = sorted(row["node_id"] for _, row in metadata.items())
+
+        store.start_compaction().join()
+
+        # The old views still read the merged-away segments
+        assert sorted(row["node_id"] for _, row in metadata.items()) == before
+        _, indices = index.search(doc_vectors(3, 2), 2)
+        assert all(int(i) in metadata for i in indices.ravel())
+        assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 5
+
+        del metadata, index
+        assert [p.name for p in tmp_path.iterdir() if p.is_dir()] == [
+            store.manifest["segments"][0]["name"]
+        ]
+
+
+class CountingModel:
+    container_available = True
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode_texts(self, texts):
+        self.encoded.extend(texts)
+        return normalize_rows([[len(t) % DIM + 1.0] + [1.0] * (DIM - 1) for t in texts])
+
+
+def write_yfinance(data_dir, ticker, value):
+    ticker_dir = data_dir / "stage_01_extract" / "yfinance" / "20250101" / ticker
+    ticker_dir.mkdir(parents=True, exist_ok=True)
+    (ticker_dir / f"{ticker}_yfinance_daily.json").write_text(json.dumps({"price": value}))
+    return ticker_dir
+
+
+def test_incremental_run_encodes_only_the_delta(tmp_path, monkeypatch):
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    config = VectorEmbeddingConfig(dimension=DIM, cache_embeddings=False)
+
+    for ticker in ["AAA", "BBB", "CCC"]:
+        write_yfinance(tmp_path, ticker, 1)
+    first = sr.SemanticEmbeddingGenerator(config)
+    first.model = CountingModel()
+    assert first.generate_document_embeddings(tmp_path).documents_processed == 3
+
+    write_yfinance(tmp_path, "BBB", 2)
+    write_yfinance(tmp_path, "DDD", 1)
+    for path in write_yfinance(tmp_path, "CCC", 1).iterdir():
+        path.unlink()
+
+    second = sr.SemanticEmbeddingGenerator(config)
+    second.model = CountingModel()
+    result = second.generate_document_embeddings(tmp_path)
+
+    assert len(second.model.encoded) == 2
+    assert result.documents_processed == 2
+    assert result.stats["documents_unchanged"] == 1
+    assert (result.stats["rows_added"], result.stats["rows_deleted"]) == (2, 2)
+
+    retriever = sr.SemanticRetriever(tmp_path / "stage_03_load" / "embeddings")
+    assert retriever.vector_index.ntotal == 3
+    assert sorted(row["ticker"] for _, row in retriever.document_metadata.items()) == [
+        "AAA",
+        "BBB",
+        "DDD",
+    ]
+
+
+def test_document_that_fails_to_load_keeps_its_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    config = VectorEmbeddingConfig(dimension=DIM, cache_embeddings=False)
+    write_yfinance(tmp_path, "AAPL", 1)
+    msft_dir = write_yfinance(tmp_path, "MSFT", 1)
+    first = sr.SemanticEmbeddingGenerator(config)
+    first.model = CountingModel()
+    first.generate_document_embeddings(tmp_path)
+
+    (msft_dir / "MSFT_yfinance_daily.json").write_text('{"price": ')
+    second = sr.SemanticEmbeddingGenerator(config)
+    second.model = CountingModel()
+    result = second.generate_document_embeddings(tmp_path)
+
+    assert result.stats["rows_deleted"] == 0
+    assert sorted(row["document_id"] for _, row in second.document_metadata.items()) == [
+        "AAPL_yfinance_daily",
+        "MSFT_yfinance_daily",
+    ]
+
+
+def test_generator_views_follow_background_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(sr, "_get_ml_service", lambda: None)
+    config = VectorEmbeddingConfig(dimension=DIM, cache_embeddings=False)
+    for ticker in ["AAA", "BBB", "CCC"]:
+        write_yfinance(tmp_path, ticker, 1)
+    first = sr.SemanticEmbeddingGenerator(config)
+    first.model = CountingModel()
+    first.generate_document_embeddings(tmp_path)
+
+    # Replacing two of three documents tombstones enough rows to trigger compaction
+    write_yfinance(tmp_path, "BBB", 2)
+    write_yfinance(tmp_path, "CCC", 2)
+    generator = sr.SemanticEmbeddingGenerator(config)
+    generator.model = CountingModel()
+    generator.generate_document_embeddings(tmp_path)
+    generator.compaction_thread.join()
+
+    assert sorted(row["ticker"] for _, row in generator.document_metadata.items()) == [
+        "AAA",
+        "BBB",
+        "CCC",
+    ]
+    _, indices = generator.vector_index.search(normalize_rows(np.ones((1, DIM))), 3)
+    assert all(int(i) in generator.document_metadata for i in indices.ravel())
+    store_dir = tmp_path / "stage_03_load" / "embeddings"
+    assert [p.name for p in store_dir.iterdir() if p.is_dir()] == [
+        generator.store.manifest["segments"][0]["name"]
+    ]
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy vector index used when FAISS is not installed.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.vector_index import (
+    IVF_MIN_ROWS,
+    IVFVectorIndex,
+    NumpyVectorIndex,
+    blocked_top_k,
+    normalize_rows,
+)
+
+
+def brute_force(queries, data, k):
+    scores = queries @ data.T
+    order = np.argsort(-scores, axis=1)[:, :k]
+    return np.take_along_axis(scores, order, axis=1), order
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(42)
+    return normalize_rows(rng.standard_normal((2000, 32)))
+
+
+class TestNumpyVectorIndex:
+    def test_matches_brute_force_for_every_query(self, data):
+        rng = np.random.default_rng(7)
+        queries = normalize_rows(rng.standard_normal((25, 32)))
+        index = NumpyVectorIndex(32)
+        index.add(data)
+
+        scores, indices = index.search(queries, 10)
+        expected_scores, expected_indices = brute_force(queries, data, 10)
+
+        assert scores.shape == (25, 10)
+        np.testing.assert_array_equal(indices, expected_indices)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+    def test_small_blocks_give_same_result(self, data):
+        queries = data[:5]
+        full = blocked_top_k(queries, data, 7)
+        blocked = blocked_top_k(queries, data, 7, max_block_elements=5 * 37)
+
+        np.testing.assert_array_equal(full[1], blocked[1])
+        # Each query's best match is itself
+        np.testing.assert_array_equal(blocked[1][:, 0], np.arange(5))
+
+    def test_pads_when_fewer_rows_than_k(self):
+        index = NumpyVectorIndex(4)
+        index.add(normalize_rows([[1, 0, 0, 0], [0, 1, 0, 0]]))
+
+        scores, indices = index.search(normalize_rows([[1, 1, 0, 0]]), 5)
+
+        assert list(indices[0][:2]) in ([0, 1], [1, 0])
+        assert list(indices[0][2:]) == [-1, -1, -1]
+        assert np.all(np.isneginf(scores[0][2:]))
+
+    def test_incremental_add_and_save_load(self, data, tmp_path):
+        index = NumpyVectorIndex(32)
+        for start in range(0, len(data), 300):
+            index.add(data[start : start + 300])
+        assert index.ntotal == len(data)
+        assert index.vectors.dtype == np.float32
+
+        index.save(tmp_path / "vector_index.npy")
+        loaded = NumpyVectorIndex.load(tmp_path / "vector_index.npy")
+
+        np.testing.assert_array_equal(loaded.search(data[:3], 4)[1], index.search(data[:3], 4)[1])
+
+
+def clustered(n, dim, n_clusters, seed):
+    """Rows drawn around n_clusters fixed centers (shared by every seed)."""
+    centers = np.random.default_rng(1234).standard_normal((n_clusters, dim))
+    rng = np.random.default_rng(seed)
+    return normalize_rows(
+        centers[rng.integers(0, n_clusters, n)] + 0.3 * rng.standard_normal((n, dim))
+    )
+
+
+class TestIVFVectorIndex:
+    def test_probing_every_list_is_exact(self, data):
+        index = IVFVectorIndex.build(data, nlist=16, nprobe=16)
+        queries = data[:10]
+
+        np.testing.assert_array_equal(index.search(queries, 5)[1], brute_force(queries, data, 5)[1])
+
+    def test_recall_on_clustered_data(self):
+        base = clustered(20000, 32, 50, seed=0)
+        queries = clustered(50, 32, 50, seed=1)
+        index = IVFVectorIndex.build(base, nprobe=16)
+
+        _, approx = index.search(queries, 10)
+        _, exact = brute_force(queries, base, 10)
+        recall = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(approx, exact)])
+
+        assert index.nlist == IVFVectorIndex.default_nlist(20000)
+        assert recall >= 0.95
+
+    def test_save_load_and_subset_search(self, data, tmp_path):
+        index = IVFVectorIndex.build(data, nlist=8, nprobe=2)
+        index.save(tmp_path / "vector_index_ivf")
+        loaded = IVFVectorIndex.load(tmp_path / "vector_index_ivf", mmap_mode="r", nprobe=2)
+
+        assert isinstance(loaded.vectors, np.memmap)
+        np.testing.assert_array_equal(loaded.search(data[:5], 4)[1], index.search(data[:5], 4)[1])
+
+        rows = np.arange(0, 2000, 7)
+        expected = rows[np.argsort(-(data[:3] @ data[rows].T), axis=1)[:, :5]]
+        np.testing.assert_array_equal(loaded.search_subset(data[:3], 5, rows)[1], expected)
+
+
+def test_segmented_store_builds_ivf_for_large_segments(tmp_path):
+    from ETL.embedding_store import SegmentedEmbeddingStore
+
+    base = clustered(IVF_MIN_ROWS, 16, 20, seed=0)
+    rows = [{"node_id": f"n{i}", "document_id": f"d{i // 10}"} for i in range(len(base))]
+    store = SegmentedEmbeddingStore.create(tmp_path)
+    store.set_index_config("ivf", nlist=32)
+    store.update(base, rows)
+    store.update(base[:10], rows[:10])
+
+    reopened = SegmentedEmbeddingStore.open(tmp_path)
+    assert [seg.get("index") for seg in reopened.manifest["segments"]] == ["ivf", None]
+    index = reopened.vector_index(nprobe=32)
+    _, indices = index.search(base[20:21], 1)
+    assert indices[0, 0] == 20
+    # Replaced rows of the IVF segment are never returned
+    assert index.search(base[:1], 1)[1][0, 0] == IVF_MIN_ROWS
+
+
+def test_simple_index_returns_results_for_every_query():
+    from ETL.semantic_retrieval import SimpleVectorIndex
+
+    index = SimpleVectorIndex(2)
+    index.add([[1.0, 0.0], [0.0, 1.0]])
+
+    scores, indices = index.search([[1.0, 0.0], [0.0, 1.0]], 1)
+
+    assert indices == [[0], [1]]
+    assert len(scores) == 2
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for the compressed (float16 / int8 / product-quantized) vector index.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.vector_index import normalize_rows
+from ETL.vector_quantization import (
+    QUANTIZATION_MIN_ROWS,
+    ProductQuantizer,
+    QuantizedVectorIndex,
+)
+
+
+def clustered(n, dim, n_clusters, seed, noise=0.5):
+    """Rows drawn around n_clusters fixed centers (shared by every seed)."""
+    centers = np.random.default_rng(1234).standard_normal((n_clusters, dim))
+    rng = np.random.default_rng(seed)
+    points = centers[rng.integers(0, n_clusters, n)] + noise * rng.standard_normal((n, dim))
+    return normalize_rows(points)
+
+
+def exact_top_k(queries, data, k):
+    return np.argsort(-(queries @ data.T), axis=1)[:, :k]
+
+
+def recall(approx, exact):
+    k = exact.shape[1]
+    return np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)])
+
+
+@pytest.fixture(scope="module")
+def base():
+    return clustered(5000, 32, 40, seed=0)
+
+
+@pytest.fixture(scope="module")
+def queries():
+    return clustered(40, 32, 40, seed=1)
+
+
+class TestQuantizedVectorIndex:
+    @pytest.mark.parametrize(
+        "compression, bytes_per_row", [("float16", 64), ("int8", 32), ("pq", 4)]
+    )
+    def test_memory_and_recall_with_rerank(self, base, queries, compression, bytes_per_row):
+        index = QuantizedVectorIndex.build(base, compression, rerank=20)
+
+        _, indices = index.search(queries, 10)
+
+        assert index.codes.nbytes == bytes_per_row * len(base)
+        assert recall(indices, exact_top_k(queries, base, 10)) >= 0.95
+
+    def test_rerank_returns_exact_scores(self, base, queries):
+        index = QuantizedVectorIndex.build(base, "int8")
+
+        scores, indices = index.search(queries, 5)
+
+        expected = np.take_along_axis(queries @ base.T, indices, axis=1)
+        np.testing.assert_allclose(scores, expected, rtol=1e-5)
+        assert np.all(np.diff(scores, axis=1) <= 0)
+
+    def test_without_vectors_scores_are_approximate(self, base, queries):
+        index = QuantizedVectorIndex.build(base, "int8")
+        index.vectors = None
+
+        _, indices = index.search(queries, 10)
+
+        assert recall(indices, exact_top_k(queries, base, 10)) >= 0.8
+
+    def test_k_larger_than_index_is_padded(self):
+        data = normalize_rows(np.eye(3, 8))
+        index = QuantizedVectorIndex.build(data, "float16")
+
+        scores, indices = index.search(data[:1], 5)
+
+        assert list(indices[0]) == [0, 1, 2, -1, -1]
+        assert np.isneginf(scores[0, 3:]).all()
+
+    def test_subset_search_only_returns_given_rows(self, base, queries):
+        index = QuantizedVectorIndex.build(base, "pq")
+        rows = np.arange(0, len(base), 9)
+
+        _, indices = index.search_subset(queries[:3], 5, rows)
+        index.vectors = None
+        _, approx = index.search_subset(queries[:3], 5, rows)
+
+        np.testing.assert_array_equal(indices, rows[exact_top_k(queries[:3], base[rows], 5)])
+        assert set(approx.ravel()) <= set(rows)
+
+    def test_save_load_round_trip(self, base, queries, tmp_path):
+        index = QuantizedVectorIndex.build(base, "pq", pq_subspaces=8)
+        index.save(tmp_path / "vector_index_quantized")
+
+        loaded = QuantizedVectorIndex.load(tmp_path / "vector_index_quantized", vectors=base)
+
+        assert loaded.compression == "pq"
+        assert loaded.quantizer.n_subspaces == 8
+        np.testing.assert_array_equal(loaded.search(queries, 5)[1], index.search(queries, 5)[1])
+
+    def test_unknown_compression_is_rejected(self, base):
+        with pytest.raises(ValueError):
+            QuantizedVectorIndex.build(base, "int4")
+
+
+def test_pq_subspaces_must_divide_dimension(base):
+    assert ProductQuantizer.default_subspaces(384) == 48
+    with pytest.raises(ValueError):
+        ProductQuantizer.train(base, n_subspaces=5)
+
+
+def test_segmented_store_quantizes_large_segments(tmp_path):
+    from ETL.embedding_store import SegmentedEmbeddingStore
+
+    base = clustered(QUANTIZATION_MIN_ROWS, 16, 20, seed=0)
+    rows = [{"node_id": f"n{i}", "document_id": f"d{i // 10}"} for i in range(len(base))]
+    store = SegmentedEmbeddingStore.create(tmp_path)
+    store.set_index_config(compression="pq", pq_subspaces=4)
+    store.update(base, rows)
+    store.update(base[:10], rows[:10])
+
+    reopened = SegmentedEmbeddingStore.open(tmp_path)
+    assert [seg.get("index") for seg in reopened.manifest["segments"]] == ["pq", None]
+    index = reopened.vector_index(rerank=20)
+    assert index.search(base[20:21], 1)[1][0, 0] == 20
+    # Replaced rows of the quantized segment are never returned
+    assert index.search(base[:1], 1)[1][0, 0] == QUANTIZATION_MIN_ROWS
+
+    with pytest.raises(ValueError):
+        store.set_index_config(compression="int4")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar (Parquet) yfinance extract format.
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ETL.price_import import history_columns
+from ETL.yfinance_columnar import read_extract, read_table, to_table, write_extract
+
+LOGGER = logging.getLogger(__name__)
+
+
+def extract():
+    return {
+        "ticker": "AAPL",
+        "period": "5y",
+        "interval": "1d",
+        "fetched_at": "2025-10-16T09:00:00",
+        "info": {"sector": "Technology", "fullTimeEmployees": 164000},
+        "history": {
+            # Across a DST change, as yfinance returns exchange-local bar dates
+            "Date": [
+                "2024-03-08T00:00:00-05:00",
+                "2024-03-11T00:00:00-04:00",
+                "2024-03-12T00:00:00-04:00",
+            ],
+            "Open": [169.0, 172.9, 173.2],
+            "High": [173.7, 174.4, 173.7],
+            "Low": [168.5, 171.0, 171.0],
+            "Close": [170.7, 172.8, 173.2],
+            "Volume": [76114600, 60139500, 59825400],
+        },
+        "dividends": {"2024-02-09T00:00:00-05:00": 0.24, "2024-05-10T00:00:00-04:00": 0.25},
+        "balance_sheet": {
+            "2024-09-30T00:00:00": {"Total Assets": 364980.0, "Total Debt": None},
+            "2023-09-30T00:00:00": {"Total Assets": 352583.0, "Total Debt": 111088.0},
+        },
+        # Keyed by year, not by date: stays in the JSON file
+        "earnings": {"Revenue": {"2023": 383285.0}},
+        "news": [{"title": "Headline"}],
+    }
+
+
+class TestColumnarExtract:
+    def test_round_trip_matches_json_layout(self, tmp_path):
+        path = tmp_path / "AAPL_yfinance_D1_251016-090000.json"
+        written = write_extract(extract(), str(path))
+
+        assert sorted(Path(p).name for p in written) == [
+            "AAPL_yfinance_D1_251016-090000.balance_sheet.parquet",
+            "AAPL_yfinance_D1_251016-090000.dividends.parquet",
+            "AAPL_yfinance_D1_251016-090000.history.parquet",
+            "AAPL_yfinance_D1_251016-090000.json",
+        ]
+        document = json.loads(path.read_text())
+        assert "history" not in document and "earnings" in document
+        assert read_extract(str(path)) == extract()
+
+    def test_projection_loads_only_requested_tables_and_columns(self, tmp_path):
+        path = tmp_path / "AAPL.json"
+        write_extract(extract(), str(path))
+
+        data = read_extract(str(path), tables=["history"], columns={"history": ["Close"]})
+
+        assert "balance_sheet" not in data and "dividends" not in data
+        assert list(data["history"]) == ["Date", "Close"]
+        assert data["history"]["Date"] == extract()["history"]["Date"]
+
+    def test_tables_have_typed_dates(self, tmp_path):
+        path = tmp_path / "AAPL.json"
+        write_extract(extract(), str(path))
+
+        history = read_table(str(path), "history", columns=["Close"])
+        assert history.schema.field("Date").type == pa.timestamp("us", tz="UTC")
+        assert history.column_names == ["Date", "utc_offset", "Close"]
+        statements = read_table(str(path), "balance_sheet")
+        assert statements.schema.field("Date").type == pa.timestamp("us")
+        assert statements.column("Total Assets").to_pylist() == [364980.0, 352583.0]
+
+    def test_json_extracts_read_the_same_way(self, tmp_path):
+        path = tmp_path / "AAPL.json"
+        path.write_text(json.dumps(extract(), indent=2))
+
+        assert read_extract(str(path), tables=["history"]) == extract()
+        assert read_table(str(path), "history").num_rows == 3
+        assert read_table(str(path), "earnings") is None
+
+    def test_fields_outside_their_layout_are_not_tables(self):
+        assert to_table("history", {"Close": [1.0]}) is None
+        assert to_table("dividends", {"not a date": 1.0}) is None
+        assert to_table("info", {"sector": "Technology"}) is None
+
+
+def test_spider_saves_columnar_extracts(tmp_path):
+    from common.build.metadata_manager import MetadataManager
+    from ETL import yfinance_spider
+
+    manager = MetadataManager(str(tmp_path / "extract"))
+    config_info = {"period": "5y", "interval": "1d", "oid": "D1", "exe_id": "run-1"}
+    with patch.object(yfinance_spider, "STAGE_01_EXTRACT_DIR", str(tmp_path / "extract")):
+        path = yfinance_spider.save_data(
+            "AAPL", "yfinance", "D1", extract(), LOGGER, manager, config_info, "parquet"
+        )
+
+    assert path.endswith(".json")
+    assert len(list(Path(path).parent.glob("*.parquet"))) == 3
+    assert manager.check_file_exists_recent("yfinance", "AAPL", "D1", config_info, hours=24)
+    data = read_extract(path, tables=["history"])
+    assert history_columns(data["history"]) == history_columns(extract()["history"])
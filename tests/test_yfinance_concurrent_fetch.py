@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Tests for the concurrent, rate-limited yfinance fetch engine.
+Runs ETL/yfinance_spider.run_job against a local fake yfinance Ticker.
+"""
+
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from common.utils.rate_limiting import RateLimiter, TokenBucket, call_with_retries
+
+
+class FakeIndex(list):
+    name = "Date"
+
+
+class FakeFrame:
+    """Minimal stand-in for the DataFrames returned by yfinance."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.index = FakeIndex(datetime(2025, 1, i + 1) for i in range(len(rows)))
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def to_dict(self, orient="dict"):
+        return {"Close": list(self.rows)}
+
+
+class FakeTicker:
+    """Fake yf.Ticker that records calls and can fail a number of times."""
+
+    instances = []
+    lock = threading.Lock()
+    failures_left = {}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.history_calls = []
+        self.info = {"symbol": symbol}
+        with FakeTicker.lock:
+            FakeTicker.instances.append(self)
+
+    def history(self, period, interval):
+        with FakeTicker.lock:
+            if FakeTicker.failures_left.get(self.symbol, 0) > 0:
+                FakeTicker.failures_left[self.symbol] -= 1
+                raise RuntimeError("HTTP 429")
+        self.history_calls.append((period, interval))
+        return FakeFrame([1.0, 2.0])
+
+
+@pytest.fixture
+def spider(tmp_path):
+    from ETL import yfinance_spider
+
+    FakeTicker.instances = []
+    FakeTicker.failures_left = {}
+    with patch.object(yfinance_spider, "STAGE_01_EXTRACT_DIR", str(tmp_path / "extract")):
+        yield yfinance_spider
+
+
+def write_config(tmp_path, **overrides):
+    config = {
+        "source": "yfinance",
+        "tickers": ["AAPL", "MSFT", "NVDA", "GOOGL"],
+        "data_periods": {
+            "daily_3mo": {"period": "3mo", "interval": "1d"},
+            "weekly_5y": {"period": "5y", "interval": "1wk"},
+        },
+        "rate_limits": {"requests_per_second": 1000, "max_retries": 2, "retry_after_seconds": 0},
+        "max_workers": 4,
+    }
+    config.update(overrides)
+    config_path = tmp_path / "job.yml"
+    config_path.write_text(yaml.dump(config))
+    return str(config_path)
+
+
+class TestTokenBucket:
+    def test_bucket_throttles_after_capacity(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+
+        # Two tokens are free, the next two each wait 0.5s at 2 tokens/s
+        assert sum(sleeps) == pytest.approx(1.0)
+
+    def test_limiter_from_config_enforces_per_minute_budget(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        limiter = RateLimiter.from_config(
+            {"requests_per_second": 10, "requests_per_minute": 60},
+            clock=lambda: now[0],
+            sleep=sleep,
+        )
+        for _ in range(120):
+            limiter.acquire()
+
+        # First 60 are burst capacity, the next 60 are refilled at 1/s
+        assert now[0] == pytest.approx(60.0, rel=0.05)
+        assert limiter.total_acquired == 120
+
+    def test_call_with_retries_reraises_after_budget(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            call_with_retries(flaky, max_retries=2, retry_after_seconds=0, sleep=lambda s: None)
+        assert len(calls) == 3
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.total_acquired = 0
+
+    def acquire(self):
+        self.total_acquired += 1
+        return 0.0
+
+
+class TestConcurrentRunJob:
+    def test_every_yfinance_request_takes_a_token(self, spider):
+        limiter = CountingLimiter()
+
+        data = spider.fetch_stock_data("AAPL", "3mo", "1d", tkr=FakeTicker("AAPL"), limiter=limiter)
+
+        # history plus one request per downloaded attribute; the rest is fetch metadata
+        metadata = {"ticker", "period", "interval", "fetched_at"}
+        assert limiter.total_acquired == len(data.keys() - metadata)
+
+    def test_all_periods_share_one_ticker_session(self, spider, tmp_path):
+        summary = spider.run_job(write_config(tmp_path), ticker_factory=FakeTicker)
+
+        assert summary["processed"] == 8
+        assert summary["success"] == 8
+        assert summary["errors"] == 0
+        assert summary["fetched"] == 8
+        assert summary["throughput_per_second"] > 0
+
+        # One session per ticker, each serving both periods
+        assert sorted(t.symbol for t in FakeTicker.instances) == ["AAPL", "GOOGL", "MSFT", "NVDA"]
+        for tkr in FakeTicker.instances:
+            assert tkr.history_calls == [("3mo", "1d"), ("5y", "1wk")]
+
+        saved = list((tmp_path / "extract" / "yfinance").rglob("*_yfinance_*.json"))
+        assert len(saved) == 8
+
+    def test_retries_follow_rate_limit_config(self, spider, tmp_path):
+        FakeTicker.failures_left = {"MSFT": 2, "NVDA": 5}
+
+        summary = spider.run_job(write_config(tmp_path), ticker_factory=FakeTicker)
+
+        # MSFT recovers within max_retries=2, NVDA exhausts retries on its first period
+        assert summary["errors"] == 1
+        assert summary["success"] == 7
+
+    def test_sequential_mode_matches_concurrent_results(self, spider, tmp_path):
+        summary = spider.run_job(write_config(tmp_path, max_workers=1), ticker_factory=FakeTicker)
+
+        assert summary["workers"] == 1
+        assert summary["success"] == 8
+
+    def test_rerun_skips_recent_data(self, spider, tmp_path):
+        config_path = write_config(tmp_path, tickers=["AAPL"])
+        spider.run_job(config_path, ticker_factory=FakeTicker)
+        FakeTicker.instances = []
+
+        summary = spider.run_job(config_path, ticker_factory=FakeTicker)
+
+        assert summary["skipped"] == 2
+        assert summary["fetched"] == 0
+        # No Ticker session is opened when every period is fresh
+        assert FakeTicker.instances == []
+
+    def test_indexes_are_written_once_per_ticker_at_job_end(self, spider, tmp_path):
+        from common.build.metadata_manager import MetadataManager
+
+        calls = []
+        generate = MetadataManager.generate_markdown_index
+
+        def counting(manager, source, ticker):
+            calls.append(ticker)
+            generate(manager, source, ticker)
+
+        with patch.object(MetadataManager, "generate_markdown_index", counting):
+            summary = spider.run_job(write_config(tmp_path), ticker_factory=FakeTicker)
+
+        assert sorted(calls) == ["AAPL", "GOOGL", "MSFT", "NVDA"]
+        assert summary["indexes_written"] == 4
+        readmes = list((tmp_path / "extract" / "yfinance").rglob("README.md"))
+        assert len(readmes) == 4
+
+    def test_markdown_index_can_be_skipped(self, spider, tmp_path):
+        summary = spider.run_job(
+            write_config(tmp_path, markdown_index=False), ticker_factory=FakeTicker
+        )
+
+        assert summary["success"] == 8
+        assert summary["indexes_written"] == 0
+        assert not list((tmp_path / "extract" / "yfinance").rglob("README.md"))